@@ -1,20 +1,13 @@
-import os
-import psycopg2
-from urllib.parse import urlparse
-from dotenv import load_dotenv
-
-load_dotenv()
-
-DATABASE_URL = os.getenv('DATABASE_URL')
-result = urlparse(DATABASE_URL)
-
-conn = psycopg2.connect(
-    database=result.path[1:],
-    user=result.username,
-    password=result.password,
-    host=result.hostname,
-    port=result.port
-)
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from decor.db import connect
+from decor.instrument import instrument
+
+# Connexion partagée (DATABASE_URL de l'environnement ou du .env)
+# Requêtes chronométrées (QUERY_EXPLAIN=1 pour capturer les plans)
+conn = instrument(connect())
 
 cur = conn.cursor()
 
@@ -1,20 +1,13 @@
-import os
-import psycopg2
-from urllib.parse import urlparse
-from dotenv import load_dotenv
+import sys
+from pathlib import Path
 
-load_dotenv()
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from decor.db import connect, stream_rows
+from decor.instrument import instrument
 
-DATABASE_URL = os.getenv('DATABASE_URL')
-result = urlparse(DATABASE_URL)
-
-conn = psycopg2.connect(
-    database=result.path[1:],
-    user=result.username,
-    password=result.password,
-    host=result.hostname,
-    port=result.port
-)
+# Connexion partagée (DATABASE_URL de l'environnement ou du .env)
+# Requêtes chronométrées (QUERY_EXPLAIN=1 pour capturer les plans)
+conn = instrument(connect())
 
 cur = conn.cursor()
 
@@ -145,7 +138,8 @@ else:
 print("\n\n📦 5. PRODUITS 'DIVERS' / 'FACTURE COMPTA'")
 print("-"*80)
 
-cur.execute("""
+# Liste non bornée : lue en flux (curseur serveur), affichée au fil de l'eau
+produits_divers = stream_rows(conn, """
     SELECT 
         p.id,
         p.famille,
@@ -165,14 +159,16 @@ cur.execute("""
     ORDER BY nb_tickets DESC
 """)
 
-produits_divers = cur.fetchall()
-if produits_divers:
-    print(f"\n{'Code':<12} {'Famille':<30} {'Sous-famille':<35} {'Tickets':>8} {'CA €':>12} {'Caisses':>8}")
-    print("-"*80)
-    for p in produits_divers:
-        pid, fam, sfam, tickets, ca, caisses = p
-        print(f"{pid:<12} {(fam or 'N/A')[:30]:<30} {(sfam or 'N/A')[:35]:<35} {tickets:>8} {ca:>12,.0f} {caisses:>8}")
-    print(f"\n⚠️  TOTAL: {len(produits_divers)} produits de type Divers/Facture/Compta")
+nb_divers = 0
+for p in produits_divers:
+    if nb_divers == 0:
+        print(f"\n{'Code':<12} {'Famille':<30} {'Sous-famille':<35} {'Tickets':>8} {'CA €':>12} {'Caisses':>8}")
+        print("-"*80)
+    nb_divers += 1
+    pid, fam, sfam, tickets, ca, caisses = p
+    print(f"{pid:<12} {(fam or 'N/A')[:30]:<30} {(sfam or 'N/A')[:35]:<35} {tickets:>8} {ca:>12,.0f} {caisses:>8}")
+if nb_divers:
+    print(f"\n⚠️  TOTAL: {nb_divers} produits de type Divers/Facture/Compta")
 else:
     print("✅ Aucun produit 'Divers' trouvé")
 
@@ -0,0 +1,42 @@
+// Clés entières des dimensions (scripts/decor/dimensions.py, `apply-migration.py cles`)
+// Préfixe `_` : module, pas une route Vercel
+
+// Colonnes carte_id / produit_id / depot_id présentes sur transactions
+export async function clesEntieres(prisma) {
+  const [{ cles }] = await prisma.$queryRaw`
+    SELECT COUNT(*) = 3 as cles FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = 'transactions'
+      AND column_name IN ('carte_id', 'produit_id', 'depot_id')
+  `
+  return cles
+}
+
+// Fragments SQL (transactions t, clients c, produits p) : jointures sur entiers
+// une fois la base migrée. Les clients comptés sur transactions restent sur
+// `carte` (texte) : carte_id est NULL pour une carte absente de clients
+export async function jointures(prisma) {
+  return (await clesEntieres(prisma))
+    ? { produits: 't.produit_id = p.cle', clients: 't.carte_id = c.cle', client: 'c.cle' }
+    : { produits: 't.produit = p.id', clients: 't.carte = c.carte', client: 'c.carte' }
+}
+
+// Requêtes à placer dans le même prisma.$transaction([...]) qu'un chargement
+// de transactions : *_id encore vides renseignés depuis les dimensions, comme
+// fill_keys (scripts/decor/dimensions.py). Aucun membre créé : une clé
+// inconnue (carte '0', produit orphelin) reste NULL
+export function renseignerCles(prisma) {
+  return [
+    prisma.$executeRaw`
+      UPDATE transactions t SET carte_id = c.cle FROM clients c
+      WHERE c.carte = t.carte AND t.carte_id IS NULL
+    `,
+    prisma.$executeRaw`
+      UPDATE transactions t SET produit_id = p.cle FROM produits p
+      WHERE p.id = t.produit AND t.produit_id IS NULL
+    `,
+    prisma.$executeRaw`
+      UPDATE transactions t SET depot_id = m.cle FROM magasins m
+      WHERE m.code = t.depot AND t.depot_id IS NULL
+    `
+  ]
+}
@@ -0,0 +1,34 @@
+// Codes dépôt partagés par les routes (préfixe `_` : module, pas une route Vercel)
+import { clesEntieres } from './_cles.js'
+
+// Code dépôt canonique ('M32', '032' → '32' ; vide → '0'), comme scripts/decor/depots.py à l'import
+export function canonicalDepot(code) {
+  const text = String(code ?? '').trim().toUpperCase().replace(/^(?:MAG|M)[\s_-]*(?=\d)/, '')
+  if (!text) return '0'
+  return /^\d+(?:\.0+)?$/.test(text) ? String(parseInt(text, 10)) : text
+}
+
+// `apply-migration.py depots` passé : codes canonisés, table depot_aliases créée
+export async function depotsCanonises(prisma) {
+  const [{ canonique }] = await prisma.$queryRaw`
+    SELECT to_regclass('public.depot_aliases') IS NOT NULL as canonique
+  `
+  return canonique
+}
+
+// Jointure magasins : équi-jointure indexée une fois les codes dépôt canonisés
+// (sur depot_id si la base a les clés entières), sinon les formes 'M32' / '32'
+export async function magasinJoin(prisma) {
+  if (!(await depotsCanonises(prisma))) {
+    return "JOIN magasins m ON (t.depot = m.code OR t.depot = CONCAT('M', m.code) OR REPLACE(t.depot, 'M', '') = m.code)"
+  }
+  return (await clesEntieres(prisma)) ? 'JOIN magasins m ON t.depot_id = m.cle' : 'JOIN magasins m ON t.depot = m.code'
+}
+
+// Formes du code dépôt à chercher : la forme canonique sur une base migrée,
+// sinon aussi 'M32' / '32' comme avant la migration
+export async function depotCodes(prisma, storeCode) {
+  const depot = canonicalDepot(storeCode)
+  if (await depotsCanonises(prisma)) return [depot]
+  return [...new Set([storeCode, depot, `M${depot}`, storeCode.replace(/^M/, '')])]
+}
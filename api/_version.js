@@ -0,0 +1,21 @@
+// Version des données (scripts/decor/version.py), clé des exports en cache
+// Préfixe `_` : module, pas une route Vercel
+
+// Requêtes d'incrément à placer dans le même prisma.$transaction([...])
+// que les écritures : une lecture ne voit jamais de lignes nouvelles sous
+// l'ancienne version
+export function incrementVersion(prisma) {
+  return [
+    prisma.$executeRaw`
+      CREATE TABLE IF NOT EXISTS data_version (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+      )
+    `,
+    prisma.$executeRaw`
+      INSERT INTO data_version (id, version) VALUES (TRUE, 1)
+      ON CONFLICT (id) DO UPDATE SET version = data_version.version + 1, updated_at = NOW()
+    `
+  ]
+}
@@ -1,4 +1,5 @@
 import { PrismaClient } from '@prisma/client'
+import { jointures } from './_cles.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
@@ -20,7 +21,68 @@ export default async function handler(req, res) {
   }
 
   try {
+    const { fenetre, periode, depot } = req.query
+
+    // Classes précalculées par scripts/decor/abc.py (table abc_classes) : ?fenetre=mois|3m|12m
+    if (fenetre) {
+      const [{ precalcule }] = await prisma.$queryRaw`
+        SELECT to_regclass('public.abc_classes') IS NOT NULL as precalcule
+      `
+      if (!precalcule) {
+        return res.status(404).json({ error: 'Classes ABC non calculées (scripts/refresh-aggregates.py --only abc --full)' })
+      }
+
+      const periodes = await prisma.$queryRaw`
+        SELECT DISTINCT TO_CHAR(periode, 'YYYY-MM') as mois
+        FROM abc_classes
+        WHERE fenetre = ${fenetre}
+        ORDER BY mois DESC
+      `
+      const mois = periode || periodes[0]?.mois
+      if (!mois) {
+        return res.status(404).json({ error: `Aucun classement pour la fenêtre ${fenetre}` })
+      }
+
+      const depots = depot ? [depot] : ['TOUS', 'MAGASIN', 'WEB']
+      const rows = await prisma.$queryRaw`
+        SELECT depot, produit, famille, ca::float as ca, volume::int as volume,
+               rang::int as rang, part_cumulee::float as part, classe
+        FROM abc_classes
+        WHERE fenetre = ${fenetre}
+          AND periode = TO_DATE(${mois}, 'YYYY-MM')
+          AND depot = ANY(${depots})
+        ORDER BY depot, rang
+      `
+
+      const produits = {}
+      depots.forEach(code => { produits[code] = {} })
+      rows.forEach(row => {
+        produits[row.depot][row.produit] = {
+          ca: row.ca,
+          volume: row.volume,
+          famille: row.famille,
+          classe: row.classe,
+          rang: row.rang,
+          cumulativePercent: row.part * 100
+        }
+      })
+
+      console.log(`✅ API ABC Analysis: ${rows.length} classements (précalculés, ${fenetre} ${mois})`)
+
+      return res.status(200).json(depot
+        ? { fenetre, periode: mois, periodes: periodes.map(p => p.mois), depot, produits: produits[depot] }
+        : {
+            fenetre,
+            periode: mois,
+            periodes: periodes.map(p => p.mois),
+            produits: produits.TOUS,
+            produitsMag: produits.MAGASIN,
+            produitsWeb: produits.WEB
+          })
+    }
+
     console.log('🔄 API ABC Analysis: Calcul en cours...')
+    const cles = await jointures(prisma)
 
     // Données TOUS canaux
     const famillesAll = await prisma.$queryRawUnsafe(`
@@ -29,7 +91,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL
       GROUP BY p.famille
       ORDER BY SUM(t.ca) DESC
@@ -42,7 +104,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL
       GROUP BY p.famille, p.sous_famille
       ORDER BY SUM(t.ca) DESC
@@ -55,7 +117,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL
       GROUP BY t.produit, p.famille
       ORDER BY SUM(t.ca) DESC
@@ -68,7 +130,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot != 'WEB'
       GROUP BY p.famille
       ORDER BY SUM(t.ca) DESC
@@ -81,7 +143,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot != 'WEB'
       GROUP BY p.famille, p.sous_famille
       ORDER BY SUM(t.ca) DESC
@@ -94,7 +156,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot != 'WEB'
       GROUP BY t.produit, p.famille
       ORDER BY SUM(t.ca) DESC
@@ -107,7 +169,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot = 'WEB'
       GROUP BY p.famille
       ORDER BY SUM(t.ca) DESC
@@ -120,7 +182,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot = 'WEB'
       GROUP BY p.famille, p.sous_famille
       ORDER BY SUM(t.ca) DESC
@@ -133,7 +195,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::numeric as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot = 'WEB'
       GROUP BY t.produit, p.famille
       ORDER BY SUM(t.ca) DESC
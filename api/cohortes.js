@@ -22,6 +22,43 @@ export default async function handler(req, res) {
   try {
     console.log('🔄 API Cohortes: Calcul en cours...')
 
+    // Matrice précalculée par scripts/refresh-aggregates.py (tables client_first_purchase / cohort_matrix)
+    const [{ precalcule }] = await prisma.$queryRaw`
+      SELECT to_regclass('public.cohort_matrix') IS NOT NULL as precalcule
+    `
+    if (precalcule) {
+      const matrice = await prisma.$queryRaw`
+        SELECT
+          TO_CHAR(cohort_month, 'YYYY-MM') as cohort_month,
+          TO_CHAR(active_month, 'YYYY-MM') as active_month,
+          clients::int as clients,
+          ca::float as ca,
+          volume::int as volume
+        FROM cohort_matrix
+        ORDER BY cohort_month, active_month
+      `
+
+      // Taille d'une cohorte = clients actifs le mois de leur premier achat
+      const result = {}
+      matrice.forEach(row => {
+        if (!result[row.cohort_month]) {
+          result[row.cohort_month] = { clients: { size: 0 }, ca: 0, volume: 0 }
+        }
+        if (row.active_month === row.cohort_month) {
+          result[row.cohort_month].clients.size = row.clients
+        }
+        result[row.cohort_month].ca += row.ca
+        result[row.cohort_month].volume += row.volume
+      })
+
+      console.log(`✅ API Cohortes: ${Object.keys(result).length} cohortes (précalculées)`)
+
+      return res.status(200).json({
+        cohortes: result,
+        retention: matrice
+      })
+    }
+
     // Obtenir la première transaction de chaque client (cohorte)
     const cohorteData = await prisma.$queryRawUnsafe(`
       WITH first_purchase AS (
@@ -1,4 +1,5 @@
 import { PrismaClient } from '@prisma/client'
+import { jointures } from './_cles.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
@@ -26,7 +27,49 @@ export default async function handler(req, res) {
 
     console.log('🔄 API Cross-Selling: Requête reçue', { magasin })
 
+    // Règles précalculées par scripts/cross-selling-rules.py (table cross_selling_rules)
+    const [{ precalcule }] = await prisma.$queryRaw`
+      SELECT to_regclass('public.cross_selling_rules') IS NOT NULL as precalcule
+    `
+    if (precalcule) {
+      const scope = showWebOnly ? 'web' : showMagasinOnly ? 'magasin' : 'tous'
+
+      // Une ligne par paire (antécédent < conséquent), les plus fréquentes d'abord
+      const paires = await prisma.$queryRaw`
+        SELECT antecedent, consequent, tickets::int as tickets, ca::float as ca
+        FROM cross_selling_rules
+        WHERE scope = ${scope} AND niveau = 'famille' AND nb_articles = 2 AND antecedent < consequent
+        ORDER BY tickets DESC
+        LIMIT 50
+      `
+      const regles = await prisma.$queryRaw`
+        SELECT antecedent, consequent, nb_articles::int as "nbArticles", tickets::int as tickets,
+               support::float as support, confidence::float as confidence, lift::float as lift
+        FROM cross_selling_rules
+        WHERE scope = ${scope} AND niveau = 'famille'
+        ORDER BY lift DESC
+        LIMIT 50
+      `
+      const stats = await prisma.$queryRaw`
+        SELECT tickets_multi::int as "ticketsMulti" FROM cross_selling_stats
+        WHERE scope = ${scope} AND niveau = 'famille'
+      `
+
+      console.log(`✅ API Cross-Selling: ${paires.length} associations (précalculées, ${scope})`)
+
+      return res.status(200).json({
+        associations: paires.map(row => ({
+          families: [row.antecedent, row.consequent],
+          count: row.tickets,
+          totalCA: row.ca
+        })),
+        rules: regles,
+        totalTickets: stats[0]?.ticketsMulti || 0
+      })
+    }
+
     // Query avec structure RFM
+    const cles = await jointures(prisma)
     let results
     
     if (showWebOnly) {
@@ -39,7 +82,7 @@ export default async function handler(req, res) {
           ARRAY_AGG(DISTINCT p.famille) as familles,
           SUM(t.ca)::numeric as ca_ticket
         FROM transactions t
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.ca > 0 AND t.facture IS NOT NULL AND t.depot = 'WEB' AND p.famille IS NOT NULL
         GROUP BY t.facture, t.date
         HAVING COUNT(DISTINCT p.famille) >= 2
@@ -56,7 +99,7 @@ export default async function handler(req, res) {
           ARRAY_AGG(DISTINCT p.famille) as familles,
           SUM(t.ca)::numeric as ca_ticket
         FROM transactions t
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.ca > 0 AND t.facture IS NOT NULL AND t.depot != 'WEB' AND p.famille IS NOT NULL
         GROUP BY t.facture, t.date
         HAVING COUNT(DISTINCT p.famille) >= 2
@@ -73,7 +116,7 @@ export default async function handler(req, res) {
           ARRAY_AGG(DISTINCT p.famille) as familles,
           SUM(t.ca)::numeric as ca_ticket
         FROM transactions t
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.ca > 0 AND t.facture IS NOT NULL AND p.famille IS NOT NULL
         GROUP BY t.facture, t.date
         HAVING COUNT(DISTINCT p.famille) >= 2
@@ -1,4 +1,6 @@
 import { PrismaClient } from '@prisma/client'
+import { jointures } from './_cles.js'
+import { magasinJoin } from './_depots.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
@@ -33,6 +35,8 @@ export default async function handler(req, res) {
     if (!process.env.DATABASE_URL) {
       throw new Error('DATABASE_URL not configured')
     }
+    const joinMagasins = await magasinJoin(prisma)
+    const cles = await jointures(prisma)
     
     // Gestion des périodes personnalisées (startDate/endDate)
     if (startDate && endDate) {
@@ -48,15 +52,15 @@ export default async function handler(req, res) {
       
       const statsClients = await prisma.$queryRawUnsafe(`
         SELECT 
-          COUNT(DISTINCT c.carte)::int as total,
-          COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN c.carte END)::int as hommes,
-          COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN c.carte END)::int as femmes,
-          COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN c.carte END)::int as avec_nom,
-          COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN c.carte END)::int as avec_prenom,
-          COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN c.carte END)::int as avec_email,
-          COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN c.carte END)::int as avec_telephone
+          COUNT(DISTINCT ${cles.client})::int as total,
+          COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN ${cles.client} END)::int as hommes,
+          COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN ${cles.client} END)::int as femmes,
+          COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN ${cles.client} END)::int as avec_nom,
+          COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN ${cles.client} END)::int as avec_prenom,
+          COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN ${cles.client} END)::int as avec_email,
+          COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN ${cles.client} END)::int as avec_telephone
         FROM clients c
-        INNER JOIN transactions t ON c.carte = t.carte
+        INNER JOIN transactions t ON ${cles.clients}
         WHERE t.date >= '${startDate}' AND t.date <= '${endDate}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
       `)
       
@@ -69,7 +73,7 @@ export default async function handler(req, res) {
           SUM(t.ca)::float as ca,
           SUM(t.quantite)::float as volume
         FROM transactions t
-        JOIN produits p ON t.produit = p.id
+        JOIN produits p ON ${cles.produits}
         WHERE t.date >= '${startDate}' AND t.date <= '${endDate}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY p.id, p.famille, p.sous_famille
         ORDER BY ca DESC
@@ -86,7 +90,7 @@ export default async function handler(req, res) {
           COUNT(DISTINCT t.facture)::int as "nbTickets",
           (SUM(t.ca) / COUNT(DISTINCT t.facture))::float as "panierMoyen"
         FROM transactions t
-        JOIN magasins m ON (t.depot = m.code OR t.depot = CONCAT('M', m.code) OR REPLACE(t.depot, 'M', '') = m.code)
+        ${joinMagasins}
         WHERE t.date >= '${startDate}' AND t.date <= '${endDate}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY m.code, m.nom, m.zone
         ORDER BY ca DESC
@@ -100,7 +104,7 @@ export default async function handler(req, res) {
           SUM(t.ca)::float as ca,
           COUNT(DISTINCT t.facture)::int as "nbCommandes"
         FROM transactions t
-        JOIN clients c ON t.carte = c.carte
+        JOIN clients c ON ${cles.clients}
         WHERE t.date >= '${startDate}' AND t.date <= '${endDate}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY c.carte, c.ville
         ORDER BY ca DESC
@@ -198,15 +202,15 @@ export default async function handler(req, res) {
       
       const statsClients = await prisma.$queryRawUnsafe(`
         SELECT 
-          COUNT(DISTINCT c.carte)::int as total,
-          COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN c.carte END)::int as hommes,
-          COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN c.carte END)::int as femmes,
-          COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN c.carte END)::int as avec_nom,
-          COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN c.carte END)::int as avec_prenom,
-          COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN c.carte END)::int as avec_email,
-          COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN c.carte END)::int as avec_telephone
+          COUNT(DISTINCT ${cles.client})::int as total,
+          COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN ${cles.client} END)::int as hommes,
+          COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN ${cles.client} END)::int as femmes,
+          COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN ${cles.client} END)::int as avec_nom,
+          COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN ${cles.client} END)::int as avec_prenom,
+          COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN ${cles.client} END)::int as avec_email,
+          COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN ${cles.client} END)::int as avec_telephone
         FROM clients c
-        INNER JOIN transactions t ON c.carte = t.carte
+        INNER JOIN transactions t ON ${cles.clients}
         WHERE t.date >= '${startDateStr}' AND t.date <= '${endDateStr}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
       `)
       
@@ -219,7 +223,7 @@ export default async function handler(req, res) {
           SUM(t.ca)::float as ca,
           SUM(t.quantite)::float as volume
         FROM transactions t
-        JOIN produits p ON t.produit = p.id
+        JOIN produits p ON ${cles.produits}
         WHERE t.date >= '${startDateStr}' AND t.date <= '${endDateStr}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY p.id, p.famille, p.sous_famille
         ORDER BY ca DESC
@@ -236,7 +240,7 @@ export default async function handler(req, res) {
           COUNT(DISTINCT t.facture)::int as "nbTickets",
           (SUM(t.ca) / COUNT(DISTINCT t.facture))::float as "panierMoyen"
         FROM transactions t
-        JOIN magasins m ON (t.depot = m.code OR t.depot = CONCAT('M', m.code) OR REPLACE(t.depot, 'M', '') = m.code)
+        ${joinMagasins}
         WHERE t.date >= '${startDateStr}' AND t.date <= '${endDateStr}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY m.code, m.nom, m.zone
         ORDER BY ca DESC
@@ -250,7 +254,7 @@ export default async function handler(req, res) {
           SUM(t.ca)::float as ca,
           COUNT(DISTINCT t.facture)::int as "nbCommandes"
         FROM transactions t
-        JOIN clients c ON t.carte = c.carte
+        JOIN clients c ON ${cles.clients}
         WHERE t.date >= '${startDateStr}' AND t.date <= '${endDateStr}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY c.carte, c.ville
         ORDER BY ca DESC
@@ -340,15 +344,15 @@ export default async function handler(req, res) {
       
       const statsClients = await prisma.$queryRawUnsafe(`
         SELECT 
-          COUNT(DISTINCT c.carte)::int as total,
-          COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN c.carte END)::int as hommes,
-          COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN c.carte END)::int as femmes,
-          COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN c.carte END)::int as avec_nom,
-          COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN c.carte END)::int as avec_prenom,
-          COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN c.carte END)::int as avec_email,
-          COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN c.carte END)::int as avec_telephone
+          COUNT(DISTINCT ${cles.client})::int as total,
+          COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN ${cles.client} END)::int as hommes,
+          COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN ${cles.client} END)::int as femmes,
+          COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN ${cles.client} END)::int as avec_nom,
+          COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN ${cles.client} END)::int as avec_prenom,
+          COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN ${cles.client} END)::int as avec_email,
+          COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN ${cles.client} END)::int as avec_telephone
         FROM clients c
-        INNER JOIN transactions t ON c.carte = t.carte
+        INNER JOIN transactions t ON ${cles.clients}
         WHERE t.depot NOT IN ('1', '41', '42') AND t.ca > 0
       `)
       
@@ -361,7 +365,7 @@ export default async function handler(req, res) {
           SUM(t.ca)::float as ca,
           SUM(t.quantite)::float as volume
         FROM transactions t
-        JOIN produits p ON t.produit = p.id
+        JOIN produits p ON ${cles.produits}
         WHERE t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY p.id, p.famille, p.sous_famille
         ORDER BY ca DESC
@@ -378,7 +382,7 @@ export default async function handler(req, res) {
           COUNT(DISTINCT t.facture)::int as "nbTickets",
           (SUM(t.ca) / COUNT(DISTINCT t.facture))::float as "panierMoyen"
         FROM transactions t
-        JOIN magasins m ON (t.depot = m.code OR t.depot = CONCAT('M', m.code) OR REPLACE(t.depot, 'M', '') = m.code)
+        ${joinMagasins}
         WHERE t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY m.code, m.nom, m.zone
         ORDER BY ca DESC
@@ -392,7 +396,7 @@ export default async function handler(req, res) {
           SUM(t.ca)::float as ca,
           COUNT(DISTINCT t.facture)::int as "nbCommandes"
         FROM transactions t
-        JOIN clients c ON t.carte = c.carte
+        JOIN clients c ON ${cles.clients}
         WHERE t.depot NOT IN ('1', '41', '42') AND t.ca > 0
         GROUP BY c.carte, c.ville
         ORDER BY ca DESC
@@ -485,15 +489,15 @@ export default async function handler(req, res) {
     // Statistiques qualité des données clients
     const statsClients = await prisma.$queryRawUnsafe(`
       SELECT 
-        COUNT(DISTINCT c.carte)::int as total,
-        COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN c.carte END)::int as hommes,
-        COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN c.carte END)::int as femmes,
-        COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN c.carte END)::int as avec_nom,
-        COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN c.carte END)::int as avec_prenom,
-        COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN c.carte END)::int as avec_email,
-        COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN c.carte END)::int as avec_telephone
+        COUNT(DISTINCT ${cles.client})::int as total,
+        COUNT(DISTINCT CASE WHEN c.sexe = 'H' THEN ${cles.client} END)::int as hommes,
+        COUNT(DISTINCT CASE WHEN c.sexe = 'F' THEN ${cles.client} END)::int as femmes,
+        COUNT(DISTINCT CASE WHEN c.nom IS NOT NULL AND c.nom != '' THEN ${cles.client} END)::int as avec_nom,
+        COUNT(DISTINCT CASE WHEN c.prenom IS NOT NULL AND c.prenom != '' THEN ${cles.client} END)::int as avec_prenom,
+        COUNT(DISTINCT CASE WHEN c.email IS NOT NULL AND c.email != '' THEN ${cles.client} END)::int as avec_email,
+        COUNT(DISTINCT CASE WHEN c.telephone IS NOT NULL AND c.telephone != '' THEN ${cles.client} END)::int as avec_telephone
       FROM clients c
-      INNER JOIN transactions t ON c.carte = t.carte
+      INNER JOIN transactions t ON ${cles.clients}
       WHERE t.date >= '${startDateYear}' AND t.date <= '${endDateYear}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
     `)
     
@@ -506,7 +510,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::float as ca,
         SUM(t.quantite)::float as volume
       FROM transactions t
-      JOIN produits p ON t.produit = p.id
+      JOIN produits p ON ${cles.produits}
       WHERE t.date >= '${startDateYear}' AND t.date <= '${endDateYear}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
       GROUP BY p.id, p.famille, p.sous_famille
       ORDER BY ca DESC
@@ -523,7 +527,7 @@ export default async function handler(req, res) {
         COUNT(DISTINCT t.facture)::int as "nbTickets",
         (SUM(t.ca) / COUNT(DISTINCT t.facture))::float as "panierMoyen"
       FROM transactions t
-      JOIN magasins m ON (t.depot = m.code OR t.depot = CONCAT('M', m.code) OR REPLACE(t.depot, 'M', '') = m.code)
+      ${joinMagasins}
       WHERE t.date >= '${startDateYear}' AND t.date <= '${endDateYear}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
       GROUP BY m.code, m.nom, m.zone
       ORDER BY ca DESC
@@ -537,7 +541,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::float as ca,
         COUNT(DISTINCT t.facture)::int as "nbCommandes"
       FROM transactions t
-      JOIN clients c ON t.carte = c.carte
+      JOIN clients c ON ${cles.clients}
       WHERE t.date >= '${startDateYear}' AND t.date <= '${endDateYear}' AND t.depot NOT IN ('1', '41', '42') AND t.ca > 0
       GROUP BY c.carte, c.ville
       ORDER BY ca DESC
@@ -1,5 +1,6 @@
-import { PrismaClient } from '@prisma/client'
+import { PrismaClient, Prisma } from '@prisma/client'
 import ExcelJS from 'exceljs'
+import { jointures } from './_cles.js'
 
 const prisma = new PrismaClient({ log: ['error', 'warn'] })
 
@@ -34,6 +35,7 @@ export default async function handler(req, res) {
   // Export normal
   try {
     console.log('🚀 Export API - Début');
+    const cles = await jointures(prisma);
 
     // 1. Familles
     const famillesData = await prisma.$queryRaw`
@@ -42,7 +44,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::float as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      JOIN produits p ON t.produit = p.id
+      JOIN produits p ON ${Prisma.raw(cles.produits)}
       WHERE p.famille IS NOT NULL AND p.famille != ''
       GROUP BY p.famille
       ORDER BY ca DESC
@@ -57,7 +59,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::float as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      JOIN produits p ON t.produit = p.id
+      JOIN produits p ON ${Prisma.raw(cles.produits)}
       GROUP BY p.id, p.famille, p.sous_famille
       ORDER BY ca DESC
       LIMIT 100
@@ -79,7 +81,7 @@ export default async function handler(req, res) {
         (SUM(t.ca) / COUNT(DISTINCT t.facture))::float as panier_moyen,
         MAX(t.date)::text as dernier_achat
       FROM transactions t
-      JOIN clients c ON t.carte = c.carte
+      JOIN clients c ON ${Prisma.raw(cles.clients)}
       WHERE t.carte != '0'
       GROUP BY c.carte, c.nom, c.prenom, c.email, c.telephone, c.sexe, c.ville, c.cp
       ORDER BY ca_total DESC
@@ -211,6 +213,7 @@ export default async function handler(req, res) {
 async function handleRFMAIExport(req, res) {
   try {
     console.log('🤖 Export RFM pour IA - Début')
+    const cles = await jointures(prisma)
     const today = new Date()
 
     // 1. Récupérer TOUTES les données RFM avec segmentation
@@ -231,7 +234,7 @@ async function handleRFMAIExport(req, res) {
           MAX(t.date)::text as last_date,
           MIN(t.date)::text as first_date
         FROM clients c
-        INNER JOIN transactions t ON c.carte = t.carte
+        INNER JOIN transactions t ON ${cles.clients}
         WHERE c.carte != '0'
         GROUP BY c.carte, c.nom, c.prenom, c.email, c.telephone, c.sexe, c.ville, c.cp
         HAVING SUM(t.ca) > 0
@@ -558,6 +561,7 @@ Stratégie : Campagnes de reconquête à faible coût (email), offres de "derni
 async function handleRFMAuditExcel(req, res) {
   try {
     console.log('🔬 Génération Excel Audit RFM TECHNIQUE - Début')
+    const cles = await jointures(prisma)
     const today = new Date()
 
     // ============================================================================
@@ -576,7 +580,7 @@ async function handleRFMAuditExcel(req, res) {
         t.ca::float as montant,
         t.facture
       FROM transactions t
-      LEFT JOIN clients c ON t.carte = c.carte
+      LEFT JOIN clients c ON ${Prisma.raw(cles.clients)}
       WHERE t.carte IS NOT NULL 
         AND t.carte != '0'
         AND t.ca > 0
@@ -1,4 +1,5 @@
 import { PrismaClient } from '@prisma/client'
+import { jointures } from './_cles.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
@@ -21,6 +22,7 @@ export default async function handler(req, res) {
 
   try {
     console.log('🔄 API Forecast: Calcul en cours...')
+    const cles = await jointures(prisma)
 
     // Données TOUS canaux - CA par mois et famille
     const saisonAll = await prisma.$queryRawUnsafe(`
@@ -29,7 +31,7 @@ export default async function handler(req, res) {
         p.famille::text,
         SUM(t.ca)::numeric as ca
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL
       GROUP BY TO_CHAR(date, 'YYYY-MM'), p.famille
       ORDER BY mois, p.famille
@@ -42,7 +44,7 @@ export default async function handler(req, res) {
         p.famille::text,
         SUM(t.ca)::numeric as ca
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot != 'WEB'
       GROUP BY TO_CHAR(date, 'YYYY-MM'), p.famille
       ORDER BY mois, p.famille
@@ -55,7 +57,7 @@ export default async function handler(req, res) {
         p.famille::text,
         SUM(t.ca)::numeric as ca
       FROM transactions t
-      LEFT JOIN produits p ON t.produit = p.id
+      LEFT JOIN produits p ON ${cles.produits}
       WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot = 'WEB'
       GROUP BY TO_CHAR(date, 'YYYY-MM'), p.famille
       ORDER BY mois, p.famille
@@ -73,12 +75,37 @@ export default async function handler(req, res) {
       return result
     }
 
-    console.log(`✅ API Forecast: Données calculées`)
+    // Prévisions précalculées par scripts/forecast-series.py (table forecasts)
+    const [{ precalcule }] = await prisma.$queryRaw`
+      SELECT to_regclass('public.forecasts') IS NOT NULL as precalcule
+    `
+    let previsions = null
+    if (precalcule) {
+      const rows = await prisma.$queryRaw`
+        SELECT
+          scope,
+          TO_CHAR(periode, 'YYYY-MM') as mois,
+          famille,
+          modele,
+          prevision::float as prevision,
+          borne_basse::float as basse,
+          borne_haute::float as haute
+        FROM forecasts
+        WHERE granularite = 'mois' AND depot = '' AND scope IN ('tous', 'magasin', 'web')
+        ORDER BY scope, famille, periode
+      `
+      const canaux = { tous: 'all', magasin: 'mag', web: 'web' }
+      previsions = { all: [], mag: [], web: [] }
+      rows.forEach(({ scope, ...row }) => previsions[canaux[scope]].push(row))
+    }
+
+    console.log(`✅ API Forecast: Données calculées${previsions ? ' (prévisions précalculées)' : ''}`)
 
     res.status(200).json({
       saison: formatData(saisonAll),
       saisonMag: formatData(saisonMag),
-      saisonWeb: formatData(saisonWeb)
+      saisonWeb: formatData(saisonWeb),
+      ...(previsions && { previsions })
     })
 
   } catch (error) {
@@ -1,4 +1,5 @@
-import { PrismaClient } from '@prisma/client'
+import { PrismaClient, Prisma } from '@prisma/client'
+import { jointures } from './_cles.js'
 
 const prisma = new PrismaClient({ log: ['error', 'warn'] })
 
@@ -20,6 +21,7 @@ export default async function handler(req, res) {
 
   try {
     console.log('🚀 Marketing API - Début');
+    const cles = await jointures(prisma);
 
     // 1. Données mensuelles magasin (clients avec carte)
     const monthlyMagasin = await prisma.$queryRaw`
@@ -50,7 +52,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::float as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      JOIN produits p ON t.produit = p.id
+      JOIN produits p ON ${Prisma.raw(cles.produits)}
       WHERE t.depot = 'WEB'
       GROUP BY p.id, p.famille, p.sous_famille
       ORDER BY ca DESC
@@ -66,7 +68,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::float as ca,
         COUNT(*)::int as volume
       FROM transactions t
-      JOIN produits p ON t.produit = p.id
+      JOIN produits p ON ${Prisma.raw(cles.produits)}
       WHERE t.depot != 'WEB' AND t.carte != '0'
       GROUP BY TO_CHAR(t.date, 'YYYY-MM'), p.id, p.famille, p.sous_famille
       ORDER BY month DESC, ca DESC
@@ -78,7 +80,7 @@ export default async function handler(req, res) {
         SUM(t.ca)::float as ca,
         COUNT(DISTINCT t.carte)::int as clients
       FROM transactions t
-      JOIN clients c ON t.carte = c.carte
+      JOIN clients c ON ${Prisma.raw(cles.clients)}
       WHERE t.carte != '0' AND c.cp IS NOT NULL AND c.cp != ''
       GROUP BY SUBSTRING(c.cp, 1, 2)
       ORDER BY ca DESC
@@ -115,7 +117,7 @@ export default async function handler(req, res) {
         COUNT(DISTINCT t.facture)::int as nb_achats,
         MAX(t.date)::text as dernier_achat
       FROM clients c
-      INNER JOIN transactions t ON c.carte = t.carte
+      INNER JOIN transactions t ON ${Prisma.raw(cles.clients)}
       WHERE c.email IS NOT NULL 
         AND c.email != '' 
         AND c.carte != '0'
@@ -13,6 +13,19 @@ const serializeJSON = (obj) => {
   )
 }
 
+// Cartes d'une même personne regroupées (table client_identity, scripts/dedupe-clients.py)
+async function transactionsSource() {
+  const [{ precalcule }] = await prisma.$queryRaw`
+    SELECT to_regclass('public.client_identity') IS NOT NULL as precalcule
+  `
+  if (!precalcule) return 'transactions'
+  return `(
+    SELECT COALESCE(ci.client_id, tr.carte) AS carte, tr.facture, tr.depot, tr.date, tr.ca
+    FROM transactions tr
+    LEFT JOIN client_identity ci ON ci.carte = tr.carte
+  )`
+}
+
 export default async function handler(req, res) {
   // CORS headers
   res.setHeader('Access-Control-Allow-Credentials', 'true')
@@ -41,6 +54,7 @@ export default async function handler(req, res) {
     
     // Calcul RFM optimisé avec NTILE directement en SQL
     let clientsData
+    const source = await transactionsSource()
     
     if (showWebOnly) {
       clientsData = await prisma.$queryRawUnsafe(`
@@ -61,7 +75,7 @@ export default async function handler(req, res) {
             MAX(t.date)::text as last_date,
             MIN(t.date)::text as first_date
           FROM clients c
-          INNER JOIN transactions t ON c.carte = t.carte
+          INNER JOIN ${source} t ON c.carte = t.carte
           WHERE t.depot = 'WEB' AND c.carte != '0'
           GROUP BY c.carte, c.nom, c.prenom, c.email, c.telephone, c.sexe, c.ville, c.cp
           HAVING SUM(t.ca) > 0
@@ -108,7 +122,7 @@ export default async function handler(req, res) {
             MAX(t.date)::text as last_date,
             MIN(t.date)::text as first_date
           FROM clients c
-          INNER JOIN transactions t ON c.carte = t.carte
+          INNER JOIN ${source} t ON c.carte = t.carte
           WHERE t.depot != 'WEB' AND c.carte != '0'
           GROUP BY c.carte, c.nom, c.prenom, c.email, c.telephone, c.sexe, c.ville, c.cp
           HAVING SUM(t.ca) > 0
@@ -155,7 +169,7 @@ export default async function handler(req, res) {
             MAX(t.date)::text as last_date,
             MIN(t.date)::text as first_date
           FROM clients c
-          INNER JOIN transactions t ON c.carte = t.carte
+          INNER JOIN ${source} t ON c.carte = t.carte
           WHERE c.carte != '0'
           GROUP BY c.carte, c.nom, c.prenom, c.email, c.telephone, c.sexe, c.ville, c.cp
           HAVING SUM(t.ca) > 0
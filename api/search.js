@@ -1,9 +1,53 @@
 import { PrismaClient } from '@prisma/client'
+import { jointures } from './_cles.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
 })
 
+// Index de recherche (scripts/apply-migration.py recherche, scripts/decor/search.py) :
+// préfixes sans casse ni accents servis par des index B-tree sur recherche_normalise().
+// Champs indexés par type lus dans recherche_champs (recopie de KINDS, colonnes
+// absentes de la base écartées à la migration) : { client: { nom_table, colonnes, filtre, champs }, ... }
+async function searchFields() {
+  const [{ precalcule }] = await prisma.$queryRaw`
+    SELECT to_regprocedure('recherche_normalise(text)') IS NOT NULL
+       AND to_regclass('public.recherche_champs') IS NOT NULL as precalcule
+  `
+  if (!precalcule) return null
+  const rows = await prisma.$queryRaw`SELECT type, nom_table, colonnes, filtre, champs FROM recherche_champs`
+  return Object.fromEntries(rows.map(row => [row.type, row]))
+}
+
+const likeEscape = (text) => text.replace(/[\\%_]/g, c => '\\' + c)
+
+// Nom de colonne d'une expression SELECT ('NULL AS email' → 'email')
+const columnName = (expression) => expression.split(' ').pop()
+
+// Une sous-requête par champ, lue dans l'ordre de son index et arrêtée à `limit`
+function prefixSearchSQL({ nom_table, colonnes, filtre, champs }, limit) {
+  const branches = champs.map((expression, rang) => {
+    const key = `recherche_normalise(${expression})`
+    return `
+      (SELECT ${colonnes.join(', ')}, ${rang} AS rang, ${key} AS cle_recherche
+       FROM ${nom_table}
+       WHERE ${filtre} AND ${key} LIKE recherche_normalise($1) || '%'
+       ORDER BY ${key} USING ~<~
+       LIMIT ${limit})`
+  })
+  return `SELECT * FROM (${branches.join(' UNION ALL ')}) s ORDER BY rang, cle_recherche USING ~<~`
+}
+
+// Condition « un champ indexé commence par $1 » sur la table d'un type
+const prefixWhere = ({ champs }) =>
+  champs.map(expression => `recherche_normalise(${expression}) LIKE recherche_normalise($1) || '%'`).join(' OR ')
+
+// Une ligne trouvée par plusieurs champs n'apparaît qu'une fois
+function uniqueBy(rows, key, limit) {
+  const seen = new Set()
+  return rows.filter(r => !seen.has(r[key]) && seen.add(r[key])).slice(0, limit)
+}
+
 export default async function handler(req, res) {
   // CORS headers
   res.setHeader('Access-Control-Allow-Credentials', 'true')
@@ -29,10 +73,56 @@ export default async function handler(req, res) {
     console.log(`🔍 API Search: ${type} - "${query}"`)
 
     let results = []
+    const fields = await searchFields()
+
+    if (type === 'suggestion') {
+      // Recherche à la frappe : clients (carte, nom prénom, email), produits (code, désignation, référence), tickets
+      if (!fields) {
+        return res.status(503).json({ error: 'Index de recherche absent (python scripts/apply-migration.py recherche)' })
+      }
+      const pattern = likeEscape(query.trim())
+      const suggestions = {}
+      for (const kind of ['client', 'produit', 'ticket']) {
+        const spec = fields[kind]
+        const rows = spec ? await prisma.$queryRawUnsafe(prefixSearchSQL(spec, 10), pattern) : []
+        const key = spec && columnName(spec.colonnes[0])
+        suggestions[`${kind}s`] = uniqueBy(rows, key, 10).map(({ rang, cle_recherche, ...row }) => row)
+      }
+      return res.status(200).json(suggestions)
+    }
+
+    const cles = await jointures(prisma)
 
     if (type === 'ticket') {
-      // Recherche par facture
-      results = await prisma.$queryRawUnsafe(`
+      // Recherche par facture : numéros par préfixe dans l'index des tickets,
+      // sous-chaîne sur transactions seulement si rien n'est trouvé
+      if (fields?.ticket) {
+        results = await prisma.$queryRawUnsafe(`
+          SELECT 
+            t.facture::text,
+            t.date::text,
+            t.carte::text,
+            c.ville::text,
+            t.depot::text,
+            t.produit::text,
+            p.famille::text,
+            p.sous_famille::text,
+            t.ca::numeric,
+            t.quantite::numeric
+          FROM transactions t
+          LEFT JOIN clients c ON ${cles.clients}
+          LEFT JOIN produits p ON ${cles.produits}
+          WHERE t.facture IN (
+            SELECT facture FROM tickets
+            WHERE ${prefixWhere(fields.ticket)}
+            ORDER BY recherche_normalise(${fields.ticket.champs[0]}) USING ~<~
+            LIMIT 100
+          )
+          ORDER BY t.date DESC
+          LIMIT 100
+        `, likeEscape(query.trim()))
+      }
+      if (results.length === 0) results = await prisma.$queryRawUnsafe(`
         SELECT 
           t.facture::text,
           t.date::text,
@@ -45,8 +135,8 @@ export default async function handler(req, res) {
           t.ca::numeric,
           t.quantite::numeric
         FROM transactions t
-        LEFT JOIN clients c ON t.carte = c.carte
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN clients c ON ${cles.clients}
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.facture ILIKE $1
         ORDER BY t.date DESC
         LIMIT 100
@@ -86,8 +176,8 @@ export default async function handler(req, res) {
           t.heure::int,
           t.montant_ttc::numeric
         FROM transactions t
-        LEFT JOIN clients c ON t.carte = c.carte
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN clients c ON ${cles.clients}
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.carte = $1
         ORDER BY t.date DESC
         LIMIT 100
@@ -112,8 +202,34 @@ export default async function handler(req, res) {
         }))
       })
     } else if (type === 'produit') {
-      // Recherche par produit
-      results = await prisma.$queryRawUnsafe(`
+      // Recherche par produit : code, désignation ou référence interne par préfixe,
+      // sous-chaîne du code sur transactions seulement si rien n'est trouvé
+      if (fields?.produit) {
+        results = await prisma.$queryRawUnsafe(`
+          SELECT 
+            t.facture::text,
+            t.date::text,
+            t.carte::text,
+            c.ville::text,
+            t.depot::text,
+            t.produit::text,
+            p.famille::text,
+            p.sous_famille::text,
+            t.ca::numeric,
+            t.quantite::numeric
+          FROM transactions t
+          LEFT JOIN clients c ON ${cles.clients}
+          LEFT JOIN produits p ON ${cles.produits}
+          WHERE t.produit IN (
+            SELECT id FROM produits
+            WHERE ${prefixWhere(fields.produit)}
+            LIMIT 50
+          )
+          ORDER BY t.date DESC
+          LIMIT 100
+        `, likeEscape(query.trim()))
+      }
+      if (results.length === 0) results = await prisma.$queryRawUnsafe(`
         SELECT 
           t.facture::text,
           t.date::text,
@@ -126,14 +242,14 @@ export default async function handler(req, res) {
           t.ca::numeric,
           t.quantite::numeric
         FROM transactions t
-        LEFT JOIN clients c ON t.carte = c.carte
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN clients c ON ${cles.clients}
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.produit ILIKE $1
         ORDER BY t.date DESC
         LIMIT 100
       `, `%${query}%`)
     } else {
-      return res.status(400).json({ error: 'Invalid type. Use: ticket, client, or produit' })
+      return res.status(400).json({ error: 'Invalid type. Use: ticket, client, produit or suggestion' })
     }
 
     console.log(`✅ API Search: ${results.length} résultats`)
@@ -1,9 +1,51 @@
-import { PrismaClient } from '@prisma/client'
+import { PrismaClient, Prisma } from '@prisma/client'
+import { jointures } from './_cles.js'
+import { canonicalDepot, depotCodes } from './_depots.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
 })
 
+async function catchmentPrecalcule() {
+  const [{ precalcule }] = await prisma.$queryRaw`
+    SELECT to_regclass('public.catchment_store_clients') IS NOT NULL as precalcule
+  `
+  return precalcule
+}
+
+// Codes postaux par magasin depuis les tables de chalandise (un magasin, ou tous si depot est null)
+async function precomputedZones(depot) {
+  return prisma.$queryRaw`
+    WITH ventes AS (
+      SELECT depot, cp, SUM(ca) AS ca, SUM(lignes) AS lignes
+      FROM catchment_cp_month
+      WHERE ${depot}::text IS NULL OR depot = ${depot}
+      GROUP BY depot, cp
+    ), cartes AS (
+      SELECT depot, cp, COUNT(*) AS clients
+      FROM catchment_store_clients
+      WHERE cp IS NOT NULL AND (${depot}::text IS NULL OR depot = ${depot})
+      GROUP BY depot, cp
+    ), villes AS (
+      SELECT depot, cp, STRING_AGG(DISTINCT ville, ', ') AS ville
+      FROM catchment_cp_month, unnest(string_to_array(villes, ', ')) ville
+      WHERE ${depot}::text IS NULL OR depot = ${depot}
+      GROUP BY depot, cp
+    )
+    SELECT
+      v.depot as store_code,
+      v.cp,
+      n.ville,
+      c.clients::int as nb_clients,
+      v.ca::float as total_ca,
+      v.lignes::int as nb_transactions
+    FROM ventes v
+    JOIN cartes c USING (depot, cp)
+    LEFT JOIN villes n USING (depot, cp)
+    ORDER BY v.depot, v.ca DESC
+  `
+}
+
 export default async function handler(req, res) {
   // CORS headers
   res.setHeader('Access-Control-Allow-Credentials', 'true')
@@ -30,25 +72,42 @@ export default async function handler(req, res) {
     try {
       console.log(`🔍 [SIMPLE] Récupération zones pour magasin ${storeCode}...`);
 
-      // Essayer avec et sans le préfixe "M"
-      const storeCodeWithM = storeCode.startsWith('M') ? storeCode : `M${storeCode}`;
-      const storeCodeWithoutM = storeCode.replace(/^M/, '');
-      
-      console.log(`  🔍 Test codes: "${storeCode}", "${storeCodeWithM}", "${storeCodeWithoutM}"`);
+      // Codes dépôt canonisés à l'import : une seule forme à chercher sur une base migrée
+      const depot = canonicalDepot(storeCode);
+      const depots = await depotCodes(prisma, storeCode);
+
+      // Zones précalculées à l'import (scripts/decor/catchment.py)
+      if (await catchmentPrecalcule()) {
+        const zones = await precomputedZones(depot);
+        return res.status(200).json({
+          success: true,
+          storeCode,
+          data: zones
+            .filter(row => row.nb_clients >= 10)
+            .map(row => ({
+              cp: row.cp,
+              ville: row.ville,
+              nbClients: row.nb_clients,
+              totalCA: row.total_ca,
+              nbTransactions: row.nb_transactions
+            }))
+        });
+      }
 
-      // D'abord vérifier combien de transactions ce magasin a (tester les 3 formats)
+      // D'abord vérifier combien de transactions ce magasin a
+      const cles = await jointures(prisma);
       const totalTx = await prisma.$queryRaw`
         SELECT 
           COUNT(*)::int as nb_tx,
           COUNT(DISTINCT t.carte)::int as nb_clients,
           SUM(t.ca)::numeric as ca_total
         FROM transactions t
-        WHERE (t.depot = ${storeCode} OR t.depot = ${storeCodeWithM} OR t.depot = ${storeCodeWithoutM})
+        WHERE t.depot = ANY(${depots})
           AND t.ca > 0
       `;
       console.log(`  📊 Magasin ${storeCode}: ${totalTx[0].nb_tx} transactions, ${totalTx[0].nb_clients} clients, ${parseFloat(totalTx[0].ca_total || 0).toFixed(0)}€ CA`);
 
-      // Requête ultra-simple: tous les CP avec leur CA pour ce magasin (tester les 3 formats)
+      // Requête ultra-simple: tous les CP avec leur CA pour ce magasin
       const zones = await prisma.$queryRaw`
         SELECT 
           c.cp::text as cp,
@@ -57,8 +116,8 @@ export default async function handler(req, res) {
           SUM(t.ca)::numeric as total_ca,
           COUNT(*)::int as nb_transactions
         FROM transactions t
-        INNER JOIN clients c ON t.carte = c.carte
-        WHERE (t.depot = ${storeCode} OR t.depot = ${storeCodeWithM} OR t.depot = ${storeCodeWithoutM})
+        INNER JOIN clients c ON ${Prisma.raw(cles.clients)}
+        WHERE t.depot = ANY(${depots})
           AND t.ca > 0
           AND c.cp IS NOT NULL 
           AND c.cp != ''
@@ -117,11 +176,15 @@ export default async function handler(req, res) {
     try {
       // Récupérer tous les magasins
       const stores = await prisma.magasin.findMany();
+      const cles = await jointures(prisma);
       
       console.log(`🔄 Récupération zones pour ${stores.length} magasins...`);
       
       // OPTIMISATION: UNE SEULE requête SQL pour TOUS les magasins
-      const allStoreData = await prisma.$queryRaw`
+      // (zones précalculées à l'import si scripts/decor/catchment.py a créé ses tables)
+      const allStoreData = await catchmentPrecalcule()
+        ? (await precomputedZones(null)).filter(row => row.nb_transactions >= 10)
+        : await prisma.$queryRaw`
         SELECT 
           t.depot as store_code,
           c.cp::text,
@@ -130,7 +193,7 @@ export default async function handler(req, res) {
           SUM(t.ca)::numeric as total_ca,
           COUNT(*)::int as nb_transactions
         FROM transactions t
-        INNER JOIN clients c ON t.carte = c.carte
+        INNER JOIN clients c ON ${Prisma.raw(cles.clients)}
         WHERE t.ca > 0 
           AND c.cp IS NOT NULL 
           AND c.cp != '' 
@@ -247,6 +310,7 @@ export default async function handler(req, res) {
     })
 
     console.log(`📊 ${magasinsTable.length} magasins physiques trouvés`)
+    const cles = await jointures(prisma)
 
     // 2. Stats détaillées par magasin
     const magasinsStats = await prisma.$queryRaw`
@@ -282,7 +346,7 @@ export default async function handler(req, res) {
           COUNT(*)::int as volume,
           ROW_NUMBER() OVER (PARTITION BY t.depot ORDER BY SUM(t.ca) DESC) as rang
         FROM transactions t
-        INNER JOIN produits p ON t.produit = p.id
+        INNER JOIN produits p ON ${Prisma.raw(cles.produits)}
         WHERE t.ca > 0 
           AND t.depot IS NOT NULL 
           AND t.depot NOT LIKE 'D%'
@@ -313,7 +377,7 @@ export default async function handler(req, res) {
           MAX(t.date) as dernier_achat,
           ROW_NUMBER() OVER (PARTITION BY t.depot ORDER BY SUM(t.ca) DESC) as rang
         FROM transactions t
-        INNER JOIN clients c ON t.carte = c.carte
+        INNER JOIN clients c ON ${Prisma.raw(cles.clients)}
         WHERE t.ca > 0 
           AND t.depot IS NOT NULL 
           AND t.depot NOT LIKE 'D%'
@@ -338,7 +402,7 @@ export default async function handler(req, res) {
           COUNT(*)::int as nb_transactions,
           ROW_NUMBER() OVER (PARTITION BY t.depot ORDER BY SUM(t.ca) DESC) as rang
         FROM transactions t
-        INNER JOIN clients c ON t.carte = c.carte
+        INNER JOIN clients c ON ${Prisma.raw(cles.clients)}
         WHERE t.ca > 0 
           AND t.depot IS NOT NULL 
           AND t.depot NOT LIKE 'D%'
@@ -490,9 +554,10 @@ async function handleCatchmentArea(req, res, storeCode) {
     }
 
     // Récupérer toutes les transactions du magasin avec les infos clients
+    const depots = await depotCodes(prisma, storeCode);
     const transactions = await prisma.transaction.findMany({
       where: {
-        depot: storeCode,
+        depot: { in: depots },
       },
       include: {
         client: true,
@@ -562,8 +627,8 @@ async function handleCatchmentArea(req, res, storeCode) {
     }
 
     // Récupérer info magasin
-    const store = await prisma.magasin.findUnique({
-      where: { code: storeCode },
+    const store = await prisma.magasin.findFirst({
+      where: { code: { in: depots } },
     });
 
     res.json({
@@ -1,4 +1,5 @@
 import { PrismaClient } from '@prisma/client'
+import { jointures } from './_cles.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
@@ -26,7 +27,77 @@ export default async function handler(req, res) {
 
     console.log('🔄 API Sub-Families: Requête reçue', { magasin })
 
+    // Cumuls précalculés par scripts/decor/hierarchy.py (tables hierarchy_nodes / hierarchy_rollup)
+    const [{ precalcule }] = await prisma.$queryRaw`
+      SELECT to_regclass('public.hierarchy_rollup') IS NOT NULL as precalcule
+    `
+    if (precalcule) {
+      const scope = showWebOnly ? 'web' : showMagasinOnly ? 'magasin' : 'tous'
+      const parent = req.query.parent ? Number(req.query.parent) : null
+
+      const noeuds = await prisma.$queryRaw`
+        SELECT
+          n.id,
+          n.niveau::int as niveau,
+          n.famille,
+          n.sous_famille,
+          SUM(r.ca)::float as ca,
+          SUM(r.volume)::int as volume,
+          SUM(r.nb_tickets)::int as nb_tickets
+        FROM hierarchy_nodes n
+        JOIN hierarchy_rollup r ON r.node_id = n.id
+        WHERE n.niveau IN (0, 2)
+          AND (${scope} = 'tous' OR (r.depot = 'WEB') = (${scope} = 'web'))
+        GROUP BY n.id
+        ORDER BY SUM(r.ca) DESC
+      `
+
+      const subFamilies = noeuds
+        .filter(row => row.niveau === 2)
+        .map(row => ({
+          id: row.id,
+          famille: row.famille,
+          sousFamille: row.sous_famille,
+          ca: row.ca,
+          volume: row.volume,
+          nbTickets: row.nb_tickets
+        }))
+      const total = noeuds.find(row => row.niveau === 0)
+
+      // Descente dans la hiérarchie : ?parent=<id> → enfants du nœud
+      let children
+      if (parent !== null) {
+        children = await prisma.$queryRaw`
+          SELECT
+            n.id,
+            n.niveau::int as niveau,
+            n.famille,
+            n.sous_famille as "sousFamille",
+            n.sous_sous_famille as "sousSousFamille",
+            n.sous_sous_sous_famille as "sousSousSousFamille",
+            SUM(r.ca)::float as ca,
+            SUM(r.volume)::int as volume,
+            SUM(r.nb_tickets)::int as "nbTickets"
+          FROM hierarchy_nodes n
+          JOIN hierarchy_rollup r ON r.node_id = n.id
+          WHERE n.parent_id = ${parent}
+            AND (${scope} = 'tous' OR (r.depot = 'WEB') = (${scope} = 'web'))
+          GROUP BY n.id
+          ORDER BY SUM(r.ca) DESC
+        `
+      }
+
+      console.log(`✅ API Sub-Families: ${subFamilies.length} sous-familles (précalculées)`)
+
+      return res.status(200).json({
+        subFamilies,
+        totalTickets: total?.nb_tickets || 0,
+        ...(children && { children })
+      })
+    }
+
     // Query avec CTE comme RFM
+    const cles = await jointures(prisma)
     let results
     
     if (showWebOnly) {
@@ -38,7 +109,7 @@ export default async function handler(req, res) {
           COUNT(*)::int as volume,
           COUNT(DISTINCT t.facture)::int as nb_tickets
         FROM transactions t
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.ca > 0 AND t.depot = 'WEB'
         GROUP BY p.famille, p.sous_famille
         ORDER BY SUM(t.ca) DESC
@@ -52,7 +123,7 @@ export default async function handler(req, res) {
           COUNT(*)::int as volume,
           COUNT(DISTINCT t.facture)::int as nb_tickets
         FROM transactions t
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.ca > 0 AND t.depot != 'WEB'
         GROUP BY p.famille, p.sous_famille
         ORDER BY SUM(t.ca) DESC
@@ -66,7 +137,7 @@ export default async function handler(req, res) {
           COUNT(*)::int as volume,
           COUNT(DISTINCT t.facture)::int as nb_tickets
         FROM transactions t
-        LEFT JOIN produits p ON t.produit = p.id
+        LEFT JOIN produits p ON ${cles.produits}
         WHERE t.ca > 0
         GROUP BY p.famille, p.sous_famille
         ORDER BY SUM(t.ca) DESC
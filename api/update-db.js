@@ -2,6 +2,9 @@ import { PrismaClient, Prisma } from '@prisma/client'
 import multiparty from 'multiparty'
 import fs from 'fs'
 import { parse } from 'csv-parse/sync'
+import { incrementVersion } from './_version.js'
+import { clesEntieres, renseignerCles } from './_cles.js'
+import { canonicalDepot } from './_depots.js'
 
 const prisma = new PrismaClient({
   log: ['error', 'warn']
@@ -44,14 +47,18 @@ const handleDailyUpdate = async (files) => {
     const clientsData = parseCSV(files.clients[0].path)
     console.log(`📥 ${clientsData.length} clients à insérer...`)
     
-    await prisma.clients.createMany({
-      data: clientsData.map(row => ({
-        carte: row.carte,
-        ville: row.ville,
-        cp: row.cp
-      })),
-      skipDuplicates: true
-    })
+    // Version des données incrémentée dans la transaction des lignes
+    await prisma.$transaction([
+      prisma.clients.createMany({
+        data: clientsData.map(row => ({
+          carte: row.carte,
+          ville: row.ville,
+          cp: row.cp
+        })),
+        skipDuplicates: true
+      }),
+      ...incrementVersion(prisma)
+    ])
   }
 
   // 2. Produits (optionnel)
@@ -59,16 +66,19 @@ const handleDailyUpdate = async (files) => {
     const produitsData = parseCSV(files.produits[0].path)
     console.log(`📥 ${produitsData.length} produits à insérer...`)
     
-    await prisma.produits.createMany({
-      data: produitsData.map(row => ({
-        id: row.id,
-        famille: row.famille,
-        sous_famille: row.sous_famille,
-        sous_sous_famille: row.sous_sous_famille,
-        sous_sous_sous_famille: row.sous_sous_sous_famille
-      })),
-      skipDuplicates: true
-    })
+    await prisma.$transaction([
+      prisma.produits.createMany({
+        data: produitsData.map(row => ({
+          id: row.id,
+          famille: row.famille,
+          sous_famille: row.sous_famille,
+          sous_sous_famille: row.sous_sous_famille,
+          sous_sous_sous_famille: row.sous_sous_sous_famille
+        })),
+        skipDuplicates: true
+      }),
+      ...incrementVersion(prisma)
+    ])
   }
 
   // 3. Transactions (obligatoire) - FILTRER PAR DATE
@@ -91,23 +101,30 @@ const handleDailyUpdate = async (files) => {
     return { inserted: 0, filtered: totalFiltered, maxDate }
   }
 
+  // Clés entières renseignées dans la transaction de chaque lot (base migrée)
+  const cles = await clesEntieres(prisma)
+
   // Insérer par batch
   const batchSize = 500
   for (let i = 0; i < newTransactions.length; i += batchSize) {
     const batch = newTransactions.slice(i, i + batchSize)
     
-    await prisma.transactions.createMany({
-      data: batch.map(row => ({
-        facture: row.facture,
-        date: new Date(row.date),
-        carte: row.carte,
-        depot: row.depot,
-        produit: row.produit,
-        ca: parseFloat(row.ca),
-        quantite: parseInt(row.quantite)
-      })),
-      skipDuplicates: true
-    })
+    await prisma.$transaction([
+      prisma.transactions.createMany({
+        data: batch.map(row => ({
+          facture: row.facture,
+          date: new Date(row.date),
+          carte: row.carte,
+          depot: canonicalDepot(row.depot),
+          produit: row.produit,
+          ca: parseFloat(row.ca),
+          quantite: parseInt(row.quantite)
+        })),
+        skipDuplicates: true
+      }),
+      ...(cles ? renseignerCles(prisma) : []),
+      ...incrementVersion(prisma)
+    ])
     
     totalInserted += batch.length
     console.log(`  ✅ ${totalInserted}/${newTransactions.length}`)
@@ -135,13 +152,13 @@ const handleWeeklyUpdate = async (files) => {
 
   // 1. Supprimer toutes les tables
   console.log('🗑️ Suppression des données existantes...')
-  await prisma.transactions.deleteMany({})
-  await prisma.clients.deleteMany({})
-  await prisma.produits.deleteMany({})
-  
-  if (files.depots) {
-    await prisma.depots.deleteMany({})
-  }
+  await prisma.$transaction([
+    prisma.transactions.deleteMany({}),
+    prisma.clients.deleteMany({}),
+    prisma.produits.deleteMany({}),
+    ...(files.depots ? [prisma.depots.deleteMany({})] : []),
+    ...incrementVersion(prisma)
+  ])
 
   let totals = {
     clients: 0,
@@ -154,28 +171,34 @@ const handleWeeklyUpdate = async (files) => {
   const clientsData = parseCSV(files.clients[0].path)
   console.log(`📥 ${clientsData.length} clients...`)
   
-  await prisma.clients.createMany({
-    data: clientsData.map(row => ({
-      carte: row.carte,
-      ville: row.ville,
-      cp: row.cp
-    }))
-  })
+  await prisma.$transaction([
+    prisma.clients.createMany({
+      data: clientsData.map(row => ({
+        carte: row.carte,
+        ville: row.ville,
+        cp: row.cp
+      }))
+    }),
+    ...incrementVersion(prisma)
+  ])
   totals.clients = clientsData.length
 
   // 3. Charger produits
   const produitsData = parseCSV(files.produits[0].path)
   console.log(`📥 ${produitsData.length} produits...`)
   
-  await prisma.produits.createMany({
-    data: produitsData.map(row => ({
-      id: row.id,
-      famille: row.famille,
-      sous_famille: row.sous_famille,
-      sous_sous_famille: row.sous_sous_famille,
-      sous_sous_sous_famille: row.sous_sous_sous_famille
-    }))
-  })
+  await prisma.$transaction([
+    prisma.produits.createMany({
+      data: produitsData.map(row => ({
+        id: row.id,
+        famille: row.famille,
+        sous_famille: row.sous_famille,
+        sous_sous_famille: row.sous_sous_famille,
+        sous_sous_sous_famille: row.sous_sous_sous_famille
+      }))
+    }),
+    ...incrementVersion(prisma)
+  ])
   totals.produits = produitsData.length
 
   // 4. Charger dépôts (optionnel)
@@ -183,12 +206,15 @@ const handleWeeklyUpdate = async (files) => {
     const depotsData = parseCSV(files.depots[0].path)
     console.log(`📥 ${depotsData.length} dépôts...`)
     
-    await prisma.depots.createMany({
-      data: depotsData.map(row => ({
-        code: row.code,
-        nom: row.nom
-      }))
-    })
+    await prisma.$transaction([
+      prisma.depots.createMany({
+        data: depotsData.map(row => ({
+          code: row.code,
+          nom: row.nom
+        }))
+      }),
+      ...incrementVersion(prisma)
+    ])
     totals.depots = depotsData.length
   }
 
@@ -196,22 +222,28 @@ const handleWeeklyUpdate = async (files) => {
   const transactionsData = parseCSV(files.transactions[0].path)
   console.log(`📥 ${transactionsData.length} transactions...`)
   
+  const cles = await clesEntieres(prisma)
+
   // Charger par batch
   const batchSize = 1000
   for (let i = 0; i < transactionsData.length; i += batchSize) {
     const batch = transactionsData.slice(i, i + batchSize)
     
-    await prisma.transactions.createMany({
-      data: batch.map(row => ({
-        facture: row.facture,
-        date: new Date(row.date),
-        carte: row.carte,
-        depot: row.depot,
-        produit: row.produit,
-        ca: parseFloat(row.ca),
-        quantite: parseInt(row.quantite)
-      }))
-    })
+    await prisma.$transaction([
+      prisma.transactions.createMany({
+        data: batch.map(row => ({
+          facture: row.facture,
+          date: new Date(row.date),
+          carte: row.carte,
+          depot: canonicalDepot(row.depot),
+          produit: row.produit,
+          ca: parseFloat(row.ca),
+          quantite: parseInt(row.quantite)
+        }))
+      }),
+      ...(cles ? renseignerCles(prisma) : []),
+      ...incrementVersion(prisma)
+    ])
     
     totals.transactions += batch.length
     console.log(`  ✅ ${totals.transactions}/${transactionsData.length}`)
@@ -1,6 +1,14 @@
 #!/usr/bin/env python3
-import requests
-import time
+"""
+Coordonnées des magasins pour src/utils (code TypeScript)
+Cache et référentiels locaux d'abord (scripts/decor/geocode.py) ;
+--remote autorise Nominatim (1 requête/s) pour les adresses restantes.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from decor.geocode import Geocoder, Nominatim
 
 stores = {
     '12': '10 Lotissement de Larnac Rocade Est 30100 ALES',
@@ -32,20 +40,15 @@ coords = {}
 
 print("Geocodage en cours...")
 
-for code, addr in stores.items():
-    try:
-        r = requests.get("https://nominatim.openstreetmap.org/search", 
-                        params={'q': addr, 'format': 'json', 'limit': 1, 'countrycodes': 'fr'},
-                        headers={'User-Agent': 'DecorAnalytics/1.0'})
-        data = r.json()
-        if data:
-            coords[code] = {'lat': float(data[0]['lat']), 'lon': float(data[0]['lon'])}
-            print(f"M{code}: OK")
+with Geocoder(remote=Nominatim() if '--remote' in sys.argv else None) as geocoder:
+    results = geocoder.addresses(stores.values())
+    for code, addr in stores.items():
+        if addr in results:
+            lat, lon, precision = results[addr]
+            coords[code] = {'lat': lat, 'lon': lon}
+            print(f"M{code}: OK ({precision})")
         else:
             print(f"M{code}: NOT FOUND")
-        time.sleep(1.1)
-    except Exception as e:
-        print(f"M{code}: ERROR - {e}")
 
 print("\n--- TypeScript Code ---\n")
 print("const storeCoordinates: Record<string, { lat: number; lon: number }> = {")
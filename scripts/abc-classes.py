@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Classes ABC précalculées
+------------------------
+Affiche ou exporte en CSV les classes ABC d'une fenêtre (mois, 3 mois ou
+12 mois glissants), d'une période et d'un dépôt, lues dans `abc_classes`.
+
+Usage:
+  python scripts/abc-classes.py                                  # 12 mois, dernière période, tous canaux
+  python scripts/abc-classes.py --fenetre mois --periode 2025-11 --depot 32 --classe A
+  python scripts/abc-classes.py --depot MAGASIN --output abc-magasins.csv
+"""
+import argparse
+import csv
+import sys
+
+from decor import abc
+from decor.db import connect, stream_rows, transaction
+from decor.env import describe_database_url, get_database_url
+from decor.schema import parse_month
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Classes ABC précalculées")
+    parser.add_argument('--fenetre', choices=list(abc.WINDOWS), default='12m')
+    parser.add_argument('--periode', help="Dernier mois de la fenêtre (YYYY-MM, défaut: le plus récent)")
+    parser.add_argument('--depot', default=abc.ALL_CHANNELS,
+                        help=f"Code dépôt, WEB, {abc.ALL_CHANNELS} ou {abc.STORES} (défaut: {abc.ALL_CHANNELS})")
+    parser.add_argument('--classe', choices=['A', 'B', 'C'], help="Une seule classe")
+    parser.add_argument('--top', type=int, default=30, help="Lignes affichées (sans --output)")
+    parser.add_argument('--output', help="Exporter toutes les lignes en CSV")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    conn = connect(database_url)
+    try:
+        with transaction(conn) as cur:
+            if not abc.exists(cur):
+                print("ℹ️  Tables ABC absentes : python scripts/refresh-aggregates.py --only abc --full")
+                sys.exit(1)
+            if args.periode:
+                period = parse_month(args.periode)
+            else:
+                cur.execute(f"SELECT MAX(periode) FROM {abc.TABLE} WHERE fenetre = %s", (args.fenetre,))
+                period = cur.fetchone()[0]
+        if period is None:
+            print("ℹ️  Aucun classement enregistré")
+            sys.exit(1)
+
+        where = "fenetre = %s AND periode = %s AND depot = %s"
+        params = [args.fenetre, period, args.depot]
+        if args.classe:
+            where += " AND classe = %s"
+            params.append(args.classe)
+        sql = f"""
+            SELECT rang, produit, famille, ca, volume, part_cumulee, classe
+            FROM {abc.TABLE}
+            WHERE {where}
+            ORDER BY rang
+        """
+
+        print(f"🅰️  {args.fenetre} au {period:%Y-%m}, dépôt {args.depot}")
+        if args.output:
+            count = 0
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['rang', 'produit', 'famille', 'ca', 'volume', 'part_cumulee', 'classe'])
+                for row in stream_rows(conn, sql, params):
+                    writer.writerow(row)
+                    count += 1
+            print(f"✅ {count:,} lignes exportées dans {args.output}")
+        else:
+            with transaction(conn) as cur:
+                cur.execute(sql + " LIMIT %s", params + [args.top])
+                rows = cur.fetchall()
+            print(f"   {'Rang':>5} {'Produit':<15} {'Famille':<25} {'CA €':>12} {'Lignes':>8} {'Cumul':>7}  Classe")
+            for rang, produit, famille, ca, volume, part, classe in rows:
+                print(f"   {rang:>5} {produit:<15} {(famille or '-')[:25]:<25} {ca:>12,.0f} {volume:>8,} {part:>7.1%}  {classe}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,123 +1,260 @@
 #!/usr/bin/env python3
 """
-Applique la migration pour ajouter les nouvelles colonnes
+Migrations du schéma PostgreSQL
+-------------------------------
+Usage:
+  python scripts/apply-migration.py                     # nouvelles colonnes (février 2026)
+  python scripts/apply-migration.py partition           # transactions partitionnée par mois
+  python scripts/apply-migration.py partitions          # liste des partitions
+  python scripts/apply-migration.py ensure 2026-03      # partitions jusqu'à mars 2026 (+1 mois)
+  python scripts/apply-migration.py detach 2023-01 [--drop]
+  python scripts/apply-migration.py attach 2023-01
+  python scripts/apply-migration.py reload 2025-11 chemin/lignevente.csv
+  python scripts/apply-migration.py depots              # codes dépôt canoniques ('M32' → '32')
+  python scripts/apply-migration.py cles                # clés entières carte/produit/dépôt
+  python scripts/apply-migration.py tickets             # table des tickets (en-têtes de facture)
+  python scripts/apply-migration.py recherche           # index de recherche (préfixes, trigrammes)
+  python scripts/apply-migration.py sql scripts/migrations/20261019-index-advisor.sql
 """
-import psycopg2
-import os
-
-# Lire DATABASE_URL depuis .env
-DATABASE_URL = None
-with open('.env', 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-            break
-
-if not DATABASE_URL:
-    print("❌ DATABASE_URL non trouvé dans .env")
-    exit(1)
-
-print("🔗 Connexion à la base de données...")
-print(f"   Host: {DATABASE_URL.split('@')[1].split('/')[0]}")
-
-conn = psycopg2.connect(DATABASE_URL)
-cur = conn.cursor()
-
-print("\n" + "="*80)
-print("📝 MIGRATION : Ajout des nouvelles colonnes (février 2026)")
-print("="*80)
-
-# CLIENTS
-print("\n👥 Table CLIENTS...")
-print("   - Ajout colonne 'nom'")
-cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS nom VARCHAR(255)")
-print("   - Ajout colonne 'prenom'")
-cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS prenom VARCHAR(255)")
-print("   - Ajout colonne 'email'")
-cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS email VARCHAR(255)")
-print("   - Ajout colonne 'telephone'")
-cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS telephone VARCHAR(50)")
-print("   - Création index sur email")
-cur.execute("CREATE INDEX IF NOT EXISTS idx_clients_email ON clients(email) WHERE email IS NOT NULL")
-conn.commit()
-print("   ✅ Colonnes clients ajoutées")
-
-# PRODUITS
-print("\n📦 Table PRODUITS...")
-print("   - Ajout colonne 'nom'")
-cur.execute("ALTER TABLE produits ADD COLUMN IF NOT EXISTS nom TEXT")
-print("   - Ajout colonne 'reference_interne'")
-cur.execute("ALTER TABLE produits ADD COLUMN IF NOT EXISTS reference_interne VARCHAR(100)")
-print("   - Ajout colonne 'produit_web'")
-cur.execute("ALTER TABLE produits ADD COLUMN IF NOT EXISTS produit_web VARCHAR(10)")
-print("   - Création index sur produit_web")
-cur.execute("CREATE INDEX IF NOT EXISTS idx_produits_web ON produits(produit_web) WHERE produit_web = 'yes'")
-conn.commit()
-print("   ✅ Colonnes produits ajoutées")
-
-# TRANSACTIONS
-print("\n🎫 Table TRANSACTIONS...")
-print("   - Ajout colonne 'heure'")
-cur.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS heure INTEGER")
-print("   - Ajout colonne 'montant_ttc'")
-cur.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS montant_ttc DECIMAL(12, 2)")
-print("   - Création index sur heure")
-cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_heure ON transactions(heure) WHERE heure IS NOT NULL")
-conn.commit()
-print("   ✅ Colonnes transactions ajoutées")
-
-# Vérifications
-print("\n" + "="*80)
-print("📊 VÉRIFICATION DES TABLES")
-print("="*80)
-
-print("\n👥 Table CLIENTS:")
-cur.execute("""
-    SELECT 
-        column_name, 
-        data_type,
-        CASE WHEN is_nullable = 'YES' THEN '(nullable)' ELSE '(not null)' END as nullable
-    FROM information_schema.columns 
-    WHERE table_name = 'clients' 
-    AND column_name IN ('nom', 'prenom', 'email', 'telephone')
-    ORDER BY column_name
-""")
-for row in cur.fetchall():
-    print(f"   ✅ {row[0]:20s} {row[1]:20s} {row[2]}")
-
-print("\n📦 Table PRODUITS:")
-cur.execute("""
-    SELECT 
-        column_name, 
-        data_type,
-        CASE WHEN is_nullable = 'YES' THEN '(nullable)' ELSE '(not null)' END as nullable
-    FROM information_schema.columns 
-    WHERE table_name = 'produits' 
-    AND column_name IN ('nom', 'reference_interne', 'produit_web')
-    ORDER BY column_name
-""")
-for row in cur.fetchall():
-    print(f"   ✅ {row[0]:20s} {row[1]:20s} {row[2]}")
-
-print("\n🎫 Table TRANSACTIONS:")
-cur.execute("""
-    SELECT 
-        column_name, 
-        data_type,
-        CASE WHEN is_nullable = 'YES' THEN '(nullable)' ELSE '(not null)' END as nullable
-    FROM information_schema.columns 
-    WHERE table_name = 'transactions' 
-    AND column_name IN ('heure', 'montant_ttc')
-    ORDER BY column_name
-""")
-for row in cur.fetchall():
-    print(f"   ✅ {row[0]:20s} {row[1]:20s} {row[2]}")
-
-cur.close()
-conn.close()
-
-print("\n" + "="*80)
-print("✅ MIGRATION TERMINÉE AVEC SUCCÈS")
-print("="*80)
-print("\nVous pouvez maintenant exécuter le script d'import:")
-print("   python3 scripts/import-new-data-feb2026.py")
+import argparse
+import sys
+from datetime import date
+
+from decor import aggregates, depots, dimensions, schema, search, tickets, version
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+from decor.sage import iter_lignevente
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrations du schéma PostgreSQL")
+    sub = parser.add_subparsers(dest='commande')
+    sub.add_parser('colonnes', help="Ajout des colonnes février 2026 (défaut)")
+    partition = sub.add_parser('partition', help="Convertir transactions en table partitionnée par mois")
+    partition.add_argument('--drop-old', action='store_true', help="Supprimer l'ancienne table après copie")
+    sub.add_parser('partitions', help="Lister les partitions")
+    ensure = sub.add_parser('ensure', help="Créer les partitions manquantes jusqu'à un mois")
+    ensure.add_argument('mois', nargs='?', help="AAAA-MM (défaut: mois courant)")
+    detach = sub.add_parser('detach', help="Détacher un mois")
+    detach.add_argument('mois')
+    detach.add_argument('--drop', action='store_true', help="Supprimer la partition détachée")
+    attach = sub.add_parser('attach', help="Rattacher un mois détaché")
+    attach.add_argument('mois')
+    reload = sub.add_parser('reload', help="Recharger un mois depuis un lignevente.csv")
+    reload.add_argument('mois')
+    reload.add_argument('fichier')
+    sub.add_parser('depots', help="Canoniser les codes dépôt (magasins, transactions, depot_aliases)")
+    sub.add_parser('cles', help="Clés entières carte_id / produit_id / depot_id dans transactions")
+    sub.add_parser('tickets', help="Créer et remplir la table tickets depuis transactions")
+    sub.add_parser('recherche', help="Index de recherche clients / produits / tickets")
+    sql = sub.add_parser('sql', help="Exécuter un fichier de migration SQL (une transaction)")
+    sql.add_argument('fichier')
+    return parser.parse_args()
+
+
+def migrate_columns(conn):
+    cur = conn.cursor()
+
+    print("\n" + "="*80)
+    print("📝 MIGRATION : Ajout des nouvelles colonnes (février 2026)")
+    print("="*80)
+
+    # CLIENTS
+    print("\n👥 Table CLIENTS...")
+    print("   - Ajout colonne 'nom'")
+    cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS nom VARCHAR(255)")
+    print("   - Ajout colonne 'prenom'")
+    cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS prenom VARCHAR(255)")
+    print("   - Ajout colonne 'email'")
+    cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS email VARCHAR(255)")
+    print("   - Ajout colonne 'telephone'")
+    cur.execute("ALTER TABLE clients ADD COLUMN IF NOT EXISTS telephone VARCHAR(50)")
+    print("   - Création index sur email")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_clients_email ON clients(email) WHERE email IS NOT NULL")
+    conn.commit()
+    print("   ✅ Colonnes clients ajoutées")
+
+    # PRODUITS
+    print("\n📦 Table PRODUITS...")
+    print("   - Ajout colonne 'nom'")
+    cur.execute("ALTER TABLE produits ADD COLUMN IF NOT EXISTS nom TEXT")
+    print("   - Ajout colonne 'reference_interne'")
+    cur.execute("ALTER TABLE produits ADD COLUMN IF NOT EXISTS reference_interne VARCHAR(100)")
+    print("   - Ajout colonne 'produit_web'")
+    cur.execute("ALTER TABLE produits ADD COLUMN IF NOT EXISTS produit_web VARCHAR(10)")
+    print("   - Création index sur produit_web")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_produits_web ON produits(produit_web) WHERE produit_web = 'yes'")
+    conn.commit()
+    print("   ✅ Colonnes produits ajoutées")
+
+    # TRANSACTIONS
+    print("\n🎫 Table TRANSACTIONS...")
+    print("   - Ajout colonne 'heure'")
+    cur.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS heure INTEGER")
+    print("   - Ajout colonne 'montant_ttc'")
+    cur.execute("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS montant_ttc DECIMAL(12, 2)")
+    print("   - Création index sur heure")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transactions_heure ON transactions(heure) WHERE heure IS NOT NULL")
+    conn.commit()
+    print("   ✅ Colonnes transactions ajoutées")
+
+    # Vérifications
+    print("\n" + "="*80)
+    print("📊 VÉRIFICATION DES TABLES")
+    print("="*80)
+
+    print("\n👥 Table CLIENTS:")
+    cur.execute("""
+        SELECT 
+            column_name, 
+            data_type,
+            CASE WHEN is_nullable = 'YES' THEN '(nullable)' ELSE '(not null)' END as nullable
+        FROM information_schema.columns 
+        WHERE table_name = 'clients' 
+        AND column_name IN ('nom', 'prenom', 'email', 'telephone')
+        ORDER BY column_name
+    """)
+    for row in cur.fetchall():
+        print(f"   ✅ {row[0]:20s} {row[1]:20s} {row[2]}")
+
+    print("\n📦 Table PRODUITS:")
+    cur.execute("""
+        SELECT 
+            column_name, 
+            data_type,
+            CASE WHEN is_nullable = 'YES' THEN '(nullable)' ELSE '(not null)' END as nullable
+        FROM information_schema.columns 
+        WHERE table_name = 'produits' 
+        AND column_name IN ('nom', 'reference_interne', 'produit_web')
+        ORDER BY column_name
+    """)
+    for row in cur.fetchall():
+        print(f"   ✅ {row[0]:20s} {row[1]:20s} {row[2]}")
+
+    print("\n🎫 Table TRANSACTIONS:")
+    cur.execute("""
+        SELECT 
+            column_name, 
+            data_type,
+            CASE WHEN is_nullable = 'YES' THEN '(nullable)' ELSE '(not null)' END as nullable
+        FROM information_schema.columns 
+        WHERE table_name = 'transactions' 
+        AND column_name IN ('heure', 'montant_ttc')
+        ORDER BY column_name
+    """)
+    for row in cur.fetchall():
+        print(f"   ✅ {row[0]:20s} {row[1]:20s} {row[2]}")
+
+
+    cur.close()
+
+    print("\n" + "="*80)
+    print("✅ MIGRATION TERMINÉE AVEC SUCCÈS")
+    print("="*80)
+    print("\nVous pouvez maintenant exécuter le script d'import:")
+    print("   python3 scripts/import-new-data-feb2026.py")
+
+
+def print_partitions(conn):
+    with transaction(conn) as cur:
+        if not schema.is_partitioned(cur):
+            print("ℹ️  transactions n'est pas partitionnée (python scripts/apply-migration.py partition)")
+            return
+        partitions = schema.list_partitions(cur)
+    print(f"\n📅 {len(partitions)} partitions de transactions :")
+    for name, bounds, rows, size in partitions:
+        print(f"   {name:<26} {rows:>10,} lignes  {size / 1024 / 1024:>8.1f} Mo   {bounds}")
+
+
+def main():
+    args = parse_args()
+
+    # DATABASE_URL (environnement ou .env)
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+
+    print("🔗 Connexion à la base de données...")
+    print(f"   Host: {describe_database_url(database_url)}")
+    conn = connect(database_url)
+
+    try:
+        if args.commande in (None, 'colonnes'):
+            migrate_columns(conn)
+
+        elif args.commande == 'partition':
+            print("\n📅 PARTITIONNEMENT MENSUEL DE transactions")
+            if schema.convert_to_partitioned(conn, drop_old=args.drop_old):
+                print("✅ Conversion terminée")
+            print_partitions(conn)
+
+        elif args.commande == 'partitions':
+            print_partitions(conn)
+
+        elif args.commande == 'ensure':
+            with transaction(conn) as cur:
+                created = schema.ensure_partitions(cur, date.today(), args.mois or date.today())
+            for month in created:
+                print(f"   ✅ {schema.partition_name(month)} créée")
+            if not created:
+                print("✅ Aucune partition à créer")
+
+        elif args.commande == 'detach':
+            with transaction(conn) as cur:
+                name = schema.detach_month(cur, args.mois, drop=args.drop)
+            print(f"✅ {name} {'supprimée' if args.drop else 'détachée (table conservée)'}")
+
+        elif args.commande == 'attach':
+            with transaction(conn) as cur:
+                name = schema.attach_month(cur, args.mois)
+            print(f"✅ {name} rattachée")
+
+        elif args.commande == 'reload':
+            print(f"\n🔄 RECHARGEMENT DE {args.mois} depuis {args.fichier}")
+            loaded = schema.reload_month(conn, args.mois, iter_lignevente(args.fichier))
+            print(f"✅ {schema.partition_name(args.mois)} rechargée ({loaded:,} lignes)")
+            aggregates.refresh_all(conn, args.mois)
+
+        elif args.commande == 'depots':
+            print("\n🏪 CODES DÉPÔT CANONIQUES")
+            inconnus = depots.normalize_database(conn)
+            if inconnus:
+                print(f"⚠️  Dépôts absents de la liste officielle des caisses: {', '.join(inconnus)}")
+            print("✅ Codes dépôt canonisés : jointures magasins en t.depot = m.code")
+
+        elif args.commande == 'cles':
+            print("\n🔢 CLÉS ENTIÈRES DES DIMENSIONS")
+            dimensions.migrate(conn)
+            with transaction(conn) as cur:
+                texte, entiers = dimensions.key_sizes(cur)
+            print(f"✅ Clés par ligne : {float(texte or 0):.1f} octets (texte) → {float(entiers or 0):.1f} octets (entiers)")
+
+        elif args.commande == 'tickets':
+            print("\n🎫 TABLE DES TICKETS")
+            tickets.rebuild(conn)
+            with transaction(conn) as cur:
+                nb, lignes, ca, panier, taille = tickets.stats(cur)
+            if nb:
+                print(f"✅ {nb:,} tickets, {taille:.1f} lignes par ticket, panier moyen {panier:.2f} €")
+
+        elif args.commande == 'recherche':
+            print("\n🔎 INDEX DE RECHERCHE")
+            trigram = search.migrate(conn)
+            mode = "préfixes et sous-chaînes (pg_trgm)" if trigram else "préfixes"
+            print(f"✅ Recherche indexée : {mode}")
+
+        elif args.commande == 'sql':
+            with open(args.fichier, 'r', encoding='utf-8') as f:
+                script = f.read()
+            print(f"\n📜 MIGRATION {args.fichier}")
+            with transaction(conn) as cur:
+                cur.execute(script)
+                version.bump(cur)
+            print("✅ Migration appliquée")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,125 +1,144 @@
 #!/usr/bin/env python3
-import psycopg2
-import time
-
-DATABASE_URL = None
-with open('.env', 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-            break
-
-conn = psycopg2.connect(DATABASE_URL)
-cur = conn.cursor()
-
-print('🔍 BENCHMARK DES REQUÊTES DASHBOARD:')
-print('='*60)
-
-total_start = time.time()
-
-# 1. KPIs
-print('\n1. KPIs globaux...')
-start = time.time()
-cur.execute('''
-    SELECT 
-      COUNT(DISTINCT carte) as total_clients,
-      COUNT(*) as total_transactions,
-      SUM(ca) as total_ca,
-      AVG(ca) as panier_moyen
-    FROM transactions
-''')
-result = cur.fetchone()
-elapsed = time.time() - start
-print(f'   ⏱️  {elapsed:.2f}s - {result[1]:,} transactions, {result[0]:,} clients')
-
-# 2. Top produits avec JOIN
-print('\n2. Top 10 produits (avec JOIN)...')
-start = time.time()
-cur.execute('''
-    SELECT 
-      p.id, p.famille, p.sous_famille,
-      SUM(t.ca) as ca,
-      SUM(t.quantite) as volume
-    FROM transactions t
-    JOIN produits p ON t.produit = p.id
-    GROUP BY p.id, p.famille, p.sous_famille
-    ORDER BY ca DESC
-    LIMIT 10
-''')
-result = cur.fetchall()
-elapsed = time.time() - start
-print(f'   ⏱️  {elapsed:.2f}s - {len(result)} produits')
-
-# 3. Top magasins avec JOIN
-print('\n3. Top 5 magasins (avec JOIN)...')
-start = time.time()
-cur.execute('''
-    SELECT 
-      m.code, m.nom, m.zone,
-      SUM(t.ca) as ca,
-      SUM(t.quantite) as volume,
-      COUNT(DISTINCT t.facture) as nb_tickets,
-      AVG(t.ca) as panier_moyen
-    FROM transactions t
-    JOIN magasins m ON (t.depot = m.code OR t.depot = CONCAT('M', m.code))
-    GROUP BY m.code, m.nom, m.zone
-    ORDER BY ca DESC
-    LIMIT 5
-''')
-result = cur.fetchall()
-elapsed = time.time() - start
-print(f'   ⏱️  {elapsed:.2f}s - {len(result)} magasins')
-
-# 4. Top clients avec JOIN
-print('\n4. Top 10 clients (avec JOIN)...')
-start = time.time()
-cur.execute('''
-    SELECT 
-      c.carte, c.ville,
-      SUM(t.ca) as ca,
-      COUNT(DISTINCT t.facture) as nb_commandes
-    FROM transactions t
-    JOIN clients c ON t.carte = c.carte
-    GROUP BY c.carte, c.ville
-    ORDER BY ca DESC
-    LIMIT 10
-''')
-result = cur.fetchall()
-elapsed = time.time() - start
-print(f'   ⏱️  {elapsed:.2f}s - {len(result)} clients')
-
-# 5. Evolution mensuelle
-print('\n5. Evolution mensuelle...')
-start = time.time()
-cur.execute('''
-    SELECT 
-      TO_CHAR(date, 'YYYY-MM') as mois,
-      SUM(ca) as ca,
-      COUNT(*) as tickets
-    FROM transactions
-    GROUP BY TO_CHAR(date, 'YYYY-MM')
-    ORDER BY mois
-''')
-result = cur.fetchall()
-elapsed = time.time() - start
-print(f'   ⏱️  {elapsed:.2f}s - {len(result)} mois')
-
-total_elapsed = time.time() - total_start
-
-print('\n' + '='*60)
-print(f'⏱️  TEMPS TOTAL: {total_elapsed:.2f}s')
-print('='*60)
-
-if total_elapsed > 5:
-    print('\n⚠️  PROBLÈME: Plus de 5 secondes!')
-    print('\n💡 Solutions possibles:')
-    print('   1. Ajouter des index sur les colonnes de JOIN')
-    print('   2. Neon en mode "sleep" → attendre wake-up')
-    print('   3. Limiter les données importées')
-elif total_elapsed > 2:
-    print('\n⚠️  Un peu lent (>2s) mais acceptable')
-else:
-    print('\n✅ Performance OK!')
-
-cur.close()
-conn.close()
+"""
+Benchmark des requêtes de l'API (dashboard, RFM, cohortes, cross-selling,
+forecast, magasins, ABC...)
+-----------------------------------------------------------------------
+Mesure chaque requête du catalogue (scripts/decor/queries.py) en froid et
+en chaud, affiche p50/p95 et enregistre un rapport JSON dans
+data/benchmarks/ pour suivre les régressions d'un rafraîchissement à l'autre.
+
+Usage:
+  python scripts/benchmark-dashboard.py                       # PostgreSQL (DATABASE_URL)
+  python scripts/benchmark-dashboard.py --backend duckdb      # public/duckdb.db
+  python scripts/benchmark-dashboard.py --backend memory      # Parquet en mémoire
+  python scripts/benchmark-dashboard.py --module rfm --module stores -n 10
+  python scripts/benchmark-dashboard.py --list
+"""
+import argparse
+import sys
+
+from decor.backends import BACKENDS, open_backend
+from decor.bench import (
+    RESULTS_DIR, compare_results, latest_results, load_results,
+    run_benchmark, save_results,
+)
+from decor.queries import list_modules, select_queries
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark des requêtes de l'API")
+    parser.add_argument('--backend', action='append', choices=list(BACKENDS),
+                        help="Moteur cible (répétable, défaut: postgres)")
+    parser.add_argument('--module', action='append', choices=list_modules(),
+                        help="Limiter à un module de l'API (répétable)")
+    parser.add_argument('--query', action='append', help="Limiter à une requête (répétable)")
+    parser.add_argument('-n', '--iterations', type=int, default=5, help="Itérations chaudes mesurées")
+    parser.add_argument('--cold', type=int, default=1, help="Itérations froides (nouvelle connexion)")
+    parser.add_argument('--database-url', help="URL PostgreSQL (défaut: DATABASE_URL)")
+    parser.add_argument('--duckdb-file', help="Base DuckDB (défaut: public/duckdb.db)")
+    parser.add_argument('--parquet-dir', help="Dossier Parquet (défaut: public/data)")
+    parser.add_argument('--output-dir', default=str(RESULTS_DIR), help="Dossier des rapports JSON")
+    parser.add_argument('--compare', help="Rapport JSON de référence (défaut: dernier rapport du moteur)")
+    parser.add_argument('--threshold', type=float, default=0.20, help="Seuil de régression (0.20 = +20%%)")
+    parser.add_argument('--no-save', action='store_true', help="Ne pas enregistrer le rapport")
+    parser.add_argument('--list', action='store_true', help="Lister les requêtes du catalogue")
+    return parser.parse_args()
+
+
+def backend_options(name, args):
+    if name == 'postgres':
+        return {'database_url': args.database_url}
+    if name == 'duckdb':
+        return {'db_file': args.duckdb_file}
+    return {'parquet_dir': args.parquet_dir}
+
+
+def fmt(seconds):
+    if seconds is None:
+        return '     -'
+    if seconds < 1:
+        return f"{seconds * 1000:5.0f}ms"
+    return f"{seconds:5.2f}s"
+
+
+def print_result(name, result):
+    if 'error' in result:
+        print(f"   ❌ {name:<32} {result['error'].splitlines()[0][:60]}")
+        return
+    cold = result['cold'] or {}
+    warm = result['warm'] or {}
+    rows = '-' if result['rows'] is None else f"{result['rows']:,}"
+    print(f"   ⏱️  {name:<32} froid {fmt(cold.get('p50'))}   "
+          f"chaud p50 {fmt(warm.get('p50'))}  p95 {fmt(warm.get('p95'))}   "
+          f"{rows:>7} lignes")
+
+
+def print_comparison(comparison, reference):
+    print(f"\n📈 Comparaison avec {reference}")
+    regressions = [c for c in comparison if c['regression']]
+    for c in comparison:
+        marker = '🔴' if c['regression'] else ('🟢' if c['ratio'] < 0.9 else '  ')
+        print(f"   {marker} {c['name']:<32} {fmt(c['before'])} → {fmt(c['after'])}  (x{c['ratio']:.2f})")
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} requête(s) en régression")
+    else:
+        print("\n✅ Aucune régression détectée")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    queries = select_queries(args.module, args.query)
+
+    if args.list:
+        for query in queries:
+            print(f"{query['module']:<14} {query['name']}")
+        return
+
+    if not queries:
+        print("❌ Aucune requête ne correspond aux filtres")
+        sys.exit(1)
+
+    failed = False
+    for backend_name in args.backend or ['postgres']:
+        print(f"\n🔍 BENCHMARK {backend_name.upper()} - {len(queries)} requêtes "
+              f"({args.cold} froide(s), {args.iterations} chaude(s))")
+        print('=' * 100)
+
+        try:
+            backend = open_backend(backend_name, **backend_options(backend_name, args))
+        except Exception as e:
+            print(f"❌ Connexion impossible: {e}")
+            failed = True
+            continue
+
+        try:
+            print(f"   Cible: {backend.target}\n")
+            report = run_benchmark(backend, queries, iterations=args.iterations,
+                                   cold=args.cold, on_result=print_result)
+        finally:
+            backend.close()
+
+        warm_total = sum((r['warm'] or {}).get('p50') or 0
+                         for r in report['queries'].values() if 'error' not in r)
+        nb_transactions = report['data'].get('transactions')
+        print('\n' + '=' * 100)
+        print(f"⏱️  TOTAL (somme des p50 chauds): {warm_total:.2f}s"
+              + (f" - {nb_transactions:,} transactions" if nb_transactions is not None else ''))
+
+        saved = None
+        if not args.no_save:
+            saved = save_results(report, args.output_dir)
+            print(f"💾 Rapport: {saved}")
+
+        reference = args.compare or latest_results(backend_name, args.output_dir, exclude=saved)
+        if reference:
+            comparison = compare_results(report, load_results(reference), args.threshold)
+            if print_comparison(comparison, reference):
+                failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
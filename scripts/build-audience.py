@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Audiences marketing par composition de bitmaps
+----------------------------------------------
+Les appartenances (segment RFM, email, téléphone, magasin de préférence,
+affinité famille, cohorte) sont précalculées dans `audience_sets`
+(decor.audiences) ; une audience est une expression ET / OU / SAUF sur ces
+ensembles, évaluée en mémoire puis exportée en CSV.
+
+Usage:
+  python scripts/build-audience.py --liste                        # ensembles disponibles
+  python scripts/build-audience.py 'rfm:Champions & contact:email'
+  python scripts/build-audience.py '("rfm:À Risque" | rfm:Perdus) & ~magasin:WEB' --output relance.csv
+  python scripts/build-audience.py --reconstruire --liste         # recalcul des ensembles d'abord
+"""
+import argparse
+import difflib
+import sys
+import time
+
+from decor import audiences, version
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Audiences marketing par composition de bitmaps")
+    parser.add_argument('expression', nargs='?',
+                        help="Expression sur les ensembles : & (ET), | (OU), ~ (SAUF), parenthèses")
+    parser.add_argument('--liste', action='store_true', help="Lister les ensembles et leurs effectifs")
+    parser.add_argument('--dimension', help="Avec --liste : une seule dimension (rfm, contact, magasin...)")
+    parser.add_argument('--reconstruire', action='store_true', help="Recalculer audience_sets avant")
+    parser.add_argument('--output', help="Exporter les coordonnées des clients en CSV")
+    return parser.parse_args()
+
+
+def print_catalog(cur, dimension=None):
+    rows = [row for row in audiences.catalog(cur) if not dimension or row[1] == dimension]
+    if not rows:
+        print("ℹ️  Aucun ensemble")
+        return
+    print(f"\n📚 {len(rows)} ensembles (calculés le {max(row[4] for row in rows):%d/%m/%Y %H:%M}) :")
+    current = None
+    for name, dim, _, count, _ in rows:
+        if dim != current:
+            print(f"\n   {dim}")
+            current = dim
+        label = f'"{name}"' if ' ' in name else name
+        print(f"      {label:<36} {count:>10,}")
+
+
+def main():
+    args = parse_args()
+    if not args.expression and not args.liste and not args.reconstruire:
+        print("❌ Expression, --liste ou --reconstruire attendu")
+        sys.exit(1)
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+    conn = connect(database_url)
+    try:
+        if args.reconstruire:
+            audiences.rebuild(conn)
+            with transaction(conn) as cur:
+                version.bump(cur)
+
+        with transaction(conn) as cur:
+            if not audiences.exists(cur):
+                print(f"❌ Table {audiences.TABLE} absente : lancer avec --reconstruire "
+                      f"ou python scripts/refresh-aggregates.py --only audiences --full")
+                sys.exit(1)
+            if args.liste:
+                print_catalog(cur, args.dimension)
+            if not args.expression:
+                return
+
+            try:
+                names = audiences.names_in(args.expression)
+            except ValueError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            known = {row[0] for row in audiences.catalog(cur)}
+            for name in sorted(names - known):
+                close = difflib.get_close_matches(name, known, n=3)
+                print(f"❌ Ensemble inconnu : {name}" + (f" (voisins : {', '.join(close)})" if close else ''))
+            if not names <= known:
+                sys.exit(1)
+
+            start = time.perf_counter()
+            sets = audiences.load(cur, names | {audiences.UNIVERSE})
+            loaded = time.perf_counter() - start
+
+            start = time.perf_counter()
+            try:
+                audience = audiences.compose(args.expression, sets)
+            except ValueError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            composed = time.perf_counter() - start
+
+            total = len(sets.get(audiences.UNIVERSE, ()))
+            share = len(audience) / total * 100 if total else 0
+            print(f"\n🎯 {args.expression}")
+            print(f"   {len(audience):,} clients ({share:.1f} % de {total:,}) : "
+                  f"chargement {loaded * 1000:.1f} ms, composition {composed * 1e6:.0f} µs")
+
+            if args.output:
+                count = audiences.export(cur, audience, args.output)
+                print(f"✅ {count:,} clients exportés dans {args.output}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
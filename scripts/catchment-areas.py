@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Zones de chalandise par magasin
+-------------------------------
+Lit les tables précalculées de decor.catchment : rayons contenant 50, 80 et
+90 % du CA de chaque magasin, nombre de codes postaux par seuil de clients,
+codes postaux dans un rayon, tuiles de carte de chaleur.
+
+Usage:
+  python scripts/catchment-areas.py --rebuild                  # tables + centroïdes
+  python scripts/catchment-areas.py                            # rayons et seuils de tous les magasins
+  python scripts/catchment-areas.py --depot 32 --rayon 20      # codes postaux à moins de 20 km
+  python scripts/catchment-areas.py --since 2025-01 --tuiles 9 --output tuiles.csv
+"""
+import argparse
+import csv
+import sys
+
+from decor import catchment, version
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+from decor.schema import parse_month
+
+SEUILS = (1, 2, 5, 10)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Zones de chalandise par magasin")
+    parser.add_argument('--rebuild', action='store_true', help="Recalculer les tables et recharger les centroïdes")
+    parser.add_argument('--since', help="Premier mois pris en compte (YYYY-MM, défaut: tout l'historique)")
+    parser.add_argument('--depot', help="Un seul magasin")
+    parser.add_argument('--rayon', type=float, help="Codes postaux à moins de N km du magasin (avec --depot)")
+    parser.add_argument('--tuiles', type=int, metavar='ZOOM', help="Tuiles de carte de chaleur à ce niveau de zoom")
+    parser.add_argument('--output', help="Exporter les tuiles en CSV (avec --tuiles)")
+    return parser.parse_args()
+
+
+def print_radii(index, depot=None):
+    radii = index.radii()
+    thresholds = index.thresholds(SEUILS)
+    print(f"\n🗺️  {'Dépôt':<6} {'50 % CA':>9} {'80 % CA':>9} {'90 % CA':>9}  "
+          + ' '.join(f"{'≥' + str(seuil):>5}" for seuil in SEUILS))
+    for code in sorted(radii, key=lambda d: (len(d), d)):
+        if depot and code != depot:
+            continue
+        cells = ' '.join(f"{r:>6.1f} km" if r is not None else f"{'-':>9}" for r in radii[code])
+        print(f"   {code:<6} {cells}  " + ' '.join(f"{n:>5}" for n in thresholds[code]))
+
+
+def main():
+    args = parse_args()
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    conn = connect(database_url)
+    try:
+        if args.rebuild:
+            catchment.rebuild(conn)
+            with transaction(conn) as cur:
+                version.bump(cur)
+        with transaction(conn) as cur:
+            if not catchment.exists(cur):
+                print("ℹ️  Tables de chalandise absentes : lancer avec --rebuild")
+                sys.exit(1)
+            index = catchment.CatchmentIndex.load(cur, parse_month(args.since) if args.since else None)
+        print(f"📍 {len(index.cps):,} couples dépôt × cp, {int(index.located.sum()):,} situés par rapport au magasin")
+
+        print_radii(index, args.depot)
+
+        if args.rayon:
+            if not args.depot:
+                print("❌ --rayon demande --depot")
+                sys.exit(1)
+            zones = index.within(args.depot, args.rayon)
+            print(f"\n📌 Dépôt {args.depot}, moins de {args.rayon:g} km : {len(zones)} codes postaux")
+            print(f"   {'CP':<7} {'Distance':>9} {'Clients':>8} {'CA €':>12}")
+            for cp, distance, clients, ca in zones:
+                print(f"   {cp:<7} {distance:>6.1f} km {clients:>8,} {ca:>12,.0f}")
+
+        if args.tuiles is not None:
+            tiles = index.tiles(args.tuiles, args.depot)
+            if args.output:
+                with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(['zoom', 'x', 'y', 'clients', 'ca'])
+                    writer.writerows((args.tuiles, x, y, clients, round(ca, 2)) for x, y, clients, ca in tiles)
+                print(f"\n✅ {len(tiles):,} tuiles exportées dans {args.output}")
+            else:
+                print(f"\n🔥 {len(tiles):,} tuiles au zoom {args.tuiles} (les 10 plus fortes en CA)")
+                for x, y, clients, ca in sorted(tiles, key=lambda t: -t[3])[:10]:
+                    print(f"   {args.tuiles}/{x}/{y:<8} {clients:>8,} clients {ca:>12,.0f} €")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
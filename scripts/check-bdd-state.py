@@ -1,24 +1,19 @@
 #!/usr/bin/env python3
 """Vérifier l'état actuel de la BDD Neon"""
 
-import psycopg2
 import os
-from pathlib import Path
 
-# Lire le DATABASE_URL
-env_path = Path(__file__).parent.parent / '.env'
-DATABASE_URL = None
-with open(env_path, 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-            break
+from decor.db import connect
+from decor.env import get_database_url
+
+# DATABASE_URL (environnement ou .env)
+DATABASE_URL = get_database_url()
 
 if not DATABASE_URL:
     print("❌ DATABASE_URL non trouvé dans .env")
     exit(1)
 
-conn = psycopg2.connect(DATABASE_URL)
+conn = connect(DATABASE_URL)
 cur = conn.cursor()
 
 print('='*80)
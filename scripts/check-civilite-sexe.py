@@ -1,18 +1,9 @@
 #!/usr/bin/env python3
 """Vérifier les valeurs des colonnes civilite et sexe"""
 
-import psycopg2
-from pathlib import Path
+from decor.db import connect
 
-env_path = Path(__file__).parent.parent / '.env'
-DATABASE_URL = None
-with open(env_path, 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-            break
-
-conn = psycopg2.connect(DATABASE_URL)
+conn = connect()
 cur = conn.cursor()
 
 # Vérifier les valeurs distinctes de civilite
@@ -1,10 +1,6 @@
-import os
-from dotenv import load_dotenv
-import psycopg2
+from decor.db import connect
 
-load_dotenv()
-
-conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+conn = connect()
 cur = conn.cursor()
 
 print('=== STRUCTURE transactions ===')
@@ -1,24 +1,25 @@
 #!/usr/bin/env python3
 """
 Vérifier ce qui est dans la BDD + analyser le CSV ligne par ligne
+
+Usage:
+  python scripts/check-import-status.py          # 10 exemples en BDD
+  python scripts/check-import-status.py --all    # tous les clients avec nom/prénom (en flux)
 """
-import psycopg2
+import sys
+
 import pandas as pd
 
-# Lire DATABASE_URL
-DATABASE_URL = None
-with open('.env', 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-            break
+from decor.db import connect, stream_rows
+
+AUDIT_COMPLET = '--all' in sys.argv
 
 print("="*80)
 print("🔍 VÉRIFICATION BDD + CSV")
 print("="*80)
 
 # Connexion BDD
-conn = psycopg2.connect(DATABASE_URL)
+conn = connect()
 cur = conn.cursor()
 
 # Stats sur ce qui est en BDD
@@ -29,10 +30,14 @@ print(f"Clients avec nom: {avec_nom:,}")
 print(f"Clients avec prénom: {avec_prenom:,}")
 print(f"Ratio: {avec_nom}/{avec_prenom} = {avec_nom/avec_prenom if avec_prenom > 0 else 0:.2f}")
 
-# Exemples de ce qui est en BDD
-print("\n👥 EXEMPLES EN BDD (10 premiers avec nom OU prénom):")
-cur.execute("SELECT carte, nom, prenom FROM clients WHERE nom IS NOT NULL OR prenom IS NOT NULL LIMIT 10")
-for row in cur.fetchall():
+# Exemples de ce qui est en BDD (audit complet : curseur serveur, mémoire constante)
+if AUDIT_COMPLET:
+    print(f"\n👥 CLIENTS EN BDD AVEC NOM OU PRÉNOM ({total:,}):")
+    sql = "SELECT carte, nom, prenom FROM clients WHERE nom IS NOT NULL OR prenom IS NOT NULL ORDER BY carte"
+else:
+    print("\n👥 EXEMPLES EN BDD (10 premiers avec nom OU prénom):")
+    sql = "SELECT carte, nom, prenom FROM clients WHERE nom IS NOT NULL OR prenom IS NOT NULL LIMIT 10"
+for row in stream_rows(conn, sql):
     print(f"  Carte {row[0]:10s} | Nom: {str(row[1])[:20]:20s} | Prénom: {str(row[2])[:20]:20s}")
 
 cur.close()
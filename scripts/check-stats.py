@@ -1,14 +1,7 @@
 #!/usr/bin/env python3
-import psycopg2
+from decor.db import connect
 
-DATABASE_URL = None
-with open('.env', 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-            break
-
-conn = psycopg2.connect(DATABASE_URL)
+conn = connect()
 cur = conn.cursor()
 
 cur.execute("SELECT COUNT(*), COUNT(nom), COUNT(prenom), COUNT(email), COUNT(telephone) FROM clients")
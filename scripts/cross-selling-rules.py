@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Règles d'association du cross-selling
+-------------------------------------
+Construit la matrice ticket × article, calcule paires (produits de matrices
+creuses) et itemsets FP-growth, écrit `cross_selling_rules` ; ou affiche les
+meilleures règles déjà calculées.
+
+Usage:
+  python scripts/cross-selling-rules.py --rebuild                        # familles + sous-familles, 3 périmètres
+  python scripts/cross-selling-rules.py --rebuild --niveau produit --scope magasin
+  python scripts/cross-selling-rules.py --niveau sous_famille --scope web --top 20
+"""
+import argparse
+import sys
+import time
+
+from decor import basket, version
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Règles d'association du cross-selling")
+    parser.add_argument('--rebuild', action='store_true', help="Recalculer et enregistrer les règles")
+    parser.add_argument('--niveau', action='append', choices=list(basket.LEVELS),
+                        help="Niveau d'article (répétable, défaut: famille et sous_famille)")
+    parser.add_argument('--scope', action='append', choices=list(basket.SCOPES),
+                        help="Périmètre (répétable, défaut: tous)")
+    parser.add_argument('--top', type=int, default=15, help="Règles affichées par niveau et périmètre")
+    parser.add_argument('--tri', choices=['lift', 'confidence', 'tickets', 'ca'], default='lift')
+    return parser.parse_args()
+
+
+def print_top(conn, level, scope, top, order):
+    with transaction(conn) as cur:
+        cur.execute(f"""
+            SELECT antecedent, consequent, tickets, support, confidence, lift, ca
+            FROM {basket.RULES_TABLE}
+            WHERE niveau = %s AND scope = %s
+            ORDER BY {order} DESC NULLS LAST
+            LIMIT %s
+        """, (level, scope, top))
+        rules = cur.fetchall()
+    print(f"\n🛒 {scope} / {level} (tri: {order})")
+    print(f"   {'Antécédent':<45} {'→ Conséquent':<30} {'Tickets':>8} {'Conf.':>6} {'Lift':>6} {'CA €':>12}")
+    for antecedent, consequent, tickets, support, confidence, lift, ca in rules:
+        ca_str = f"{ca:,.0f}" if ca is not None else '-'
+        print(f"   {antecedent[:45]:<45} → {consequent[:28]:<28} {tickets:>8,} {confidence:>6.0%} {lift:>6.2f} {ca_str:>12}")
+
+
+def main():
+    args = parse_args()
+    levels = args.niveau or basket.DEFAULT_LEVELS
+    scopes = args.scope or (list(basket.SCOPES) if args.rebuild else ['tous'])
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    conn = connect(database_url)
+    try:
+        if args.rebuild:
+            start = time.perf_counter()
+            total = basket.rebuild(conn, levels=levels, scopes=scopes)
+            with transaction(conn) as cur:
+                version.bump(cur)
+            print(f"✅ {total:,} règles enregistrées en {time.perf_counter() - start:.1f}s")
+        else:
+            with transaction(conn) as cur:
+                ready = basket.exists(cur)
+            if not ready:
+                print("ℹ️  Table cross_selling_rules absente : lancer avec --rebuild")
+                sys.exit(1)
+        for level in levels:
+            for scope in scopes:
+                print_top(conn, level, scope, args.top, args.tri)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+"""
+Bibliothèque partagée des scripts Python Décor Analytics
+--------------------------------------------------------
+Les scripts de `scripts/` (et ceux de la racine) importent ce paquet pour
+éviter de recopier la lecture du `.env`, les connexions et les requêtes.
+
+Depuis un script de `scripts/` :
+    from decor.backends import open_backend
+
+Depuis un script de la racine :
+    sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+"""
@@ -0,0 +1,237 @@
+"""
+Classes ABC précalculées par période et par dépôt
+-------------------------------------------------
+api/abc-analysis.js agrège tout l'historique à chaque appel et la page ABC
+trie, cumule et classe les articles dans le navigateur. Ce module garde :
+
+    product_month_sales   (mois, dépôt, produit) → famille, CA, lignes
+    abc_classes           (fenêtre, période, dépôt, produit) → rang, part cumulée, classe
+
+Fenêtres : le mois seul, 3 mois et 12 mois glissants (la période est le
+dernier mois de la fenêtre ; les premières fenêtres ne couvrent que
+l'historique disponible). Outre chaque code dépôt, deux partitions
+regroupent les canaux : TOUS et MAGASIN (hors WEB), comme l'API.
+
+Le classement d'une fenêtre se fait en une passe NumPy pour toutes les
+partitions : tri (partition, CA décroissant), somme cumulée, part cumulée
+rapportée au total de la partition, seuils 80 % / 95 % de la page ABC.
+
+Après un import, seuls les mois chargés sont relus dans `transactions` ;
+les fenêtres qui les contiennent sont reclassées depuis product_month_sales.
+
+    python scripts/refresh-aggregates.py --only abc --full
+    python scripts/abc-classes.py --fenetre 12m --depot 32 --classe A
+
+Dépendances : numpy.
+"""
+import csv
+import io
+
+from decor.db import transaction
+from decor.dimensions import keyed
+from decor.schema import add_months, month_range, parse_month, table_exists
+
+SALES_TABLE = 'product_month_sales'
+TABLE = 'abc_classes'
+
+# Fenêtre → nombre de mois
+WINDOWS = {'mois': 1, '3m': 3, '12m': 12}
+
+# Seuils de part cumulée de la page ABC (A ≤ 80 %, B ≤ 95 %, C au-delà)
+THRESHOLDS = (0.80, 0.95)
+
+ALL_CHANNELS = 'TOUS'
+STORES = 'MAGASIN'
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SALES_TABLE} (
+        mois DATE NOT NULL,
+        depot TEXT NOT NULL,
+        produit TEXT NOT NULL,
+        famille TEXT,
+        ca DOUBLE PRECISION NOT NULL,
+        volume INTEGER NOT NULL,
+        PRIMARY KEY (mois, depot, produit)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        fenetre TEXT NOT NULL,
+        periode DATE NOT NULL,
+        depot TEXT NOT NULL,
+        produit TEXT NOT NULL,
+        famille TEXT,
+        ca DOUBLE PRECISION NOT NULL,
+        volume INTEGER NOT NULL,
+        rang INTEGER NOT NULL,
+        part_cumulee DOUBLE PRECISION NOT NULL,
+        classe CHAR(1) NOT NULL,
+        PRIMARY KEY (fenetre, periode, depot, produit)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_rang ON {TABLE} (fenetre, periode, depot, rang)",
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_produit ON {TABLE} (produit, fenetre, periode)",
+]
+
+# Même périmètre que api/abc-analysis.js
+SALES_SQL = f"""
+    INSERT INTO {SALES_TABLE} (mois, depot, produit, famille, ca, volume)
+    SELECT date_trunc('month', t.date)::date, t.depot, MIN(p.id), MIN(p.famille), SUM(t.ca), COUNT(*)
+    FROM transactions t
+    JOIN produits p ON t.produit_id = p.cle
+    WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot IS NOT NULL {{where}}
+    GROUP BY 1, 2, t.produit_id
+"""
+
+WINDOW_SQL = f"""
+    SELECT depot, produit, MIN(famille), SUM(ca), SUM(volume)
+    FROM {SALES_TABLE}
+    WHERE mois >= %s AND mois <= %s
+    GROUP BY depot, produit
+"""
+
+COLUMNS = ('fenetre', 'periode', 'depot', 'produit', 'famille', 'ca', 'volume',
+           'rang', 'part_cumulee', 'classe')
+
+
+def exists(cur):
+    return table_exists(cur, SALES_TABLE) and table_exists(cur, TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def refresh_sales(cur, start=None, end=None):
+    """Recharger product_month_sales pour les mois de [start, end), ou en entier"""
+    if start is None:
+        cur.execute(f"TRUNCATE {SALES_TABLE}")
+        cur.execute(keyed(cur, SALES_SQL.format(where='')))
+    else:
+        cur.execute(f"DELETE FROM {SALES_TABLE} WHERE mois >= %s AND mois < %s", (start, end))
+        cur.execute(keyed(cur, SALES_SQL.format(where='AND t.date >= %s AND t.date < %s')), (start, end))
+    return cur.rowcount
+
+
+def classify(partitions, ca, ties):
+    """
+    Classement ABC de toutes les partitions en une passe.
+    Renvoie (ordre, rang, part cumulée, classe) ; `ordre` trie les lignes
+    d'entrée par partition, CA décroissant puis `ties` (ex aequo stables
+    d'un recalcul à l'autre).
+    """
+    import numpy as np
+
+    order = np.lexsort((ties, -ca, partitions))
+    sorted_parts, sorted_ca = partitions[order], ca[order]
+    starts = np.r_[0, np.flatnonzero(sorted_parts[1:] != sorted_parts[:-1]) + 1]
+    sizes = np.diff(np.r_[starts, len(order)])
+
+    cumulative = np.cumsum(sorted_ca)
+    before = np.repeat(cumulative[starts] - sorted_ca[starts], sizes)
+    totals = np.repeat(np.add.reduceat(sorted_ca, starts), sizes)
+    share = np.minimum((cumulative - before) / np.where(totals > 0, totals, 1), 1.0)
+    rank = np.arange(len(order)) - np.repeat(starts, sizes) + 1
+    classes = np.where(share <= THRESHOLDS[0] + 1e-12, 'A',
+                       np.where(share <= THRESHOLDS[1] + 1e-12, 'B', 'C'))
+    return order, rank, share, classes
+
+
+def with_channels(depots, produits, familles, ca, volume):
+    """Ajouter aux lignes (dépôt, produit) les partitions TOUS et MAGASIN"""
+    import numpy as np
+
+    parts = [(depots, produits, familles, ca, volume)]
+    for name, mask in ((ALL_CHANNELS, np.ones(len(depots), dtype=bool)), (STORES, depots != 'WEB')):
+        keys, first, inverse = np.unique(produits[mask], return_index=True, return_inverse=True)
+        parts.append((np.full(len(keys), name, dtype=object), keys, familles[mask][first],
+                      np.bincount(inverse, weights=ca[mask], minlength=len(keys)),
+                      np.bincount(inverse, weights=volume[mask], minlength=len(keys))))
+    return [np.concatenate(columns) for columns in zip(*parts)]
+
+
+def classify_window(cur, window, period):
+    """Lignes abc_classes de la fenêtre `window` se terminant au mois `period`"""
+    import numpy as np
+
+    period = parse_month(period)
+    cur.execute(WINDOW_SQL, (add_months(period, 1 - WINDOWS[window]), period))
+    rows = cur.fetchall()
+    if not rows:
+        return []
+    depots, produits, familles, ca, volume = with_channels(
+        np.array([r[0] for r in rows], dtype=object),
+        np.array([r[1] for r in rows], dtype=object),
+        np.array([r[2] for r in rows], dtype=object),
+        np.array([float(r[3]) for r in rows]),
+        np.array([float(r[4]) for r in rows]),
+    )
+    _, partitions = np.unique(depots, return_inverse=True)
+    _, ties = np.unique(produits, return_inverse=True)
+    order, rank, share, classes = classify(partitions, ca, ties)
+    return [(window, period, depots[i], produits[i], familles[i], float(ca[i]), int(volume[i]),
+             int(rank[k]), float(share[k]), classes[k]) for k, i in enumerate(order)]
+
+
+def save_window(cur, window, period, rows):
+    """Remplacer une fenêtre (DELETE + COPY)"""
+    cur.execute(f"DELETE FROM {TABLE} WHERE fenetre = %s AND periode = %s", (window, parse_month(period)))
+    if not rows:
+        return 0
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {TABLE} ({', '.join(COLUMNS)}) FROM STDIN WITH CSV", buffer)
+    return len(rows)
+
+
+def sales_months(cur):
+    cur.execute(f"SELECT MIN(mois), MAX(mois) FROM {SALES_TABLE}")
+    return cur.fetchone()
+
+
+def reclassify(cur, first, last):
+    """Reclasser toutes les fenêtres qui contiennent un mois de [first, last]"""
+    oldest, latest = sales_months(cur)
+    if latest is None:
+        return 0
+    count = 0
+    for window, size in WINDOWS.items():
+        end = min(add_months(parse_month(last), size - 1), latest)
+        for period in month_range(max(parse_month(first), oldest), end):
+            count += save_window(cur, window, period, classify_window(cur, window, period))
+    return count
+
+
+def rebuild(conn, log=print):
+    """Recalcul complet (création des tables au besoin)"""
+    with transaction(conn) as cur:
+        create(cur)
+        cur.execute(f"TRUNCATE {TABLE}")
+        sales = refresh_sales(cur)
+        oldest, latest = sales_months(cur)
+    count = 0
+    if latest is not None:
+        for month in month_range(oldest, latest):
+            with transaction(conn) as cur:
+                for window in WINDOWS:
+                    count += save_window(cur, window, month, classify_window(cur, window, month))
+    with transaction(conn) as cur:
+        cur.execute(f"ANALYZE {SALES_TABLE}")
+        cur.execute(f"ANALYZE {TABLE}")
+    log(f"   🅰️  ABC : {sales:,} ventes mensuelles, {count:,} classements")
+    return count
+
+
+def refresh(conn, first, last=None, log=print):
+    """Mise à jour après le chargement des mois `first` à `last` (None si tables absentes)"""
+    months = list(month_range(first, last or first))
+    with transaction(conn) as cur:
+        if not exists(cur):
+            return None
+        refresh_sales(cur, months[0], add_months(months[-1], 1))
+        count = reclassify(cur, months[0], months[-1])
+    log(f"   🅰️  ABC : {count:,} classements recalculés")
+    return count
@@ -0,0 +1,57 @@
+"""
+Tables précalculées tenues à jour après chaque chargement
+---------------------------------------------------------
+Chaque agrégat expose `rebuild(conn, log)` (recalcul complet, création des
+tables) et `refresh(conn, first, last, log)` (mois chargés seulement,
+None si ses tables n'existent pas encore). Les imports appellent
+`refresh_all` avec les mois qu'ils viennent de charger ;
+scripts/refresh-aggregates.py permet de tout reconstruire. Les deux
+incrémentent la version des données (decor.version) une fois les tables
+à jour.
+
+L'ordre compte : les tickets d'abord, les agrégats suivants peuvent les lire ;
+les identités client avant les cohortes et les audiences qui s'en servent.
+"""
+from decor import abc, audiences, basket, catchment, cohorts, forecast, hierarchy, identity, tickets, version
+from decor.db import transaction
+
+AGGREGATES = {
+    'tickets': tickets,
+    'identites': identity,
+    'cohortes': cohorts,
+    'abc': abc,
+    'hierarchie': hierarchy,
+    'cross_selling': basket,
+    'chalandise': catchment,
+    'previsions': forecast,
+    'audiences': audiences,
+}
+
+
+def select(names=None):
+    return [(name, module) for name, module in AGGREGATES.items() if not names or name in names]
+
+
+def refresh_all(conn, first, last=None, names=None, log=print):
+    """Mettre à jour les agrégats existants pour les mois `first` à `last`"""
+    results = {}
+    try:
+        for name, module in select(names):
+            results[name] = module.refresh(conn, first, last, log=log)
+    finally:
+        # Agrégats déjà validés visibles même si un suivant échoue
+        with transaction(conn) as cur:
+            version.bump(cur)
+    return results
+
+
+def rebuild_all(conn, names=None, log=print):
+    results = {}
+    try:
+        for name, module in select(names):
+            log(f"🔄 {name}")
+            results[name] = module.rebuild(conn, log=log)
+    finally:
+        with transaction(conn) as cur:
+            version.bump(cur)
+    return results
@@ -0,0 +1,251 @@
+"""
+Détection d'anomalies par magasin
+---------------------------------
+analyse-magasins-anomalies.py, debug-m32.py, verif-complete-m32.py et
+test-all-stores.py vérifient un magasin à la fois, chacun avec plusieurs
+parcours complets de `transactions`. Ici, une seule requête agrégée
+(table `tickets` si elle existe, sinon `transactions`) donne les séries
+journalières de tous les dépôts : CA, tickets, lignes, panier moyen.
+
+Les séries sont rangées en matrices dépôts × jours et traitées ensemble :
+
+1. résidu saisonnier : log(1 + valeur) moins la médiane du même jour de la
+   semaine sur les `weeks` semaines précédentes ;
+2. choc commun retiré : médiane des résidus de tous les dépôts le même jour
+   (jours fériés, soldes, météo) ;
+3. score robuste : (résidu - médiane) / (1,4826 × MAD) par dépôt et
+   indicateur ; au-delà de `threshold`, le jour est signalé.
+
+Un jour sans aucun ticket alors que le dépôt en fait d'habitude est signalé
+à part (`absence` : fermeture ou mois mal importé), sauf si la plupart des
+dépôts sont fermés ce jour-là (jour férié).
+
+Le rapport (Markdown + JSON) va dans data/anomaly-reports/ :
+
+    python scripts/store-anomalies.py --since 2025-01
+    python scripts/store-anomalies.py --depot 32 --seuil 3
+
+Dépendances : numpy.
+"""
+import json
+import warnings
+from datetime import datetime
+
+from decor import tickets
+from decor.depots import categorie
+from decor.env import DATA_DIR
+
+REPORTS_DIR = DATA_DIR / 'anomaly-reports'
+
+METRICS = ('ca', 'tickets', 'lignes', 'panier')
+
+# Semaines de référence pour la saisonnalité hebdomadaire
+WEEKS = 8
+THRESHOLD = 3.5
+# Absence signalée si le dépôt fait d'habitude au moins ce nombre de tickets ce jour-là
+ABSENCE_MIN_TICKETS = 5
+# Cohérence MAD → écart-type pour une loi normale
+MAD_SCALE = 1.4826
+
+TICKETS_SQL = f"""
+    SELECT depot, date::date AS jour, SUM(ca), COUNT(*), SUM(nb_lignes)
+    FROM {tickets.TABLE}
+    WHERE depot IS NOT NULL {{where}}
+    GROUP BY 1, 2
+"""
+
+TRANSACTIONS_SQL = """
+    SELECT depot, date::date AS jour, SUM(ca), COUNT(DISTINCT facture), COUNT(*)
+    FROM transactions
+    WHERE depot IS NOT NULL {where}
+    GROUP BY 1, 2
+"""
+
+
+def is_monitored(depot):
+    """Magasins réels et web ; avoirs, services et siège n'ont pas de rythme régulier"""
+    return categorie(depot) == 'magasin' or depot == 'WEB'
+
+
+def load_daily(cur, since=None, until=None):
+    """
+    Séries journalières de tous les dépôts en une requête :
+    (dépôts, jours datetime64[D], {indicateur: matrice dépôts × jours}, source)
+    """
+    import numpy as np
+
+    where, params = '', []
+    if since:
+        where += ' AND date >= %s'
+        params.append(since)
+    if until:
+        where += ' AND date < %s'
+        params.append(until)
+    source = tickets.TABLE if tickets.exists(cur) else 'transactions'
+    cur.execute((TICKETS_SQL if source == tickets.TABLE else TRANSACTIONS_SQL).format(where=where), params)
+    rows = cur.fetchall()
+    if not rows:
+        return np.array([], dtype=object), np.array([], dtype='datetime64[D]'), {}, source
+
+    depots, row_index = np.unique(np.array([r[0] for r in rows], dtype=object), return_inverse=True)
+    dates = np.array([r[1] for r in rows], dtype='datetime64[D]')
+    days = np.arange(dates.min(), dates.max() + 1)
+    col_index = (dates - days[0]).astype(int)
+
+    series = {}
+    for position, metric in enumerate(('ca', 'tickets', 'lignes'), start=2):
+        matrix = np.zeros((len(depots), len(days)))
+        matrix[row_index, col_index] = [float(r[position] or 0) for r in rows]
+        series[metric] = matrix
+    with np.errstate(divide='ignore', invalid='ignore'):
+        series['panier'] = np.where(series['tickets'] > 0, series['ca'] / series['tickets'], np.nan)
+    return depots, days, series, source
+
+
+def seasonal_baseline(values, weeks=WEEKS):
+    """
+    Médiane du même jour de la semaine sur les `weeks` semaines précédentes
+    (NaN tant que l'historique manque), pour toutes les lignes à la fois.
+    """
+    import numpy as np
+
+    lag = 7 * weeks
+    padded = np.concatenate([np.full((values.shape[0], lag), np.nan), values], axis=1)
+    width = values.shape[1]
+    previous = np.stack([padded[:, lag - 7 * k:lag - 7 * k + width] for k in range(1, weeks + 1)])
+    enough = np.isfinite(previous).sum(axis=0) >= max(2, weeks // 2)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        baseline = np.nanmedian(previous, axis=0)
+    return np.where(enough, baseline, np.nan)
+
+
+def robust_scores(residuals):
+    """Scores robustes par ligne : (x - médiane) / (1,4826 × MAD)"""
+    import numpy as np
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(residuals, axis=1, keepdims=True)
+        mad = MAD_SCALE * np.nanmedian(np.abs(residuals - median), axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(mad > 0, (residuals - median) / mad, np.nan)
+
+
+def detect(depots, days, series, threshold=THRESHOLD, weeks=WEEKS):
+    """
+    Anomalies de tous les dépôts et indicateurs, triées par score décroissant :
+    [{depot, jour, indicateur, type, valeur, attendu, ecart, score}]
+    """
+    import numpy as np
+
+    if not len(depots):
+        return []
+    open_days = series['tickets'] > 0
+    usual_tickets = np.expm1(seasonal_baseline(np.log1p(series['tickets']), weeks))
+    absent = ~open_days & (usual_tickets >= ABSENCE_MIN_TICKETS)
+    # Fermeture générale (jour férié) : plus de la moitié des dépôts sans ticket
+    absent &= (~open_days).sum(axis=0) <= len(depots) // 2
+
+    anomalies = []
+    for i, j in zip(*np.nonzero(absent)):
+        anomalies.append(_anomaly(depots[i], days[j], 'tickets', 'absence', 0.0, usual_tickets[i, j], np.inf))
+
+    for metric in METRICS:
+        # Les jours fermés (aucun ticket) ne comptent ni comme référence ni comme anomalie
+        logged = np.where(open_days, np.log1p(np.maximum(np.nan_to_num(series[metric]), 0)), np.nan)
+        baseline = seasonal_baseline(logged, weeks)
+        residuals = logged - baseline
+        if len(depots) >= 3:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                residuals = residuals - np.nan_to_num(np.nanmedian(residuals, axis=0))
+        scores = robust_scores(residuals)
+        flagged = np.abs(np.nan_to_num(scores)) > threshold
+        for i, j in zip(*np.nonzero(flagged)):
+            kind = 'hausse' if scores[i, j] > 0 else 'baisse'
+            anomalies.append(_anomaly(depots[i], days[j], metric, kind, series[metric][i, j],
+                                      np.expm1(baseline[i, j]), scores[i, j]))
+    # Absences d'abord (pas de score), puis par score absolu décroissant
+    return sorted(anomalies, key=lambda a: (a['score'] is not None, -abs(a['score'] or 0), a['jour'], a['depot']))
+
+
+def _anomaly(depot, day, metric, kind, value, expected, score):
+    return {
+        'depot': str(depot),
+        'jour': str(day),
+        'indicateur': metric,
+        'type': kind,
+        'valeur': float(value),
+        'attendu': float(expected),
+        'ecart': float(value / expected - 1) if expected else None,
+        'score': float(score) if score != float('inf') else None,
+    }
+
+
+def unknown_depots(depots):
+    """Dépôts absents de la liste officielle des caisses (decor.depots)"""
+    return [str(d) for d in depots if categorie(d) == 'inconnu']
+
+
+def select_depots(depots, series, only=None):
+    """Garder les dépôts suivis (`is_monitored`), ou seulement ceux de `only`"""
+    import numpy as np
+
+    keep = np.array([d in only if only else is_monitored(d) for d in depots], dtype=bool)
+    return depots[keep], {metric: matrix[keep] for metric, matrix in series.items()}
+
+
+def summarize(depots, series):
+    """Totaux par dépôt sur la période : [(dépôt, jours ouverts, CA, tickets, panier)]"""
+    opened = (series['tickets'] > 0).sum(axis=1)
+    ca = series['ca'].sum(axis=1)
+    count = series['tickets'].sum(axis=1)
+    return [(str(d), int(o), float(c), int(t), float(c / t) if t else 0.0)
+            for d, o, c, t in sorted(zip(depots, opened, ca, count), key=lambda r: -r[2])]
+
+
+def write_report(anomalies, summary, unknown, meta, output_dir=REPORTS_DIR, top=200):
+    """Rapports JSON (complet) et Markdown (les `top` premières anomalies) ; renvoie le chemin Markdown"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started_at = datetime.now()
+    base = output_dir / f"magasins-{started_at:%Y%m%d-%H%M%S}"
+
+    with open(base.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        json.dump({**meta, 'generated_at': started_at.isoformat(timespec='seconds'),
+                   'depots_inconnus': unknown, 'depots': summary, 'anomalies': anomalies},
+                  f, indent=2, ensure_ascii=False)
+
+    lines = [
+        "# Anomalies par magasin",
+        '',
+        f"- Période : {meta['debut']} → {meta['fin']} ({meta['source']})",
+        f"- Dépôts suivis : {len(summary)}, seuil {meta['seuil']}, référence {meta['semaines']} semaines",
+        f"- Anomalies : {len(anomalies)}",
+        '',
+    ]
+    if unknown:
+        lines += [f"⚠️ Dépôts hors liste officielle : {', '.join(unknown)}", '']
+    lines += ['| Dépôt | Jours ouverts | CA € | Tickets | Panier € | Anomalies |',
+              '|-------|---------------|------|---------|----------|-----------|']
+    counts = {}
+    for anomaly in anomalies:
+        counts[anomaly['depot']] = counts.get(anomaly['depot'], 0) + 1
+    for depot, opened, ca, count, basket in summary:
+        lines.append(f"| {depot} | {opened} | {ca:,.0f} | {count:,} | {basket:,.2f} | {counts.get(depot, 0)} |")
+
+    lines += ['', '## Anomalies', '',
+              '| Jour | Dépôt | Indicateur | Type | Valeur | Attendu | Écart | Score |',
+              '|------|-------|------------|------|--------|---------|-------|-------|']
+    for a in anomalies[:top]:
+        ecart = f"{a['ecart']:+.0%}" if a['ecart'] is not None else '-'
+        score = f"{a['score']:+.1f}" if a['score'] is not None else '-'
+        lines.append(f"| {a['jour']} | {a['depot']} | {a['indicateur']} | {a['type']} "
+                     f"| {a['valeur']:,.2f} | {a['attendu']:,.2f} | {ecart} | {score} |")
+    if len(anomalies) > top:
+        lines += ['', f"… {len(anomalies) - top} autres dans {base.with_suffix('.json').name}"]
+
+    md_path = base.with_suffix('.md')
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return md_path
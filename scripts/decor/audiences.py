@@ -0,0 +1,379 @@
+"""
+Audiences marketing : appartenances précalculées en bitmaps
+-----------------------------------------------------------
+api/marketing.js et api/rfm.js refiltrent à chaque appel les clients par
+segment, magasin et coordonnées disponibles. Ici chaque attribut est
+calculé une fois et stocké comme un bitmap compressé (Roaring) des clés
+entières `clients.cle` (decor.dimensions) :
+
+    audience_sets   nom ('rfm:Champions', 'contact:email', 'magasin:32'...)
+                    → dimension, valeur, nombre de clients, bitmap sérialisé
+
+Ensembles :
+
+- `tous`             tous les clients identifiés (univers de la négation)
+- `rfm:<segment>`    segments de api/rfm.js (NTILE R, F, M, mêmes règles)
+- `contact:email`, `contact:telephone`
+                     email / téléphone valides (normalisation de decor.identity)
+- `magasin:<dépôt>`  magasin de préférence (CA le plus élevé, WEB compris)
+- `famille:<famille>` familles pesant au moins `AFFINITY_SHARE` du CA du client
+- `cohorte:<AAAA-MM>` mois du premier achat (lignes à CA positif, comme decor.cohorts)
+
+Quand `client_identity` existe, les cartes fusionnées comptent pour un seul
+client (clé de la carte de référence). Une audience se compose ensuite en
+mémoire, ET / OU / SAUF entre bitmaps, sans relire `transactions` :
+
+    python scripts/build-audience.py 'rfm:Champions & contact:email & ~magasin:WEB'
+    python scripts/build-audience.py '"rfm:À Risque" | rfm:Perdus' --output relance.csv
+
+Les segments RFM dépendent de tout l'historique : `refresh` recalcule tous
+les ensembles. Nécessite `clients.cle` (python scripts/apply-migration.py cles).
+
+Dépendances : pyroaring.
+"""
+import re
+import time
+
+from decor import identity
+from decor.db import transaction
+from decor.dimensions import KEY_COLUMN
+from decor.schema import table_exists
+
+TABLE = 'audience_sets'
+
+UNIVERSE = 'tous'
+
+# Part minimale du CA du client pour une affinité famille
+AFFINITY_SHARE = 0.30
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        nom TEXT PRIMARY KEY,
+        dimension TEXT NOT NULL,
+        valeur TEXT NOT NULL,
+        clients INTEGER NOT NULL,
+        bitmap BYTEA NOT NULL,
+        calcule_le TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+]
+
+# Clé entière du client : celle de la carte de référence quand la carte est fusionnée
+CLIENT_KEYS_SQL = """
+    SELECT {key} AS cle, c.email, c.telephone
+    FROM clients c {join}
+    WHERE c.carte <> '0'
+"""
+
+IDENTITY_KEY = f"COALESCE(r.{KEY_COLUMN}, c.{KEY_COLUMN})"
+IDENTITY_JOIN = f"""
+    LEFT JOIN {identity.TABLE} ci ON ci.carte = c.carte
+    LEFT JOIN clients r ON r.carte = ci.client_id"""
+
+# Scores R, F, M de api/rfm.js (NTILE sur les clients à CA positif) et mois de cohorte
+RFM_SQL = f"""
+    WITH client_metrics AS (
+        SELECT
+            c.{KEY_COLUMN} AS cle,
+            COUNT(DISTINCT t.facture) AS frequency,
+            SUM(t.ca) AS monetary,
+            CURRENT_DATE - MAX(t.date) AS recency,
+            MIN(t.date) FILTER (WHERE t.ca > 0) AS first_date
+        FROM clients c
+        INNER JOIN {{source}} t ON c.carte = t.carte
+        WHERE c.carte <> '0'
+        GROUP BY c.{KEY_COLUMN}
+    )
+    SELECT
+        cle,
+        monetary > 0,
+        6 - NTILE(5) OVER (PARTITION BY monetary > 0 ORDER BY recency ASC),
+        6 - NTILE(5) OVER (PARTITION BY monetary > 0 ORDER BY frequency DESC),
+        6 - NTILE(5) OVER (PARTITION BY monetary > 0 ORDER BY monetary DESC),
+        TO_CHAR(first_date, 'YYYY-MM')
+    FROM client_metrics
+"""
+
+STORE_SQL = f"""
+    SELECT DISTINCT ON (cle) cle, depot
+    FROM (
+        SELECT c.{KEY_COLUMN} AS cle, t.depot, SUM(t.ca) AS ca
+        FROM clients c
+        INNER JOIN {{source}} t ON c.carte = t.carte
+        WHERE c.carte <> '0'
+        GROUP BY 1, 2
+    ) s
+    ORDER BY cle, ca DESC, depot
+"""
+
+FAMILY_SQL = f"""
+    SELECT cle, famille
+    FROM (
+        SELECT
+            c.{KEY_COLUMN} AS cle,
+            COALESCE(p.famille, 'Inconnu') AS famille,
+            SUM(t.ca) AS ca,
+            SUM(SUM(t.ca)) OVER (PARTITION BY c.{KEY_COLUMN}) AS total
+        FROM clients c
+        INNER JOIN {{source}} t ON c.carte = t.carte
+        LEFT JOIN produits p ON p.id = t.produit
+        WHERE c.carte <> '0'
+        GROUP BY 1, 2
+    ) s
+    WHERE total > 0 AND ca >= %s * total
+"""
+
+# Jetons d'une expression : opérateur, nom entre guillemets, nom nu
+TOKEN = re.compile(r'\s*(?:([&|~()])|"([^"]*)"|([^\s&|~()"]+))')
+
+
+def exists(cur):
+    return table_exists(cur, TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def has_client_key(cur):
+    """`clients.cle` existe-t-elle (migration des clés entières) ?"""
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = 'public' AND table_name = 'clients' AND column_name = %s
+        )
+    """, (KEY_COLUMN,))
+    return cur.fetchone()[0]
+
+
+def source(cur):
+    return identity.RESOLVED_TRANSACTIONS if identity.exists(cur) else 'transactions'
+
+
+def segment(r, f, m):
+    """Segment RFM, mêmes règles et même ordre que api/rfm.js"""
+    if r == 5 and f == 5 and m == 5:
+        return 'Ultra Champions'
+    if r >= 4 and f >= 4 and m >= 4:
+        return 'Champions'
+    if f >= 4:
+        return 'À Risque' if r <= 2 else 'Loyaux'
+    if f <= 2 and r >= 4:
+        return 'Nouveaux'
+    if r <= 2:
+        return 'Perdus'
+    return 'Occasionnels'
+
+
+def _add(members, dimension, value, cle):
+    members.setdefault((dimension, str(value)), []).append(cle)
+
+
+def memberships(cur):
+    """{(dimension, valeur): [clés clients]} pour tous les ensembles"""
+    from decor.identity import normalize_emails, normalize_phones
+
+    members = {}
+    if identity.exists(cur):
+        cur.execute(CLIENT_KEYS_SQL.format(key=IDENTITY_KEY, join=IDENTITY_JOIN))
+    else:
+        cur.execute(CLIENT_KEYS_SQL.format(key=f"c.{KEY_COLUMN}", join=''))
+    rows = [row for row in cur.fetchall() if row[0] is not None]
+    keys = [row[0] for row in rows]
+    emails = normalize_emails([row[1] for row in rows])
+    phones = normalize_phones([row[2] for row in rows])
+    members[(UNIVERSE, '')] = keys
+    for cle, email, phone in zip(keys, emails.tolist(), phones.tolist()):
+        if email:
+            _add(members, 'contact', 'email', cle)
+        if phone:
+            _add(members, 'contact', 'telephone', cle)
+
+    transactions = source(cur)
+    cur.execute(RFM_SQL.format(source=transactions))
+    for cle, positive, r, f, m, cohort in cur.fetchall():
+        if positive:
+            _add(members, 'rfm', segment(r, f, m), cle)
+        if cohort:
+            _add(members, 'cohorte', cohort, cle)
+
+    cur.execute(STORE_SQL.format(source=transactions))
+    for cle, depot in cur.fetchall():
+        _add(members, 'magasin', depot, cle)
+
+    cur.execute(FAMILY_SQL.format(source=transactions), (AFFINITY_SHARE,))
+    for cle, famille in cur.fetchall():
+        _add(members, 'famille', famille, cle)
+    return members
+
+
+def set_name(dimension, value):
+    return f"{dimension}:{value}" if value else dimension
+
+
+def bitmaps(members):
+    """{nom: BitMap} (clés dédoublonnées : plusieurs cartes d'un même client)"""
+    from pyroaring import BitMap
+
+    return {set_name(dimension, value): BitMap(keys) for (dimension, value), keys in members.items()}
+
+
+def store(cur, sets):
+    import psycopg2
+    from psycopg2.extras import execute_values
+
+    cur.execute(f"TRUNCATE {TABLE}")
+    rows = []
+    for name, bitmap in sets.items():
+        dimension, _, value = name.partition(':')
+        bitmap.run_optimize()
+        rows.append((name, dimension, value, len(bitmap), psycopg2.Binary(bitmap.serialize())))
+    execute_values(cur, f"INSERT INTO {TABLE} (nom, dimension, valeur, clients, bitmap) VALUES %s",
+                   rows, page_size=500)
+
+
+def load(cur, names=None):
+    """{nom: BitMap} depuis audience_sets (tous les ensembles, ou seulement `names`)"""
+    from pyroaring import BitMap
+
+    if names is None:
+        cur.execute(f"SELECT nom, bitmap FROM {TABLE}")
+    else:
+        cur.execute(f"SELECT nom, bitmap FROM {TABLE} WHERE nom = ANY(%s)", (list(names),))
+    return {name: BitMap.deserialize(bytes(data)) for name, data in cur.fetchall()}
+
+
+def catalog(cur):
+    """[(nom, dimension, valeur, clients, calcule_le)] triés par dimension puis nom"""
+    cur.execute(f"SELECT nom, dimension, valeur, clients, calcule_le FROM {TABLE} ORDER BY dimension, nom")
+    return cur.fetchall()
+
+
+def tokenize(expression):
+    tokens, position = [], 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Expression illisible à partir de : {expression[position:]!r}")
+        operator, quoted, bare = match.groups()
+        tokens.append(('op', operator) if operator else ('nom', quoted if quoted is not None else bare))
+        position = match.end()
+    return tokens
+
+
+def names_in(expression):
+    """Noms d'ensembles cités dans l'expression"""
+    return {value for kind, value in tokenize(expression) if kind == 'nom'}
+
+
+def compose(expression, sets):
+    """
+    Évaluer une expression sur des bitmaps : `&` (ET), `|` (OU), `~` (SAUF,
+    par rapport à l'ensemble `tous`), parenthèses ; `~` lie plus fort que
+    `&`, lui-même plus fort que `|`. Les noms contenant des espaces
+    s'écrivent entre guillemets : '"rfm:À Risque" & contact:email'.
+    """
+    tokens = tokenize(expression)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+
+    def take(expected=None):
+        nonlocal position
+        token = peek()
+        if token[0] is None or (expected and token != ('op', expected)):
+            raise ValueError(f"Expression incomplète : {expression!r}")
+        position += 1
+        return token
+
+    def union():
+        result = intersection()
+        while peek() == ('op', '|'):
+            take()
+            result = result | intersection()
+        return result
+
+    def intersection():
+        result = factor()
+        while peek() == ('op', '&'):
+            take()
+            result = result & factor()
+        return result
+
+    def factor():
+        kind, value = take()
+        if (kind, value) == ('op', '~'):
+            if UNIVERSE not in sets:
+                raise ValueError(f"Négation impossible : ensemble '{UNIVERSE}' absent")
+            return sets[UNIVERSE] - factor()
+        if (kind, value) == ('op', '('):
+            result = union()
+            take(')')
+            return result
+        if kind == 'nom':
+            if value not in sets:
+                raise ValueError(f"Ensemble inconnu : {value}")
+            return sets[value]
+        raise ValueError(f"Opérateur inattendu '{value}' dans {expression!r}")
+
+    result = union()
+    if position != len(tokens):
+        raise ValueError(f"Jeton en trop '{tokens[position][1]}' dans {expression!r}")
+    return result
+
+
+def export(cur, bitmap, path):
+    """Coordonnées des clients du bitmap en CSV ; renvoie le nombre de lignes écrites"""
+    import csv
+
+    columns = ['carte', 'nom', 'prenom', 'email', 'telephone', 'cp', 'ville']
+    cur.execute(f"SELECT {', '.join(columns)} FROM clients WHERE {KEY_COLUMN} = ANY(%s) ORDER BY carte",
+                (list(bitmap),))
+    rows = cur.fetchall()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def compute(conn):
+    with transaction(conn) as cur:
+        return bitmaps(memberships(cur))
+
+
+def _write(conn, log):
+    start = time.perf_counter()
+    sets = compute(conn)
+    with transaction(conn) as cur:
+        create(cur)
+        store(cur, sets)
+    size = sum(len(bitmap.serialize()) for bitmap in sets.values())
+    log(f"   🎯 Audiences : {len(sets):,} ensembles, {len(sets.get(UNIVERSE, ())):,} clients, "
+        f"{size / 1024:,.0f} Ko de bitmaps en {time.perf_counter() - start:.1f}s")
+    return len(sets)
+
+
+def rebuild(conn, log=print):
+    """Recalcul complet (création de la table au besoin)"""
+    with transaction(conn) as cur:
+        keyed = has_client_key(cur)
+    if not keyed:
+        log(f"   ⚠️  clients.{KEY_COLUMN} absente : python scripts/apply-migration.py cles")
+        return 0
+    return _write(conn, log)
+
+
+def refresh(conn, first, last=None, log=print):
+    """
+    Tous les ensembles sont recalculés (les quintiles RFM dépendent de tout
+    l'historique). None si la table n'existe pas.
+    """
+    with transaction(conn) as cur:
+        if not exists(cur) or not has_client_key(cur):
+            return None
+    return _write(conn, log)
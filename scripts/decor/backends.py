@@ -0,0 +1,204 @@
+"""
+Moteurs de requête interchangeables pour les benchmarks et analyses
+-------------------------------------------------------------------
+Trois cibles exposent la même interface (`execute`, `reset`, `close`) :
+
+- postgres : base PostgreSQL locale ou Neon (DATABASE_URL)
+- duckdb   : réplique DuckDB `public/duckdb.db` (scripts/import-data.py)
+- memory   : moteur en mémoire chargé depuis les Parquet de `public/data`
+             (les mêmes fichiers que ceux lus par le navigateur)
+
+Le catalogue est écrit sur les clés entières (decor.dimensions) ; une cible
+sans colonnes carte_id / produit_id / depot_id reçoit sa forme texte.
+"""
+import re
+from pathlib import Path
+
+from decor.dimensions import FK_COLUMNS, text_keys
+from decor.env import DUCKDB_FILE, PARQUET_DIR, describe_database_url, get_database_url
+
+TABLES = ['clients', 'produits', 'magasins', 'transactions']
+
+
+def _closing_paren(sql, start):
+    """Index de la parenthèse fermant celle ouverte en `start` (chaînes '...' ignorées)"""
+    depth = 0
+    quoted = False
+    for i in range(start, len(sql)):
+        char = sql[i]
+        if char == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+
+def translate_sql(sql, dialect):
+    """
+    Adapter les quelques fonctions PostgreSQL absentes de DuckDB :
+    TO_CHAR(expr, 'YYYY-MM') → strftime(CAST(expr AS DATE), '%Y-%m'), `expr`
+    pouvant contenir des appels imbriqués (`TO_CHAR(MIN(date), 'YYYY-MM')`).
+    """
+    if dialect != 'duckdb':
+        return sql
+    pattern = re.compile(r"TO_CHAR\s*\(", re.IGNORECASE)
+    parts = []
+    position = 0
+    for match in pattern.finditer(sql):
+        if match.start() < position:
+            continue
+        end = _closing_paren(sql, match.end() - 1)
+        if end < 0:
+            break
+        inner = sql[match.end():end]
+        expression, separator, fmt = inner.rpartition(',')
+        if not separator or fmt.strip() != "'YYYY-MM'":
+            continue
+        parts.append(sql[position:match.start()])
+        parts.append(f"strftime(CAST({translate_sql(expression.strip(), dialect)} AS DATE), '%Y-%m')")
+        position = end + 1
+    parts.append(sql[position:])
+    return ''.join(parts)
+
+
+# Colonnes de clés entières de `transactions` (même requête PostgreSQL / DuckDB)
+KEYS_SQL = f"""
+    SELECT COUNT(DISTINCT column_name) FROM information_schema.columns
+    WHERE table_name = 'transactions' AND column_name IN ({', '.join(f"'{c}'" for c in FK_COLUMNS)})
+"""
+
+
+class PostgresBackend:
+    """PostgreSQL via psycopg2"""
+    name = 'postgres'
+    dialect = 'postgres'
+
+    def __init__(self, database_url=None):
+        self.database_url = database_url or get_database_url()
+        if not self.database_url:
+            raise RuntimeError("DATABASE_URL non définie (environnement ou .env)")
+        self.conn = None
+        self.keys = True
+
+    @property
+    def target(self):
+        return describe_database_url(self.database_url)
+
+    def connect(self):
+        import psycopg2
+
+        self.conn = psycopg2.connect(self.database_url)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cur:
+            cur.execute(KEYS_SQL)
+            self.keys = cur.fetchone()[0] == len(FK_COLUMNS)
+        return self
+
+    def execute(self, sql, params=None):
+        if self.conn is None:
+            self.connect()
+        cur = self.conn.cursor()
+        try:
+            cur.execute(translate_sql(sql if self.keys else text_keys(sql), self.dialect), params)
+            return cur.fetchall() if cur.description else []
+        finally:
+            cur.close()
+
+    def reset(self):
+        """Nouvelle connexion (session froide : plans et caches de session vidés)"""
+        self.close()
+        self.connect()
+        self.execute("DISCARD ALL")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class DuckDBBackend:
+    """Réplique DuckDB sur disque (lecture seule)"""
+    name = 'duckdb'
+    dialect = 'duckdb'
+
+    def __init__(self, db_file=None):
+        self.db_file = Path(db_file or DUCKDB_FILE)
+        self.conn = None
+        self.keys = True
+
+    @property
+    def target(self):
+        return str(self.db_file)
+
+    def connect(self):
+        import duckdb
+
+        if not self.db_file.exists():
+            raise RuntimeError(f"Base DuckDB introuvable: {self.db_file}")
+        self.conn = duckdb.connect(str(self.db_file), read_only=True)
+        self.keys = self.has_keys()
+        return self
+
+    def has_keys(self):
+        return self.conn.execute(KEYS_SQL).fetchone()[0] == len(FK_COLUMNS)
+
+    def execute(self, sql, params=None):
+        if self.conn is None:
+            self.connect()
+        result = self.conn.execute(translate_sql(sql if self.keys else text_keys(sql), self.dialect), params or [])
+        return result.fetchall() if result.description else []
+
+    def reset(self):
+        """Rouvrir la base : le buffer manager DuckDB repart à vide"""
+        self.close()
+        self.connect()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class MemoryBackend(DuckDBBackend):
+    """Moteur en mémoire : tables matérialisées depuis les fichiers Parquet"""
+    name = 'memory'
+
+    def __init__(self, parquet_dir=None):
+        super().__init__()
+        self.parquet_dir = Path(parquet_dir or PARQUET_DIR)
+
+    @property
+    def target(self):
+        return str(self.parquet_dir)
+
+    def connect(self):
+        import duckdb
+
+        self.conn = duckdb.connect(':memory:')
+        for table in TABLES:
+            path = self.parquet_dir / f"{table}.parquet"
+            if not path.exists():
+                raise RuntimeError(f"Fichier Parquet introuvable: {path}")
+            self.conn.execute(f"CREATE TABLE {table} AS SELECT * FROM read_parquet('{path}')")
+        self.keys = self.has_keys()
+        return self
+
+
+BACKENDS = {
+    'postgres': PostgresBackend,
+    'duckdb': DuckDBBackend,
+    'memory': MemoryBackend,
+}
+
+
+def open_backend(name, **options):
+    """Instancier et connecter un moteur par son nom"""
+    if name not in BACKENDS:
+        raise ValueError(f"Moteur inconnu: {name} (choix: {', '.join(BACKENDS)})")
+    return BACKENDS[name](**options).connect()
@@ -0,0 +1,335 @@
+"""
+Règles d'association (cross-selling) précalculées
+-------------------------------------------------
+api/cross-selling.js regroupe les lignes par facture à chaque appel et ne
+compte que des paires de familles sur les 50 000 derniers tickets. Ce module
+construit hors ligne la matrice d'incidence ticket × article (SciPy CSR,
+une ligne par ticket, une colonne par famille / sous-famille / produit) :
+
+- paires : cooccurrences, support, confiance, lift et CA par produits de
+  matrices creuses (XᵀX et Xᵀ·diag(CA)·X), toutes les paires d'un coup ;
+- itemsets de 3 articles et plus : FP-growth, règles top-k par lift.
+
+Les règles sont écrites dans `cross_selling_rules` (une ligne par
+antécédent → conséquent, par périmètre et par niveau), recalculées après
+chaque import (decor.aggregates) et lues par api/cross-selling.js.
+
+    python scripts/cross-selling-rules.py --rebuild
+    python scripts/cross-selling-rules.py --niveau sous_famille --scope web --top 20
+
+Dépendances : numpy, scipy.
+"""
+import time
+from collections import Counter
+
+from decor.db import stream_rows, transaction
+from decor.dimensions import keyed
+from decor.schema import table_exists
+
+RULES_TABLE = 'cross_selling_rules'
+STATS_TABLE = 'cross_selling_stats'
+
+# Article d'une ligne de vente selon le niveau d'analyse
+LEVELS = {
+    'famille': "p.famille",
+    'sous_famille': "p.famille || ' › ' || COALESCE(p.sous_famille, 'Non classé')",
+    'produit': "t.produit",
+}
+
+# Mêmes périmètres que le paramètre `magasin` de l'API (WEB / MAGASIN / tous)
+SCOPES = {
+    'tous': "",
+    'web': "AND t.depot = 'WEB'",
+    'magasin': "AND t.depot <> 'WEB'",
+}
+
+# Niveaux recalculés après chaque import (le niveau produit se lance à la demande)
+DEFAULT_LEVELS = ['famille', 'sous_famille']
+
+MIN_TICKETS = 20          # cooccurrences minimales d'une paire
+MIN_SUPPORT = 0.002       # support minimal d'un itemset FP-growth
+MIN_CONFIDENCE = 0.10
+MAX_ITEMSET = 4
+TOP_K = 200               # règles à 3 articles et plus conservées (par lift)
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {RULES_TABLE} (
+        scope TEXT NOT NULL,
+        niveau TEXT NOT NULL,
+        antecedent TEXT NOT NULL,
+        consequent TEXT NOT NULL,
+        nb_articles INTEGER NOT NULL,
+        tickets INTEGER NOT NULL,
+        support DOUBLE PRECISION NOT NULL,
+        confidence DOUBLE PRECISION NOT NULL,
+        lift DOUBLE PRECISION NOT NULL,
+        ca DOUBLE PRECISION,
+        PRIMARY KEY (scope, niveau, antecedent, consequent)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{RULES_TABLE}_lift ON {RULES_TABLE} (scope, niveau, lift DESC)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+        scope TEXT NOT NULL,
+        niveau TEXT NOT NULL,
+        tickets INTEGER NOT NULL,
+        tickets_multi INTEGER NOT NULL,
+        articles INTEGER NOT NULL,
+        computed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (scope, niveau)
+    )
+    """,
+]
+
+
+def incidence_sql(level, scope):
+    return f"""
+        SELECT t.facture, t.date, {LEVELS[level]} AS article, SUM(t.ca)
+        FROM transactions t
+        JOIN produits p ON t.produit_id = p.cle
+        WHERE t.ca > 0 AND t.facture IS NOT NULL AND p.famille IS NOT NULL {SCOPES[scope]}
+        GROUP BY t.facture, t.date, article
+    """
+
+
+class Incidence:
+    """Matrice ticket × article (CSR 0/1) et CA de chaque ticket"""
+
+    def __init__(self, matrix, items, ticket_ca):
+        self.matrix = matrix
+        self.items = items
+        self.ticket_ca = ticket_ca
+
+    @property
+    def n_tickets(self):
+        return self.matrix.shape[0]
+
+    def baskets(self):
+        """Articles (indices de colonne) de chaque ticket à 2 articles ou plus"""
+        indptr, indices = self.matrix.indptr, self.matrix.indices
+        for row in range(self.n_tickets):
+            start, end = indptr[row], indptr[row + 1]
+            if end - start >= 2:
+                yield indices[start:end].tolist()
+
+
+def load_incidence(conn, level='famille', scope='tous'):
+    """Lire les couples (ticket, article) en flux et construire la matrice CSR"""
+    import numpy as np
+    from scipy import sparse
+
+    with transaction(conn) as cur:
+        sql = keyed(cur, incidence_sql(level, scope))
+    tickets, items = {}, {}
+    rows, cols, ca = [], [], []
+    for facture, date, article, montant in stream_rows(conn, sql):
+        row = tickets.setdefault((facture, date), len(tickets))
+        rows.append(row)
+        cols.append(items.setdefault(article, len(items)))
+        ca.append(float(montant or 0))
+
+    rows = np.asarray(rows, dtype=np.int32)
+    cols = np.asarray(cols, dtype=np.int32)
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                               shape=(len(tickets), len(items)))
+    matrix.sum_duplicates()
+    ticket_ca = np.bincount(rows, weights=np.asarray(ca), minlength=len(tickets))
+    labels = [None] * len(items)
+    for label, index in items.items():
+        labels[index] = label
+    return Incidence(matrix, labels, ticket_ca)
+
+
+def pair_rules(incidence, min_tickets=MIN_TICKETS):
+    """
+    Toutes les paires par produits creux : XᵀX donne les cooccurrences,
+    Xᵀ·diag(CA)·X le CA des tickets communs. Deux règles par paire (a→b, b→a).
+    """
+    import numpy as np
+    from scipy import sparse
+
+    x = incidence.matrix
+    n = incidence.n_tickets
+    counts = np.asarray(x.sum(axis=0)).ravel()
+    together = sparse.triu(x.T @ x, k=1).tocoo()
+    keep = together.data >= min_tickets
+    a, b, both = together.row[keep], together.col[keep], together.data[keep].astype(float)
+
+    weighted = (x.T @ (sparse.diags(incidence.ticket_ca) @ x)).tocsr()
+    ca = np.asarray(weighted[a, b]).ravel()
+
+    lift = both * n / (counts[a] * counts[b])
+    rules = []
+    for i in range(len(both)):
+        for left, right in ((a[i], b[i]), (b[i], a[i])):
+            rules.append({
+                'antecedent': [incidence.items[left]],
+                'consequent': incidence.items[right],
+                'tickets': int(both[i]),
+                'support': both[i] / n,
+                'confidence': both[i] / counts[left],
+                'lift': float(lift[i]),
+                'ca': float(ca[i]),
+            })
+    return rules
+
+
+# ---------------------------------------------------------------------------
+# FP-growth (itemsets de 3 articles et plus)
+# ---------------------------------------------------------------------------
+class _Node:
+    __slots__ = ('item', 'count', 'parent', 'children')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+
+
+def _build_tree(paths, min_count):
+    counts = Counter()
+    for path, weight in paths:
+        for item in path:
+            counts[item] += weight
+    root = _Node(None, None)
+    headers = {}
+    for path, weight in paths:
+        node = root
+        for item in sorted((i for i in path if counts[i] >= min_count), key=lambda i: (-counts[i], i)):
+            child = node.children.get(item)
+            if child is None:
+                child = node.children[item] = _Node(item, node)
+                headers.setdefault(item, []).append(child)
+            child.count += weight
+            node = child
+    return headers, counts
+
+
+def _mine(paths, min_count, max_len, prefix, results):
+    headers, counts = _build_tree(paths, min_count)
+    for item, nodes in headers.items():
+        itemset = prefix + (item,)
+        results[frozenset(itemset)] = counts[item]
+        if len(itemset) >= max_len:
+            continue
+        conditional = []
+        for node in nodes:
+            path, parent = [], node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                conditional.append((path, node.count))
+        if conditional:
+            _mine(conditional, min_count, max_len, itemset, results)
+
+
+def fpgrowth(baskets, min_count, max_len=MAX_ITEMSET):
+    """Itemsets fréquents {frozenset: nombre de tickets}"""
+    results = {}
+    _mine([(basket, 1) for basket in baskets], min_count, max_len, (), results)
+    return results
+
+
+def itemset_rules(incidence, min_support=MIN_SUPPORT, min_confidence=MIN_CONFIDENCE,
+                  max_len=MAX_ITEMSET, top_k=TOP_K):
+    """Règles A → c (A de 2 articles ou plus) issues de FP-growth, top-k par lift"""
+    import numpy as np
+
+    n = incidence.n_tickets
+    # Support des articles seuls sur tous les tickets (FP-growth ne voit que les paniers multiples)
+    counts = np.asarray(incidence.matrix.sum(axis=0)).ravel()
+    min_count = max(MIN_TICKETS, int(n * min_support))
+    itemsets = fpgrowth(incidence.baskets(), min_count, max_len)
+    rules = []
+    for itemset, count in itemsets.items():
+        if len(itemset) < 3:
+            continue
+        for consequent in itemset:
+            antecedent = itemset - {consequent}
+            confidence = count / itemsets[antecedent]
+            if confidence < min_confidence:
+                continue
+            rules.append({
+                'antecedent': sorted(incidence.items[i] for i in antecedent),
+                'consequent': incidence.items[consequent],
+                'tickets': count,
+                'support': count / n,
+                'confidence': confidence,
+                'lift': float(confidence * n / counts[consequent]),
+                'ca': None,
+            })
+    rules.sort(key=lambda r: r['lift'], reverse=True)
+    return rules[:top_k]
+
+
+# ---------------------------------------------------------------------------
+# Table des règles
+# ---------------------------------------------------------------------------
+def exists(cur):
+    return table_exists(cur, RULES_TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def mine(conn, level='famille', scope='tous', log=print):
+    """Incidence + paires + FP-growth pour un niveau et un périmètre"""
+    start = time.perf_counter()
+    incidence = load_incidence(conn, level, scope)
+    loaded = time.perf_counter()
+    if incidence.n_tickets:
+        rules = pair_rules(incidence) + itemset_rules(incidence)
+        multi = int((incidence.matrix.getnnz(axis=1) >= 2).sum())
+    else:
+        rules, multi = [], 0
+    log(f"   🛒 {scope}/{level}: {incidence.n_tickets:,} tickets × {len(incidence.items):,} articles, "
+        f"{len(rules):,} règles (lecture {loaded - start:.1f}s, calcul {time.perf_counter() - loaded:.1f}s)")
+    return incidence, multi, rules
+
+
+def save_rules(cur, level, scope, incidence, multi, rules):
+    from psycopg2.extras import execute_values
+
+    cur.execute(f"DELETE FROM {RULES_TABLE} WHERE scope = %s AND niveau = %s", (scope, level))
+    execute_values(cur, f"""
+        INSERT INTO {RULES_TABLE}
+            (scope, niveau, antecedent, consequent, nb_articles, tickets, support, confidence, lift, ca)
+        VALUES %s
+        ON CONFLICT DO NOTHING
+    """, [(scope, level, ' + '.join(r['antecedent']), r['consequent'], len(r['antecedent']) + 1,
+           int(r['tickets']), float(r['support']), float(r['confidence']), float(r['lift']),
+           None if r['ca'] is None else float(r['ca'])) for r in rules])
+    cur.execute(f"""
+        INSERT INTO {STATS_TABLE} (scope, niveau, tickets, tickets_multi, articles, computed_at)
+        VALUES (%s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (scope, niveau) DO UPDATE SET
+            tickets = EXCLUDED.tickets, tickets_multi = EXCLUDED.tickets_multi,
+            articles = EXCLUDED.articles, computed_at = EXCLUDED.computed_at
+    """, (scope, level, incidence.n_tickets, multi, len(incidence.items)))
+
+
+def rebuild(conn, log=print, levels=DEFAULT_LEVELS, scopes=SCOPES):
+    """Recalcul des règles de chaque niveau et périmètre (création des tables au besoin)"""
+    with transaction(conn) as cur:
+        create(cur)
+    total = 0
+    for level in levels:
+        for scope in scopes:
+            incidence, multi, rules = mine(conn, level, scope, log=log)
+            with transaction(conn) as cur:
+                save_rules(cur, level, scope, incidence, multi, rules)
+            total += len(rules)
+    return total
+
+
+def refresh(conn, first, last=None, log=print):
+    """Les règles portent sur tout l'historique : recalcul complet si la table existe"""
+    with transaction(conn) as cur:
+        if not exists(cur):
+            return None
+    return rebuild(conn, log=log)
@@ -0,0 +1,177 @@
+"""
+Exécution des benchmarks et stockage des résultats en JSON
+----------------------------------------------------------
+Pour chaque requête du catalogue :
+- itérations "froides" : nouvelle connexion avant chaque exécution
+- itérations "chaudes" : une exécution de chauffe, puis N exécutions mesurées
+
+Les résultats (p50/p95 par requête) sont écrits dans `data/benchmarks/`
+pour comparer deux rafraîchissements de données entre eux.
+"""
+import json
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+
+from decor.env import DATA_DIR, ROOT_DIR
+
+RESULTS_DIR = DATA_DIR / 'benchmarks'
+RESULTS_VERSION = 1
+
+
+def percentile(values, pct):
+    """Percentile par interpolation linéaire (équivalent numpy.percentile)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(timings):
+    """Statistiques d'une série de temps (en secondes)"""
+    if not timings:
+        return None
+    return {
+        'runs': len(timings),
+        'min': min(timings),
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'max': max(timings),
+        'mean': sum(timings) / len(timings),
+    }
+
+
+def timed_execute(backend, sql):
+    """Exécuter une requête et renvoyer (durée, nombre de lignes)"""
+    start = time.perf_counter()
+    rows = backend.execute(sql)
+    return time.perf_counter() - start, len(rows)
+
+
+def benchmark_query(backend, query, iterations=5, cold=1):
+    """Mesurer une requête en froid puis en chaud"""
+    cold_timings = []
+    warm_timings = []
+    nb_rows = None
+
+    for _ in range(cold):
+        backend.reset()
+        elapsed, nb_rows = timed_execute(backend, query['sql'])
+        cold_timings.append(elapsed)
+
+    if iterations > 0:
+        # Chauffe (non mesurée) : cache de plans et pages en mémoire
+        _, nb_rows = timed_execute(backend, query['sql'])
+        for _ in range(iterations):
+            elapsed, nb_rows = timed_execute(backend, query['sql'])
+            warm_timings.append(elapsed)
+
+    return {
+        'module': query['module'],
+        'rows': nb_rows,
+        'cold': summarize(cold_timings),
+        'warm': summarize(warm_timings),
+    }
+
+
+def data_fingerprint(backend):
+    """Volume et période des transactions, pour situer le rafraîchissement mesuré"""
+    try:
+        row = backend.execute("""
+            SELECT COUNT(*), MIN(date)::text, MAX(date)::text
+            FROM transactions
+        """)[0]
+        return {'transactions': row[0], 'date_min': row[1], 'date_max': row[2]}
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(backend, queries, iterations=5, cold=1, on_result=None):
+    """Benchmarker une liste de requêtes sur un moteur déjà connecté"""
+    results = {}
+    for query in queries:
+        try:
+            result = benchmark_query(backend, query, iterations=iterations, cold=cold)
+        except Exception as e:
+            result = {'module': query['module'], 'error': str(e)}
+            backend.reset()
+        results[query['name']] = result
+        if on_result:
+            on_result(query['name'], result)
+
+    return {
+        'version': RESULTS_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'backend': backend.name,
+        'target': backend.target,
+        'iterations': iterations,
+        'cold_iterations': cold,
+        'data': data_fingerprint(backend),
+        'queries': results,
+    }
+
+
+def save_results(report, output_dir=RESULTS_DIR):
+    """Écrire le rapport JSON et renvoyer son chemin"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = output_dir / f"{report['backend']}-{stamp}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def latest_results(backend_name, output_dir=RESULTS_DIR, exclude=None):
+    """Dernier rapport enregistré pour un moteur (ou None)"""
+    output_dir = Path(output_dir)
+    if not output_dir.exists():
+        return None
+    candidates = sorted(output_dir.glob(f"{backend_name}-*.json"))
+    candidates = [p for p in candidates if exclude is None or p.resolve() != Path(exclude).resolve()]
+    return candidates[-1] if candidates else None
+
+
+def compare_results(current, previous, threshold=0.20, phase='warm'):
+    """
+    Comparer deux rapports requête par requête sur le p50.
+    Renvoie une liste de dicts triée par ratio décroissant ;
+    `regression` vaut True au-delà de +threshold.
+    """
+    comparison = []
+    for name, result in current['queries'].items():
+        before = previous.get('queries', {}).get(name)
+        now_stats = result.get(phase)
+        before_stats = before.get(phase) if before else None
+        if not now_stats or not before_stats or not before_stats['p50']:
+            continue
+        ratio = now_stats['p50'] / before_stats['p50']
+        comparison.append({
+            'name': name,
+            'before': before_stats['p50'],
+            'after': now_stats['p50'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    comparison.sort(key=lambda c: c['ratio'], reverse=True)
+    return comparison
@@ -0,0 +1,376 @@
+"""
+Zones de chalandise précalculées par code postal
+------------------------------------------------
+api/stores.js, test-thresholds.py, test-sans-join.py et check-couverture.py
+rejoignent `transactions` à `clients.cp` à chaque question (une sous-requête
+COUNT(DISTINCT carte) par magasin et par seuil). Trois tables gardent ce
+travail, mises à jour à chaque import :
+
+    catchment_cp_month       (dépôt, cp, mois) → clients, CA, lignes, villes
+    catchment_store_clients  (dépôt, carte) → connue du fichier clients, cp,
+                             premier et dernier mois d'achat
+    cp_centroids             cp → latitude, longitude
+
+`CatchmentIndex` charge ces tables une fois dans des tableaux NumPy
+(une ligne par couple dépôt × cp) avec les centroïdes et la distance au
+magasin : rayons de chalandise (part du CA à moins de x km), courbes de part
+cumulée, seuils de clients, tuiles de carte de chaleur, codes postaux dans
+un rayon (arbre KD SciPy sur la sphère unité).
+
+Centroïdes : référentiel local des codes postaux de decor.geocode
+(`data/reference/codes-postaux.csv`, sinon src/utils/postcodeCoordsMap.ts),
+complété par les codes des clients présents dans le cache de géocodage
+(scripts/geocode-clients.py). Coordonnées des magasins : src/utils/storesCoords.ts.
+
+    python scripts/catchment-areas.py --rebuild
+    python scripts/catchment-areas.py --depot 32 --rayon 20
+
+Dépendances : numpy, scipy.
+"""
+import math
+
+from decor.db import transaction
+from decor.dimensions import keyed
+from decor.env import ROOT_DIR
+from decor.geocode import Geocoder, normalize_cp, read_ts_coords
+from decor.schema import add_months, month_range, table_exists
+
+MONTH_TABLE = 'catchment_cp_month'
+CLIENTS_TABLE = 'catchment_store_clients'
+CENTROIDS_TABLE = 'cp_centroids'
+
+TS_STORES = ROOT_DIR / 'src' / 'utils' / 'storesCoords.ts'
+
+EARTH_RADIUS_KM = 6371.0
+
+# Parts du CA pour les rayons de chalandise
+SHARES = (0.5, 0.8, 0.9)
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {MONTH_TABLE} (
+        depot TEXT NOT NULL,
+        cp TEXT NOT NULL,
+        mois DATE NOT NULL,
+        villes TEXT,
+        clients INTEGER NOT NULL,
+        ca DOUBLE PRECISION NOT NULL,
+        lignes INTEGER NOT NULL,
+        PRIMARY KEY (depot, cp, mois)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{MONTH_TABLE}_mois ON {MONTH_TABLE} (mois)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {CLIENTS_TABLE} (
+        depot TEXT NOT NULL,
+        carte TEXT NOT NULL,
+        connu BOOLEAN NOT NULL,
+        cp TEXT,
+        first_mois DATE NOT NULL,
+        last_mois DATE NOT NULL,
+        PRIMARY KEY (depot, carte)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{CLIENTS_TABLE}_cp ON {CLIENTS_TABLE} (depot, cp)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {CENTROIDS_TABLE} (
+        cp TEXT PRIMARY KEY,
+        lat DOUBLE PRECISION NOT NULL,
+        lon DOUBLE PRECISION NOT NULL,
+        source TEXT
+    )
+    """,
+]
+
+# Même périmètre que api/stores.js (cartes identifiées, CA positif)
+SCOPE = "t.ca > 0 AND t.carte <> '0'"
+HAS_CP = "c.cp IS NOT NULL AND c.cp <> ''"
+
+MONTH_SQL = f"""
+    INSERT INTO {MONTH_TABLE} (depot, cp, mois, villes, clients, ca, lignes)
+    SELECT t.depot, c.cp, date_trunc('month', t.date)::date,
+           STRING_AGG(DISTINCT c.ville, ', '), COUNT(DISTINCT t.carte), SUM(t.ca), COUNT(*)
+    FROM transactions t
+    JOIN clients c ON t.carte_id = c.cle
+    WHERE {SCOPE} AND {HAS_CP} {{where}}
+    GROUP BY 1, 2, 3
+"""
+
+# Toutes les cartes identifiées, présentes ou non dans `clients` (couverture)
+CLIENTS_SQL = f"""
+    INSERT INTO {CLIENTS_TABLE} (depot, carte, connu, cp, first_mois, last_mois)
+    SELECT t.depot, t.carte, BOOL_OR(c.carte IS NOT NULL), MIN(NULLIF(c.cp, '')),
+           date_trunc('month', MIN(t.date))::date, date_trunc('month', MAX(t.date))::date
+    FROM transactions t
+    LEFT JOIN clients c ON t.carte = c.carte
+    WHERE {SCOPE} {{where}}
+    GROUP BY t.depot, t.carte
+    ON CONFLICT (depot, carte) DO UPDATE SET
+        connu = EXCLUDED.connu,
+        cp = EXCLUDED.cp,
+        first_mois = LEAST({CLIENTS_TABLE}.first_mois, EXCLUDED.first_mois),
+        last_mois = GREATEST({CLIENTS_TABLE}.last_mois, EXCLUDED.last_mois)
+"""
+
+
+def store_coordinates():
+    return read_ts_coords(TS_STORES)
+
+
+def load_centroids(cur):
+    """
+    Référentiel local des codes postaux, complété par les codes des clients
+    déjà résolus dans le cache de géocodage (fournisseur distant compris)
+    """
+    cur.execute(f"SELECT DISTINCT cp FROM {CLIENTS_TABLE} WHERE cp IS NOT NULL")
+    with Geocoder() as geocoder:
+        located = geocoder.postcodes(cp for cp, in cur.fetchall())
+        centroids = dict(geocoder.centroids)
+        source = geocoder.source
+    centroids.update((normalize_cp(cp), point) for cp, point in located.items())
+    return centroids, source
+
+
+def save_centroids(cur, centroids, source):
+    from psycopg2.extras import execute_values
+
+    cur.execute(f"TRUNCATE {CENTROIDS_TABLE}")
+    execute_values(cur, f"INSERT INTO {CENTROIDS_TABLE} (cp, lat, lon, source) VALUES %s",
+                   [(cp, lat, lon, source) for cp, (lat, lon) in centroids.items()])
+    return len(centroids)
+
+
+def exists(cur):
+    return table_exists(cur, MONTH_TABLE) and table_exists(cur, CLIENTS_TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def load_months(cur, start=None, end=None):
+    """Agréger les mois de [start, end) (tout l'historique sans bornes)"""
+    if start is None:
+        cur.execute(f"TRUNCATE {MONTH_TABLE}, {CLIENTS_TABLE}")
+        cur.execute(keyed(cur, MONTH_SQL.format(where='')))
+        count = cur.rowcount
+        cur.execute(CLIENTS_SQL.format(where=''))
+        return count
+    where = 'AND t.date >= %s AND t.date < %s'
+    cur.execute(f"DELETE FROM {MONTH_TABLE} WHERE mois >= %s AND mois < %s", (start, end))
+    cur.execute(keyed(cur, MONTH_SQL.format(where=where)), (start, end))
+    count = cur.rowcount
+    cur.execute(CLIENTS_SQL.format(where=where), (start, end))
+    return count
+
+
+def rebuild(conn, log=print):
+    """Recalcul complet et rechargement des centroïdes"""
+    with transaction(conn) as cur:
+        create(cur)
+        count = load_months(cur)
+        centroids, source = load_centroids(cur)
+        save_centroids(cur, centroids, source)
+    with transaction(conn) as cur:
+        for table in (MONTH_TABLE, CLIENTS_TABLE, CENTROIDS_TABLE):
+            cur.execute(f"ANALYZE {table}")
+    log(f"   🗺️  Chalandise : {count:,} cellules (dépôt, cp, mois), {len(centroids):,} centroïdes ({source})")
+    return count
+
+
+def refresh(conn, first, last=None, log=print):
+    """Mise à jour après le chargement des mois `first` à `last` (None si tables absentes)"""
+    months = list(month_range(first, last or first))
+    with transaction(conn) as cur:
+        if not exists(cur):
+            return None
+        count = load_months(cur, months[0], add_months(months[-1], 1))
+    log(f"   🗺️  Chalandise : {count:,} cellules recalculées")
+    return count
+
+
+def zones(cur, depot=None, min_clients=1, min_lines=1):
+    """
+    Codes postaux par magasin depuis les tables précalculées (comme les
+    requêtes d'api/stores.js) : [(dépôt, cp, villes, clients, CA, lignes)]
+    triés par dépôt puis CA décroissant.
+    """
+    cur.execute(f"""
+        WITH ventes AS (
+            SELECT depot, cp, SUM(ca) AS ca, SUM(lignes) AS lignes
+            FROM {MONTH_TABLE}
+            WHERE %(depot)s::text IS NULL OR depot = %(depot)s
+            GROUP BY depot, cp
+        ), cartes AS (
+            SELECT depot, cp, COUNT(*) AS clients
+            FROM {CLIENTS_TABLE}
+            WHERE cp IS NOT NULL AND (%(depot)s::text IS NULL OR depot = %(depot)s)
+            GROUP BY depot, cp
+        ), villes AS (
+            SELECT depot, cp, STRING_AGG(DISTINCT ville, ', ') AS villes
+            FROM {MONTH_TABLE}, unnest(string_to_array(villes, ', ')) ville
+            WHERE %(depot)s::text IS NULL OR depot = %(depot)s
+            GROUP BY depot, cp
+        )
+        SELECT v.depot, v.cp, n.villes, c.clients, v.ca, v.lignes
+        FROM ventes v
+        JOIN cartes c USING (depot, cp)
+        LEFT JOIN villes n USING (depot, cp)
+        WHERE c.clients >= %(min_clients)s AND v.lignes >= %(min_lines)s
+        ORDER BY v.depot, v.ca DESC
+    """, {'depot': depot, 'min_clients': min_clients, 'min_lines': min_lines})
+    return cur.fetchall()
+
+
+def _unit_vectors(lat, lon):
+    import numpy as np
+
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    import numpy as np
+
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class CatchmentIndex:
+    """
+    Couples (dépôt, cp) en tableaux NumPy : clients, CA, lignes, centroïde,
+    distance au magasin (NaN si centroïde ou magasin inconnu).
+    """
+
+    def __init__(self, depots, cps, clients, ca, lignes, centroids, stores):
+        import numpy as np
+        from scipy.spatial import cKDTree
+
+        self.depots = np.asarray(depots, dtype=object)
+        self.cps = np.asarray(cps, dtype=object)
+        self.clients = np.asarray(clients, dtype=float)
+        self.ca = np.asarray(ca, dtype=float)
+        self.lignes = np.asarray(lignes, dtype=float)
+        self.stores = stores
+
+        coords = np.array([centroids.get(normalize_cp(cp), (np.nan, np.nan)) for cp in self.cps]).reshape(-1, 2)
+        self.lat, self.lon = coords[:, 0], coords[:, 1]
+        store_coords = np.array([stores.get(d, (np.nan, np.nan)) for d in self.depots]).reshape(-1, 2)
+        self.distance = haversine_km(store_coords[:, 0], store_coords[:, 1], self.lat, self.lon)
+        self.located = np.isfinite(self.distance)
+
+        # Arbre KD des centroïdes connus (corde sur la sphère unité)
+        self.centroid_cps = np.array(sorted(centroids), dtype=object)
+        points = np.array([centroids[cp] for cp in self.centroid_cps]).reshape(-1, 2)
+        self.tree = cKDTree(_unit_vectors(points[:, 0], points[:, 1])) if len(points) else None
+
+    @classmethod
+    def load(cls, cur, since=None):
+        """
+        Depuis les tables précalculées ; `since` (premier mois) limite le CA
+        aux mois suivants et les clients à ceux revenus depuis.
+        """
+        month_filter, params = ("WHERE mois >= %s", (since,)) if since else ("", ())
+        cur.execute(f"""
+            SELECT m.depot, m.cp, COALESCE(c.clients, 0), m.ca, m.lignes
+            FROM (
+                SELECT depot, cp, SUM(ca) AS ca, SUM(lignes) AS lignes
+                FROM {MONTH_TABLE} {month_filter}
+                GROUP BY depot, cp
+            ) m
+            LEFT JOIN (
+                SELECT depot, cp, COUNT(*) AS clients
+                FROM {CLIENTS_TABLE}
+                WHERE cp IS NOT NULL {month_filter.replace('WHERE mois', 'AND last_mois')}
+                GROUP BY depot, cp
+            ) c USING (depot, cp)
+        """, params * 2)
+        rows = cur.fetchall()
+        cur.execute(f"SELECT cp, lat, lon FROM {CENTROIDS_TABLE}")
+        centroids = {cp: (lat, lon) for cp, lat, lon in cur.fetchall()}
+        columns = list(zip(*rows)) or [[]] * 5
+        return cls(*columns, centroids=centroids, stores=store_coordinates())
+
+    def _store(self, depot):
+        return self.depots == depot
+
+    def thresholds(self, seuils=(1, 2, 5, 10)):
+        """{dépôt: [nombre de cp avec au moins `seuil` clients, ...]}"""
+        import numpy as np
+
+        result = {}
+        for depot in np.unique(self.depots):
+            clients = self.clients[self._store(depot)]
+            result[depot] = [int((clients >= seuil).sum()) for seuil in seuils]
+        return result
+
+    def share_curve(self, depot):
+        """(distances triées, part cumulée du CA) des cp géolocalisés d'un magasin"""
+        import numpy as np
+
+        mask = self._store(depot) & self.located
+        order = np.argsort(self.distance[mask])
+        distances, ca = self.distance[mask][order], self.ca[mask][order]
+        total = self.ca[self._store(depot)].sum()
+        return distances, np.cumsum(ca) / total if total else np.zeros(len(ca))
+
+    def radii(self, shares=SHARES):
+        """{dépôt: [rayon (km) contenant chaque part du CA, None si non atteinte]}"""
+        import numpy as np
+
+        result = {}
+        for depot in np.unique(self.depots):
+            distances, cumulative = self.share_curve(depot)
+            radii = []
+            for share in shares:
+                index = np.searchsorted(cumulative, share)
+                radii.append(float(distances[index]) if index < len(distances) else None)
+            result[depot] = radii
+        return result
+
+    def within(self, depot, km):
+        """Codes postaux connus à moins de `km` du magasin (arbre KD), avec leurs agrégats"""
+        import numpy as np
+
+        if self.tree is None or depot not in self.stores:
+            return []
+        lat, lon = self.stores[depot]
+        chord = 2 * math.sin(km / EARTH_RADIUS_KM / 2)
+        neighbours = self.centroid_cps[self.tree.query_ball_point(_unit_vectors([lat], [lon])[0], chord)]
+        mask = self._store(depot) & np.isin(self.cps, neighbours)
+        order = np.argsort(self.distance[mask])
+        return [(self.cps[mask][i], float(self.distance[mask][i]), int(self.clients[mask][i]), float(self.ca[mask][i]))
+                for i in order]
+
+    def tiles(self, zoom=8, depot=None):
+        """
+        Tuiles de carte de chaleur (x, y, zoom au format des tuiles web) :
+        [(x, y, clients, CA)] ; un magasin ou tous.
+        """
+        import numpy as np
+
+        mask = np.isfinite(self.lat) & (self._store(depot) if depot else True)
+        lat, lon = np.radians(self.lat[mask]), self.lon[mask]
+        n = 2 ** zoom
+        x = np.floor((lon + 180) / 360 * n).astype(int)
+        y = np.floor((1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * n).astype(int)
+        keys, inverse = np.unique(x * n + y, return_inverse=True)
+        clients = np.bincount(inverse, weights=self.clients[mask], minlength=len(keys))
+        ca = np.bincount(inverse, weights=self.ca[mask], minlength=len(keys))
+        return [(int(k // n), int(k % n), int(c), float(v)) for k, c, v in zip(keys, clients, ca)]
+
+
+def coverage(cur):
+    """
+    Couverture du fichier clients par magasin (check-couverture.py) :
+    [(dépôt, cartes identifiées en caisse, présentes dans clients, avec un cp)].
+    """
+    cur.execute(f"""
+        SELECT depot, COUNT(*), COUNT(*) FILTER (WHERE connu), COUNT(cp)
+        FROM {CLIENTS_TABLE}
+        GROUP BY depot
+        ORDER BY COUNT(*) FILTER (WHERE connu)::float / COUNT(*), depot
+    """)
+    return cur.fetchall()
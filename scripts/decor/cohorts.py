@@ -0,0 +1,189 @@
+"""
+Matrice de cohortes précalculée
+-------------------------------
+api/cohortes.js recalcule à chaque appel le mois du premier achat de chaque
+carte puis l'activité de toutes les cohortes. Deux tables gardent ce calcul :
+
+    client_first_purchase   carte → premier achat, mois de cohorte
+    cohort_matrix           (cohorte, mois d'activité) → clients, CA, lignes
+
+Même périmètre que l'API : clients identifiés (carte <> '0'), lignes à CA
+positif. Quand `client_identity` existe (decor.identity), les cartes
+fusionnées comptent pour un seul client. Après un chargement, seuls les mois chargés sont recalculés
+(`refresh`) ; si un premier achat recule (données anciennes rechargées) ou
+avance (mois rechargé sans les lignes qui le fixaient, `schema.reload_month`),
+les cohortes ont changé et la matrice est recalculée entièrement.
+
+    python scripts/refresh-aggregates.py --only cohortes --full
+"""
+from decor import identity
+from decor.db import transaction
+from decor.schema import add_months, month_range, parse_month, table_exists
+
+FIRST_PURCHASE_TABLE = 'client_first_purchase'
+MATRIX_TABLE = 'cohort_matrix'
+
+SCOPE = "carte <> '0' AND ca > 0"
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {FIRST_PURCHASE_TABLE} (
+        carte TEXT PRIMARY KEY,
+        first_date TIMESTAMP NOT NULL,
+        cohort_month DATE NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{FIRST_PURCHASE_TABLE}_cohort ON {FIRST_PURCHASE_TABLE} (cohort_month)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {MATRIX_TABLE} (
+        cohort_month DATE NOT NULL,
+        active_month DATE NOT NULL,
+        clients INTEGER NOT NULL,
+        ca DOUBLE PRECISION NOT NULL,
+        volume INTEGER NOT NULL,
+        PRIMARY KEY (cohort_month, active_month)
+    )
+    """,
+]
+
+FIRST_PURCHASE_SQL = f"""
+    INSERT INTO {FIRST_PURCHASE_TABLE} (carte, first_date, cohort_month)
+    SELECT carte, MIN(date), date_trunc('month', MIN(date))::date
+    FROM {{source}} s
+    WHERE {SCOPE} {{where}}
+    GROUP BY carte
+"""
+
+MATRIX_SQL = f"""
+    INSERT INTO {MATRIX_TABLE} (cohort_month, active_month, clients, ca, volume)
+    SELECT
+        fp.cohort_month,
+        date_trunc('month', t.date)::date,
+        COUNT(DISTINCT t.carte),
+        SUM(t.ca),
+        COUNT(*)
+    FROM {{source}} t
+    JOIN {FIRST_PURCHASE_TABLE} fp ON fp.carte = t.carte
+    WHERE t.carte <> '0' AND t.ca > 0 {{where}}
+    GROUP BY 1, 2
+"""
+
+
+def exists(cur):
+    return table_exists(cur, FIRST_PURCHASE_TABLE) and table_exists(cur, MATRIX_TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def source(cur):
+    """transactions, cartes fusionnées ramenées à leur client si client_identity existe"""
+    return identity.RESOLVED_TRANSACTIONS if identity.exists(cur) else 'transactions'
+
+
+def rebuild(conn, log=print):
+    """Recalcul complet (création des tables au besoin)"""
+    with transaction(conn) as cur:
+        create(cur)
+        cur.execute(f"TRUNCATE {FIRST_PURCHASE_TABLE}, {MATRIX_TABLE}")
+        cur.execute(FIRST_PURCHASE_SQL.format(source=source(cur), where=''))
+        clients = cur.rowcount
+        cur.execute(MATRIX_SQL.format(source=source(cur), where=''))
+        cells = cur.rowcount
+    with transaction(conn) as cur:
+        cur.execute(f"ANALYZE {FIRST_PURCHASE_TABLE}")
+        cur.execute(f"ANALYZE {MATRIX_TABLE}")
+    log(f"   👥 Cohortes : {clients:,} clients, {cells:,} cellules")
+    return cells
+
+
+def update_first_purchases(cur, start):
+    """
+    Premiers achats des clients vus depuis `start`.
+    Renvoie (nouveaux clients, premiers achats avancés).
+    """
+    cur.execute(FIRST_PURCHASE_SQL.format(source=source(cur), where='AND date >= %s') + f"""
+        ON CONFLICT (carte) DO UPDATE
+        SET first_date = EXCLUDED.first_date, cohort_month = EXCLUDED.cohort_month
+        WHERE EXCLUDED.first_date < {FIRST_PURCHASE_TABLE}.first_date
+        RETURNING (xmax = 0)
+    """, (start,))
+    rows = cur.fetchall()
+    inserted = sum(1 for (is_insert,) in rows if is_insert)
+    return inserted, len(rows) - inserted
+
+
+def recheck_first_purchases(cur, start, end):
+    """
+    Premiers achats enregistrés dans [start, end) (mois rechargés) recalculés
+    sur tout l'historique : ils peuvent avancer ou disparaître si le mois
+    rechargé n'a plus les lignes qui les fixaient. Renvoie le nombre de
+    clients changés de cohorte ou retirés.
+    """
+    # Un seul parcours groupé pour toutes les cartes concernées (pas de
+    # sous-requête par carte : la source résolue n'a pas d'index sur carte)
+    cur.execute(f"""
+        CREATE TEMP TABLE cohort_recheck AS
+        WITH concernes AS (
+            SELECT carte, first_date FROM {FIRST_PURCHASE_TABLE}
+            WHERE first_date >= %s AND first_date < %s
+        ), actuels AS (
+            SELECT carte, MIN(date) AS first_date
+            FROM {source(cur)} s
+            WHERE {SCOPE} AND carte IN (SELECT carte FROM concernes)
+            GROUP BY carte
+        )
+        SELECT c.carte, a.first_date
+        FROM concernes c
+        LEFT JOIN actuels a ON a.carte = c.carte
+        WHERE a.first_date IS DISTINCT FROM c.first_date
+    """, (start, end))
+    cur.execute(f"""
+        DELETE FROM {FIRST_PURCHASE_TABLE} fp USING cohort_recheck r
+        WHERE fp.carte = r.carte AND r.first_date IS NULL
+    """)
+    removed = cur.rowcount
+    cur.execute(f"""
+        UPDATE {FIRST_PURCHASE_TABLE} fp
+        SET first_date = r.first_date, cohort_month = date_trunc('month', r.first_date)::date
+        FROM cohort_recheck r
+        WHERE fp.carte = r.carte AND r.first_date IS NOT NULL
+    """)
+    moved = cur.rowcount
+    cur.execute("DROP TABLE cohort_recheck")
+    return moved + removed
+
+
+def refresh_matrix(cur, start=None, end=None):
+    """Recalculer les colonnes (mois d'activité) de [start, end), ou toute la matrice"""
+    if start is None:
+        cur.execute(f"TRUNCATE {MATRIX_TABLE}")
+        cur.execute(MATRIX_SQL.format(source=source(cur), where=''))
+    else:
+        cur.execute(f"DELETE FROM {MATRIX_TABLE} WHERE active_month >= %s AND active_month < %s",
+                    (start, end))
+        cur.execute(MATRIX_SQL.format(source=source(cur), where='AND t.date >= %s AND t.date < %s'), (start, end))
+    return cur.rowcount
+
+
+def refresh(conn, first, last=None, log=print):
+    """Mise à jour après le chargement des mois `first` à `last` (None si tables absentes)"""
+    months = list(month_range(first, last or first))
+    start, end = months[0], add_months(parse_month(months[-1]), 1)
+    with transaction(conn) as cur:
+        if not exists(cur):
+            return None
+        rechecked = recheck_first_purchases(cur, start, end)
+        inserted, moved = update_first_purchases(cur, start)
+        if rechecked:
+            log(f"   ⚠️  {rechecked:,} premiers achats retardés ou disparus : matrice recalculée entièrement")
+        if moved:
+            log(f"   ⚠️  {moved:,} premiers achats avancés : matrice recalculée entièrement")
+        if rechecked or moved:
+            cells = refresh_matrix(cur)
+        else:
+            cells = refresh_matrix(cur, start, end)
+    log(f"   👥 Cohortes : {inserted:,} nouveaux clients, {cells:,} cellules recalculées")
+    return cells
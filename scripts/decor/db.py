@@ -0,0 +1,360 @@
+"""
+Connexions PostgreSQL partagées (pool, keep-alive, requêtes préparées)
+----------------------------------------------------------------------
+Un seul pool par processus : les fonctions d'un script (import clients,
+produits, transactions, statistiques...) réutilisent la même connexion
+au lieu de refaire la poignée de main TLS et le réveil de Neon.
+
+Usage:
+    from decor.db import connect, connection, transaction
+
+    conn = connect()                  # connexion empruntée au pool
+    ...
+    conn.close()                      # rendue au pool (pas fermée)
+
+    with connection() as conn:
+        with transaction(conn) as cur:    # COMMIT, ou ROLLBACK sur exception
+            cur.execute(...)
+
+Requêtes répétées dans une boucle : `execute_prepared(cur, nom, sql, params)`
+prépare la requête une fois par connexion (PREPARE / EXECUTE).
+
+Gros résultats : `stream_rows` / `stream_batches` (curseur serveur nommé) et,
+pour la réplique DuckDB, `duckdb_rows` / `duckdb_record_batches` (Arrow).
+"""
+import atexit
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from decor.env import describe_database_url, get_database_url
+
+# Détection des connexions mortes (Neon coupe les sessions inactives)
+KEEPALIVE_OPTIONS = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 5,
+}
+# Au-delà, une connexion inactive est vérifiée (SELECT 1) avant d'être prêtée
+PING_AFTER_SECONDS = 60
+
+_pools = {}
+_pools_lock = threading.Lock()
+_connection_class = None
+
+
+def pooled_connection_class():
+    """Classe de connexion psycopg2 dont close() rend la connexion au pool"""
+    global _connection_class
+    if _connection_class is None:
+        import psycopg2.extensions
+
+        class PooledConnection(psycopg2.extensions.connection):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.pool = None
+                self.prepared = set()
+                self.last_used = time.monotonic()
+
+            def close(self):
+                if self.pool is not None:
+                    self.pool.release(self)
+                else:
+                    super().close()
+
+            def discard(self):
+                """Fermer réellement la connexion"""
+                self.pool = None
+                if not self.closed:
+                    super().close()
+
+        _connection_class = PooledConnection
+    return _connection_class
+
+
+def supports_prepare(database_url):
+    """
+    PREPARE est lié à la session : inutilisable derrière le pooler Neon
+    (PgBouncer en mode transaction, hôte `*-pooler.*`).
+    """
+    host = describe_database_url(database_url) or ''
+    return '-pooler' not in host.split('/', 1)[0]
+
+
+class ConnectionPool:
+    """Pool de connexions d'un processus (thread-safe)"""
+
+    def __init__(self, database_url=None, minconn=1, maxconn=4, application_name=None):
+        self.database_url = database_url or get_database_url()
+        if not self.database_url:
+            raise RuntimeError("DATABASE_URL non définie (environnement ou .env)")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.application_name = application_name or f"decor:{Path(sys.argv[0]).stem or 'python'}"
+        self.prepare = supports_prepare(self.database_url)
+        self._idle = []
+        self._used = set()
+        self._opening = 0
+        self._lock = threading.Lock()
+        self._warming = None
+
+    @property
+    def target(self):
+        return describe_database_url(self.database_url)
+
+    def _open(self):
+        import psycopg2
+
+        conn = psycopg2.connect(
+            self.database_url,
+            connection_factory=pooled_connection_class(),
+            application_name=self.application_name,
+            **KEEPALIVE_OPTIONS,
+        )
+        conn.pool = self
+        return conn
+
+    @staticmethod
+    def ping(conn):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def warm_up(self):
+        """Ouvrir `minconn` connexions à l'avance (réveille le compute Neon)"""
+        with self._lock:
+            missing = self.minconn - len(self._idle) - len(self._used) - self._opening
+        for _ in range(max(missing, 0)):
+            conn = self._open()
+            self.ping(conn)
+            with self._lock:
+                self._idle.append(conn)
+        return self
+
+    def acquire(self):
+        if self._warming is not None:
+            # Connexion en cours d'ouverture par warm_up() : l'attendre plutôt qu'en ouvrir une autre
+            self._warming.join()
+            self._warming = None
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    if len(self._used) + self._opening >= self.maxconn:
+                        raise RuntimeError(f"Pool saturé ({self.maxconn} connexions utilisées)")
+                    # Place réservée sous le verrou : l'ouverture se fait hors verrou
+                    self._opening += 1
+            if conn is None:
+                try:
+                    conn = self._open()
+                    with self._lock:
+                        self._used.add(conn)
+                    return conn
+                finally:
+                    with self._lock:
+                        self._opening -= 1
+            if conn.closed or (time.monotonic() - conn.last_used > PING_AFTER_SECONDS
+                               and not self.ping(conn)):
+                conn.discard()
+                continue
+            with self._lock:
+                self._used.add(conn)
+            return conn
+
+    def release(self, conn):
+        with self._lock:
+            self._used.discard(conn)
+        if conn.closed:
+            return
+        try:
+            # Transaction laissée ouverte par l'appelant : annulée avant réutilisation
+            conn.rollback()
+            conn.autocommit = False
+        except Exception:
+            conn.discard()
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.maxconn:
+                self._idle.append(conn)
+                return
+        conn.discard()
+
+    def close(self):
+        with self._lock:
+            connections = self._idle + list(self._used)
+            self._idle = []
+            self._used = set()
+        for conn in connections:
+            conn.discard()
+
+
+def get_pool(database_url=None, minconn=1, maxconn=4):
+    """Pool du processus pour une URL (créé au premier appel)"""
+    url = database_url or get_database_url()
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = ConnectionPool(url, minconn=minconn, maxconn=maxconn)
+    return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_pools)
+
+
+def warm_up(database_url=None):
+    """Ouvrir la connexion en tâche de fond pendant la lecture des CSV"""
+    pool = get_pool(database_url)
+    thread = threading.Thread(target=pool.warm_up, daemon=True)
+    thread.start()
+    pool._warming = thread
+    return thread
+
+
+def connect(database_url=None, autocommit=False):
+    """Emprunter une connexion au pool ; `conn.close()` la rend au pool"""
+    conn = get_pool(database_url).acquire()
+    conn.autocommit = autocommit
+    return conn
+
+
+@contextmanager
+def connection(database_url=None, autocommit=False):
+    conn = connect(database_url, autocommit=autocommit)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction(conn, cursor_factory=None):
+    """Curseur dans une transaction : COMMIT en sortie, ROLLBACK sur exception"""
+    cur = conn.cursor(cursor_factory=cursor_factory) if cursor_factory else conn.cursor()
+    try:
+        yield cur
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _positional(sql):
+    """Paramètres psycopg2 (%s) → paramètres PREPARE ($1, $2...)"""
+    counter = iter(range(1, sql.count('%s') + 1))
+    return re.sub(r'%s', lambda _: f"${next(counter)}", sql.replace('%%', '%'))
+
+
+def execute_prepared(cur, name, sql, params=()):
+    """
+    Exécuter une requête répétée via PREPARE/EXECUTE (plan préparé une fois
+    par connexion). Repli sur un execute classique derrière un pooler.
+    """
+    conn = cur.connection
+    pool = getattr(conn, 'pool', None)
+    prepared = getattr(conn, 'prepared', None)
+    if pool is None or not pool.prepare or prepared is None:
+        cur.execute(sql, params)
+        return cur
+
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {_positional(sql)}")
+        prepared.add(name)
+    if params:
+        placeholders = ', '.join(['%s'] * len(params))
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cur.execute(f"EXECUTE {name}")
+    return cur
+
+
+# ---------------------------------------------------------------------------
+# Lecture en flux des gros résultats
+# ---------------------------------------------------------------------------
+STREAM_BATCH_SIZE = 10000
+_cursor_counter = iter(range(1, 1_000_000_000))
+
+
+def _idle(conn):
+    """Aucune transaction en cours sur la connexion"""
+    import psycopg2.extensions
+
+    return conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+def stream_rows(conn, sql, params=None, batch_size=STREAM_BATCH_SIZE, name=None):
+    """
+    Parcourir un résultat ligne par ligne via un curseur serveur nommé :
+    PostgreSQL n'envoie que `batch_size` lignes à la fois, la mémoire reste
+    constante et les premières lignes arrivent sans attendre la fin.
+
+    Le curseur vit dans une transaction : ouverte ici si la connexion était
+    inactive, elle est annulée à la fin ; sinon c'est celle de l'appelant,
+    laissée ouverte (ni COMMIT ni ROLLBACK).
+    """
+    if conn.autocommit:
+        raise RuntimeError("Curseur serveur impossible en autocommit (utiliser connect())")
+    opened = _idle(conn)
+    cur = conn.cursor(name=name or f"decor_stream_{next(_cursor_counter)}")
+    cur.itersize = batch_size
+    try:
+        cur.execute(sql, params)
+        yield from cur
+    finally:
+        cur.close()
+        if opened:
+            conn.rollback()
+
+
+def stream_batches(conn, sql, params=None, batch_size=STREAM_BATCH_SIZE, name=None):
+    """Comme stream_rows, mais par listes de `batch_size` lignes"""
+    if conn.autocommit:
+        raise RuntimeError("Curseur serveur impossible en autocommit (utiliser connect())")
+    opened = _idle(conn)
+    cur = conn.cursor(name=name or f"decor_stream_{next(_cursor_counter)}")
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+        if opened:
+            conn.rollback()
+
+
+def duckdb_record_batches(con, sql, params=None, batch_size=STREAM_BATCH_SIZE * 10):
+    """Résultat DuckDB en RecordBatch Arrow successifs (nécessite pyarrow)"""
+    result = con.execute(sql, params) if params is not None else con.execute(sql)
+    reader = result.fetch_record_batch(batch_size)
+    yield from reader
+
+
+def duckdb_rows(con, sql, params=None, batch_size=STREAM_BATCH_SIZE):
+    """Résultat DuckDB ligne par ligne (fetchmany, sans dépendance Arrow)"""
+    result = con.execute(sql, params) if params is not None else con.execute(sql)
+    while True:
+        rows = result.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
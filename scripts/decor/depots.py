@@ -0,0 +1,273 @@
+"""
+Codes dépôt canoniques
+----------------------
+Les extractions et les anciens imports mélangent `32`, `M32`, `032`, `32.0`...
+d'où les jointures `t.depot = m.code OR t.depot = CONCAT('M', m.code)` qui
+empêchent PostgreSQL d'utiliser les index.
+
+Le code canonique est le numéro de caisse Sage sans préfixe ni zéro ('32'),
+celui de la liste officielle ci-dessous. Il est appliqué au chargement
+(`canonical_depot`) pour `transactions.depot` comme pour `magasins.code` :
+les jointures magasins deviennent de simples `t.depot = m.code`.
+
+La table `depot_aliases` (forme rencontrée → code canonique) garde la trace
+des variantes et sert à normaliser une base existante :
+    python scripts/apply-migration.py depots
+
+Les tables précalculées par dépôt (tickets, ABC, hiérarchie, chalandise,
+prévisions, audiences ; les anomalies lisent les tickets) sont ensuite
+reconstruites si des codes ont changé.
+"""
+import csv
+import io
+import re
+
+# Liste officielle des caisses Sage (validée avec le métier, cf. verif-correspondance-caisses.py)
+CAISSES_OFFICIELLES = {
+    '12': 'Caisse ALES',
+    '13': 'Caisse BEZIERS',
+    '14': 'Caisse ARLES',
+    '15': 'Caisse VAISE',
+    '16': 'Caisse ST JEAN DE VEDAS',
+    '17': 'Caisse St Peray',
+    '19': 'Caisse Romans',
+    '20': 'Caisse Montfavet',
+    '22': 'Caisse ST BONNET DE MURE',
+    '23': 'Caisse VIRIAT',
+    '24': 'Caisse SILLINGY',
+    '25': 'Caisse CARCASSONNE',
+    '26': 'Caisse ST EGREVE',
+    '27': 'Caisse VILLEFRANCHE',
+    '28': 'Caisse ST MARTIN D\'HERES',
+    '29': 'Caisse FENOUILLET',
+    '31': 'Caisse Montelimar',
+    '32': 'Caisse LEMPDES',
+    '33': 'Caisse ESTANCARBON',
+    '34': 'Caisse AUBENAS',
+    '35': 'Caisse NIMES',
+    '36': 'Caisse VOGLANS',
+    '37': 'Caisse SORGUES',
+    '38': 'Caisse ONET LE CHATEAU',
+    '39': 'Caisse NARBONNE',
+    '48': 'D2D',
+    '49': 'SCEM',
+    '50': 'CAP',
+    '52': 'Avoir M19',
+    '53': 'Ventes etats',
+    '54': 'Ventes Web',
+    '55': 'Client activités annexes',
+    '58': 'Avoir M17',
+    '60': 'MAZET MESSAGERIE MONTELIMAR',
+    '62': 'TAILORMADE LOGISTICS FRANCE',
+    '63': 'GLS',
+    '100': 'FMI DIRRA',
+    '101': 'EFIWARE',
+    '102': 'Client Acompte M19',
+    '109': 'Avoir M12',
+    '110': 'Avoir M13',
+    '111': 'Avoir M14',
+    '112': 'Avoir M15',
+    '113': 'Avoir M16',
+    '114': 'Avoir M20',
+    '115': 'Avoir M22',
+    '116': 'Avoir M23',
+    '117': 'Avoir M24',
+    '118': 'Avoir M25',
+    '119': 'Avoir M26',
+}
+
+MAGASINS_REELS = ['12', '13', '14', '15', '16', '17', '19', '20', '22', '23',
+                  '24', '25', '26', '27', '28', '29', '31', '32', '33', '34',
+                  '35', '36', '37', '38', '39']
+
+AVOIRS = ['52', '58', '109', '110', '111', '112', '113', '114', '115', '116', '117', '118', '119']
+
+SERVICES = ['48', '49', '50', '53', '54', '55', '60', '62', '63', '100', '101', '102']
+
+# Siège/compta et dépôts exclus des statistiques du dashboard (api/dashboard.js)
+DEPOTS_EXCLUS = ['1', '41', '42']
+
+# Codes techniques conservés tels quels ('0' = inconnu, 'WEB' = commandes en ligne de l'API)
+CODES_TECHNIQUES = {'0', 'WEB'}
+
+_PREFIX = re.compile(r'^(?:MAG|M)[\s_-]*(?=\d)')
+_NUMBER = re.compile(r'^\d+(?:\.0+)?$')
+
+
+def canonical_depot(code):
+    """'M32', 'm32', '032', ' 32', '32.0', 'MAG32' → '32' ; vide → '0'"""
+    text = '' if code is None else str(code).strip().upper()
+    if not text:
+        return '0'
+    text = _PREFIX.sub('', text)
+    if _NUMBER.match(text):
+        return str(int(float(text)))
+    return text
+
+
+def categorie(code):
+    """magasin / avoir / service / siège / technique / inconnu"""
+    code = canonical_depot(code)
+    if code in MAGASINS_REELS:
+        return 'magasin'
+    if code in AVOIRS:
+        return 'avoir'
+    if code in SERVICES:
+        return 'service'
+    if code in DEPOTS_EXCLUS:
+        return 'siège'
+    if code in CODES_TECHNIQUES:
+        return 'technique'
+    return 'inconnu'
+
+
+def validate_codes(codes):
+    """Codes canoniques absents de la liste officielle (hors siège et codes techniques)"""
+    return sorted({canonical_depot(c) for c in codes if categorie(c) == 'inconnu'},
+                  key=lambda c: (not c.isdigit(), int(c) if c.isdigit() else 0, c))
+
+
+def canonical_csv(f, index):
+    """
+    Copie d'un CSV (avec en-tête) dont la colonne n° `index` est canonisée,
+    prête pour `cursor.copy_expert(... FROM STDIN WITH CSV HEADER, ...)`.
+    COPY associe les colonnes par position : `index` est celle de `depot`
+    dans la liste de colonnes du COPY, pas un nom d'en-tête.
+    """
+    reader = csv.reader(f)
+    header = next(reader, None)
+    output = io.StringIO()
+    if header is None:
+        return output
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(header)
+    for row in reader:
+        if index < len(row):
+            row[index] = canonical_depot(row[index])
+        writer.writerow(row)
+    output.seek(0)
+    return output
+
+
+# ---------------------------------------------------------------------------
+# Table de correspondance et normalisation d'une base existante
+# ---------------------------------------------------------------------------
+ALIASES_TABLE = 'depot_aliases'
+
+# Agrégats (decor.aggregates) dont les lignes portent un code dépôt
+DEPOT_AGGREGATES = ('tickets', 'abc', 'hierarchie', 'chalandise', 'previsions', 'audiences')
+
+
+def ensure_alias_table(cur):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ALIASES_TABLE} (
+            alias TEXT PRIMARY KEY,
+            code TEXT NOT NULL,
+            officiel BOOLEAN NOT NULL DEFAULT FALSE
+        )
+    """)
+
+
+def register_aliases(cur, codes):
+    """Enregistrer les formes rencontrées ; renvoie {alias: code canonique}"""
+    from psycopg2.extras import execute_values
+
+    mapping = {c: canonical_depot(c) for c in codes if c is not None}
+    if mapping:
+        execute_values(cur, f"""
+            INSERT INTO {ALIASES_TABLE} (alias, code, officiel) VALUES %s
+            ON CONFLICT (alias) DO UPDATE SET code = EXCLUDED.code, officiel = EXCLUDED.officiel
+        """, [(alias, code, code in CAISSES_OFFICIELLES) for alias, code in mapping.items()])
+    return mapping
+
+
+def normalize_database(conn, log=print):
+    """
+    Canoniser magasins.code et transactions.depot en une transaction.
+    Les magasins en double (32 / M32) sont fusionnés sur le code canonique
+    avant de repointer les transactions (clé étrangère depot → magasins),
+    puis les agrégats par dépôt existants sont reconstruits.
+    Renvoie les codes de transactions absents de la liste officielle.
+    """
+    from psycopg2.extras import execute_values
+
+    from decor import aggregates, version
+    from decor.db import transaction
+    from decor.dimensions import has_keys
+
+    with transaction(conn) as cur:
+        ensure_alias_table(cur)
+        cur.execute("SELECT DISTINCT depot FROM transactions")
+        tx_codes = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT code FROM magasins")
+        store_codes = [row[0] for row in cur.fetchall()]
+        mapping = register_aliases(cur, tx_codes + store_codes)
+        variants = sorted(alias for alias, code in mapping.items() if alias != code)
+        log(f"   🔤 {len(mapping)} formes de code dépôt, {len(variants)} à canoniser"
+            + (f" ({', '.join(variants[:10])}{'...' if len(variants) > 10 else ''})" if variants else ''))
+
+        # Magasin canonique créé à partir de sa variante s'il n'existe pas encore
+        cur.execute(f"""
+            INSERT INTO magasins (code, nom, zone, adresse_1, adresse_2, adresse_3, cp, ville)
+            SELECT DISTINCT ON (a.code) a.code, m.nom, m.zone, m.adresse_1, m.adresse_2, m.adresse_3, m.cp, m.ville
+            FROM magasins m
+            JOIN {ALIASES_TABLE} a ON a.alias = m.code AND a.alias <> a.code
+            ORDER BY a.code, m.code
+            ON CONFLICT (code) DO NOTHING
+        """)
+        created = cur.rowcount
+
+        # Code canonique de transactions sans aucun magasin (imports faits sous
+        # DISABLE TRIGGER ALL) : caisse officielle créée sous son nom du registre,
+        # sinon ses variantes restent telles quelles (la clé étrangère casserait)
+        cur.execute("SELECT code FROM magasins")
+        stores = {row[0] for row in cur.fetchall()}
+        missing = sorted({mapping[c] for c in tx_codes if c is not None and mapping[c] != c} - stores)
+        official = [(code, CAISSES_OFFICIELLES[code]) for code in missing if code in CAISSES_OFFICIELLES]
+        skipped = [code for code in missing if code not in CAISSES_OFFICIELLES]
+        if official:
+            execute_values(cur, "INSERT INTO magasins (code, nom) VALUES %s ON CONFLICT (code) DO NOTHING", official)
+            created += len(official)
+        if skipped:
+            log(f"   ⚠️  Sans magasin ni caisse officielle, non canonisés : {', '.join(skipped)}")
+
+        # Base migrée (apply-migration.py cles) : depot_id suit le magasin canonique
+        if has_keys(cur):
+            cur.execute(f"""
+                UPDATE transactions t SET depot = a.code, depot_id = m.cle
+                FROM {ALIASES_TABLE} a
+                LEFT JOIN magasins m ON m.code = a.code
+                WHERE t.depot = a.alias AND a.alias <> a.code AND a.code <> ALL(%s::text[])
+            """, (skipped,))
+        else:
+            cur.execute(f"""
+                UPDATE transactions t SET depot = a.code
+                FROM {ALIASES_TABLE} a
+                WHERE t.depot = a.alias AND a.alias <> a.code AND a.code <> ALL(%s::text[])
+            """, (skipped,))
+        updated = cur.rowcount
+        cur.execute(f"""
+            DELETE FROM magasins m USING {ALIASES_TABLE} a
+            WHERE m.code = a.alias AND a.alias <> a.code
+        """)
+        merged = cur.rowcount
+        if created or updated or merged:
+            version.bump(cur)
+        log(f"   🏪 Magasins : {created} créés, {merged} variantes fusionnées")
+        log(f"   🎫 Transactions repointées : {updated:,}")
+
+        cur.execute("SELECT DISTINCT depot FROM transactions")
+        unknown = validate_codes(row[0] for row in cur.fetchall())
+
+    with transaction(conn) as cur:
+        cur.execute("ANALYZE transactions")
+        cur.execute("ANALYZE magasins")
+
+    # Agrégats encore sur les anciens codes : recalcul complet de ceux qui existent
+    if updated or merged:
+        with transaction(conn) as cur:
+            stale = [name for name, module in aggregates.select(DEPOT_AGGREGATES) if module.exists(cur)]
+        if stale:
+            log(f"   🔄 Agrégats par dépôt reconstruits : {', '.join(stale)}")
+            aggregates.rebuild_all(conn, names=stale, log=log)
+    return unknown
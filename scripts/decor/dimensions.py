@@ -0,0 +1,192 @@
+"""
+Clés entières des dimensions (carte, produit, dépôt)
+----------------------------------------------------
+`transactions` répète sur chaque ligne des clés texte (`carte`, `produit`,
+`depot`) comparées et hachées dans toutes les jointures et GROUP BY. Les
+tables de dimension existantes servent de dictionnaire : chacune reçoit une
+clé entière `cle` (identité), et la table de faits les colonnes
+`carte_id`, `produit_id`, `depot_id` (index plus petits, jointures sur
+entiers).
+
+Les chaînes d'origine restent dans les dimensions ; les colonnes texte de
+`transactions` sont conservées tant que l'API les lit.
+
+    python scripts/apply-migration.py cles     # colonnes, index et remplissage
+
+Les imports renseignent les clés à l'insertion (`KeyCache`) ou juste après
+un COPY (`fill_keys`). Sur une base sans ces colonnes, rien n'est fait.
+
+Aucun membre n'est créé dans les dimensions : une clé naturelle inconnue
+(carte anonyme '0', produit orphelin) garde un *_id NULL, comme la jointure
+texte qui l'écartait. Les contrôles de couverture et d'orphelins restent
+justes ; `unresolved` compte ces lignes à part.
+
+Les requêtes (catalogue, agrégats, exports) s'écrivent sur les clés
+entières, `JOIN produits p ON t.produit_id = p.cle` ; `text_keys` les ramène
+aux clés texte (`t.produit = p.id`) sur une base pas encore migrée.
+"""
+import re
+
+from decor.db import transaction
+
+KEY_COLUMN = 'cle'
+
+# Colonne de transactions → dimension (table, clé naturelle, colonne de la table de faits)
+DIMENSIONS = {
+    'carte': {
+        'table': 'clients',
+        'natural': 'carte',
+        'fk': 'carte_id',
+        'type': 'INTEGER',
+    },
+    'produit': {
+        'table': 'produits',
+        'natural': 'id',
+        'fk': 'produit_id',
+        'type': 'INTEGER',
+    },
+    'depot': {
+        'table': 'magasins',
+        'natural': 'code',
+        'fk': 'depot_id',
+        'type': 'SMALLINT',
+    },
+}
+
+FK_COLUMNS = [dim['fk'] for dim in DIMENSIONS.values()]
+
+# `t.produit_id = p.cle` (jointure fait → dimension), puis toute autre clé de fait
+KEY_JOIN = re.compile(rf"\b(\w+)\.(carte|produit|depot)_id = (\w+)\.{KEY_COLUMN}\b")
+FACT_KEY = re.compile(r"\b(carte|produit|depot)_id\b")
+
+
+def text_keys(sql):
+    """
+    Forme texte d'une requête écrite sur les clés entières :
+    `t.produit_id = p.cle` → `t.produit = p.id`, `COUNT(DISTINCT t.carte_id)`
+    → `COUNT(DISTINCT t.carte)`.
+    """
+    sql = KEY_JOIN.sub(lambda m: f"{m[1]}.{m[2]} = {m[3]}.{DIMENSIONS[m[2]]['natural']}", sql)
+    return FACT_KEY.sub(r"\1", sql)
+
+
+def has_keys(cur, table='transactions'):
+    """Les colonnes de clés entières existent-elles sur la table ?"""
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND column_name = ANY(%s)
+    """, (table, FK_COLUMNS))
+    return cur.fetchone()[0] == len(FK_COLUMNS)
+
+
+def keyed(cur, sql):
+    """`sql` telle quelle sur une base qui a les clés entières, sinon sa forme texte"""
+    return sql if has_keys(cur) else text_keys(sql)
+
+
+def present(cur):
+    """Dimensions dont la table existe (update-weekly.py ne recrée pas `magasins`)"""
+    cur.execute("SELECT t FROM unnest(%s::text[]) t WHERE to_regclass(t) IS NOT NULL",
+                ([dim['table'] for dim in DIMENSIONS.values()],))
+    tables = {row[0] for row in cur.fetchall()}
+    return {column: dim for column, dim in DIMENSIONS.items() if dim['table'] in tables}
+
+
+def ensure_keys(cur):
+    """Clé `cle` sur chaque dimension présente, colonnes *_id et index sur transactions"""
+    dims = present(cur)
+    for column, dim in DIMENSIONS.items():
+        cur.execute(f"ALTER TABLE transactions ADD COLUMN IF NOT EXISTS {dim['fk']} {dim['type']}")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_transactions_{dim['fk']} ON transactions ({dim['fk']})")
+        if column not in dims:
+            continue
+        table = dim['table']
+        # Colonne identité : les lignes existantes sont numérotées à l'ajout
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {KEY_COLUMN} "
+                    f"INTEGER GENERATED BY DEFAULT AS IDENTITY")
+        cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_{KEY_COLUMN}_key ON {table} ({KEY_COLUMN})")
+
+
+def fill_keys(cur, table='transactions'):
+    """Renseigner les *_id encore vides (après un COPY ou sur une table de travail)"""
+    filled = {}
+    for column, dim in present(cur).items():
+        cur.execute(f"""
+            UPDATE {table} t SET {dim['fk']} = d.{KEY_COLUMN}
+            FROM {dim['table']} d
+            WHERE d.{dim['natural']} = t.{column} AND t.{dim['fk']} IS NULL
+        """)
+        filled[dim['fk']] = cur.rowcount
+    return filled
+
+
+def unresolved(cur, table='transactions'):
+    """Lignes dont la clé naturelle n'a pas de membre dans sa dimension (*_id NULL)"""
+    dims = present(cur)
+    if not dims:
+        return {}
+    counts = ', '.join(f"COUNT(*) FILTER (WHERE {column} IS NOT NULL AND {dim['fk']} IS NULL)"
+                       for column, dim in dims.items())
+    cur.execute(f"SELECT {counts} FROM {table}")
+    return dict(zip((dim['fk'] for dim in dims.values()), cur.fetchone()))
+
+
+def migrate(conn, log=print):
+    """Ajout des clés puis remplissage de toute la table de faits"""
+    with transaction(conn) as cur:
+        ensure_keys(cur)
+        for fk, count in fill_keys(cur).items():
+            log(f"   🔢 {fk}: {count:,} lignes renseignées")
+        for fk, count in unresolved(cur).items():
+            if count:
+                log(f"   ❔ {fk}: {count:,} lignes sans membre (clé NULL)")
+    with transaction(conn) as cur:
+        for dim in present(cur).values():
+            cur.execute(f"ANALYZE {dim['table']}")
+        cur.execute("ANALYZE transactions")
+
+
+def key_sizes(cur):
+    """Taille moyenne (octets) des clés texte et des clés entières dans transactions"""
+    text = ' + '.join(f"AVG(pg_column_size({column}))" for column in DIMENSIONS)
+    ints = ' + '.join(f"AVG(pg_column_size({dim['fk']}))" for dim in DIMENSIONS.values())
+    cur.execute(f"SELECT {text}, {ints} FROM transactions TABLESAMPLE SYSTEM (1)")
+    return cur.fetchone()
+
+
+class KeyCache:
+    """
+    Clé naturelle → clé entière pour une dimension, en mémoire pendant un
+    import. Un membre inconnu n'est pas créé : la ligne de faits reçoit une
+    clé NULL (`fill_keys` la renseignera si le membre arrive plus tard).
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.dim = DIMENSIONS[column]
+        self.ids = {}
+        self.unknown = set()
+
+    def load(self, cur):
+        cur.execute(f"SELECT {self.dim['natural']}, {KEY_COLUMN} FROM {self.dim['table']}")
+        self.ids.update(cur.fetchall())
+        return self
+
+    def resolve(self, cur, values):
+        """{clé naturelle: clé entière ou None} pour `values`"""
+        missing = {v for v in values if v is not None and v not in self.ids and v not in self.unknown}
+        if missing:
+            # Membres ajoutés depuis `load` (fichier clients/produits chargé entre-temps)
+            dim = self.dim
+            cur.execute(f"SELECT {dim['natural']}, {KEY_COLUMN} FROM {dim['table']} "
+                        f"WHERE {dim['natural']} = ANY(%s)", (list(missing),))
+            self.ids.update(cur.fetchall())
+            self.unknown |= missing - self.ids.keys()
+        return {v: self.ids.get(v) for v in values}
+
+
+def key_caches(cur):
+    """Un KeyCache chargé par dimension, ou None si la base n'a pas les clés"""
+    if not has_keys(cur):
+        return None
+    return {column: KeyCache(column).load(cur) for column in DIMENSIONS}
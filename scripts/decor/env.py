@@ -0,0 +1,47 @@
+"""
+Configuration commune : chemins du projet et lecture de DATABASE_URL
+"""
+import os
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+ENV_FILE = ROOT_DIR / '.env'
+
+# Réplique DuckDB et exports Parquet (voir scripts/import-data.py et export-parquet.py)
+DUCKDB_FILE = ROOT_DIR / 'public' / 'duckdb.db'
+PARQUET_DIR = ROOT_DIR / 'public' / 'data'
+
+DATA_DIR = ROOT_DIR / 'data'
+
+
+def read_env_file(path=ENV_FILE):
+    """Lire un fichier .env (KEY=VALUE) sans dépendre de python-dotenv"""
+    values = {}
+    path = Path(path)
+    if not path.exists():
+        return values
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            values[key.strip()] = value.strip().strip('"').strip("'")
+    return values
+
+
+def get_database_url(env_file=ENV_FILE):
+    """DATABASE_URL depuis l'environnement, sinon depuis le .env du projet"""
+    url = os.getenv('DATABASE_URL')
+    if url:
+        return url
+    return read_env_file(env_file).get('DATABASE_URL')
+
+
+def describe_database_url(url):
+    """Hôte/base d'une URL PostgreSQL, sans le mot de passe (pour les logs)"""
+    if not url:
+        return None
+    target = url.split('@', 1)[-1]
+    return target.split('?', 1)[0]
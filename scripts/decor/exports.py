@@ -0,0 +1,454 @@
+"""
+Exports CSV / Parquet / XLSX en flux, avec cache par version des données
+------------------------------------------------------------------------
+api/export.js relance ses requêtes d'analyse à chaque export et assemble
+le classeur en mémoire. Ici :
+
+- chaque analyse du catalogue (`EXPORTS`) est une requête sur
+  `transactions` (mêmes périmètres que api/export.js, sans les LIMIT 100)
+  ou sur une table précalculée (hiérarchie, ABC, cohortes, prévisions,
+  chalandise) ;
+- le résultat est lu par un curseur serveur, `BATCH_SIZE` lignes à la fois,
+  et écrit au fil de l'eau : csv.writer, pyarrow ParquetWriter (un groupe de
+  lignes par lot), openpyxl en mode write-only (nouvelle feuille au-delà de
+  la limite Excel) ; la mémoire ne dépend pas du nombre de lignes ;
+- le fichier produit est gardé dans `data/exports/`, sous une clé
+  (analyse, filtres, format, version des données). La version est le
+  compteur de decor.version, incrémenté par chaque import et par
+  `aggregates.refresh_all` ; un nouvel export de la même vue sur les mêmes
+  données est une copie. Sans version posée, rien n'est servi du cache ;
+- plusieurs exports tournent en parallèle (`run_all`, un processus et une
+  connexion par export).
+
+    python scripts/export-data.py clients familles --format xlsx --since 2025-11
+    python scripts/export-data.py transactions --format parquet --depot 32 --output lignes-32.parquet
+
+Dépendances : pyarrow (Parquet), openpyxl (XLSX).
+"""
+import csv
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from decor import version
+from decor.dimensions import has_keys, text_keys
+from decor.env import DATA_DIR
+
+CACHE_DIR = DATA_DIR / 'exports'
+
+FORMATS = ('csv', 'parquet', 'xlsx')
+
+BATCH_SIZE = 20000
+
+# Lignes de données par feuille Excel (1 048 576 lignes, en-tête compris)
+XLSX_MAX_ROWS = 1_048_575
+
+
+def _period(column):
+    """Filtres de période sur `column` (since inclus, until exclu après build_filters)"""
+    return {'since': f"{column} >= %(since)s", 'until': f"{column} < %(until)s"}
+
+
+EXPORTS = {
+    'familles': {
+        'description': "CA et lignes par famille (api/export.js)",
+        'tables': ('transactions', 'produits'),
+        'sql': """
+            SELECT p.famille, SUM(t.ca)::float AS ca, COUNT(*)::int AS volume
+            FROM transactions t
+            JOIN produits p ON t.produit_id = p.cle
+            WHERE p.famille IS NOT NULL AND p.famille != '' {where}
+            GROUP BY p.famille
+            ORDER BY ca DESC
+        """,
+        'filters': {**_period('t.date'), 'depot': "t.depot = %(depot)s"},
+    },
+    'produits': {
+        'description': "CA et lignes par produit, tous les produits",
+        'tables': ('transactions', 'produits'),
+        'sql': """
+            SELECT p.id AS numero, p.famille, p.sous_famille, SUM(t.ca)::float AS ca, COUNT(*)::int AS volume
+            FROM transactions t
+            JOIN produits p ON t.produit_id = p.cle
+            WHERE TRUE {where}
+            GROUP BY p.id, p.famille, p.sous_famille
+            ORDER BY ca DESC
+        """,
+        'filters': {**_period('t.date'), 'depot': "t.depot = %(depot)s"},
+    },
+    'clients': {
+        'description': "Coordonnées, CA, achats et panier moyen par client identifié",
+        'tables': ('transactions', 'clients'),
+        'sql': """
+            SELECT
+                c.carte, c.nom, c.prenom, c.email, c.telephone, c.sexe, c.ville, c.cp,
+                SUM(t.ca)::float AS ca_total,
+                COUNT(DISTINCT t.facture)::int AS nb_achats,
+                (SUM(t.ca) / COUNT(DISTINCT t.facture))::float AS panier_moyen,
+                MAX(t.date)::date AS dernier_achat
+            FROM transactions t
+            JOIN clients c ON t.carte_id = c.cle
+            WHERE t.carte != '0' {where}
+            GROUP BY c.carte, c.nom, c.prenom, c.email, c.telephone, c.sexe, c.ville, c.cp
+            ORDER BY ca_total DESC
+        """,
+        'filters': {**_period('t.date'), 'depot': "t.depot = %(depot)s"},
+    },
+    'magasins': {
+        'description': "CA, lignes et CA moyen par ligne par dépôt (api/export.js)",
+        'tables': ('transactions',),
+        'sql': """
+            SELECT t.depot AS magasin, SUM(t.ca)::float AS ca, COUNT(*)::int AS volume,
+                   (SUM(t.ca) / COUNT(*))::float AS panier_moyen
+            FROM transactions t
+            WHERE t.depot IS NOT NULL AND t.depot != '' {where}
+            GROUP BY t.depot
+            ORDER BY ca DESC
+        """,
+        'filters': {**_period('t.date'), 'depot': "t.depot = %(depot)s"},
+    },
+    'transactions': {
+        'description': "Lignes de vente brutes",
+        'tables': ('transactions',),
+        'sql': """
+            SELECT t.date::date AS date, t.facture, t.depot, t.carte, t.produit, t.quantite, t.prix, t.ca
+            FROM transactions t
+            WHERE TRUE {where}
+            ORDER BY t.date, t.facture
+        """,
+        'filters': {**_period('t.date'), 'depot': "t.depot = %(depot)s"},
+    },
+    'hierarchie': {
+        'description': "Cumuls famille → sous-sous-sous-famille par mois et dépôt (précalculés)",
+        'tables': ('hierarchy_rollup', 'hierarchy_nodes'),
+        'sql': """
+            SELECT r.mois, r.depot, n.niveau, n.famille, n.sous_famille, n.sous_sous_famille,
+                   n.sous_sous_sous_famille, r.ca, r.volume, r.nb_tickets
+            FROM hierarchy_rollup r
+            JOIN hierarchy_nodes n ON n.id = r.node_id
+            WHERE TRUE {where}
+            ORDER BY r.mois, r.depot, n.famille, n.sous_famille, n.sous_sous_famille, n.sous_sous_sous_famille
+        """,
+        'filters': {**_period('r.mois'), 'depot': "r.depot = %(depot)s"},
+    },
+    'abc': {
+        'description': "Classes ABC par fenêtre, période et dépôt (précalculées)",
+        'tables': ('abc_classes',),
+        'sql': """
+            SELECT fenetre, periode, depot, rang, produit, famille, ca, volume, part_cumulee, classe
+            FROM abc_classes
+            WHERE TRUE {where}
+            ORDER BY fenetre, periode, depot, rang
+        """,
+        'filters': {**_period('periode'), 'depot': "depot = %(depot)s", 'fenetre': "fenetre = %(fenetre)s"},
+    },
+    'cohortes': {
+        'description': "Matrice de cohortes : clients, CA, lignes par (cohorte, mois d'activité) (précalculée)",
+        'tables': ('cohort_matrix',),
+        'sql': """
+            SELECT cohort_month AS cohorte, active_month AS mois, clients, ca, volume
+            FROM cohort_matrix
+            WHERE TRUE {where}
+            ORDER BY cohort_month, active_month
+        """,
+        'filters': _period('cohort_month'),
+    },
+    'previsions': {
+        'description': "Prévisions par famille et intervalles (précalculées)",
+        'tables': ('forecasts',),
+        'sql': """
+            SELECT granularite, scope, famille, depot, periode, horizon, modele,
+                   prevision, borne_basse, borne_haute, rmse
+            FROM forecasts
+            WHERE TRUE {where}
+            ORDER BY granularite, scope, famille, depot, periode
+        """,
+        'filters': {**_period('periode'), 'depot': "depot = %(depot)s"},
+    },
+    'chalandise': {
+        'description': "Clients, CA et lignes par (dépôt, code postal, mois) (précalculés)",
+        'tables': ('catchment_cp_month',),
+        'sql': """
+            SELECT depot, cp, mois, villes, clients, ca, lignes
+            FROM catchment_cp_month
+            WHERE TRUE {where}
+            ORDER BY depot, mois, cp
+        """,
+        'filters': {**_period('mois'), 'depot': "depot = %(depot)s"},
+    },
+}
+
+# Codes de type psycopg2 (OID PostgreSQL)
+_BOOL = {16}
+_INTEGER = {20, 21, 23}
+_FLOAT = {700, 701, 1700}
+_DATE = {1082}
+_TIMESTAMP = {1114, 1184}
+
+
+def build_filters(analysis, since=None, until=None, depot=None, fenetre=None):
+    """
+    Filtres normalisés d'une analyse : {'since': 'AAAA-MM-01', 'until': mois
+    suivant exclu, 'depot': code canonique...} ; ValueError si l'analyse ne
+    prend pas en charge un filtre demandé.
+    """
+    from decor.depots import canonical_depot
+    from decor.schema import add_months, parse_month
+
+    values = {
+        'since': str(parse_month(since)) if since else None,
+        'until': str(add_months(parse_month(until), 1)) if until else None,
+        'depot': canonical_depot(depot) if depot else None,
+        'fenetre': fenetre,
+    }
+    filters = {key: value for key, value in values.items() if value}
+    unsupported = set(filters) - set(EXPORTS[analysis]['filters'])
+    if unsupported:
+        raise ValueError(f"{analysis} : filtre(s) non pris en charge : {', '.join(sorted(unsupported))}")
+    return filters
+
+
+def export_sql(analysis, filters, keys=True):
+    """Requête de l'export, forme texte des jointures si la base n'a pas les clés entières"""
+    spec = EXPORTS[analysis]
+    where = ''.join(f" AND {spec['filters'][key]}" for key in sorted(filters))
+    sql = spec['sql'].format(where=where)
+    return sql if keys else text_keys(sql)
+
+
+def missing_tables(cur, analysis):
+    cur.execute("SELECT t FROM unnest(%s::text[]) t WHERE to_regclass(t) IS NULL", (list(EXPORTS[analysis]['tables']),))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+
+
+def cache_path(analysis, fmt, filters, data_version):
+    """data/exports/<analyse>/<analyse>-<vue : requête, filtres, format>-<version>.<format>"""
+    view = _digest({'sql': export_sql(analysis, filters), 'filters': filters, 'format': fmt})
+    return CACHE_DIR / analysis / f"{analysis}-{view}-{_digest(data_version)}.{fmt}"
+
+
+def output_name(analysis, fmt, filters):
+    """Nom lisible d'un export : clients-depot32-2025-11-01.xlsx"""
+    parts = [analysis] + [f"{key}{value}" if key in ('depot', 'fenetre') else str(value)
+                          for key, value in sorted(filters.items())]
+    return '-'.join(parts) + f".{fmt}"
+
+
+def _converters(type_codes):
+    """Conversion par colonne : Decimal (NUMERIC) → float, le reste tel quel"""
+    return [float if code == 1700 else None for code in type_codes]
+
+
+def _convert(rows, converters):
+    if not any(converters):
+        return rows
+    return [tuple(value if convert is None or value is None else convert(value)
+                  for value, convert in zip(row, converters)) for row in rows]
+
+
+class CsvWriter:
+    """CSV UTF-8 avec BOM et séparateur ';' (ouverture directe dans Excel)"""
+
+    def __init__(self, path, columns, type_codes, title=None):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.writer(self.file, delimiter=';')
+        self.writer.writerow(columns)
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Parquet (ZSTD), schéma déduit des types PostgreSQL, un groupe de lignes par lot"""
+
+    def __init__(self, path, columns, type_codes, title=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(name, self.arrow_type(code)) for name, code in zip(columns, type_codes)])
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression='zstd')
+
+    def arrow_type(self, code):
+        pa = self.pa
+        if code in _BOOL:
+            return pa.bool_()
+        if code in _INTEGER:
+            return pa.int64()
+        if code in _FLOAT:
+            return pa.float64()
+        if code in _DATE:
+            return pa.date32()
+        if code in _TIMESTAMP:
+            return pa.timestamp('us')
+        return pa.string()
+
+    def write(self, rows):
+        pa = self.pa
+        arrays = [pa.array([row[i] for row in rows], type=field.type) for i, field in enumerate(self.schema)]
+        self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+class XlsxWriter:
+    """Classeur openpyxl en mode write-only : les lignes partent sur disque au fil de l'eau"""
+
+    def __init__(self, path, columns, type_codes, title='export'):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.columns = columns
+        self.title = title[:28]
+        self.workbook = Workbook(write_only=True)
+        self.sheets = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheets += 1
+        name = self.title if self.sheets == 1 else f"{self.title} ({self.sheets})"
+        self.sheet = self.workbook.create_sheet(name)
+        self.sheet.append(self.columns)
+        self.rows = 0
+
+    def write(self, rows):
+        for row in rows:
+            if self.rows >= XLSX_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.append(row)
+            self.rows += 1
+
+    def close(self):
+        self.workbook.save(str(self.path))
+
+
+WRITERS = {'csv': CsvWriter, 'parquet': ParquetWriter, 'xlsx': XlsxWriter}
+
+
+def stream(conn, sql, params, path, fmt, title, batch_size=BATCH_SIZE):
+    """Écrire le résultat de `sql` dans `path` par lots ; renvoie (lignes, colonnes)"""
+    cur = conn.cursor(name=f"export_{title}")
+    try:
+        cur.execute(sql, params)
+        rows = cur.fetchmany(batch_size)
+        columns = [column.name for column in cur.description]
+        type_codes = [column.type_code for column in cur.description]
+        converters = _converters(type_codes)
+        writer = WRITERS[fmt](path, columns, type_codes, title)
+        count = 0
+        try:
+            while rows:
+                writer.write(_convert(rows, converters))
+                count += len(rows)
+                rows = cur.fetchmany(batch_size)
+        finally:
+            writer.close()
+    finally:
+        cur.close()
+    return count, columns
+
+
+def _prune(path):
+    """Supprimer les versions précédentes de la même vue"""
+    prefix = path.name.rsplit('-', 1)[0] + '-'
+    for old in path.parent.glob(f"{prefix}*"):
+        if old.name != path.name and old.name != path.name + '.json':
+            old.unlink()
+
+
+def run_export(database_url, analysis, fmt, filters=None, output=None, use_cache=True):
+    """
+    Un export (appelable dans un processus séparé) : sert le fichier du cache
+    si la vue et les données n'ont pas changé, sinon l'écrit en flux.
+    Renvoie {analyse, format, filtres, lignes, chemin, cache, secondes, octets}.
+    """
+    from decor.db import connect, transaction
+
+    filters = filters or {}
+    start = time.perf_counter()
+    conn = connect(database_url)
+    try:
+        with transaction(conn) as cur:
+            missing = missing_tables(cur, analysis)
+            if missing:
+                raise ValueError(f"{analysis} : table(s) absente(s) : {', '.join(missing)} "
+                                 f"(python scripts/refresh-aggregates.py --full)")
+            data = version.current(cur)
+            keys = has_keys(cur)
+
+        path = cache_path(analysis, fmt, filters, data)
+        meta_path = path.with_name(path.name + '.json')
+        cached = use_cache and data is not None and path.exists() and meta_path.exists()
+        if cached:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(path.name + '.part')
+            with transaction(conn):
+                rows, columns = stream(conn, export_sql(analysis, filters, keys), filters, partial, fmt, analysis)
+            os.replace(partial, path)
+            meta = {
+                'analyse': analysis,
+                'format': fmt,
+                'filtres': filters,
+                'version': data,
+                'lignes': rows,
+                'colonnes': columns,
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=2, ensure_ascii=False)
+            _prune(path)
+    finally:
+        conn.close()
+
+    target = path
+    if output:
+        shutil.copyfile(path, output)
+        target = output
+    return {
+        'analyse': analysis,
+        'format': fmt,
+        'filtres': filters,
+        'lignes': meta['lignes'],
+        'chemin': str(target),
+        'cache': cached,
+        'secondes': time.perf_counter() - start,
+        'octets': os.path.getsize(target),
+    }
+
+
+def _run_job(job):
+    try:
+        return run_export(*job)
+    except Exception as e:
+        return {'analyse': job[1], 'format': job[2], 'filtres': job[3], 'erreur': str(e)}
+
+
+def run_all(jobs, workers=1):
+    """
+    Exports [(database_url, analyse, format, filtres, sortie, cache)] ; en
+    parallèle si workers > 1 (un processus et une connexion par export).
+    Une erreur n'arrête pas les autres exports : le résultat porte 'erreur'.
+    """
+    if workers and workers > 1 and len(jobs) > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn : les processus n'héritent pas du pool de connexions du parent
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            return list(pool.map(_run_job, jobs))
+    return [_run_job(job) for job in jobs]
@@ -0,0 +1,393 @@
+"""
+Prévisions précalculées par famille
+-----------------------------------
+api/forecast.js renvoie le CA par mois et famille et la page Prévisions
+projette la courbe en JS (régression sur 6 mois) à chaque affichage. Ce
+module ajuste hors ligne toutes les séries d'un coup :
+
+- une seule lecture de `transactions` par granularité (période × famille ×
+  dépôt), d'où sont tirées les séries tous canaux, magasins, web et
+  famille × magasin, plus le total toutes familles de chaque périmètre ;
+- les séries forment un tableau NumPy 2-D (série × période) : Holt-Winters
+  additif à tendance amortie sur une grille de paramètres, et saisonnier
+  naïf, calculés pour toutes les lignes à la fois ;
+- le modèle de chaque série est choisi sur les dernières périodes mises de
+  côté, puis réajusté sur tout l'historique ;
+- au-delà de CHUNK_SIZE séries, les blocs sont répartis sur un pool de
+  processus.
+
+Prévisions et intervalles sont écrits dans `forecasts`, recalculés après
+chaque import (decor.aggregates) et lus par api/forecast.js.
+
+    python scripts/forecast-series.py --rebuild
+    python scripts/forecast-series.py --granularite semaine --scope depot --jobs 4
+
+Dépendances : numpy.
+"""
+import time
+from datetime import timedelta
+
+from decor.db import stream_rows, transaction
+from decor.depots import MAGASINS_REELS
+from decor.dimensions import keyed
+from decor.schema import add_months, table_exists
+
+TABLE = 'forecasts'
+
+# Granularité → (date_trunc, période saisonnière, horizon par défaut)
+GRANULARITIES = {
+    'mois': ('month', 12, 6),
+    'semaine': ('week', 52, 13),
+}
+
+# Périmètres : mêmes canaux que l'API, plus famille × magasin réel
+SCOPES = ['tous', 'magasin', 'web', 'depot']
+
+DEFAULT_GRANULARITIES = ['mois']
+
+TOTAL = 'Toutes familles'
+
+# Grille de lissage (niveau, tendance, saison) ; tendance amortie par PHI
+ALPHAS = (0.1, 0.2, 0.4, 0.6, 0.8)
+BETAS = (0.0, 0.05, 0.15)
+GAMMAS = (0.0, 0.1, 0.3)
+PHI = 0.95
+
+INTERVAL_Z = 1.96         # intervalle à 95 %
+CHUNK_SIZE = 500          # séries par bloc envoyé au pool de processus
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        granularite TEXT NOT NULL,
+        scope TEXT NOT NULL,
+        famille TEXT NOT NULL,
+        depot TEXT NOT NULL DEFAULT '',
+        periode DATE NOT NULL,
+        horizon INTEGER NOT NULL,
+        modele TEXT NOT NULL,
+        prevision DOUBLE PRECISION NOT NULL,
+        borne_basse DOUBLE PRECISION NOT NULL,
+        borne_haute DOUBLE PRECISION NOT NULL,
+        rmse DOUBLE PRECISION,
+        computed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (granularite, scope, famille, depot, periode)
+    )
+    """,
+]
+
+SERIES_SQL = """
+    SELECT date_trunc('{unit}', t.date)::date AS periode, p.famille, t.depot, SUM(t.ca)
+    FROM transactions t
+    JOIN produits p ON t.produit_id = p.cle
+    WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.date < %s
+    GROUP BY 1, 2, 3
+"""
+
+
+def exists(cur):
+    return table_exists(cur, TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def next_period(period, granularity):
+    if granularity == 'mois':
+        return add_months(period, 1)
+    return period + timedelta(days=7)
+
+
+def period_start(day, granularity):
+    if granularity == 'mois':
+        return day.replace(day=1)
+    return day - timedelta(days=day.weekday())
+
+
+def history_end(cur, granularity):
+    """Début de la période en cours : une période entamée n'entre pas dans l'historique"""
+    cur.execute("SELECT MAX(date)::date FROM transactions")
+    last = cur.fetchone()[0]
+    if last is None:
+        return None
+    end = period_start(last, granularity)
+    if period_start(last + timedelta(days=1), granularity) != end:
+        end = next_period(end, granularity)   # dernière période complète
+    return end
+
+
+class Series:
+    """Séries d'un périmètre : clés (famille, dépôt), périodes, valeurs (série × période)"""
+
+    def __init__(self, keys, periods, values):
+        self.keys = keys
+        self.periods = periods
+        self.values = values
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def load_series(conn, granularity='mois'):
+    """
+    Lire le CA (période, famille, dépôt) en une passe et construire les
+    séries de chaque périmètre ; renvoie {scope: Series}.
+    """
+    import numpy as np
+
+    unit = GRANULARITIES[granularity][0]
+    with transaction(conn) as cur:
+        end = history_end(cur, granularity)
+        sql = keyed(cur, SERIES_SQL.format(unit=unit))
+    if end is None:
+        return {}
+
+    cells = {}
+    for periode, famille, depot, ca in stream_rows(conn, sql, (end,)):
+        cells[(periode, famille, depot)] = cells.get((periode, famille, depot), 0.0) + float(ca or 0)
+    if not cells:
+        return {}
+
+    periods = [min(periode for periode, _, _ in cells)]
+    while next_period(periods[-1], granularity) < end:
+        periods.append(next_period(periods[-1], granularity))
+    column = {periode: index for index, periode in enumerate(periods)}
+
+    magasins = set(MAGASINS_REELS)
+    scopes = {scope: {} for scope in SCOPES}
+    for (periode, famille, depot), ca in cells.items():
+        targets = ['tous', 'web' if depot == 'WEB' else 'magasin']
+        if depot in magasins:
+            targets.append('depot')
+        for scope in targets:
+            key_depot = depot if scope == 'depot' else ''
+            for key in ((famille, key_depot), (TOTAL, key_depot)):
+                row = scopes[scope].setdefault(key, np.zeros(len(periods)))
+                row[column[periode]] += ca
+
+    result = {}
+    for scope, rows in scopes.items():
+        keys = sorted(rows)
+        values = np.vstack([rows[key] for key in keys]) if keys else np.zeros((0, len(periods)))
+        result[scope] = Series(keys, periods, values)
+    return result
+
+
+def _starts(Y):
+    """Indice de la première période à CA positif de chaque série"""
+    return (Y > 0).argmax(axis=1)
+
+
+def _holt_winters(Y, start, m, horizon, alpha, beta, gamma):
+    """
+    Holt-Winters additif à tendance amortie, mêmes paramètres pour toutes les
+    lignes de Y. Renvoie (somme des carrés des erreurs à un pas, nombre
+    d'erreurs, prévisions série × horizon).
+    """
+    import numpy as np
+
+    N, T = Y.shape
+    rows = np.arange(N)
+    seasonal = (T - start) >= 2 * m
+
+    # Initialisation : première saison (séries assez longues) ou première valeur
+    first = Y[rows[:, None], np.minimum(start[:, None] + np.arange(m), T - 1)]
+    level = np.where(seasonal, first.mean(axis=1), Y[rows, start])
+    trend = np.zeros(N)
+    season = np.zeros((N, m))
+    slots = (start[:, None] + np.arange(m)) % m
+    season[rows[:, None], slots] = np.where(seasonal[:, None], first - level[:, None], 0.0)
+    warm = np.where(seasonal, start + m, start + 1)
+    g = np.where(seasonal, gamma, 0.0)
+
+    sse = np.zeros(N)
+    count = np.zeros(N)
+    for t in range(T):
+        y = Y[:, t]
+        s = season[:, t % m]
+        active = t >= warm
+        err = y - (level + PHI * trend + s)
+        sse += np.where(active, err ** 2, 0.0)
+        count += active
+        new_level = alpha * (y - s) + (1 - alpha) * (level + PHI * trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * PHI * trend
+        season[:, t % m] = np.where(active, g * (y - new_level) + (1 - g) * s, s)
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+
+    damping = np.cumsum(PHI ** np.arange(1, horizon + 1))
+    steps = (T + np.arange(horizon)) % m
+    forecast = level[:, None] + damping[None, :] * trend[:, None] + season[:, steps]
+    return sse, count, forecast
+
+
+def fit_holt_winters(Y, m, horizon):
+    """Meilleure combinaison de la grille pour chaque série (SSE à un pas)"""
+    import numpy as np
+
+    N = Y.shape[0]
+    start = _starts(Y)
+    best_sse = np.full(N, np.inf)
+    best_forecast = np.zeros((N, horizon))
+    best_sigma = np.zeros(N)
+    best_alpha = np.zeros(N)
+    for alpha in ALPHAS:
+        for beta in BETAS:
+            for gamma in GAMMAS:
+                sse, count, forecast = _holt_winters(Y, start, m, horizon, alpha, beta, gamma)
+                score = np.where(count > 0, sse / np.maximum(count, 1), np.inf)
+                better = score < best_sse
+                best_sse = np.where(better, score, best_sse)
+                best_forecast[better] = forecast[better]
+                best_sigma = np.where(better, np.sqrt(score), best_sigma)
+                best_alpha = np.where(better, alpha, best_alpha)
+    # Séries trop courtes pour une erreur : dernière valeur, sans intervalle
+    none = ~np.isfinite(best_sse)
+    best_forecast[none] = Y[none, -1:]
+    best_sigma[none] = 0.0
+    # Variance à h pas du lissage simple : σ² (1 + (h-1) α²)
+    widths = np.sqrt(1 + np.arange(horizon)[None, :] * best_alpha[:, None] ** 2)
+    return best_forecast, best_sigma, best_sigma[:, None] * widths
+
+
+def fit_seasonal_naive(Y, m, horizon):
+    """Même période de la saison précédente (dernière valeur si moins d'une saison)"""
+    import numpy as np
+
+    N, T = Y.shape
+    start = _starts(Y)
+    lag = np.where(T - start > m, m, 1)
+    steps = np.arange(horizon)
+    columns = np.where(lag[:, None] == m, T - m + steps[None, :] % m, T - 1)
+    forecast = Y[np.arange(N)[:, None], np.maximum(columns, 0)]
+
+    diffs_m = Y[:, m:] - Y[:, :-m] if T > m else np.zeros((N, 0))
+    diffs_1 = Y[:, 1:] - Y[:, :-1]
+    scored_m = np.arange(m, T)[None, :] >= (start + m)[:, None]
+    scored_1 = np.arange(1, T)[None, :] >= (start + 1)[:, None]
+    sigma_m = np.sqrt((np.where(scored_m, diffs_m, 0) ** 2).sum(1) / np.maximum(scored_m.sum(1), 1))
+    sigma_1 = np.sqrt((np.where(scored_1, diffs_1, 0) ** 2).sum(1) / np.maximum(scored_1.sum(1), 1))
+    sigma = np.where(lag == m, sigma_m, sigma_1)
+    # Marche aléatoire saisonnière : la variance croît avec le nombre de saisons
+    periods = np.where(lag[:, None] == m, steps[None, :] // m + 1, steps[None, :] + 1)
+    return forecast, sigma, sigma[:, None] * np.sqrt(periods)
+
+
+MODELS = {
+    'holt_winters': fit_holt_winters,
+    'saisonnier_naif': fit_seasonal_naive,
+}
+
+
+def fit_block(args):
+    """
+    Ajuster un bloc de séries : choix du modèle sur les `horizon` dernières
+    périodes, puis réajustement sur tout l'historique. Fonction de module
+    pour pouvoir passer par un pool de processus.
+    """
+    import numpy as np
+
+    Y, m, horizon = args
+    N, T = Y.shape
+    names = list(MODELS)
+    choice = np.zeros(N, dtype=int)
+    if T > horizon + 2:
+        train, test = Y[:, :-horizon], Y[:, -horizon:]
+        errors = [np.abs(MODELS[name](train, m, horizon)[0] - test).mean(axis=1) for name in names]
+        choice = np.argmin(np.vstack(errors), axis=0)
+        # Trop peu d'historique avant la période de test : Holt-Winters
+        choice[_starts(train) >= train.shape[1] - 2] = 0
+
+    forecast = np.zeros((N, horizon))
+    spread = np.zeros((N, horizon))
+    sigma = np.zeros(N)
+    for index, name in enumerate(names):
+        chosen = choice == index
+        if chosen.any():
+            f, s, w = MODELS[name](Y[chosen], m, horizon)
+            forecast[chosen], sigma[chosen], spread[chosen] = f, s, w
+    lower = np.maximum(forecast - INTERVAL_Z * spread, 0)
+    upper = np.maximum(forecast + INTERVAL_Z * spread, 0)
+    return [names[c] for c in choice], np.maximum(forecast, 0), lower, upper, sigma
+
+
+def fit_all(Y, m, horizon, jobs=1):
+    """Toutes les séries, par blocs de CHUNK_SIZE (en parallèle si jobs > 1)"""
+    import numpy as np
+
+    blocks = [(Y[i:i + CHUNK_SIZE], m, horizon) for i in range(0, Y.shape[0], CHUNK_SIZE)]
+    if jobs and jobs > 1 and len(blocks) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(fit_block, blocks))
+    else:
+        results = [fit_block(block) for block in blocks]
+    models = [name for result in results for name in result[0]]
+    arrays = [np.concatenate([result[i] for result in results]) for i in range(1, 5)]
+    return (models, *arrays)
+
+
+def forecast_scope(series, granularity, horizon=None, jobs=1):
+    """Lignes (famille, dépôt, période, h, modèle, prévision, basse, haute, rmse) d'un périmètre"""
+    _, m, default_horizon = GRANULARITIES[granularity]
+    horizon = horizon or default_horizon
+    keep = [i for i in range(len(series)) if series.values[i].any()]
+    if not keep:
+        return []
+    models, forecast, lower, upper, sigma = fit_all(series.values[keep], m, horizon, jobs)
+
+    future = [next_period(series.periods[-1], granularity)]
+    while len(future) < horizon:
+        future.append(next_period(future[-1], granularity))
+    rows = []
+    for row, index in enumerate(keep):
+        famille, depot = series.keys[index]
+        for h, periode in enumerate(future):
+            rows.append((famille, depot, periode, h + 1, models[row], float(forecast[row, h]),
+                         float(lower[row, h]), float(upper[row, h]), float(sigma[row])))
+    return rows
+
+
+def save_forecasts(cur, granularity, scope, rows):
+    from psycopg2.extras import execute_values
+
+    cur.execute(f"DELETE FROM {TABLE} WHERE granularite = %s AND scope = %s", (granularity, scope))
+    execute_values(cur, f"""
+        INSERT INTO {TABLE}
+            (granularite, scope, famille, depot, periode, horizon, modele,
+             prevision, borne_basse, borne_haute, rmse)
+        VALUES %s
+    """, [(granularity, scope, *row) for row in rows])
+
+
+def rebuild(conn, log=print, granularities=DEFAULT_GRANULARITIES, scopes=SCOPES, horizon=None, jobs=1):
+    """Réajuster toutes les séries (création de la table au besoin)"""
+    with transaction(conn) as cur:
+        create(cur)
+    total = 0
+    for granularity in granularities:
+        start = time.perf_counter()
+        series = load_series(conn, granularity)
+        loaded = time.perf_counter()
+        for scope in scopes:
+            if scope not in series:
+                continue
+            rows = forecast_scope(series[scope], granularity, horizon, jobs)
+            with transaction(conn) as cur:
+                save_forecasts(cur, granularity, scope, rows)
+            log(f"   📈 {granularity}/{scope}: {len(series[scope]):,} séries, {len(rows):,} prévisions")
+            total += len(rows)
+        log(f"   ⏱️  {granularity}: lecture {loaded - start:.1f}s, ajustement {time.perf_counter() - loaded:.1f}s")
+    return total
+
+
+def refresh(conn, first, last=None, log=print):
+    """Les modèles portent sur tout l'historique : réajustement complet si la table existe"""
+    with transaction(conn) as cur:
+        if not exists(cur):
+            return None
+        cur.execute(f"SELECT DISTINCT granularite FROM {TABLE}")
+        granularities = [row[0] for row in cur.fetchall()] or DEFAULT_GRANULARITIES
+    return rebuild(conn, log=log, granularities=granularities)
@@ -0,0 +1,377 @@
+"""
+Géocodage hors ligne avec cache persistant
+------------------------------------------
+geocode_exact.py interrogeait Nominatim adresse par adresse (une seconde
+d'attente entre deux appels) et ne gardait rien. Ici :
+
+1. cache SQLite `data/geocode-cache.sqlite`, clé = adresse normalisée
+   (majuscules, sans accents ni ponctuation, abréviations développées) ;
+2. référentiels locaux dans `data/reference/` :
+     codes-postaux.csv     centroïdes des codes postaux (base La Poste,
+                           Code_postal / coordonnees_gps, ou cp;latitude;longitude),
+                           à défaut src/utils/postcodeCoordsMap.ts
+     ban/adresses-*.csv[.gz]  Base Adresse Nationale (fichiers départementaux)
+3. en dernier recours seulement, un fournisseur distant facultatif
+   (`Nominatim`, une requête par seconde au plus) ; n'importe quel appelable
+   adresse → (lat, lon) ou None peut le remplacer, par exemple un dict.get
+   pour les tests.
+
+Les codes postaux des clients se résolvent par lot dans les dictionnaires
+chargés en mémoire : des centaines de milliers de lignes, quelques milliers
+de codes distincts, et un second passage ne lit que le cache.
+
+    geocoder = Geocoder()
+    geocoder.postcodes(['30100', '1440'])            # {'30100': (44.13, 4.09), ...}
+    geocoder.address('905 Rue des Vareys 01440 VIRIAT')
+
+    python scripts/geocode-clients.py
+    python geocode_exact.py --remote
+"""
+import csv
+import gzip
+import re
+import sqlite3
+import time
+import unicodedata
+
+from decor.env import DATA_DIR, ROOT_DIR
+
+CACHE_FILE = DATA_DIR / 'geocode-cache.sqlite'
+REFERENCE_DIR = DATA_DIR / 'reference'
+POSTCODES_FILE = REFERENCE_DIR / 'codes-postaux.csv'
+BAN_DIR = REFERENCE_DIR / 'ban'
+TS_POSTCODES = ROOT_DIR / 'src' / 'utils' / 'postcodeCoordsMap.ts'
+
+# Précision d'un résultat, de la plus fine à la plus grossière
+ADDRESS, STREET, POSTCODE = 'adresse', 'voie', 'code_postal'
+
+# Limite de SQLite sur le nombre de paramètres d'une requête
+SQLITE_CHUNK = 900
+
+ABBREVIATIONS = {
+    'AV': 'AVENUE', 'AVE': 'AVENUE', 'BD': 'BOULEVARD', 'BLD': 'BOULEVARD',
+    'CHE': 'CHEMIN', 'CH': 'CHEMIN', 'IMP': 'IMPASSE', 'PL': 'PLACE',
+    'RTE': 'ROUTE', 'R': 'RUE', 'ST': 'SAINT', 'STE': 'SAINTE', 'ALL': 'ALLEE',
+    'FBG': 'FAUBOURG', 'QU': 'QUAI', 'LOT': 'LOTISSEMENT', 'RES': 'RESIDENCE',
+}
+
+CACHE_SQL = """
+    CREATE TABLE IF NOT EXISTS geocode (
+        cle TEXT PRIMARY KEY,
+        lat REAL,
+        lon REAL,
+        precision TEXT,
+        source TEXT,
+        updated_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+"""
+
+
+def normalize_cp(value):
+    """' 1440' → '01440' ; None si ce n'est pas un code postal"""
+    cp = re.sub(r'\s', '', str(value or ''))
+    if cp.endswith('.0'):
+        cp = cp[:-2]
+    if not cp.isdigit() or len(cp) not in (4, 5):
+        return None
+    return cp.zfill(5)
+
+
+def normalize_address(text):
+    """'415 av. Paul-Henri Mouton' → '415 AVENUE PAUL HENRI MOUTON'"""
+    text = unicodedata.normalize('NFKD', str(text or '')).encode('ascii', 'ignore').decode()
+    words = re.sub(r"[^A-Z0-9]+", ' ', text.upper()).split()
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def split_address(text):
+    """(numéro, adresse normalisée, code postal) d'une adresse libre"""
+    normalized = normalize_address(text)
+    postcodes = re.findall(r'\b\d{5}\b', normalized)
+    number = re.match(r'(\d+)\b', normalized)
+    return number.group(1) if number else None, normalized, postcodes[-1] if postcodes else None
+
+
+def read_centroids_csv(path):
+    """
+    Centroïdes d'un CSV (';' ou ',') : moyenne des communes d'un même code
+    postal. Colonnes Code_postal + coordonnees_gps (base La Poste) ou
+    cp + latitude + longitude.
+    """
+    sums = {}
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        sample = f.read(4096)
+        f.seek(0)
+        reader = csv.DictReader(f, delimiter=';' if sample.count(';') >= sample.count(',') else ',')
+        fields = {name.lower().lstrip('#'): name for name in reader.fieldnames or []}
+        cp_field = fields.get('code_postal') or fields.get('cp') or fields.get('codepostal')
+        for row in reader:
+            cp = normalize_cp(row.get(cp_field))
+            try:
+                if 'coordonnees_gps' in fields:
+                    lat, lon = (float(x) for x in row[fields['coordonnees_gps']].split(','))
+                else:
+                    lat = float(row[fields.get('latitude') or fields['lat']])
+                    lon = float(row[fields.get('longitude') or fields.get('lon') or fields['lng']])
+            except (KeyError, ValueError, AttributeError):
+                continue
+            if cp:
+                total = sums.setdefault(cp, [0.0, 0.0, 0])
+                total[0] += lat
+                total[1] += lon
+                total[2] += 1
+    return {cp: (lat / n, lon / n) for cp, (lat, lon, n) in sums.items()}
+
+
+def read_ts_coords(path):
+    """Paires "clé": [lat, lon] d'un fichier TypeScript de src/utils"""
+    pattern = re.compile(r"""["']([^"']+)["']\s*:\s*\[\s*(-?[\d.]+)\s*,\s*(-?[\d.]+)\s*\]""")
+    with open(path, encoding='utf-8') as f:
+        return {key: (float(lat), float(lon)) for key, lat, lon in pattern.findall(f.read())}
+
+
+def load_postcode_reference(path=None):
+    """(centroïdes, source) : fichier de référence local, sinon la table de la carte"""
+    path = path or POSTCODES_FILE
+    if path.exists():
+        return read_centroids_csv(path), path.name
+    if not TS_POSTCODES.exists():
+        return {}, None
+    return {normalize_cp(cp): coords for cp, coords in read_ts_coords(TS_POSTCODES).items()
+            if normalize_cp(cp)}, TS_POSTCODES.name
+
+
+def ban_files(directory=None):
+    directory = directory or BAN_DIR
+    if not directory.exists():
+        return []
+    return sorted(directory.glob('adresses-*.csv*'))
+
+
+def read_ban(files, postcodes):
+    """
+    Adresses BAN des codes postaux demandés :
+    {cp: {voie normalisée: {numéro: (lat, lon)}}}. Les fichiers sont lus en
+    flux, seules les lignes utiles restent en mémoire.
+    """
+    streets = {}
+    for path in files:
+        opener = gzip.open if path.suffix == '.gz' else open
+        with opener(path, 'rt', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                cp = normalize_cp(row.get('code_postal'))
+                if cp not in postcodes:
+                    continue
+                try:
+                    point = (float(row['lat']), float(row['lon']))
+                except (KeyError, ValueError):
+                    continue
+                street = normalize_address(row.get('nom_voie'))
+                number = (row.get('numero') or '').strip()
+                streets.setdefault(cp, {}).setdefault(street, {})[number] = point
+    return streets
+
+
+def mean_point(points):
+    points = list(points)
+    return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+
+
+class Nominatim:
+    """
+    Fournisseur distant facultatif : API Nominatim d'OpenStreetMap, au plus
+    une requête toutes les `interval` secondes (règle d'usage du service).
+    """
+
+    URL = 'https://nominatim.openstreetmap.org/search'
+    name = 'nominatim'
+
+    def __init__(self, interval=1.1, user_agent='DecorAnalytics/1.0', timeout=10):
+        self.interval = interval
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.last_call = 0.0
+        self.calls = 0
+
+    def __call__(self, address):
+        import requests
+
+        wait = self.last_call + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            response = requests.get(self.URL, timeout=self.timeout,
+                                    params={'q': address, 'format': 'json', 'limit': 1, 'countrycodes': 'fr'},
+                                    headers={'User-Agent': self.user_agent})
+            response.raise_for_status()
+            data = response.json()
+        finally:
+            self.last_call = time.monotonic()
+            self.calls += 1
+        return (float(data[0]['lat']), float(data[0]['lon'])) if data else None
+
+
+class Geocoder:
+    """
+    Résolution cache → référentiels locaux → fournisseur distant (`remote`,
+    None pour rester hors ligne). Les échecs du fournisseur distant sont
+    gardés dans le cache (lat NULL) pour ne pas être redemandés ; un échec
+    purement local ne l'est pas, afin qu'un référentiel ajouté plus tard
+    soit pris en compte. Le centroïde servi à défaut d'une adresse n'est pas
+    mis en cache non plus : un passage avec `remote` peut encore l'affiner.
+    """
+
+    def __init__(self, cache_file=None, remote=None, postcodes_file=None, ban_dir=None, refresh=False):
+        self.cache_file = cache_file or CACHE_FILE
+        self.remote = remote
+        self.postcodes_file = postcodes_file
+        self.ban_dir = ban_dir
+        self.refresh = refresh
+        self._centroids = None
+        self.source = None
+        self.stats = {'cache': 0, 'reference': 0, 'remote': 0, 'absent': 0}
+
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.cache_file))
+        self.db.execute(CACHE_SQL)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def centroids(self):
+        if self._centroids is None:
+            self._centroids, self.source = load_postcode_reference(self.postcodes_file)
+        return self._centroids
+
+    def cached(self, keys):
+        """{clé: (lat, lon, précision) ou None} des clés présentes dans le cache"""
+        if self.refresh:
+            return {}
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), SQLITE_CHUNK):
+            chunk = keys[i:i + SQLITE_CHUNK]
+            rows = self.db.execute(
+                f"SELECT cle, lat, lon, precision FROM geocode WHERE cle IN ({', '.join('?' * len(chunk))})", chunk)
+            for key, lat, lon, precision in rows:
+                found[key] = (lat, lon, precision) if lat is not None else None
+        return found
+
+    def store(self, entries):
+        """Écrire [(clé, lat, lon, précision, source)] dans le cache (une transaction)"""
+        with self.db:
+            self.db.executemany("""
+                INSERT INTO geocode (cle, lat, lon, precision, source) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (cle) DO UPDATE SET lat = excluded.lat, lon = excluded.lon,
+                    precision = excluded.precision, source = excluded.source, updated_at = datetime('now')
+            """, entries)
+
+    def _resolve(self, keys, local, query, fallback=None):
+        """
+        Résultats {clé: (lat, lon, précision) ou None} : cache, puis
+        `local(clé)` (liste), puis le fournisseur distant sur `query(clé)`.
+
+        Un résultat local de précision `fallback` (centroïde du code postal
+        pour une adresse) n'est qu'un repli : le fournisseur distant est
+        interrogé d'abord, et le repli n'est jamais écrit dans le cache.
+        """
+        cached = self.cached(keys)
+        # Échec distant déjà connu : le référentiel local est relu, le fournisseur pas
+        tried = {key for key, value in cached.items() if value is None}
+        results = {key: value for key, value in cached.items()
+                   if value is not None and value[2] != fallback}
+        self.stats['cache'] += len(results)
+        missing = [key for key in keys if key not in results]
+        found = local(missing) if missing else {}
+        entries = []
+
+        for key in missing:
+            point = found.get(key)
+            if point is not None and point[2] != fallback:
+                results[key] = point
+                entries.append((key, *point, self.source_of(point[2])))
+                self.stats['reference'] += 1
+                continue
+            if self.remote is not None and key not in tried:
+                try:
+                    remote_point = self.remote(query(key))
+                except Exception as e:
+                    # Erreur réseau : rien dans le cache, la clé sera redemandée
+                    print(f"   ⚠️  Géocodage distant impossible pour {query(key)!r}: {e}")
+                else:
+                    precision = POSTCODE if key.startswith('cp:') else ADDRESS
+                    entries.append((key, *(remote_point or (None, None)), precision,
+                                    getattr(self.remote, 'name', 'distant')))
+                    if remote_point:
+                        results[key] = (*remote_point, precision)
+                        self.stats['remote'] += 1
+                        continue
+            results[key] = point
+            self.stats['reference' if point else 'absent'] += 1
+        if entries:
+            self.store(entries)
+        return results
+
+    def source_of(self, precision):
+        return 'ban' if precision in (ADDRESS, STREET) else self.source
+
+    def postcodes(self, values):
+        """{code postal tel que fourni: (lat, lon)} pour les codes résolus"""
+        normalized = {value: normalize_cp(value) for value in set(values)}
+        keys = sorted({f'cp:{cp}' for cp in normalized.values() if cp})
+
+        def local(missing):
+            return {key: (*self.centroids[key[3:]], POSTCODE) for key in missing if key[3:] in self.centroids}
+
+        results = self._resolve(keys, local, lambda key: f'{key[3:]}, France')
+        return {value: results[f'cp:{cp}'][:2] for value, cp in normalized.items()
+                if cp and results.get(f'cp:{cp}')}
+
+    def addresses(self, values):
+        """
+        {adresse telle que fournie: (lat, lon, précision)} : numéro exact de
+        la BAN, sinon centre de la voie, sinon le fournisseur distant s'il y
+        en a un, sinon centroïde du code postal.
+        """
+        parsed = {value: split_address(value) for value in set(values)}
+        keys = sorted({f'adr:{normalized}' for _, normalized, _ in parsed.values() if normalized})
+        by_key = {f'adr:{normalized}': (number, normalized, cp) for number, normalized, cp in parsed.values()}
+
+        def local(missing):
+            wanted = {by_key[key][2] for key in missing if by_key[key][2]}
+            streets = read_ban(ban_files(self.ban_dir), wanted) if wanted else {}
+            found = {}
+            for key in missing:
+                number, normalized, cp = by_key[key]
+                point = self._match_street(streets.get(cp, {}), number, normalized)
+                if point is None and cp in self.centroids:
+                    point = (*self.centroids[cp], POSTCODE)
+                if point is not None:
+                    found[key] = point
+            return found
+
+        results = self._resolve(keys, local, lambda key: by_key[key][1], fallback=POSTCODE)
+        return {value: results[f'adr:{normalized}'] for value, (_, normalized, _) in parsed.items()
+                if normalized and results.get(f'adr:{normalized}')}
+
+    def address(self, value):
+        return self.addresses([value]).get(value)
+
+    @staticmethod
+    def _match_street(streets, number, normalized):
+        """Voie de la BAN la plus longue contenue dans l'adresse ; point du numéro ou centre de la voie"""
+        best = max((street for street in streets if street and f' {street} ' in f' {normalized} '),
+                   key=len, default=None)
+        if best is None:
+            return None
+        points = streets[best]
+        if number and number in points:
+            return (*points[number], ADDRESS)
+        return (*mean_point(points.values()), STREET)
@@ -0,0 +1,155 @@
+"""
+Cumuls de la hiérarchie produits par mois et par dépôt
+------------------------------------------------------
+Les produits ont quatre niveaux (famille, sous_famille, sous_sous_famille,
+sous_sous_sous_famille). api/sub-families.js rejoint `produits` sur chaque
+ligne de vente et regroupe à la volée. Deux tables gardent les cumuls :
+
+    hierarchy_nodes    un nœud par chemin de la hiérarchie (niveau 0 = total,
+                       1 = famille ... 4 = sous-sous-sous-famille), id entier
+                       et parent
+    hierarchy_rollup   (nœud, mois, dépôt) → CA, lignes, tickets
+
+Les cumuls de tous les niveaux sortent d'une seule requête GROUP BY ROLLUP
+sur les quatre niveaux ; les lignes de cumul ne portent que l'id du nœud,
+pas les libellés. Un ticket n'ayant qu'un dépôt et qu'une date, les tickets
+d'un nœud s'additionnent entre dépôts et entre mois.
+
+Les imports recalculent les mois chargés (`refresh`, decor.aggregates) :
+
+    python scripts/refresh-aggregates.py --only hierarchie --full
+"""
+from decor.db import transaction
+from decor.dimensions import keyed
+from decor.schema import add_months, month_range, table_exists
+
+NODES_TABLE = 'hierarchy_nodes'
+ROLLUP_TABLE = 'hierarchy_rollup'
+
+LEVELS = ['famille', 'sous_famille', 'sous_sous_famille', 'sous_sous_sous_famille']
+
+UNCLASSIFIED = 'Non classé'
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {NODES_TABLE} (
+        id SERIAL PRIMARY KEY,
+        niveau SMALLINT NOT NULL,
+        parent_id INTEGER REFERENCES {NODES_TABLE} (id),
+        famille TEXT NOT NULL DEFAULT '',
+        sous_famille TEXT NOT NULL DEFAULT '',
+        sous_sous_famille TEXT NOT NULL DEFAULT '',
+        sous_sous_sous_famille TEXT NOT NULL DEFAULT '',
+        UNIQUE (famille, sous_famille, sous_sous_famille, sous_sous_sous_famille)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{NODES_TABLE}_parent ON {NODES_TABLE} (parent_id)",
+    f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        node_id INTEGER NOT NULL REFERENCES {NODES_TABLE} (id),
+        mois DATE NOT NULL,
+        depot TEXT NOT NULL,
+        ca DOUBLE PRECISION NOT NULL,
+        volume INTEGER NOT NULL,
+        nb_tickets INTEGER NOT NULL,
+        PRIMARY KEY (node_id, mois, depot)
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{ROLLUP_TABLE}_mois ON {ROLLUP_TABLE} (mois)",
+]
+
+# Chemin de la hiérarchie : libellé manquant ou vide → 'Non classé' (comme
+# l'API), niveau cumulé par ROLLUP → '' (jamais un vrai libellé)
+_PATH = [f"COALESCE(NULLIF(p.{level}, ''), '{UNCLASSIFIED}')" for level in LEVELS]
+
+# Même périmètre que api/sub-families.js (lignes à CA positif, LEFT JOIN produits)
+ROLLUP_SQL = f"""
+    CREATE TEMP TABLE hierarchy_staging ON COMMIT DROP AS
+    SELECT
+        date_trunc('month', t.date)::date AS mois,
+        t.depot,
+        CASE GROUPING({', '.join(_PATH)})
+            WHEN 0 THEN 4 WHEN 1 THEN 3 WHEN 3 THEN 2 WHEN 7 THEN 1 ELSE 0
+        END AS niveau,
+        {', '.join(f"COALESCE({expr}, '') AS {level}" for expr, level in zip(_PATH, LEVELS))},
+        SUM(t.ca) AS ca,
+        COUNT(*) AS volume,
+        COUNT(DISTINCT t.facture) AS nb_tickets
+    FROM transactions t
+    LEFT JOIN produits p ON t.produit_id = p.cle
+    WHERE t.ca > 0 AND t.depot IS NOT NULL {{where}}
+    GROUP BY date_trunc('month', t.date), t.depot, ROLLUP({', '.join(_PATH)})
+"""
+
+NODES_SQL = f"""
+    INSERT INTO {NODES_TABLE} (niveau, {', '.join(LEVELS)})
+    SELECT DISTINCT niveau, {', '.join(LEVELS)} FROM hierarchy_staging
+    ON CONFLICT ({', '.join(LEVELS)}) DO NOTHING
+"""
+
+# Parent = même chemin tronqué d'un niveau
+PARENTS_SQL = f"""
+    UPDATE {NODES_TABLE} n SET parent_id = p.id
+    FROM {NODES_TABLE} p
+    WHERE n.parent_id IS NULL AND n.niveau > 0 AND p.niveau = n.niveau - 1
+      AND {' AND '.join(f"p.{level} = CASE WHEN n.niveau > {depth} THEN n.{level} ELSE '' END"
+                        for depth, level in enumerate(LEVELS, start=1))}
+"""
+
+INSERT_SQL = f"""
+    INSERT INTO {ROLLUP_TABLE} (node_id, mois, depot, ca, volume, nb_tickets)
+    SELECT n.id, s.mois, s.depot, s.ca, s.volume, s.nb_tickets
+    FROM hierarchy_staging s
+    JOIN {NODES_TABLE} n USING ({', '.join(LEVELS)})
+"""
+
+
+def exists(cur):
+    return table_exists(cur, NODES_TABLE) and table_exists(cur, ROLLUP_TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def load(cur, start=None, end=None):
+    """Cumuler les mois de [start, end) (tout l'historique sans bornes) ; renvoie le nombre de cumuls"""
+    if start is None:
+        cur.execute(f"TRUNCATE {ROLLUP_TABLE}")
+        cur.execute(keyed(cur, ROLLUP_SQL.format(where='')))
+    else:
+        cur.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE mois >= %s AND mois < %s", (start, end))
+        cur.execute(keyed(cur, ROLLUP_SQL.format(where='AND t.date >= %s AND t.date < %s')), (start, end))
+    cur.execute(NODES_SQL)
+    cur.execute(PARENTS_SQL)
+    cur.execute(INSERT_SQL)
+    count = cur.rowcount
+    cur.execute("DROP TABLE hierarchy_staging")
+    return count
+
+
+def rebuild(conn, log=print):
+    """Recalcul complet (création des tables au besoin)"""
+    with transaction(conn) as cur:
+        create(cur)
+        count = load(cur)
+        cur.execute(f"SELECT COUNT(*) FROM {NODES_TABLE}")
+        nodes = cur.fetchone()[0]
+    with transaction(conn) as cur:
+        cur.execute(f"ANALYZE {NODES_TABLE}")
+        cur.execute(f"ANALYZE {ROLLUP_TABLE}")
+    log(f"   🌳 Hiérarchie : {nodes:,} nœuds, {count:,} cumuls")
+    return count
+
+
+def refresh(conn, first, last=None, log=print):
+    """Mise à jour après le chargement des mois `first` à `last` (None si tables absentes)"""
+    months = list(month_range(first, last or first))
+    with transaction(conn) as cur:
+        if not exists(cur):
+            return None
+        count = load(cur, months[0], add_months(months[-1], 1))
+    log(f"   🌳 Hiérarchie : {count:,} cumuls recalculés")
+    return count
+
@@ -0,0 +1,302 @@
+"""
+Identité client : cartes d'une même personne
+--------------------------------------------
+Le fichier client contient des doublons : la même personne sur plusieurs
+cartes, saisie avec des casses, espaces, accents ou formats de téléphone
+différents (clean-and-reimport.py, check-emails.py, analyse-csv-emails.py
+les constatent sans les rapprocher). Ici :
+
+1. normalisation vectorisée (NumPy) des noms, prénoms, emails, téléphones ;
+2. blocage : index de hachage par clé normalisée (email, téléphone,
+   nom + prénom + code postal), les cartes ne sont comparées qu'à l'intérieur
+   d'un même bloc, jamais deux à deux sur tout le fichier ; les blocs de plus
+   de `MAX_BLOCK` cartes (adresses ou numéros génériques) sont ignorés ;
+3. vérification dans le bloc (même nom, prénom compatible, date de naissance
+   compatible) puis union des cartes rapprochées.
+
+    client_identity   carte → client_id (plus petite carte du groupe),
+                      règle du rapprochement, taille du groupe
+
+Seules les cartes fusionnées y figurent : `COALESCE(ci.client_id, t.carte)`
+ramène une ligne de vente à son client. Les cohortes (decor.cohorts) et
+api/rfm.js agrègent ainsi les cartes fusionnées.
+
+    python scripts/dedupe-clients.py                    # base : table client_identity
+    python scripts/dedupe-clients.py --fichier /chemin/extraction
+
+Dépendances : numpy.
+"""
+from decor.db import transaction
+from decor.schema import table_exists
+
+TABLE = 'client_identity'
+
+# Blocs plus grands : clés génériques (« aucun@... », 0600000000), pas une personne
+MAX_BLOCK = 10
+
+RULES = ('email', 'telephone', 'nom_cp')
+
+CREATE_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        carte TEXT PRIMARY KEY,
+        client_id TEXT NOT NULL,
+        regle TEXT NOT NULL,
+        cartes INTEGER NOT NULL
+    )
+    """,
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_client ON {TABLE} (client_id)",
+]
+
+LOAD_SQL = """
+    SELECT carte, nom, prenom, email, telephone, cp, date_naissance
+    FROM clients
+    WHERE carte <> '0'
+"""
+
+# Lignes de vente ramenées au client (cartes fusionnées → client_id)
+RESOLVED_TRANSACTIONS = f"""(
+    SELECT COALESCE(ci.client_id, tr.carte) AS carte, tr.facture, tr.depot, tr.date, tr.produit, tr.ca
+    FROM transactions tr
+    LEFT JOIN {TABLE} ci ON ci.carte = tr.carte
+)"""
+
+_ACCENTS = str.maketrans('ÀÁÂÃÄÅÇÈÉÊËÌÍÎÏÑÒÓÔÕÖÙÚÛÜÝŸ', 'AAAAAACEEEEIIIINOOOOOUUUUYY')
+# Noms : sans accents ni séparateurs ("Jean-Pierre" = "JEAN PIERRE" = "JEANPIERRE")
+NAME_TABLE = {**_ACCENTS, **{ord(c): None for c in " -'.,_"}}
+# Téléphones : chiffres seuls
+PHONE_TABLE = {ord(c): None for c in " .-/()+_"}
+
+
+def exists(cur):
+    return table_exists(cur, TABLE)
+
+
+def create(cur):
+    for sql in CREATE_SQL:
+        cur.execute(sql)
+
+
+def _strings(values):
+    import numpy as np
+
+    return np.array([v.strip() if isinstance(v, str) else '' for v in values], dtype=str)
+
+
+def normalize_names(values):
+    """'  dupont-Élodie ' → 'DUPONTELODIE'"""
+    import numpy as np
+
+    return np.char.translate(np.char.upper(_strings(values)), NAME_TABLE)
+
+
+def normalize_emails(values):
+    """Emails en minuscules ; '' si la forme n'est pas nom@domaine.tld"""
+    import numpy as np
+
+    emails = np.char.lower(_strings(values))
+    at = np.char.find(emails, '@')
+    valid = (at > 0) & (np.char.rfind(emails, '.') > at + 1) & (np.char.find(emails, ' ') < 0)
+    return np.where(valid, emails, '')
+
+
+def normalize_phones(values):
+    """
+    '+33 6 12 34 56 78', '06.12.34.56.78', '612345678' → '0612345678' ;
+    '' si le résultat n'est pas un numéro français à 10 chiffres.
+    """
+    import numpy as np
+
+    digits = np.char.translate(_strings(values), PHONE_TABLE)
+    length = np.char.str_len(digits)
+    digits = np.where(np.char.startswith(digits, '0033') & (length == 13),
+                      np.char.replace(digits, '0033', '0', count=1), digits)
+    digits = np.where(np.char.startswith(digits, '33') & (length == 11),
+                      np.char.replace(digits, '33', '0', count=1), digits)
+    # Numéro lu comme un entier par le tableur : zéro de tête perdu
+    digits = np.where((np.char.str_len(digits) == 9) & ~np.char.startswith(digits, '0'),
+                      np.char.add('0', digits), digits)
+    valid = ((np.char.str_len(digits) == 10) & np.char.isdigit(digits)
+             & np.char.startswith(digits, '0') & ~np.char.startswith(digits, '00'))
+    return np.where(valid, digits, '')
+
+
+def normalize(rows):
+    """
+    rows : [(carte, nom, prenom, email, telephone, cp, naissance)] →
+    {champ: tableau normalisé} (chaînes vides = inconnu)
+    """
+    import numpy as np
+
+    columns = list(zip(*rows)) if rows else [()] * 7
+    return {
+        'carte': np.array([str(c).strip() for c in columns[0]], dtype=str),
+        'nom': normalize_names(columns[1]),
+        'prenom': normalize_names(columns[2]),
+        'email': normalize_emails(columns[3]),
+        'telephone': normalize_phones(columns[4]),
+        'cp': np.char.translate(_strings(columns[5]), PHONE_TABLE),
+        'naissance': _strings(columns[6]),
+    }
+
+
+def blocking_keys(fields):
+    """{règle: tableau de clés} ; clé vide = carte hors bloc pour cette règle"""
+    import numpy as np
+
+    named = (fields['nom'] != '') & (fields['prenom'] != '') & (fields['cp'] != '')
+    name_cp = np.char.add(np.char.add(np.char.add(fields['nom'], '|'), np.char.add(fields['prenom'], '|')),
+                          fields['cp'])
+    return {
+        'email': fields['email'],
+        'telephone': fields['telephone'],
+        'nom_cp': np.where(named, name_cp, ''),
+    }
+
+
+def blocks(keys, max_block=MAX_BLOCK):
+    """Index de hachage clé → positions ; seuls les blocs de 2 à `max_block` cartes sont gardés"""
+    index = {}
+    for position, key in enumerate(keys.tolist()):
+        if key:
+            index.setdefault(key, []).append(position)
+    return [members for members in index.values() if 1 < len(members) <= max_block]
+
+
+def same_person(fields, i, j):
+    """Même nom, prénom et date de naissance compatibles (vide = compatible)"""
+    nom, prenom, naissance = fields['nom'], fields['prenom'], fields['naissance']
+    if not nom[i] or nom[i] != nom[j]:
+        return False
+    if prenom[i] and prenom[j] and prenom[i] != prenom[j]:
+        return False
+    return not (naissance[i] and naissance[j] and naissance[i] != naissance[j])
+
+
+def resolve(rows, max_block=MAX_BLOCK):
+    """
+    Groupes de cartes d'une même personne :
+    ({carte: (client_id, règle, taille du groupe)}, {règle: cartes rapprochées})
+    """
+    fields = normalize(rows)
+    cartes = fields['carte']
+    parent = list(range(len(cartes)))
+    linked_by = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for rule, keys in blocking_keys(fields).items():
+        for members in blocks(keys, max_block):
+            for a, i in enumerate(members):
+                for j in members[a + 1:]:
+                    if same_person(fields, i, j):
+                        root_i, root_j = find(i), find(j)
+                        if root_i != root_j:
+                            parent[root_j] = root_i
+                        linked_by.setdefault(i, rule)
+                        linked_by.setdefault(j, rule)
+
+    groups = {}
+    for i in linked_by:
+        groups.setdefault(find(i), []).append(i)
+    mapping, stats = {}, {rule: 0 for rule in RULES}
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        # Carte de référence : la plus ancienne (numéro le plus petit)
+        client_id = min((cartes[i] for i in members), key=lambda c: (len(c), c))
+        for i in members:
+            mapping[str(cartes[i])] = (str(client_id), linked_by[i], len(members))
+            stats[linked_by[i]] += 1
+    return mapping, stats
+
+
+def read_client_file(path):
+    """Lignes d'un fichier client Sage dans l'ordre de LOAD_SQL (positions de decor.sage.CLIENT_COLUMNS)"""
+    import csv
+
+    from decor import sage
+
+    rows = []
+    with open(path, 'r', encoding=sage.ENCODING, errors='replace', newline='') as f:
+        reader = csv.reader(f, delimiter=sage.SEPARATOR)
+        next(reader, None)
+        for row in reader:
+            if not row or not row[0].strip() or row[0].strip() == sage.CARTE_ANONYME:
+                continue
+            row += [''] * (len(sage.CLIENT_COLUMNS) - len(row))
+            rows.append((row[0], row[1], row[2], row[11], row[10], row[15], row[7]))
+    return rows
+
+
+def load_mapping(cur):
+    cur.execute(f"SELECT carte, client_id, regle, cartes FROM {TABLE}")
+    return {carte: (client_id, regle, size) for carte, client_id, regle, size in cur.fetchall()}
+
+
+def store(cur, mapping):
+    """Remplacer le contenu de client_identity ; renvoie le nombre de cartes dont le client change"""
+    from psycopg2.extras import execute_values
+
+    previous = load_mapping(cur)
+    changed = sum(1 for carte in previous.keys() | mapping.keys()
+                  if previous.get(carte, (carte,))[0] != mapping.get(carte, (carte,))[0])
+    cur.execute(f"TRUNCATE {TABLE}")
+    execute_values(cur, f"INSERT INTO {TABLE} (carte, client_id, regle, cartes) VALUES %s",
+                   [(carte, *value) for carte, value in mapping.items()], page_size=5000)
+    return changed
+
+
+def compute(conn):
+    with transaction(conn) as cur:
+        cur.execute(LOAD_SQL)
+        rows = cur.fetchall()
+    return len(rows), *resolve(rows)
+
+
+def _log_result(log, count, mapping, stats):
+    clients = len({client_id for client_id, _, _ in mapping.values()})
+    detail = ', '.join(f"{rule} {n:,}" for rule, n in stats.items())
+    log(f"   🪪 Identités : {count:,} cartes, {len(mapping):,} fusionnées en {clients:,} clients ({detail})")
+
+
+def rebuild(conn, log=print):
+    """Recalcul complet (création de la table au besoin)"""
+    count, mapping, stats = compute(conn)
+    with transaction(conn) as cur:
+        create(cur)
+        changed = store(cur, mapping)
+    with transaction(conn) as cur:
+        cur.execute(f"ANALYZE {TABLE}")
+    _log_result(log, count, mapping, stats)
+    if changed:
+        log(f"   ℹ️  {changed:,} cartes changent de client : cohortes à recalculer (--only cohortes --full)")
+    return len(mapping)
+
+
+def refresh(conn, first, last=None, log=print):
+    """
+    Recalcul après un chargement (le fichier client n'est pas mensuel : tout
+    est relu, en temps linéaire). Si des cartes changent de client, les
+    cohortes existantes sont recalculées. None si la table n'existe pas.
+    """
+    with transaction(conn) as cur:
+        if not exists(cur):
+            return None
+    count, mapping, stats = compute(conn)
+    with transaction(conn) as cur:
+        changed = store(cur, mapping)
+    _log_result(log, count, mapping, stats)
+    if changed:
+        from decor import cohorts
+
+        with transaction(conn) as cur:
+            has_cohorts = cohorts.exists(cur)
+        if has_cohorts:
+            log(f"   🔁 {changed:,} cartes changent de client : cohortes recalculées")
+            cohorts.rebuild(conn, log)
+    return len(mapping)
@@ -0,0 +1,299 @@
+"""
+Conseiller d'index composites / couvrants / BRIN
+------------------------------------------------
+Rejoue la charge (catalogue scripts/decor/queries.py + requêtes relevées par
+decor.instrument) sur un PostgreSQL local, puis pour chaque index candidat :
+création, ANALYZE, nouvelle mesure des requêtes, taille, suppression.
+
+Chaque candidat est évalué seul face à la situation de départ : le gain
+rapporté est son gain marginal. Les index retenus (gain ≥ seuil, utilisés par
+au moins un plan) sont écrits dans une migration SQL appliquée par
+`python scripts/apply-migration.py sql <fichier>`.
+"""
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+from decor.bench import RESULTS_DIR, benchmark_query, git_revision
+from decor.dimensions import text_keys
+from decor.env import ROOT_DIR
+from decor.instrument import is_explainable
+
+MIGRATIONS_DIR = ROOT_DIR / 'scripts' / 'migrations'
+
+# Colonnes lues par le catalogue sur une base migrée (decor.queries) : filtres
+# date / dépôt texte, jointures sur les clés entières *_id, clients comptés
+# sur `carte`, regroupements par facture. `candidate_sql` ramène les *_id à
+# leur clé texte sur une base sans ces colonnes.
+CANDIDATES = [
+    {
+        'name': 'idx_tx_depot_date_cover',
+        'key': ('depot', 'date'),
+        'include': ('ca', 'facture', 'carte', 'carte_id', 'produit_id'),
+        'why': "Magasins : filtre dépôt + période, CA / tickets / clients, jointures clients et produits sans accès table",
+    },
+    {
+        'name': 'idx_tx_date_cover',
+        'key': ('date',),
+        'include': ('depot', 'depot_id', 'ca', 'quantite', 'facture', 'carte', 'produit_id'),
+        'why': "Dashboard / marketing : période puis agrégats",
+    },
+    {
+        'name': 'idx_tx_carte_id_date_cover',
+        'key': ('carte_id', 'date'),
+        'include': ('ca', 'facture', 'depot'),
+        'where': 'carte_id IS NOT NULL',
+        'why': "RFM / fiches clients : historique par client (jointure t.carte_id = c.cle)",
+    },
+    {
+        'name': 'idx_tx_depot_id_cover',
+        'key': ('depot_id',),
+        'include': ('ca', 'quantite', 'facture'),
+        'why': "Top magasins : jointure t.depot_id = m.cle puis CA / tickets",
+    },
+    {
+        'name': 'idx_tx_facture_produit_id',
+        'key': ('facture',),
+        'include': ('date', 'produit_id', 'ca'),
+        'why': "Cross-selling : lignes d'un ticket et leur produit",
+    },
+    {
+        'name': 'idx_tx_produit_id_date_cover',
+        'key': ('produit_id', 'date'),
+        'include': ('ca', 'quantite', 'produit', 'depot'),
+        'why': "ABC / forecast : ventes par produit et période (jointure t.produit_id = p.cle)",
+    },
+    {
+        'name': 'idx_tx_date_brin',
+        'key': ('date',),
+        'using': 'brin',
+        'with': 'pages_per_range = 32',
+        'why': "Plages de dates sur une table chargée dans l'ordre chronologique (index minuscule)",
+    },
+]
+
+
+def candidate_sql(candidate, keys=True):
+    """
+    CREATE INDEX du candidat (nom laissé en `{name}`). Sans clés entières,
+    les *_id deviennent leur colonne texte, sans doublon.
+    """
+    def text(column):
+        return column if keys else text_keys(column)
+
+    key = list(dict.fromkeys(text(c) for c in candidate['key']))
+    include = [c for c in dict.fromkeys(text(c) for c in candidate.get('include', ())) if c not in key]
+    sql = "CREATE INDEX {name} ON transactions"
+    if candidate.get('using'):
+        sql += f" USING {candidate['using']}"
+    sql += f" ({', '.join(key)})"
+    if include:
+        sql += f" INCLUDE ({', '.join(include)})"
+    if candidate.get('with'):
+        sql += f" WITH ({candidate['with']})"
+    if candidate.get('where'):
+        sql += f" WHERE {text(candidate['where'])}"
+    return sql
+
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+
+def is_local(target):
+    """Les candidats sont créés puis supprimés : jamais sur la base de production par défaut"""
+    host = (target or '').split('/', 1)[0].rsplit(':', 1)[0]
+    return host in LOCAL_HOSTS or host == ''
+
+
+def load_workload(paths):
+    """
+    Requêtes relevées par decor.instrument (data/query-reports/*.json).
+    Les requêtes paramétrées (%s) ne sont pas rejouables et sont ignorées.
+    """
+    queries = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        for i, group in enumerate(report.get('ranking', []), 1):
+            sql = group['sql']
+            if '%s' in sql or '%(' in sql or not is_explainable(sql):
+                continue
+            queries.append({
+                'name': f"{report.get('script', Path(path).stem)}#{i}",
+                'module': 'workload',
+                'sql': sql,
+                'weight': group.get('calls', 1),
+            })
+    return queries
+
+
+def index_size(backend, name):
+    """Taille de l'index (somme des partitions pour une table partitionnée)"""
+    row = backend.execute("""
+        SELECT pg_relation_size(%s::regclass)
+             + COALESCE((SELECT SUM(pg_relation_size(inhrelid))
+                         FROM pg_inherits WHERE inhparent = %s::regclass), 0)
+    """, (name, name))[0]
+    return int(row[0])
+
+
+def index_family(backend, name):
+    """
+    Noms de l'index et de ses index de partition : sur `transactions`
+    partitionnée, les plans citent les index enfants, que PostgreSQL nomme
+    d'après la partition (`transactions_2025_11_depot_date_..._idx`).
+    """
+    rows = backend.execute("""
+        WITH RECURSIVE family(oid) AS (
+            SELECT %s::regclass::oid
+            UNION ALL
+            SELECT i.inhrelid FROM pg_inherits i JOIN family f ON i.inhparent = f.oid
+        )
+        SELECT c.relname FROM family f JOIN pg_class c ON c.oid = f.oid
+    """, (name,))
+    return {row[0] for row in rows}
+
+
+def plan_index_names(plan):
+    """Valeurs « Index Name » de tous les nœuds d'un plan EXPLAIN (FORMAT JSON)"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    names = set()
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if 'Index Name' in node:
+                names.add(node['Index Name'])
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return names
+
+
+def plan_uses_index(backend, sql, names):
+    """Le plan de `sql` lit-il l'un des index `names` (résultat de index_family) ?"""
+    plan = backend.execute(f"EXPLAIN (FORMAT JSON) {sql}")[0][0]
+    return not plan_index_names(plan).isdisjoint(names)
+
+
+def measure(backend, queries, iterations):
+    """p50 chaud de chaque requête (None si erreur)"""
+    timings = {}
+    for query in queries:
+        try:
+            result = benchmark_query(backend, query, iterations=iterations, cold=0)
+            timings[query['name']] = result['warm']['p50']
+        except Exception:
+            backend.reset()
+            timings[query['name']] = None
+    return timings
+
+
+def weighted_total(queries, timings):
+    return sum((timings.get(q['name']) or 0) * q.get('weight', 1) for q in queries)
+
+
+def evaluate_candidate(backend, candidate, queries, baseline, iterations):
+    name = candidate['name']
+    sql = candidate_sql(candidate, backend.keys).format(name=name)
+    backend.execute(f"DROP INDEX IF EXISTS {name}")
+    start = time.perf_counter()
+    backend.execute(sql)
+    build_seconds = time.perf_counter() - start
+    try:
+        backend.execute("ANALYZE transactions")
+        size = index_size(backend, name)
+        family = index_family(backend, name)
+        timings = measure(backend, queries, iterations)
+        used_by = [q['name'] for q in queries
+                   if timings.get(q['name']) is not None and plan_uses_index(backend, q['sql'], family)]
+    finally:
+        backend.execute(f"DROP INDEX IF EXISTS {name}")
+
+    before = weighted_total(queries, baseline)
+    after = weighted_total(queries, {k: v if v is not None else baseline.get(k) for k, v in timings.items()})
+    per_query = {}
+    for query in queries:
+        old, new = baseline.get(query['name']), timings.get(query['name'])
+        if old and new:
+            per_query[query['name']] = {'before': old, 'after': new, 'ratio': new / old}
+    return {
+        'name': name,
+        'sql': sql,
+        'why': candidate.get('why'),
+        'size_bytes': size,
+        'build_seconds': build_seconds,
+        'used_by': used_by,
+        'total_before': before,
+        'total_after': after,
+        'gain': (before - after) / before if before else 0.0,
+        'saved_ms_per_mb': (before - after) * 1000 / max(size / 1024 / 1024, 0.01),
+        'queries': per_query,
+    }
+
+
+def run_advisor(backend, queries, candidates=CANDIDATES, iterations=3, on_result=None):
+    backend.execute("SET statement_timeout = '120s'")
+    backend.execute("ANALYZE transactions")
+    baseline = measure(backend, queries, iterations)
+    results = []
+    for candidate in candidates:
+        try:
+            result = evaluate_candidate(backend, candidate, queries, baseline, iterations)
+        except Exception as e:
+            backend.reset()
+            result = {'name': candidate['name'], 'error': str(e)}
+        results.append(result)
+        if on_result:
+            on_result(result)
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'target': backend.target,
+        'iterations': iterations,
+        'baseline': baseline,
+        'baseline_total': weighted_total(queries, baseline),
+        'candidates': results,
+    }
+
+
+def select_indexes(report, min_gain=0.10):
+    """Candidats utilisés par au moins un plan et accélérant la charge d'au moins min_gain"""
+    chosen = [r for r in report['candidates']
+              if 'error' not in r and r['used_by'] and r['gain'] >= min_gain]
+    chosen.sort(key=lambda r: r['saved_ms_per_mb'], reverse=True)
+    return chosen
+
+
+def save_report(report, output_dir=RESULTS_DIR):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"index-advisor-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def write_migration(chosen, report, path=None):
+    """Migration SQL idempotente des index retenus"""
+    path = Path(path or MIGRATIONS_DIR / f"{datetime.now():%Y%m%d}-index-advisor.sql")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [
+        f"-- Index retenus par scripts/index-advisor.py ({report['created_at']})",
+        f"-- Charge rejouée : {len(report['baseline'])} requêtes sur {report['target']}",
+        '',
+    ]
+    for result in chosen:
+        lines += [
+            f"-- {result['why'] or result['name']}",
+            f"-- gain {result['gain'] * 100:.0f} %, {result['size_bytes'] / 1024 / 1024:.1f} Mo, "
+            f"utilisé par : {', '.join(result['used_by'])}",
+            result['sql'].replace('CREATE INDEX ', 'CREATE INDEX IF NOT EXISTS ', 1) + ';',
+            '',
+        ]
+    lines.append('ANALYZE transactions;')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
@@ -0,0 +1,270 @@
+"""
+Instrumentation des requêtes SQL des scripts d'analyse
+------------------------------------------------------
+Enveloppe une connexion psycopg2 : chaque `cursor.execute` est chronométré,
+le nombre de lignes est relevé et, sur demande, le plan
+`EXPLAIN (ANALYZE, BUFFERS)` est capturé pour les SELECT.
+
+En fin de script, un rapport classe les requêtes les plus lentes :
+    data/query-reports/<script>-<date>.md   (lecture humaine)
+    data/query-reports/<script>-<date>.json (détail + plans)
+
+Usage:
+    conn = instrument(psycopg2.connect(DATABASE_URL))
+    QUERY_EXPLAIN=1 python analyse-ecart-novembre.py   # capture des plans
+
+⚠️ EXPLAIN ANALYZE ré-exécute la requête : le temps total du script double
+et le plan est mesuré cache chaud. Les requêtes d'écriture ne sont jamais expliquées.
+"""
+import atexit
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from decor.env import DATA_DIR
+
+REPORTS_DIR = DATA_DIR / 'query-reports'
+
+_WRITE_STATEMENT = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|COPY|VACUUM)\b', re.I)
+
+
+def fingerprint(sql):
+    """Forme normalisée d'une requête : littéraux remplacés, espaces compactés"""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    return ' '.join(sql.split())
+
+
+def is_explainable(sql):
+    stripped = sql.lstrip().upper()
+    return stripped.startswith(('SELECT', 'WITH')) and not _WRITE_STATEMENT.search(sql)
+
+
+def env_flag(name):
+    return os.getenv(name, '').lower() in ('1', 'true', 'yes', 'oui')
+
+
+class QueryRecorder:
+    """Collecte les mesures d'un run et produit le rapport des requêtes lentes"""
+
+    def __init__(self, name, explain=False, output_dir=REPORTS_DIR):
+        self.name = name
+        self.explain = explain
+        self.output_dir = Path(output_dir)
+        self.started_at = datetime.now()
+        self.entries = []
+        self.finished = False
+
+    def record(self, sql, duration, rows, plan=None, error=None):
+        self.entries.append({
+            'sql': sql.strip(),
+            'fingerprint': fingerprint(sql),
+            'duration': duration,
+            'rows': rows,
+            'plan': plan,
+            'error': error,
+        })
+
+    def summary(self):
+        """Requêtes regroupées par empreinte, triées par temps total décroissant"""
+        groups = {}
+        for entry in self.entries:
+            group = groups.setdefault(entry['fingerprint'], {
+                'fingerprint': entry['fingerprint'],
+                'sql': entry['sql'],
+                'calls': 0,
+                'total': 0.0,
+                'max': 0.0,
+                'rows': 0,
+                'errors': 0,
+                'plan': None,
+            })
+            group['calls'] += 1
+            group['total'] += entry['duration']
+            group['rows'] += entry['rows'] or 0
+            group['errors'] += 1 if entry['error'] else 0
+            if entry['duration'] >= group['max']:
+                group['max'] = entry['duration']
+                group['plan'] = entry['plan'] or group['plan']
+        ranked = sorted(groups.values(), key=lambda g: g['total'], reverse=True)
+        for group in ranked:
+            group['mean'] = group['total'] / group['calls']
+        return ranked
+
+    def write_report(self):
+        """Écrire les rapports JSON et Markdown, renvoyer le chemin Markdown"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = self.started_at.strftime('%Y%m%d-%H%M%S')
+        base = self.output_dir / f"{self.name}-{stamp}"
+        ranked = self.summary()
+        total = sum(e['duration'] for e in self.entries)
+
+        with open(base.with_suffix('.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'script': self.name,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'explain': self.explain,
+                'statements': len(self.entries),
+                'total_seconds': total,
+                'ranking': ranked,
+            }, f, indent=2, ensure_ascii=False)
+
+        lines = [
+            f"# Requêtes SQL - {self.name}",
+            '',
+            f"- Exécution : {self.started_at:%Y-%m-%d %H:%M:%S}",
+            f"- Requêtes : {len(self.entries)} ({len(ranked)} distinctes)",
+            f"- Temps SQL total : {total:.2f}s",
+            '',
+            '| # | Total | Appels | Max | Lignes | Requête |',
+            '|---|-------|--------|-----|--------|---------|',
+        ]
+        for i, group in enumerate(ranked, 1):
+            label = group['fingerprint'][:90].replace('|', '\\|')
+            lines.append(f"| {i} | {group['total']:.3f}s | {group['calls']} | {group['max']:.3f}s "
+                         f"| {group['rows']:,} | `{label}` |")
+
+        plans = [g for g in ranked if g['plan']]
+        if plans:
+            lines += ['', '## Plans des requêtes les plus lentes', '']
+            for i, group in enumerate(plans[:10], 1):
+                lines += [f"### {i}. {group['total']:.3f}s", '', '```sql', group['sql'], '```', '',
+                          '```', group['plan'], '```', '']
+
+        md_path = base.with_suffix('.md')
+        with open(md_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return md_path
+
+    def print_summary(self, top=5):
+        ranked = self.summary()
+        if not ranked:
+            return
+        print(f"\n🐢 Requêtes les plus lentes ({len(self.entries)} exécutées) :")
+        for group in ranked[:top]:
+            print(f"   {group['total']:7.2f}s  x{group['calls']:<4} {group['fingerprint'][:70]}")
+
+    def finish(self):
+        if self.finished or not self.entries:
+            return None
+        self.finished = True
+        path = self.write_report()
+        self.print_summary()
+        print(f"📝 Rapport SQL: {path}")
+        return path
+
+
+class InstrumentedCursor:
+    """Curseur psycopg2 chronométré (les autres méthodes sont déléguées)"""
+
+    def __init__(self, cursor, recorder):
+        self._cursor = cursor
+        self._recorder = recorder
+
+    def execute(self, sql, params=None):
+        start = time.perf_counter()
+        try:
+            if params is None:
+                self._cursor.execute(sql)
+            else:
+                self._cursor.execute(sql, params)
+        except Exception as e:
+            self._recorder.record(sql, time.perf_counter() - start, None, error=str(e))
+            raise
+        duration = time.perf_counter() - start
+        rows = self._cursor.rowcount if self._cursor.rowcount >= 0 else None
+
+        plan = None
+        if self._recorder.explain and is_explainable(sql):
+            plan = self._explain(sql, params)
+        self._recorder.record(sql, duration, rows, plan=plan)
+
+    def executemany(self, sql, params_seq):
+        start = time.perf_counter()
+        self._cursor.executemany(sql, params_seq)
+        self._recorder.record(sql, time.perf_counter() - start, self._cursor.rowcount)
+
+    def _explain(self, sql, params):
+        """
+        Plan de la requête ; un échec est annulé jusqu'à un SAVEPOINT, la
+        transaction de l'appelant (écritures d'un lot d'import) est conservée
+        """
+        conn = self._cursor.connection
+        savepoint = not conn.autocommit
+        cur = conn.cursor()
+        try:
+            if savepoint:
+                cur.execute("SAVEPOINT instrument_explain")
+            cur.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+            plan = '\n'.join(row[0] for row in cur.fetchall())
+            if savepoint:
+                cur.execute("RELEASE SAVEPOINT instrument_explain")
+            return plan
+        except Exception as e:
+            if savepoint:
+                cur.execute("ROLLBACK TO SAVEPOINT instrument_explain")
+            return f"(plan indisponible: {e})"
+        finally:
+            cur.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # itersize, arraysize... sont réglés sur le curseur psycopg2
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+
+class InstrumentedConnection:
+    """Connexion dont les curseurs sont instrumentés ; le rapport est écrit à la fermeture"""
+
+    def __init__(self, conn, recorder):
+        self._conn = conn
+        self.recorder = recorder
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self.recorder)
+
+    def close(self):
+        self.recorder.finish()
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def instrument(conn, name=None, explain=None, output_dir=REPORTS_DIR):
+    """
+    Envelopper une connexion psycopg2.
+    `explain` vaut par défaut la variable d'environnement QUERY_EXPLAIN.
+    """
+    if name is None:
+        name = Path(sys.argv[0]).stem or 'session'
+    if explain is None:
+        explain = env_flag('QUERY_EXPLAIN')
+    recorder = QueryRecorder(name, explain=explain, output_dir=output_dir)
+    # Rapport écrit même si le script s'arrête avant conn.close()
+    atexit.register(recorder.finish)
+    return InstrumentedConnection(conn, recorder)
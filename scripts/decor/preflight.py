@@ -0,0 +1,286 @@
+"""
+Contrôle des extractions Sage avant chargement
+----------------------------------------------
+import-clean-3months.py (étapes 9-10) et test-data-v2.py découvrent les
+clients manquants, les produits orphelins et les dates illisibles après le
+chargement, par des LEFT JOIN sur la base. Ici les fichiers sont contrôlés
+avant de toucher la base, en un parcours chacun : les clés de produits.csv,
+du fichier client et de "Points de vente.csv" sont gardées en mémoire
+(ensembles), puis lignevente.csv est lu en flux et chaque ligne est vérifiée
+contre ces ensembles.
+
+Les règles ont le format de decor.validation (`table` = fichier de
+`FILES`, `colonne` = champ de ce fichier) et les mêmes statuts. Deux types
+sont propres aux fichiers :
+
+    entete     colonnes attendues (decor.sage) présentes dans l'en-tête
+    format     valeur renseignée lisible (`type` 'decimal' ou 'date')
+
+`unique` sans `colonnes` compte les lignes entières en double (empreinte
+de la ligne brute).
+
+    python scripts/validate-extract.py /chemin/extraction
+    python scripts/validate-extract.py /chemin/extraction --since 2025-11-01 --strict
+"""
+import csv
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from decor import sage, validation
+from decor.depots import canonical_depot
+
+# Fichiers d'une extraction : position des champs dans decor.sage.*_COLUMNS
+# (les scripts d'import lisent par position, l'en-tête client étant souvent mal encodé)
+FILES = {
+    'produits': {
+        'obligatoire': True,
+        'fichier': sage.PRODUITS_FILE,
+        'colonnes': sage.PRODUIT_COLUMNS,
+        'encodage': sage.ENCODING,
+        'champs': {'id': 0, 'nom': 1, 'famille': 4},
+    },
+    'clients': {
+        'fichier': sage.CLIENT_FILE_PATTERN,
+        'colonnes': sage.CLIENT_COLUMNS,
+        'encodage': sage.ENCODING,
+        'champs': {'carte': 0, 'nom': 1},
+    },
+    'points_de_vente': {
+        'fichier': sage.POINTS_DE_VENTE_FILE,
+        'colonnes': sage.POINTS_DE_VENTE_COLUMNS,
+        'encodage': sage.POINTS_DE_VENTE_ENCODING,
+        'champs': {'depot': 1},
+    },
+    'lignevente': {
+        'obligatoire': True,
+        'fichier': sage.LIGNEVENTE_FILE,
+        'colonnes': sage.LIGNEVENTE_COLUMNS,
+        'encodage': sage.ENCODING,
+        'champs': {'carte': 0, 'facture': 1, 'depot': 2, 'date': 3, 'heure': 4,
+                   'produit': 5, 'quantite': 6, 'prix': 7, 'ttc': 8},
+    },
+}
+
+# Même normalisation qu'à l'import (iter_lignevente, import-new-data-feb2026.py)
+NORMALIZERS = {'depot': canonical_depot}
+
+PARSERS = {'decimal': sage.parse_decimal, 'date': sage.parse_date}
+
+
+def default_rules(today=None):
+    """Règles par défaut (les dates au-delà de demain sont hors plage)"""
+    tomorrow = ((today or date.today()) + timedelta(days=1)).isoformat()
+    return [
+        {'table': 'produits', 'regle': 'entete', 'tolerance': 0, 'niveau': 'avertissement', 'nom': 'en-tête'},
+        {'table': 'produits', 'regle': 'complet', 'colonne': 'id'},
+        {'table': 'produits', 'regle': 'unique', 'colonnes': ['id']},
+        {'table': 'produits', 'regle': 'complet', 'colonne': 'famille', 'tolerance': 0.05, 'niveau': 'avertissement'},
+
+        {'table': 'clients', 'regle': 'entete', 'tolerance': 0, 'niveau': 'avertissement', 'nom': 'en-tête'},
+        {'table': 'clients', 'regle': 'complet', 'colonne': 'carte'},
+        {'table': 'clients', 'regle': 'unique', 'colonnes': ['carte'], 'tolerance': 0.001, 'niveau': 'avertissement'},
+        {'table': 'clients', 'regle': 'complet', 'colonne': 'nom', 'tolerance': None},
+
+        {'table': 'points_de_vente', 'regle': 'unique', 'colonnes': ['depot']},
+
+        {'table': 'lignevente', 'regle': 'entete', 'nom': 'en-tête'},
+        {'table': 'lignevente', 'regle': 'complet', 'colonne': 'facture'},
+        {'table': 'lignevente', 'regle': 'complet', 'colonne': 'date'},
+        {'table': 'lignevente', 'regle': 'format', 'colonne': 'date', 'type': 'date'},
+        {'table': 'lignevente', 'regle': 'plage', 'colonne': 'date', 'min': '2015-01-01', 'max': tomorrow},
+        {'table': 'lignevente', 'regle': 'format', 'colonne': 'quantite', 'type': 'decimal', 'tolerance': 0.001},
+        {'table': 'lignevente', 'regle': 'format', 'colonne': 'prix', 'type': 'decimal', 'tolerance': 0.001},
+        {'table': 'lignevente', 'regle': 'format', 'colonne': 'ttc', 'type': 'decimal', 'tolerance': 0.001,
+         'niveau': 'avertissement'},
+        {'table': 'lignevente', 'regle': 'plage', 'colonne': 'quantite', 'min': -10000, 'max': 10000,
+         'tolerance': 0.0001, 'niveau': 'avertissement'},
+        {'table': 'lignevente', 'regle': 'reference', 'colonne': 'produit', 'cible': 'produits.id'},
+        {'table': 'lignevente', 'regle': 'reference', 'colonne': 'carte', 'cible': 'clients.carte',
+         'sauf': ['0', ''], 'tolerance': 0.05, 'niveau': 'avertissement'},
+        {'table': 'lignevente', 'regle': 'reference', 'colonne': 'depot', 'cible': 'points_de_vente.depot',
+         'sauf': ['0'], 'tolerance': 0.01, 'niveau': 'avertissement'},
+        {'table': 'lignevente', 'regle': 'unique', 'tolerance': 0.01, 'niveau': 'avertissement',
+         'nom': 'lignes en double'},
+    ]
+
+
+def locate(data_dir, table):
+    """Chemin du fichier d'une table dans l'extraction (None s'il manque)"""
+    if table == 'clients':
+        return sage.find_client_file(data_dir)
+    path = Path(data_dir) / FILES[table]['fichier']
+    return path if path.exists() else None
+
+
+class Check:
+    """Compteurs d'une règle pendant le parcours d'un fichier"""
+
+    def __init__(self, rule, spec, keys=None):
+        self.rule = rule
+        self.kind = rule['regle']
+        fields = rule.get('colonnes') or ([rule['colonne']] if rule.get('colonne') else [])
+        self.fields = [(spec['champs'][f], NORMALIZERS.get(f)) for f in fields]
+        self.parse = PARSERS.get(rule.get('type'), sage.parse_decimal)
+        self.sauf = set(rule.get('sauf') or ())
+        self.keys = keys
+        self.violations = 0
+        self.seen = set()
+        self.orphans = set()
+        self.low = self.high = None
+
+    def value(self, row, field=None):
+        index, normalize = field or self.fields[0]
+        text = row[index].strip() if index < len(row) else ''
+        return normalize(text) if normalize and text else text
+
+    def __call__(self, row):
+        kind = self.kind
+        if kind == 'complet':
+            if not self.value(row):
+                self.violations += 1
+        elif kind == 'format':
+            text = self.value(row)
+            if text and self.parse(text) is None:
+                self.violations += 1
+        elif kind == 'plage':
+            text = self.value(row)
+            value = sage.parse_date(text) if self.rule['colonne'] == 'date' else sage.parse_decimal(text)
+            if value is None:
+                return
+            if self.low is None or value < self.low:
+                self.low = value
+            if self.high is None or value > self.high:
+                self.high = value
+            if ('min' in self.rule and value < self.rule['min']) or ('max' in self.rule and value > self.rule['max']):
+                self.violations += 1
+        elif kind == 'reference':
+            key = self.value(row)
+            if key not in self.keys and key not in self.sauf and key:
+                self.violations += 1
+                self.orphans.add(key)
+        elif kind == 'unique':
+            if self.fields:
+                key = tuple(self.value(row, field) for field in self.fields)
+                if not any(key):
+                    return
+            else:
+                key = hash(tuple(row))
+            if key in self.seen:
+                self.violations += 1
+            else:
+                self.seen.add(key)
+
+    def values(self):
+        """Mesures dans l'ordre attendu par validation.evaluate"""
+        if self.kind == 'reference':
+            return [self.violations, len(self.orphans)]
+        if self.kind == 'plage':
+            return [self.violations, self.low, self.high]
+        return [self.violations]
+
+
+def scan(path, spec, checks, collect, period=None):
+    """
+    Un parcours du fichier : règles appliquées ligne par ligne, clés des
+    champs `collect` rangées dans des ensembles ; `period` (début, fin
+    exclue) écarte les lignes datées hors période.
+    Renvoie (en-tête, lignes contrôlées, {champ: clés}).
+    """
+    keys = {field: set() for field in collect}
+    collectors = [(keys[f], spec['champs'][f], NORMALIZERS.get(f)) for f in collect]
+    date_index = spec['champs'].get('date') if period else None
+    count = 0
+    with open(path, 'r', encoding=spec['encodage'], errors='replace', newline='') as f:
+        reader = csv.reader(f, delimiter=sage.SEPARATOR)
+        header = [column.strip() for column in next(reader, [])]
+        for row in reader:
+            if not row:
+                continue
+            if date_index is not None:
+                day = sage.parse_date(row[date_index]) if date_index < len(row) else None
+                if day is not None and not period[0] <= day < period[1]:
+                    continue
+            count += 1
+            for check in checks:
+                check(row)
+            for target, index, normalize in collectors:
+                if index < len(row):
+                    key = row[index].strip()
+                    target.add(normalize(key) if normalize and key else key)
+    return header, count, keys
+
+
+def header_result(rule, header, spec):
+    missing = [column for column in dict.fromkeys(spec['colonnes']) if column not in header]
+    result = validation.evaluate(rule, len(spec['colonnes']), [len(missing)])
+    if missing:
+        result['detail'] = f"absentes : {', '.join(missing)}"
+    return result
+
+
+def ignored(rule, detail):
+    return {'id': validation.rule_id(rule), 'table': rule['table'], 'regle': rule['regle'],
+            'statut': 'ignoree', 'detail': detail}
+
+
+def validate_extract(data_dir, rules=None, period=None, log=print):
+    """
+    Contrôler une extraction (un parcours par fichier, tables cibles des
+    références d'abord) ; renvoie un rapport au format de decor.validation :
+    {source, periode, date, tables: {table: {fichier, lignes, secondes}}, regles: [...]}.
+    """
+    rules = rules or default_rules()
+    targets = {}
+    for rule in rules:
+        if rule['regle'] == 'reference':
+            table, field = rule['cible'].split('.', 1)
+            targets.setdefault(table, set()).add(field)
+    order = sorted({rule['table'] for rule in rules}, key=lambda t: (t not in targets, list(FILES).index(t)))
+
+    keys, results, report_tables = {}, {}, {}
+    for table in order:
+        spec = FILES[table]
+        numbered = [(position, rule) for position, rule in enumerate(rules) if rule['table'] == table]
+        path = locate(data_dir, table)
+        if path is None:
+            for position, rule in numbered:
+                results[position] = ignored(rule, f"fichier absent : {spec['fichier']}")
+            if spec.get('obligatoire') and numbered:
+                # Rangé avant les règles de la table
+                results[numbered[0][0] - 0.5] = {'id': f"{table}: fichier", 'table': table, 'regle': 'fichier',
+                                                 'statut': 'erreur', 'detail': f"absent : {spec['fichier']}"}
+            continue
+
+        checks, header_rules = [], []
+        for position, rule in numbered:
+            if rule['regle'] == 'entete':
+                header_rules.append((position, rule))
+            elif rule['regle'] == 'reference' and rule['cible'] not in keys:
+                results[position] = ignored(rule, f"fichier absent : {rule['cible'].split('.')[0]}")
+            else:
+                checks.append((position, Check(rule, spec, keys.get(rule.get('cible')))))
+
+        start = time.perf_counter()
+        header, count, collected = scan(path, spec, [check for _, check in checks], targets.get(table, ()),
+                                        period if table == 'lignevente' else None)
+        elapsed = time.perf_counter() - start
+        keys.update({f"{table}.{field}": values for field, values in collected.items()})
+        report_tables[table] = {'fichier': path.name, 'lignes': count, 'secondes': round(elapsed, 3)}
+        log(f"   🔎 {path.name}: {count:,} lignes, {len(numbered)} règles, {elapsed:.2f}s")
+
+        for position, rule in header_rules:
+            results[position] = header_result(rule, header, spec)
+        for position, check in checks:
+            result = validation.evaluate(check.rule, count, check.values())
+            if check.orphans:
+                result['exemples'] = sorted(check.orphans)[:10]
+            results[position] = result
+
+    return {
+        'source': str(data_dir),
+        'periode': list(period) if period else None,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'tables': report_tables,
+        'regles': [results[position] for position in sorted(results)],
+    }
@@ -0,0 +1,555 @@
+"""
+Catalogue des requêtes de l'API (api/*.js)
+------------------------------------------
+Chaque entrée reprend la forme SQL d'un endpoint Vercel : mêmes jointures,
+mêmes filtres, mêmes GROUP BY. Le catalogue sert de charge de référence
+pour les benchmarks et pour l'analyse des index.
+
+Les jointures passent par les clés entières (`t.produit_id = p.cle`, voir
+decor.dimensions) ; sur une base sans ces colonnes, les moteurs exécutent la
+forme texte. Les clients se comptent sur `carte` : carte_id est NULL pour une
+carte absente de `clients`, que COUNT(DISTINCT) écarterait.
+
+Les requêtes restent portables PostgreSQL/DuckDB : seul TO_CHAR est
+traduit à la volée (voir decor.backends.translate_sql).
+"""
+
+QUERIES = [
+    # ------------------------------------------------------------------
+    # api/dashboard.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'dashboard_kpis',
+        'module': 'dashboard',
+        'sql': """
+            SELECT
+              COUNT(DISTINCT carte)::int as total_clients,
+              COUNT(DISTINCT facture)::int as total_tickets,
+              SUM(ca)::float as total_ca,
+              (SUM(ca) / COUNT(DISTINCT facture))::float as panier_moyen
+            FROM transactions
+            WHERE depot NOT IN ('1', '41', '42') AND ca > 0
+        """,
+    },
+    {
+        'name': 'dashboard_top_produits',
+        'module': 'dashboard',
+        'sql': """
+            SELECT
+              p.id, p.famille, p.sous_famille,
+              SUM(t.ca) as ca,
+              SUM(t.quantite) as volume
+            FROM transactions t
+            JOIN produits p ON t.produit_id = p.cle
+            GROUP BY p.id, p.famille, p.sous_famille
+            ORDER BY ca DESC
+            LIMIT 10
+        """,
+    },
+    {
+        'name': 'dashboard_top_magasins',
+        'module': 'dashboard',
+        'sql': """
+            SELECT
+              m.code, m.nom, m.zone,
+              SUM(t.ca) as ca,
+              SUM(t.quantite) as volume,
+              COUNT(DISTINCT t.facture) as nb_tickets,
+              AVG(t.ca) as panier_moyen
+            FROM transactions t
+            JOIN magasins m ON t.depot_id = m.cle
+            GROUP BY m.code, m.nom, m.zone
+            ORDER BY ca DESC
+            LIMIT 5
+        """,
+    },
+    {
+        'name': 'dashboard_top_clients',
+        'module': 'dashboard',
+        'sql': """
+            SELECT
+              c.carte, c.ville,
+              SUM(t.ca) as ca,
+              COUNT(DISTINCT t.facture) as nb_commandes
+            FROM transactions t
+            JOIN clients c ON t.carte_id = c.cle
+            GROUP BY c.carte, c.ville
+            ORDER BY ca DESC
+            LIMIT 10
+        """,
+    },
+    {
+        'name': 'dashboard_evolution_mensuelle',
+        'module': 'dashboard',
+        'sql': """
+            SELECT
+              TO_CHAR(date, 'YYYY-MM') as mois,
+              SUM(ca) as ca,
+              COUNT(DISTINCT facture) as tickets
+            FROM transactions
+            WHERE depot NOT IN ('1', '41', '42') AND ca > 0
+            GROUP BY TO_CHAR(date, 'YYYY-MM')
+            ORDER BY mois
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/rfm.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'rfm_scores',
+        'module': 'rfm',
+        'sql': """
+            WITH client_metrics AS (
+              SELECT
+                c.carte::text as carte,
+                c.nom::text as nom,
+                c.prenom::text as prenom,
+                c.sexe::text as sexe,
+                c.ville::text as ville,
+                c.cp::text as cp,
+                COUNT(DISTINCT t.facture)::int as frequency,
+                SUM(t.ca)::numeric as monetary,
+                (CURRENT_DATE - MAX(t.date)::date)::int as recency,
+                (CURRENT_DATE - MIN(t.date)::date)::int as days_since_first
+              FROM clients c
+              INNER JOIN transactions t ON t.carte_id = c.cle
+              WHERE c.carte != '0'
+              GROUP BY c.carte, c.nom, c.prenom, c.sexe, c.ville, c.cp
+              HAVING SUM(t.ca) > 0
+            )
+            SELECT
+              *,
+              (6 - NTILE(5) OVER (ORDER BY recency ASC))::int as r,
+              (6 - NTILE(5) OVER (ORDER BY frequency DESC))::int as f,
+              (6 - NTILE(5) OVER (ORDER BY monetary DESC))::int as m
+            FROM client_metrics
+            ORDER BY carte
+        """,
+    },
+    {
+        'name': 'rfm_scores_web',
+        'module': 'rfm',
+        'sql': """
+            WITH client_metrics AS (
+              SELECT
+                c.carte::text as carte,
+                COUNT(DISTINCT t.facture)::int as frequency,
+                SUM(t.ca)::numeric as monetary,
+                (CURRENT_DATE - MAX(t.date)::date)::int as recency
+              FROM clients c
+              INNER JOIN transactions t ON t.carte_id = c.cle
+              WHERE t.depot = 'WEB' AND c.carte != '0'
+              GROUP BY c.carte
+              HAVING SUM(t.ca) > 0
+            )
+            SELECT
+              *,
+              (6 - NTILE(5) OVER (ORDER BY recency ASC))::int as r,
+              (6 - NTILE(5) OVER (ORDER BY frequency DESC))::int as f,
+              (6 - NTILE(5) OVER (ORDER BY monetary DESC))::int as m
+            FROM client_metrics
+            ORDER BY carte
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/cohortes.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'cohortes',
+        'module': 'cohortes',
+        'sql': """
+            WITH first_purchase AS (
+              SELECT
+                carte,
+                MIN(date) as first_date,
+                TO_CHAR(MIN(date), 'YYYY-MM') as cohort_month
+              FROM transactions
+              WHERE carte != '0' AND ca > 0
+              GROUP BY carte
+            )
+            SELECT
+              fp.carte::text,
+              fp.cohort_month::text,
+              SUM(t.ca)::numeric as ca,
+              COUNT(*)::int as volume
+            FROM first_purchase fp
+            INNER JOIN transactions t ON fp.carte = t.carte
+            WHERE t.ca > 0
+            GROUP BY fp.carte, fp.cohort_month
+            ORDER BY fp.cohort_month, fp.carte
+        """,
+    },
+    {
+        # Matrice précalculée (scripts/refresh-aggregates.py)
+        'name': 'cohortes_matrice',
+        'module': 'cohortes',
+        'sql': """
+            SELECT
+              TO_CHAR(cohort_month, 'YYYY-MM') as cohort_month,
+              TO_CHAR(active_month, 'YYYY-MM') as active_month,
+              clients::int as clients,
+              ca::float as ca,
+              volume::int as volume
+            FROM cohort_matrix
+            ORDER BY cohort_month, active_month
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/cross-selling.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'cross_selling_tickets',
+        'module': 'cross_selling',
+        'sql': """
+            SELECT
+              t.facture::text,
+              t.date::text,
+              EXTRACT(YEAR FROM t.date)::int as annee,
+              EXTRACT(MONTH FROM t.date)::int as mois,
+              ARRAY_AGG(DISTINCT p.famille) as familles,
+              SUM(t.ca)::numeric as ca_ticket
+            FROM transactions t
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.ca > 0 AND t.facture IS NOT NULL AND p.famille IS NOT NULL
+            GROUP BY t.facture, t.date
+            HAVING COUNT(DISTINCT p.famille) >= 2
+            ORDER BY t.date DESC
+            LIMIT 50000
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/forecast.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'forecast_famille_mois',
+        'module': 'forecast',
+        'sql': """
+            SELECT
+              TO_CHAR(date, 'YYYY-MM')::text as mois,
+              p.famille::text,
+              SUM(t.ca)::numeric as ca
+            FROM transactions t
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.ca > 0 AND p.famille IS NOT NULL
+            GROUP BY TO_CHAR(date, 'YYYY-MM'), p.famille
+            ORDER BY mois, p.famille
+        """,
+    },
+    {
+        'name': 'forecast_famille_mois_magasin',
+        'module': 'forecast',
+        'sql': """
+            SELECT
+              TO_CHAR(date, 'YYYY-MM')::text as mois,
+              p.famille::text,
+              SUM(t.ca)::numeric as ca
+            FROM transactions t
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.ca > 0 AND p.famille IS NOT NULL AND t.depot != 'WEB'
+            GROUP BY TO_CHAR(date, 'YYYY-MM'), p.famille
+            ORDER BY mois, p.famille
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/stores.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'stores_catchment_store',
+        'module': 'stores',
+        'sql': """
+            SELECT
+              c.cp::text as cp,
+              STRING_AGG(DISTINCT c.ville, ', ') as ville,
+              COUNT(DISTINCT t.carte)::int as nb_clients,
+              SUM(t.ca)::numeric as total_ca,
+              COUNT(*)::int as nb_transactions
+            FROM transactions t
+            INNER JOIN clients c ON t.carte_id = c.cle
+            WHERE t.depot = '32'
+              AND t.ca > 0
+              AND c.cp IS NOT NULL
+              AND c.cp != ''
+            GROUP BY c.cp
+            HAVING COUNT(DISTINCT t.carte) >= 10
+            ORDER BY SUM(t.ca) DESC
+        """,
+    },
+    {
+        'name': 'stores_catchment_all',
+        'module': 'stores',
+        'sql': """
+            SELECT
+              t.depot as store_code,
+              c.cp::text,
+              STRING_AGG(DISTINCT c.ville, ', ') as ville,
+              COUNT(DISTINCT t.carte)::int as nb_clients,
+              SUM(t.ca)::numeric as total_ca,
+              COUNT(*)::int as nb_transactions
+            FROM transactions t
+            INNER JOIN clients c ON t.carte_id = c.cle
+            WHERE t.ca > 0
+              AND c.cp IS NOT NULL
+              AND c.cp != ''
+              AND t.carte != '0'
+            GROUP BY t.depot, c.cp
+            HAVING COUNT(*) >= 10
+            ORDER BY t.depot, SUM(t.ca) DESC
+        """,
+    },
+    {
+        'name': 'stores_stats',
+        'module': 'stores',
+        'sql': """
+            SELECT
+              t.depot::text as code,
+              SUM(t.ca)::numeric as ca_total,
+              COUNT(DISTINCT t.carte)::int as nb_clients,
+              COUNT(DISTINCT CASE WHEN client_achats.nb_achats > 1 THEN t.carte END)::int as nb_clients_actifs,
+              COUNT(DISTINCT CASE WHEN client_achats.nb_achats >= 3 THEN t.carte END)::int as nb_clients_fideles,
+              COUNT(*)::int as nb_transactions,
+              (SUM(t.ca) / COUNT(DISTINCT t.facture))::numeric as panier_moyen
+            FROM transactions t
+            LEFT JOIN (
+              SELECT carte, COUNT(*) as nb_achats
+              FROM transactions
+              WHERE ca > 0 AND carte != '0'
+              GROUP BY carte
+            ) client_achats ON t.carte = client_achats.carte
+            WHERE t.ca > 0
+              AND t.depot IS NOT NULL
+              AND t.depot NOT LIKE 'D%'
+              AND t.carte != '0'
+            GROUP BY t.depot
+        """,
+    },
+    {
+        'name': 'stores_top_familles',
+        'module': 'stores',
+        'sql': """
+            WITH ranked_products AS (
+              SELECT
+                t.depot::text as code,
+                p.famille::text as famille,
+                SUM(t.ca)::numeric as ca,
+                COUNT(*)::int as volume,
+                ROW_NUMBER() OVER (PARTITION BY t.depot ORDER BY SUM(t.ca) DESC) as rang
+              FROM transactions t
+              INNER JOIN produits p ON t.produit_id = p.cle
+              WHERE t.ca > 0
+                AND t.depot IS NOT NULL
+                AND t.depot NOT LIKE 'D%'
+                AND p.famille IS NOT NULL
+              GROUP BY t.depot, p.famille
+            )
+            SELECT code, famille, ca, volume, rang
+            FROM ranked_products
+            WHERE rang <= 10
+            ORDER BY code, rang
+        """,
+    },
+    {
+        'name': 'stores_top_clients',
+        'module': 'stores',
+        'sql': """
+            WITH ranked_clients AS (
+              SELECT
+                t.depot::text as code_magasin,
+                t.carte::text as carte,
+                c.nom, c.prenom, c.sexe, c.ville, c.cp,
+                SUM(t.ca)::numeric as ca_client,
+                COUNT(*)::int as nb_achats_magasin,
+                MAX(t.date) as dernier_achat,
+                ROW_NUMBER() OVER (PARTITION BY t.depot ORDER BY SUM(t.ca) DESC) as rang
+              FROM transactions t
+              INNER JOIN clients c ON t.carte_id = c.cle
+              WHERE t.ca > 0
+                AND t.depot IS NOT NULL
+                AND t.depot NOT LIKE 'D%'
+                AND t.carte != '0'
+              GROUP BY t.depot, t.carte, c.nom, c.prenom, c.sexe, c.ville, c.cp
+            )
+            SELECT *
+            FROM ranked_clients
+            WHERE rang <= 10
+            ORDER BY code_magasin, rang
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/abc-analysis.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'abc_familles',
+        'module': 'abc',
+        'sql': """
+            SELECT
+              p.famille::text,
+              SUM(t.ca)::numeric as ca,
+              COUNT(*)::int as volume
+            FROM transactions t
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.ca > 0 AND p.famille IS NOT NULL
+            GROUP BY p.famille
+            ORDER BY SUM(t.ca) DESC
+        """,
+    },
+    {
+        'name': 'abc_sous_familles',
+        'module': 'abc',
+        'sql': """
+            SELECT
+              p.famille::text,
+              COALESCE(p.sous_famille, 'Non classé')::text as sous_famille,
+              SUM(t.ca)::numeric as ca,
+              COUNT(*)::int as volume
+            FROM transactions t
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.ca > 0 AND p.famille IS NOT NULL
+            GROUP BY p.famille, p.sous_famille
+            ORDER BY SUM(t.ca) DESC
+        """,
+    },
+    {
+        'name': 'abc_produits',
+        'module': 'abc',
+        'sql': """
+            SELECT
+              t.produit::text,
+              p.famille::text,
+              SUM(t.ca)::numeric as ca,
+              COUNT(*)::int as volume
+            FROM transactions t
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.ca > 0 AND p.famille IS NOT NULL
+            GROUP BY t.produit, p.famille
+            ORDER BY SUM(t.ca) DESC
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/sub-families.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'sub_families',
+        'module': 'sub_families',
+        'sql': """
+            SELECT
+              COALESCE(p.famille, 'Non classé')::text as famille,
+              COALESCE(p.sous_famille, 'Non classé')::text as sous_famille,
+              SUM(t.ca)::numeric as ca,
+              COUNT(*)::int as volume,
+              COUNT(DISTINCT t.facture)::int as nb_tickets
+            FROM transactions t
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.ca > 0
+            GROUP BY p.famille, p.sous_famille
+            ORDER BY SUM(t.ca) DESC
+        """,
+    },
+    {
+        # Cumuls précalculés (scripts/decor/hierarchy.py)
+        'name': 'sub_families_rollup',
+        'module': 'sub_families',
+        'sql': """
+            SELECT
+              n.id, n.famille, n.sous_famille,
+              SUM(r.ca)::float as ca,
+              SUM(r.volume)::int as volume,
+              SUM(r.nb_tickets)::int as nb_tickets
+            FROM hierarchy_nodes n
+            JOIN hierarchy_rollup r ON r.node_id = n.id
+            WHERE n.niveau = 2
+            GROUP BY n.id
+            ORDER BY SUM(r.ca) DESC
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/marketing.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'marketing_mensuel',
+        'module': 'marketing',
+        'sql': """
+            SELECT
+              TO_CHAR(t.date, 'YYYY-MM') as month,
+              SUM(t.ca)::float as ca,
+              COUNT(DISTINCT t.facture)::int as volume,
+              COUNT(DISTINCT t.carte)::int as clients
+            FROM transactions t
+            WHERE t.depot != 'WEB' AND t.carte != '0'
+            GROUP BY TO_CHAR(t.date, 'YYYY-MM')
+            ORDER BY month DESC
+        """,
+    },
+    # ------------------------------------------------------------------
+    # api/search.js
+    # ------------------------------------------------------------------
+    {
+        'name': 'search_ticket',
+        'module': 'search',
+        'sql': """
+            SELECT
+              t.facture::text, t.date::text, t.carte::text, c.ville::text,
+              t.depot::text, t.produit::text, p.famille::text,
+              t.ca::numeric, t.quantite::numeric
+            FROM transactions t
+            LEFT JOIN clients c ON t.carte_id = c.cle
+            LEFT JOIN produits p ON t.produit_id = p.cle
+            WHERE t.facture ILIKE '%1234%'
+            ORDER BY t.date DESC
+            LIMIT 100
+        """,
+    },
+    # ------------------------------------------------------------------
+    # Table tickets (scripts/decor/tickets.py) : mêmes indicateurs que
+    # dashboard_kpis / dashboard_top_magasins (mêmes lignes retenues, tickets
+    # comptés en factures distinctes), lus sur une ligne par ticket
+    # ------------------------------------------------------------------
+    {
+        'name': 'tickets_kpis',
+        'module': 'tickets',
+        'sql': """
+            SELECT
+              COUNT(DISTINCT facture)::int as total_tickets,
+              SUM(ca_positif)::float as total_ca,
+              (SUM(ca_positif) / COUNT(DISTINCT facture))::float as panier_moyen,
+              (SUM(lignes_positives) * 1.0 / COUNT(DISTINCT facture))::float as lignes_par_ticket
+            FROM tickets
+            WHERE depot NOT IN ('1', '41', '42') AND lignes_positives > 0
+        """,
+    },
+    {
+        'name': 'tickets_top_magasins',
+        'module': 'tickets',
+        'sql': """
+            SELECT
+              m.code, m.nom, m.zone,
+              SUM(t.ca) as ca,
+              SUM(t.quantite) as volume,
+              COUNT(DISTINCT t.facture) as nb_tickets,
+              SUM(t.ca) / SUM(t.nb_lignes) as panier_moyen
+            FROM tickets t
+            JOIN magasins m ON t.depot = m.code
+            GROUP BY m.code, m.nom, m.zone
+            ORDER BY ca DESC
+            LIMIT 5
+        """,
+    },
+]
+
+
+def select_queries(modules=None, names=None):
+    """Filtrer le catalogue par module (rfm, stores...) ou par nom de requête"""
+    selected = QUERIES
+    if modules:
+        selected = [q for q in selected if q['module'] in modules]
+    if names:
+        selected = [q for q in selected if q['name'] in names]
+    return selected
+
+
+def list_modules():
+    """Modules couverts, dans l'ordre du catalogue"""
+    modules = []
+    for query in QUERIES:
+        if query['module'] not in modules:
+            modules.append(query['module'])
+    return modules
@@ -0,0 +1,162 @@
+"""
+Rapprochement fichier source / base par jour et par dépôt
+---------------------------------------------------------
+analyse-ecart-novembre.py, compare-filtres-novembre.py et
+verif-correspondance-caisses.py cherchent les écarts de CA entre
+l'extraction et la base à coups de requêtes ad hoc. Ici chaque côté est lu
+une seule fois :
+
+- fichier : lignevente.csv en flux (decor.sage.iter_lignevente, mêmes règles
+  qu'à l'import), regroupé en mémoire par (jour, dépôt) ;
+- base : une requête GROUP BY jour, dépôt sur `transactions`.
+
+Les deux tables de totaux (lignes, tickets, CA, quantité) sont comparées
+cellule par cellule et seules les cellules en écart sont rapportées ; les
+totaux par mois se déduisent des mêmes tables, sans autre lecture.
+
+    python scripts/reconcile-extract.py /chemin/extraction --since 2025-11 --until 2025-11
+"""
+import json
+from datetime import datetime
+
+from decor.env import DATA_DIR
+from decor.sage import iter_lignevente
+
+REPORTS_DIR = DATA_DIR / 'reconciliation-reports'
+
+METRICS = ('lignes', 'tickets', 'ca', 'quantite')
+
+# Écart toléré par indicateur (arrondis flottants) ; les comptages doivent être exacts
+TOLERANCES = {'lignes': 0, 'tickets': 0, 'ca': 0.01, 'quantite': 0.001}
+
+DB_SQL = """
+    SELECT date::date AS jour, depot, COUNT(*), COUNT(DISTINCT facture), SUM(ca), SUM(quantite)
+    FROM transactions
+    WHERE TRUE {where}
+    GROUP BY 1, 2
+"""
+
+
+def csv_totals(path, since=None, until=None):
+    """
+    {(jour 'AAAA-MM-JJ', dépôt): [lignes, tickets, ca, quantite]} en un
+    parcours du fichier ; CA = quantité × prix comme à l'import.
+    """
+    cells, factures = {}, {}
+    for facture, _, depot, day, _, _, quantite, prix, _ in iter_lignevente(path):
+        if (since and day < since) or (until and day >= until):
+            continue
+        key = (day, depot)
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = [0, 0, 0.0, 0.0]
+            factures[key] = set()
+        cell[0] += 1
+        cell[2] += quantite * prix
+        cell[3] += quantite
+        factures[key].add(facture)
+    for key, cell in cells.items():
+        cell[1] = len(factures[key])
+    return cells
+
+
+def db_totals(cur, since=None, until=None):
+    """Mêmes totaux depuis `transactions`, en une requête groupée"""
+    where, params = '', []
+    if since:
+        where += ' AND date >= %s'
+        params.append(since)
+    if until:
+        where += ' AND date < %s'
+        params.append(until)
+    cur.execute(DB_SQL.format(where=where), params)
+    return {(str(day), depot): [int(lines), int(tickets), float(ca or 0), float(quantite or 0)]
+            for day, depot, lines, tickets, ca, quantite in cur.fetchall()}
+
+
+def diff(source, database, tolerances=TOLERANCES, label='jour'):
+    """
+    Cellules en écart, triées par période puis dépôt :
+    [{<label>, depot, indicateur, fichier, base, ecart}] (une cellule
+    absente d'un côté vaut 0 ; `label` = 'mois' pour les cumuls de by_month).
+    """
+    empty = [0, 0, 0.0, 0.0]
+    gaps = []
+    for key in sorted(source.keys() | database.keys()):
+        left, right = source.get(key, empty), database.get(key, empty)
+        for position, metric in enumerate(METRICS):
+            gap = right[position] - left[position]
+            if abs(gap) > tolerances[metric] + 1e-9:
+                gaps.append({
+                    label: key[0],
+                    'depot': key[1],
+                    'indicateur': metric,
+                    'fichier': left[position],
+                    'base': right[position],
+                    'ecart': gap,
+                })
+    return gaps
+
+
+def by_month(cells):
+    """Cumul mensuel {(mois 'AAAA-MM', dépôt): [lignes, tickets, ca, quantite]}"""
+    months = {}
+    for (day, depot), cell in cells.items():
+        total = months.setdefault((day[:7], depot), [0, 0, 0.0, 0.0])
+        for position, value in enumerate(cell):
+            total[position] += value
+    return months
+
+
+def totals(cells):
+    """[lignes, tickets, ca, quantite] sur toutes les cellules"""
+    result = [0, 0, 0.0, 0.0]
+    for cell in cells.values():
+        for position, value in enumerate(cell):
+            result[position] += value
+    return result
+
+
+def write_report(gaps, month_gaps, summary, meta, output_dir=REPORTS_DIR, top=200):
+    """Rapports JSON (complet) et Markdown (les `top` premiers écarts journaliers) ; renvoie le chemin Markdown"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    started_at = datetime.now()
+    base = output_dir / f"rapprochement-{started_at:%Y%m%d-%H%M%S}"
+
+    with open(base.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        json.dump({**meta, 'generated_at': started_at.isoformat(timespec='seconds'), 'totaux': summary,
+                   'ecarts_mois': month_gaps, 'ecarts_jour': gaps}, f, indent=2, ensure_ascii=False)
+
+    lines = [
+        "# Rapprochement fichier / base",
+        '',
+        f"- Fichier : {meta['fichier']}",
+        f"- Base : {meta['base']}",
+        f"- Période : {meta['debut'] or 'début'} → {meta['fin'] or 'fin'}",
+        f"- Cellules (jour × dépôt) : {meta['cellules_fichier']:,} fichier, {meta['cellules_base']:,} base",
+        f"- Écarts : {len(month_gaps)} (mois × dépôt), {len(gaps)} (jour × dépôt)",
+        '',
+        '| Indicateur | Fichier | Base | Écart |',
+        '|------------|---------|------|-------|',
+    ]
+    for metric in METRICS:
+        left, right = summary['fichier'][metric], summary['base'][metric]
+        lines.append(f"| {metric} | {left:,.2f} | {right:,.2f} | {right - left:+,.2f} |")
+
+    for title, rows, period in (('Écarts par mois', month_gaps, 'mois'), ('Écarts par jour', gaps, 'jour')):
+        lines += ['', f"## {title}", '']
+        if not rows:
+            lines.append("Aucun écart.")
+            continue
+        lines += [f"| {period.capitalize()} | Dépôt | Indicateur | Fichier | Base | Écart |",
+                  '|------|-------|------------|---------|------|-------|']
+        for gap in rows[:top]:
+            lines.append(f"| {gap[period]} | {gap['depot']} | {gap['indicateur']} "
+                         f"| {gap['fichier']:,.2f} | {gap['base']:,.2f} | {gap['ecart']:+,.2f} |")
+        if len(rows) > top:
+            lines += ['', f"… {len(rows) - top} autres dans {base.with_suffix('.json').name}"]
+
+    md_path = base.with_suffix('.md')
+    with open(md_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return md_path
@@ -0,0 +1,153 @@
+"""
+Formats des extractions Sage (lignevente, fichier client, produits, points de vente)
+------------------------------------------------------------------------------------
+Référence unique des noms de fichiers, en-têtes et conventions de format
+décrits dans IMPORT_FEVRIER_2026.md : ISO-8859-1, séparateur `;`,
+décimales à virgule, dates facture en AAAA-MM-JJ.
+`iter_lignevente` relit un fichier de lignes de vente sans pandas.
+"""
+from pathlib import Path
+
+from decor.depots import canonical_depot
+
+ENCODING = 'ISO-8859-1'
+SEPARATOR = ';'
+
+LIGNEVENTE_FILE = 'lignevente.csv'
+CLIENT_FILE_PATTERN = 'Fichier_client*.csv'
+PRODUITS_FILE = 'produits.csv'
+POINTS_DE_VENTE_FILE = 'Points de vente.csv'
+# Les imports existants lisent "Points de vente.csv" en UTF-8
+POINTS_DE_VENTE_ENCODING = 'utf-8'
+
+LIGNEVENTE_COLUMNS = [
+    'N° Carte fidélité',
+    'N° Facture client',
+    'Dépôt',
+    'Date facture',
+    'Heure mouvement',
+    'N° Produit',
+    'Quantité unitaire',
+    'Prix vente net en devise société',
+    'Mt T.T.C',
+]
+
+# 17 colonnes réelles (la colonne "Adresse" est dupliquée dans l'extraction)
+CLIENT_COLUMNS = [
+    'N° Carte fidélité',
+    'Nom correspondant',
+    'Prénom correspondant',
+    'Date création',
+    'Statut',
+    'Date validité',
+    'Civilité',
+    'Date de naissance',
+    'Sexe',
+    'Nom adresse',
+    'N° Téléphone',
+    'Adresse électronique',
+    'N° adresse',
+    'Adresse',
+    'Adresse',
+    'C.P',
+    'Ville',
+]
+
+PRODUIT_COLUMNS = [
+    'N° Produit',
+    'Désignation produit',
+    'Désignation produit',
+    'Référence interne',
+    'Libellé Famille',
+    'Libellé Sous-famille',
+    'Libellé Sous-sous-famille',
+    'Libellé SS/Famille',
+    'Produit web',
+]
+
+POINTS_DE_VENTE_COLUMNS = [
+    'Zones magasin',
+    'N° Dépôt',
+    'Intitulé dépôt',
+    'Adresse 1',
+    'Adresse 2',
+    'Adresse 3',
+    'C.P',
+    'Ville',
+]
+
+# Carte fidélité des ventes sans client identifié
+CARTE_ANONYME = '0'
+
+
+def format_decimal(value, decimals=2):
+    """12.5 → '12,50' (format Sage)"""
+    return f"{value:.{decimals}f}".replace('.', ',')
+
+
+def parse_decimal(text):
+    """'12,50' → 12.5 ; None si vide ou illisible"""
+    if text is None:
+        return None
+    text = str(text).strip().replace(' ', '').replace(',', '.')
+    if not text:
+        return None
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def find_client_file(data_dir):
+    """Fichier client d'une extraction (le nom contient la date d'export)"""
+    matches = sorted(Path(data_dir).glob(CLIENT_FILE_PATTERN))
+    return matches[-1] if matches else None
+
+
+def parse_date(text):
+    """'2025-11-03' ou '03/11/2025' → '2025-11-03' ; None si illisible"""
+    text = (text or '').strip()
+    if len(text) >= 10 and text[4] == '-' and text[7] == '-':
+        return text[:10]
+    if len(text) >= 10 and text[2] == '/' and text[5] == '/':
+        return f"{text[6:10]}-{text[3:5]}-{text[0:2]}"
+    return None
+
+
+def iter_lignevente(path):
+    """
+    Lignes de vente d'un fichier lignevente.csv, dans l'ordre des colonnes :
+    (facture, carte, depot, date 'AAAA-MM-JJ', heure, produit, quantite, prix, montant_ttc)
+
+    Mêmes règles que scripts/import-new-data-feb2026.py : facture obligatoire,
+    carte/dépôt/produit vides → '0', dépôt canonisé ('M32' → '32'),
+    date illisible → ligne ignorée.
+    """
+    import csv
+
+    with open(path, 'r', encoding=ENCODING, newline='') as f:
+        reader = csv.reader(f, delimiter=SEPARATOR)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 6:
+                continue
+            facture = row[1].strip()
+            date = parse_date(row[3])
+            if not facture or date is None:
+                continue
+            quantite = parse_decimal(row[6]) if len(row) > 6 else None
+            prix = parse_decimal(row[7]) if len(row) > 7 else None
+            quantite = quantite or 0.0
+            prix = prix or 0.0
+            ttc = (parse_decimal(row[8]) or 0.0) if len(row) > 8 else quantite * prix
+            yield (
+                facture,
+                row[0].strip() or CARTE_ANONYME,
+                canonical_depot(row[2]),
+                date,
+                int(parse_decimal(row[4]) or 0),
+                row[5].strip() or '0',
+                quantite,
+                prix,
+                ttc,
+            )
@@ -0,0 +1,320 @@
+"""
+Partitionnement mensuel de la table transactions
+------------------------------------------------
+`transactions` devient une table partitionnée par plage sur `date`
+(une partition `transactions_AAAA_MM` par mois + `transactions_default`
+pour les dates hors plage). Les requêtes filtrées sur la date ne lisent
+que les mois concernés, et un mois peut être détaché ou rechargé seul.
+
+Opérations exposées par scripts/apply-migration.py :
+    partition            conversion de la table existante (une seule fois)
+    partitions           liste des partitions (lignes estimées, taille)
+    ensure 2026-03       création des partitions manquantes (+ mois suivant)
+    detach / attach      retirer / rattacher un mois
+    reload 2025-11 FILE  recharger un mois depuis un lignevente.csv
+
+Les imports appellent `ensure_partitions` avant d'insérer : le mois suivant
+est toujours créé à l'avance. Sur une base non partitionnée, ces fonctions
+ne font rien. Le rechargement complet (update-weekly.py) recrée la table
+partitionnée avec `create_partitioned`.
+"""
+from datetime import date, datetime
+
+from decor import version
+from decor.db import transaction
+from decor.dimensions import fill_keys, has_keys
+
+PARENT = 'transactions'
+DEFAULT_PARTITION = f'{PARENT}_default'
+
+# Définition complète (prisma/schema.prisma, modèle Transaction) pour une table recréée ;
+# la clé de partitionnement fait partie de la clé primaire
+TRANSACTIONS_DEFINITION = """
+    id SERIAL,
+    facture TEXT NOT NULL,
+    carte TEXT,
+    depot TEXT,
+    date TIMESTAMP(3) NOT NULL,
+    heure INTEGER,
+    produit TEXT,
+    quantite DOUBLE PRECISION,
+    prix DOUBLE PRECISION,
+    montant_ttc DOUBLE PRECISION,
+    ca DOUBLE PRECISION,
+    is_web BOOLEAN NOT NULL DEFAULT FALSE,
+    ville TEXT,
+    cp TEXT,
+    PRIMARY KEY (id, date)
+"""
+
+# Colonnes alimentées par les imports (id et séquence gérés par la base)
+TRANSACTION_COLUMNS = [
+    'facture', 'carte', 'depot', 'date', 'heure', 'produit',
+    'quantite', 'prix', 'montant_ttc', 'ca', 'is_web', 'ville', 'cp',
+]
+
+
+def parse_month(value):
+    """'2025-11', date ou datetime → premier jour du mois"""
+    if isinstance(value, (date, datetime)):
+        return date(value.year, value.month, 1)
+    year, month = str(value).strip()[:7].split('-')
+    return date(int(year), int(month), 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start, end):
+    """Mois de `start` à `end` inclus"""
+    month, end = parse_month(start), parse_month(end)
+    while month <= end:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(month):
+    return f"{PARENT}_{parse_month(month):%Y_%m}"
+
+
+def month_bounds(month):
+    start = parse_month(month)
+    return start, add_months(start, 1)
+
+
+def _bounds_clause(month):
+    start, end = month_bounds(month)
+    return f"FOR VALUES FROM ('{start}') TO ('{end}')"
+
+
+def table_exists(cur, name):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f'public.{name}',))
+    return cur.fetchone()[0]
+
+
+def is_partitioned(cur, table=PARENT):
+    cur.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s AND c.relnamespace = 'public'::regnamespace
+        )
+    """, (table,))
+    return cur.fetchone()[0]
+
+
+def list_partitions(cur):
+    """(nom, bornes, lignes estimées, taille en octets) de chaque partition"""
+    cur.execute(f"""
+        SELECT
+            c.relname,
+            pg_get_expr(c.relpartbound, c.oid),
+            GREATEST(c.reltuples, 0)::bigint,
+            pg_total_relation_size(c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'public.{PARENT}'::regclass
+        ORDER BY c.relname
+    """)
+    return cur.fetchall()
+
+
+def create_month_partition(cur, month):
+    """
+    Créer la partition d'un mois ; renvoie False si elle existe déjà.
+    Les lignes du mois tombées dans la partition par défaut y sont déplacées.
+    """
+    name = partition_name(month)
+    if table_exists(cur, name):
+        return False
+
+    start, end = month_bounds(month)
+    orphans = False
+    if table_exists(cur, DEFAULT_PARTITION):
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s)",
+                    (start, end))
+        orphans = cur.fetchone()[0]
+
+    if not orphans:
+        cur.execute(f"CREATE TABLE {name} PARTITION OF {PARENT} {_bounds_clause(month)}")
+        return True
+
+    cur.execute(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)")
+    cur.execute(f"ALTER TABLE {name} ADD CONSTRAINT {name}_date_check CHECK (date >= %s AND date < %s)",
+                (start, end))
+    cur.execute(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """, (start, end))
+    cur.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} {_bounds_clause(month)}")
+    return True
+
+
+def create_partitioned(cur, first, last=None, ahead=1):
+    """
+    Créer `transactions` directement partitionnée (rechargement complet) :
+    TRANSACTIONS_DEFINITION, une partition par mois de `first` à `last` (au
+    moins le mois courant, + `ahead` mois d'avance) et la partition par défaut.
+    Renvoie les mois créés.
+    """
+    cur.execute(f"CREATE TABLE {PARENT} ({TRANSACTIONS_DEFINITION}) PARTITION BY RANGE (date)")
+    today = parse_month(date.today())
+    last = max(parse_month(last or first), today)
+    months = [m for m in month_range(first, add_months(last, ahead)) if create_month_partition(cur, m)]
+    cur.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT")
+    return months
+
+
+def ensure_partitions(cur, start, end=None, ahead=1):
+    """
+    Partitions de `start` à `end` (+ `ahead` mois d'avance).
+    Renvoie les mois créés ; liste vide si la table n'est pas partitionnée.
+    """
+    if not is_partitioned(cur):
+        return []
+    last = add_months(parse_month(end or start), ahead)
+    return [month for month in month_range(start, last) if create_month_partition(cur, month)]
+
+
+def detach_month(cur, month, drop=False):
+    """Retirer un mois de la table (la partition reste une table autonome, sauf drop)"""
+    name = partition_name(month)
+    cur.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+    if drop:
+        cur.execute(f"DROP TABLE {name}")
+    version.bump(cur)
+    return name
+
+
+def attach_month(cur, month, table=None):
+    """Rattacher une table (par défaut la partition détachée du mois)"""
+    name = table or partition_name(month)
+    start, end = month_bounds(month)
+    # La contrainte CHECK évite à ATTACH de parcourir toute la table
+    cur.execute(f"ALTER TABLE {name} DROP CONSTRAINT IF EXISTS {name}_date_check")
+    cur.execute(f"ALTER TABLE {name} ADD CONSTRAINT {name}_date_check CHECK (date >= %s AND date < %s)",
+                (start, end))
+    cur.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} {_bounds_clause(month)}")
+    version.bump(cur)
+    return name
+
+
+def reload_month(conn, month, lignes, batch_size=5000, log=print):
+    """
+    Recharger un mois depuis des lignes `sage.iter_lignevente` : chargement
+    dans une table de travail, puis échange avec la partition en une
+    transaction (les lectures ne voient jamais un mois à moitié chargé).
+    """
+    from psycopg2.extras import execute_values
+
+    name = partition_name(month)
+    staging = f"{name}_reload"
+    start, end = month_bounds(month)
+    start_text, end_text = start.isoformat(), end.isoformat()
+
+    with transaction(conn) as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {staging}")
+        cur.execute(f"CREATE TABLE {staging} (LIKE {PARENT} INCLUDING DEFAULTS)")
+
+    loaded = 0
+    batch = []
+    columns = ', '.join(TRANSACTION_COLUMNS)
+    for facture, carte, depot, jour, heure, produit, quantite, prix, ttc in lignes:
+        if not start_text <= jour < end_text:
+            continue
+        batch.append((facture, carte, depot, jour, heure, produit,
+                      quantite, prix, ttc, quantite * prix, False, None, None))
+        if len(batch) >= batch_size:
+            with transaction(conn) as cur:
+                execute_values(cur, f"INSERT INTO {staging} ({columns}) VALUES %s", batch)
+            loaded += len(batch)
+            batch = []
+    if batch:
+        with transaction(conn) as cur:
+            execute_values(cur, f"INSERT INTO {staging} ({columns}) VALUES %s", batch)
+        loaded += len(batch)
+    log(f"   📥 {loaded:,} lignes chargées dans {staging}")
+
+    with transaction(conn) as cur:
+        if has_keys(cur, staging):
+            fill_keys(cur, staging)
+        if table_exists(cur, name):
+            cur.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+            cur.execute(f"DROP TABLE {name}")
+        cur.execute(f"ALTER TABLE {staging} RENAME TO {name}")
+        attach_month(cur, month)  # nouvelle version des données dans la même transaction
+    return loaded
+
+
+def convert_to_partitioned(conn, drop_old=False, log=print):
+    """
+    Convertir la table plate `transactions` en table partitionnée par mois.
+    Tout se fait dans une transaction ; l'ancienne table est conservée sous
+    le nom `transactions_flat` (sauf drop_old) pour vérification.
+    """
+    with transaction(conn) as cur:
+        if is_partitioned(cur):
+            log("ℹ️  transactions est déjà partitionnée")
+            return False
+
+        cur.execute(f"SELECT MIN(date), MAX(date), COUNT(*) FROM {PARENT}")
+        date_min, date_max, nb_lignes = cur.fetchone()
+        cur.execute("SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = 'public' AND tablename = %s",
+                    (PARENT,))
+        indexes = cur.fetchall()
+        cur.execute(f"""
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint WHERE conrelid = 'public.{PARENT}'::regclass AND contype IN ('p', 'f')
+        """)
+        constraints = cur.fetchall()
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (PARENT,))
+        sequence = cur.fetchone()[0]
+
+        # Noms d'index libérés pour la nouvelle table
+        for index_name, _ in indexes:
+            cur.execute(f'ALTER INDEX "{index_name}" RENAME TO "{index_name[:58]}_flat"')
+        cur.execute(f"ALTER TABLE {PARENT} RENAME TO {PARENT}_flat")
+
+        cur.execute(f"CREATE TABLE {PARENT} (LIKE {PARENT}_flat INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+        pk_name = next((name for name, kind, _ in constraints if kind == 'p'), f'{PARENT}_pkey')
+        # La clé de partitionnement doit faire partie de la clé primaire
+        cur.execute(f"ALTER TABLE {PARENT} ADD CONSTRAINT {pk_name} PRIMARY KEY (id, date)")
+        for name, kind, definition in constraints:
+            if kind == 'f':
+                cur.execute(f"ALTER TABLE {PARENT} ADD CONSTRAINT {name} {definition}")
+        for index_name, definition in indexes:
+            if index_name == pk_name:
+                continue
+            if definition.startswith('CREATE UNIQUE'):
+                log(f"   ⚠️  Index unique {index_name} non recréé (doit inclure date)")
+                continue
+            cur.execute(definition)
+        log(f"   🏗️  Table partitionnée créée ({len(indexes)} index, {len(constraints)} contraintes)")
+
+        today = date.today()
+        first = parse_month(date_min or today)
+        last = max(parse_month(date_max or today), parse_month(today))
+        months = [m for m in month_range(first, add_months(last, 1)) if create_month_partition(cur, m)]
+        cur.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT")
+        log(f"   📅 {len(months)} partitions mensuelles ({months[0]:%Y-%m} → {months[-1]:%Y-%m}) + défaut")
+
+        cur.execute(f"INSERT INTO {PARENT} SELECT * FROM {PARENT}_flat")
+        log(f"   📥 {cur.rowcount:,} lignes copiées (sur {nb_lignes:,})")
+        if cur.rowcount != nb_lignes:
+            raise RuntimeError("Nombre de lignes copiées différent : conversion annulée")
+
+        if sequence:
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT}.id")
+        if drop_old:
+            cur.execute(f"DROP TABLE {PARENT}_flat")
+            log("   🗑️  Ancienne table supprimée")
+        else:
+            log(f"   💾 Ancienne table conservée : {PARENT}_flat")
+
+    with transaction(conn) as cur:
+        cur.execute(f"ANALYZE {PARENT}")
+    return True
@@ -0,0 +1,257 @@
+"""
+Index de recherche (tickets, clients, produits)
+-----------------------------------------------
+api/search.js cherche avec `ILIKE '%...%'` dans `transactions` : chaque
+frappe parcourt la table de faits. Ici la recherche porte sur les tables
+d'une ligne par objet (clients, produits, tickets) et sur des index créés
+par la migration :
+
+- `recherche_normalise(text)` : minuscules sans accents, fonction SQL
+  IMMUTABLE utilisée à la fois par les index et par les requêtes ;
+- un index B-tree `text_pattern_ops` par champ pour les préfixes
+  (« dup » → DUPONT, « 10004 » → carte 1000412...) ;
+- si l'extension `pg_trgm` est disponible, un index GIN trigrammes par champ
+  pour les sous-chaînes (« gmail », « rideau »), à partir de 3 caractères.
+
+Champs : carte, nom + prénom, email (clients) ; code, désignation,
+référence interne (produits) ; facture (tickets, decor.tickets). PostgreSQL
+tient les index à jour à chaque insertion : les imports n'ont rien à faire.
+
+La migration recopie aussi les champs indexés dans `recherche_champs`
+(type, table, colonnes, filtre, expressions) : api/search.js construit ses
+requêtes depuis cette table plutôt que de répéter KINDS.
+
+    python scripts/apply-migration.py recherche
+    python scripts/search-index.py "dupont ma"
+    python scripts/search-index.py --bench          # frappe simulée, p50 / p95
+"""
+from decor.db import transaction
+from decor.schema import table_exists
+
+FUNCTION = 'recherche_normalise'
+
+# Champs indexés par type, lus par api/search.js
+FIELDS_TABLE = 'recherche_champs'
+
+# Objectif de la recherche à la frappe
+TARGET_MS = 50
+
+# Longueur minimale d'une recherche par sous-chaîne (taille d'un trigramme)
+MIN_SUBSTRING = 3
+
+_ACCENTS = ('ÀÁÂÃÄÅÇÈÉÊËÌÍÎÏÑÒÓÔÕÖÙÚÛÜÝŸàáâãäåçèéêëìíîïñòóôõöùúûüýÿ',
+            'AAAAAACEEEEIIIINOOOOOUUUUYYaaaaaaceeeeiiiinooooouuuuyy')
+
+FUNCTION_SQL = f"""
+    CREATE OR REPLACE FUNCTION {FUNCTION}(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT lower(translate($1, '{_ACCENTS[0]}', '{_ACCENTS[1]}')) $$
+"""
+
+# Type de recherche → table, colonnes renvoyées, filtre, champs indexés (par priorité) {libellé: (expression, colonnes)}
+KINDS = {
+    'client': {
+        'table': 'clients',
+        'columns': ('carte', 'nom', 'prenom', 'email', 'ville'),
+        'where': "carte <> '0'",
+        'fields': {
+            'carte': ("carte", ('carte',)),
+            'nom': ("coalesce(nom, '') || ' ' || coalesce(prenom, '')", ('nom', 'prenom')),
+            'email': ("email", ('email',)),
+        },
+    },
+    'produit': {
+        'table': 'produits',
+        'columns': ('id', 'nom', 'reference_interne', 'famille'),
+        'where': "TRUE",
+        'fields': {
+            'code': ("id", ('id',)),
+            'nom': ("nom", ('nom',)),
+            'reference': ("reference_interne", ('reference_interne',)),
+        },
+    },
+    'ticket': {
+        'table': 'tickets',
+        'columns': ('facture', 'date', 'depot', 'carte', 'ca'),
+        'where': "TRUE",
+        'fields': {
+            'facture': ("facture", ('facture',)),
+        },
+    },
+}
+
+
+def like_escape(text):
+    """Échapper les jokers LIKE d'une saisie utilisateur"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def has_function(cur):
+    cur.execute("SELECT to_regprocedure(%s) IS NOT NULL", (f"{FUNCTION}(text)",))
+    return cur.fetchone()[0]
+
+
+def has_trigram(cur):
+    cur.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+    return cur.fetchone()[0]
+
+
+def table_columns(cur, table):
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s
+    """, (table,))
+    return {row[0] for row in cur.fetchall()}
+
+
+def available(cur):
+    """
+    {type: {'fields': [(libellé, expression)], 'columns': [expression SELECT]}}
+    pour les tables présentes ; champs aux colonnes absentes ignorés, colonnes
+    renvoyées absentes remplacées par NULL (bases antérieures à la migration
+    `colonnes`).
+    """
+    result = {}
+    for kind, spec in KINDS.items():
+        if not table_exists(cur, spec['table']):
+            continue
+        present = table_columns(cur, spec['table'])
+        fields = [(label, expression) for label, (expression, columns) in spec['fields'].items()
+                  if set(columns) <= present]
+        if fields:
+            columns = [column if column in present else f"NULL AS {column}" for column in spec['columns']]
+            result[kind] = {'fields': fields, 'columns': columns}
+    return result
+
+
+def save_fields(cur, kinds):
+    """Recopier `available()` dans FIELDS_TABLE : seuls les champs indexés, colonnes présentes"""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {FIELDS_TABLE} (
+            type TEXT PRIMARY KEY,
+            nom_table TEXT NOT NULL,
+            colonnes TEXT[] NOT NULL,
+            filtre TEXT NOT NULL,
+            champs TEXT[] NOT NULL
+        )
+    """)
+    cur.execute(f"TRUNCATE {FIELDS_TABLE}")
+    for kind, found in kinds.items():
+        spec = KINDS[kind]
+        cur.execute(f"INSERT INTO {FIELDS_TABLE} VALUES (%s, %s, %s, %s, %s)",
+                    (kind, spec['table'], found['columns'], spec['where'],
+                     [expression for _, expression in found['fields']]))
+
+
+def index_statements(table, label, expression, trigram):
+    statements = [f"CREATE INDEX IF NOT EXISTS idx_{table}_prefixe_{label} "
+                  f"ON {table} ({FUNCTION}({expression}) text_pattern_ops)"]
+    if trigram:
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_{table}_trgm_{label} "
+                          f"ON {table} USING gin ({FUNCTION}({expression}) gin_trgm_ops)")
+    return statements
+
+
+def migrate(conn, log=print):
+    """Fonction de normalisation, extension pg_trgm si possible, index par champ"""
+    with transaction(conn) as cur:
+        cur.execute(FUNCTION_SQL)
+        cur.execute("SAVEPOINT trigrammes")
+        try:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cur.execute("RELEASE SAVEPOINT trigrammes")
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT trigrammes")
+            log(f"   ⚠️  pg_trgm indisponible ({str(e).strip().splitlines()[0]}) : index de préfixe seulement")
+        trigram = has_trigram(cur)
+
+        kinds = available(cur)
+        for kind, spec in KINDS.items():
+            if kind not in kinds:
+                log(f"   ⚠️  {spec['table']} absente : recherche '{kind}' non indexée")
+                continue
+            fields = kinds[kind]['fields']
+            for label, expression in fields:
+                for sql in index_statements(spec['table'], label, expression, trigram):
+                    cur.execute(sql)
+            missing = [label for label in spec['fields'] if label not in dict(fields)]
+            detail = f" (colonnes absentes : {', '.join(missing)})" if missing else ''
+            log(f"   🔎 {spec['table']} : {', '.join(label for label, _ in fields)}{detail}")
+        save_fields(cur, kinds)
+    with transaction(conn) as cur:
+        for kind in kinds:
+            cur.execute(f"ANALYZE {KINDS[kind]['table']}")
+    return trigram
+
+
+def search_sql(kind, fields, columns, substring):
+    """
+    Une sous-requête par champ, chacune servie par son index : les préfixes
+    lus dans l'ordre de l'index B-tree (`USING ~<~`, l'ordre de
+    text_pattern_ops) et arrêtés à `limit`, les sous-chaînes par l'index
+    trigrammes. Un préfixe court (« m ») ne trie donc pas toutes ses lignes.
+    """
+    spec = KINDS[kind]
+    selected = ', '.join(columns)
+    branches = []
+    for rank, (_, expression) in enumerate(fields):
+        key = f"{FUNCTION}({expression})"
+        branches.append(f"""
+            (SELECT {selected}, {rank} AS rang, {key} AS cle_recherche
+             FROM {spec['table']}
+             WHERE {spec['where']} AND {key} LIKE {FUNCTION}(%(query)s) || '%%'
+             ORDER BY {key} USING ~<~
+             LIMIT %(limit)s)""")
+        if substring:
+            branches.append(f"""
+            (SELECT {selected}, {len(fields) + rank} AS rang, {key} AS cle_recherche
+             FROM {spec['table']}
+             WHERE {spec['where']} AND {key} LIKE '%%' || {FUNCTION}(%(query)s) || '%%'
+             LIMIT %(limit)s)""")
+    names = ', '.join(column.split()[-1] for column in columns)
+    return f"""
+        SELECT {names}
+        FROM ({' UNION ALL '.join(branches)}) s
+        ORDER BY rang, cle_recherche USING ~<~
+    """
+
+
+def search(cur, kind, query, limit=10, kinds=None, trigram=False):
+    """
+    Lignes de `kind` dont un champ commence par `query` (sans casse ni
+    accents), champ par champ dans l'ordre de KINDS ; avec pg_trgm et au
+    moins MIN_SUBSTRING caractères, les lignes qui le contiennent suivent.
+    `kinds` : résultat de `available`, relu à chaque appel s'il n'est pas fourni.
+    """
+    query = query.strip()
+    kinds = kinds if kinds is not None else available(cur)
+    if not query or kind not in kinds:
+        return []
+    substring = trigram and len(query) >= MIN_SUBSTRING
+    sql = search_sql(kind, kinds[kind]['fields'], kinds[kind]['columns'], substring)
+    cur.execute(sql, {'query': like_escape(query), 'limit': limit})
+    # Une ligne trouvée par plusieurs champs n'apparaît qu'une fois
+    rows = list(dict.fromkeys(cur.fetchall()))
+    return rows[:limit]
+
+
+def sample_terms(cur, kinds, per_kind=50):
+    """Valeurs réelles tirées au hasard pour la frappe simulée : {type: [texte]}"""
+    terms = {}
+    for kind, found in kinds.items():
+        spec = KINDS[kind]
+        expressions = [expression for _, expression in found['fields']]
+        cur.execute(f"""
+            SELECT {', '.join(expressions)}
+            FROM {spec['table']}
+            WHERE {spec['where']}
+            ORDER BY random()
+            LIMIT %s
+        """, (per_kind,))
+        terms[kind] = [value.strip() for row in cur.fetchall() for value in row if value and value.strip()]
+    return terms
+
+
+def typing_prefixes(term, max_length=12):
+    """'dupont' → ['d', 'du', 'dup', ...] comme une saisie au clavier"""
+    return [term[:length] for length in range(1, min(len(term), max_length) + 1)]
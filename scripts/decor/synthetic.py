@@ -0,0 +1,395 @@
+"""
+Générateur de données synthétiques au format des extractions Sage
+-----------------------------------------------------------------
+Produit lignevente.csv, le fichier client, produits.csv et
+"Points de vente.csv" avec des distributions proches de la production :
+- magasins de poids inégaux + ventes web (dépôt 54)
+- familles de produits avec saisonnalité propre (jardin au printemps, fêtes en fin d'année)
+- popularité produit en loi de Zipf, fréquence client en loi de Pareto
+- part de ventes anonymes (carte "0") et clients fidèles rattachés à un magasin
+- quelques doublons de clients (même personne, deux cartes) pour tester le dédoublonnage
+
+Échelle 1 = volume actuel de la base (≈709k lignes, 144k clients).
+Tout est écrit en flux : 100x reste faisable sans tout garder en mémoire.
+Le générateur n'utilise que la bibliothèque standard.
+"""
+import bisect
+import csv
+import json
+import math
+import random
+from array import array
+from datetime import date, timedelta
+from itertools import accumulate
+from pathlib import Path
+
+from decor import sage
+
+# Volume actuel (README.md) : transactions, clients, produits
+BASE_VOLUME = {'lignes': 709_000, 'clients': 144_000, 'produits': 55_000}
+
+# (code dépôt, intitulé, ville, cp, zone) - caisses officielles, voir verif-correspondance-caisses.py
+STORES = [
+    ('12', 'Caisse ALES', 'ALES', '30100', 'Occitanie Est'),
+    ('13', 'Caisse BEZIERS', 'BEZIERS', '34500', 'Occitanie Est'),
+    ('14', 'Caisse ARLES', 'ARLES', '13200', 'Provence'),
+    ('15', 'Caisse VAISE', 'LYON', '69009', 'Rhône'),
+    ('16', 'Caisse ST JEAN DE VEDAS', 'SAINT-JEAN-DE-VEDAS', '34430', 'Occitanie Est'),
+    ('17', 'Caisse St Peray', 'SAINT-PERAY', '07130', 'Vallée du Rhône'),
+    ('19', 'Caisse Romans', 'ROMANS-SUR-ISERE', '26100', 'Vallée du Rhône'),
+    ('20', 'Caisse Montfavet', 'AVIGNON', '84140', 'Provence'),
+    ('22', 'Caisse ST BONNET DE MURE', 'SAINT-BONNET-DE-MURE', '69720', 'Rhône'),
+    ('23', 'Caisse VIRIAT', 'VIRIAT', '01440', 'Alpes'),
+    ('24', 'Caisse SILLINGY', 'SILLINGY', '74330', 'Alpes'),
+    ('25', 'Caisse CARCASSONNE', 'CARCASSONNE', '11000', 'Occitanie Ouest'),
+    ('26', 'Caisse ST EGREVE', 'SAINT-EGREVE', '38120', 'Alpes'),
+    ('27', 'Caisse VILLEFRANCHE', 'VILLEFRANCHE-SUR-SAONE', '69400', 'Rhône'),
+    ('28', "Caisse ST MARTIN D'HERES", "SAINT-MARTIN-D'HERES", '38400', 'Alpes'),
+    ('29', 'Caisse FENOUILLET', 'FENOUILLET', '31150', 'Occitanie Ouest'),
+    ('31', 'Caisse Montelimar', 'MONTELIMAR', '26200', 'Vallée du Rhône'),
+    ('32', 'Caisse LEMPDES', 'LEMPDES', '63370', 'Auvergne'),
+    ('33', 'Caisse ESTANCARBON', 'ESTANCARBON', '31800', 'Occitanie Ouest'),
+    ('34', 'Caisse AUBENAS', 'AUBENAS', '07200', 'Vallée du Rhône'),
+    ('35', 'Caisse NIMES', 'NIMES', '30000', 'Occitanie Est'),
+    ('36', 'Caisse VOGLANS', 'VOGLANS', '73420', 'Alpes'),
+    ('37', 'Caisse SORGUES', 'SORGUES', '84700', 'Provence'),
+    ('38', 'Caisse ONET LE CHATEAU', 'ONET-LE-CHATEAU', '12850', 'Occitanie Ouest'),
+    ('39', 'Caisse NARBONNE', 'NARBONNE', '11100', 'Occitanie Est'),
+]
+WEB_STORE = ('54', 'Ventes Web', 'INTERNET', '', 'Web')
+
+# famille → (poids, prix médian HT, saisonnalité janvier..décembre, sous-familles)
+FAMILIES = {
+    'DECORATION': (22, 9.0, [0.8, 0.8, 0.9, 0.9, 0.9, 0.9, 0.9, 0.9, 1.0, 1.1, 1.4, 1.7],
+                   ['CADRES', 'BOUGIES', 'VASES', 'PLANTES ARTIFICIELLES', 'MIROIRS']),
+    'LINGE DE MAISON': (14, 12.0, [1.3, 1.0, 0.9, 0.9, 0.8, 0.8, 0.8, 0.9, 1.1, 1.1, 1.2, 1.3],
+                        ['RIDEAUX', 'COUSSINS', 'PLAIDS', 'LINGE DE LIT', 'TAPIS']),
+    'ART DE LA TABLE': (12, 6.5, [0.9, 0.8, 0.9, 1.0, 1.0, 1.0, 1.0, 0.9, 0.9, 1.0, 1.2, 1.6],
+                        ['VAISSELLE', 'VERRES', 'COUVERTS', 'NAPPES']),
+    'CUISINE': (9, 8.0, [1.0, 0.9, 1.0, 1.0, 1.0, 0.9, 0.9, 1.0, 1.1, 1.0, 1.1, 1.2],
+                ['USTENSILES', 'BOCAUX', 'CUISSON']),
+    'RANGEMENT': (10, 11.0, [1.5, 1.2, 1.0, 0.9, 0.8, 0.8, 0.9, 1.2, 1.3, 1.0, 0.8, 0.7],
+                  ['BOITES', 'PANIERS', 'ETAGERES']),
+    'LUMINAIRE': (8, 19.0, [1.1, 1.0, 0.9, 0.8, 0.7, 0.7, 0.7, 0.8, 1.0, 1.3, 1.4, 1.5],
+                  ['LAMPES', 'SUSPENSIONS', 'GUIRLANDES LUMINEUSES']),
+    'MOBILIER': (6, 45.0, [1.2, 1.0, 1.0, 1.0, 0.9, 0.9, 0.8, 0.9, 1.1, 1.0, 1.0, 1.0],
+                 ['CHAISES', 'TABLES BASSES', 'MEUBLES DE RANGEMENT']),
+    'JARDIN': (7, 14.0, [0.3, 0.5, 1.2, 2.0, 2.3, 2.0, 1.5, 0.9, 0.5, 0.3, 0.2, 0.3],
+               ['POTS', 'SALONS DE JARDIN', 'DECORATION EXTERIEURE']),
+    'SALLE DE BAIN': (5, 7.5, [1.1, 1.0, 1.0, 1.0, 1.0, 1.0, 0.9, 0.9, 1.0, 1.0, 1.0, 1.1],
+                      ['ACCESSOIRES', 'TAPIS DE BAIN', 'RANGEMENT SDB']),
+    'FETES ET SAISONS': (7, 5.0, [0.3, 0.6, 0.5, 0.8, 0.5, 0.6, 0.6, 0.6, 0.6, 1.6, 3.0, 3.8],
+                         ['NOEL', 'HALLOWEEN', 'PAQUES', 'ANNIVERSAIRE']),
+}
+
+# Poids des jours (lundi..dimanche) et des heures d'ouverture
+WEEKDAY_WEIGHTS = [0.8, 0.9, 1.1, 0.9, 1.1, 1.6, 0.3]
+HOUR_WEIGHTS = {9: 0.5, 10: 0.9, 11: 1.0, 12: 0.7, 13: 0.6, 14: 1.0,
+                15: 1.2, 16: 1.3, 17: 1.4, 18: 1.1, 19: 0.5}
+
+NOMS = ['MARTIN', 'BERNARD', 'DUBOIS', 'THOMAS', 'ROBERT', 'RICHARD', 'PETIT', 'DURAND',
+        'LEROY', 'MOREAU', 'SIMON', 'LAURENT', 'LEFEBVRE', 'MICHEL', 'GARCIA', 'DAVID',
+        'BERTRAND', 'ROUX', 'VINCENT', 'FOURNIER', 'MOREL', 'GIRARD', 'ANDRE', 'MERCIER',
+        'BLANC', 'GUERIN', 'BOYER', 'GARNIER', 'CHEVALIER', 'FRANCOIS', 'FAURE', 'ROUSSEL']
+PRENOMS_F = ['Marie', 'Nathalie', 'Isabelle', 'Sylvie', 'Catherine', 'Sandrine', 'Christine',
+             'Valérie', 'Céline', 'Julie', 'Sophie', 'Aurélie', 'Émilie', 'Laura', 'Camille']
+PRENOMS_H = ['Jean', 'Philippe', 'Michel', 'Alain', 'Patrick', 'Nicolas', 'Christophe',
+             'Pierre', 'Thierry', 'Stéphane', 'Julien', 'Sébastien', 'Frédéric', 'Hugo']
+RUES = ['rue de la République', 'avenue Jean Jaurès', 'chemin des Vignes', 'rue Victor Hugo',
+        'boulevard Gambetta', 'impasse des Lilas', 'route de Lyon', 'place de l\'Église']
+DOMAINES = ['gmail.com', 'orange.fr', 'hotmail.fr', 'free.fr', 'sfr.fr', 'laposte.net', 'yahoo.fr']
+
+
+def default_volumes(scale):
+    """Volumes pour une échelle donnée (le catalogue produits croît moins vite)"""
+    return {
+        'lignes': int(BASE_VOLUME['lignes'] * scale),
+        'clients': int(BASE_VOLUME['clients'] * scale),
+        'produits': int(BASE_VOLUME['produits'] * math.sqrt(scale)),
+    }
+
+
+def poisson(rng, lam):
+    """Tirage de Poisson (approximation normale au-delà de 30)"""
+    if lam <= 0:
+        return 0
+    if lam > 30:
+        return max(0, int(round(rng.gauss(lam, math.sqrt(lam)))))
+    threshold, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= threshold:
+            return k
+        k += 1
+
+
+def weighted_index(rng, cum_weights):
+    """Index tiré selon des poids cumulés (array ou liste)"""
+    return bisect.bisect(cum_weights, rng.random() * cum_weights[-1])
+
+
+def carte_number(index):
+    return str(1_000_000 + index)
+
+
+def open_sage_writer(path, columns, encoding=sage.ENCODING):
+    f = open(path, 'w', encoding=encoding, errors='replace', newline='')
+    writer = csv.writer(f, delimiter=sage.SEPARATOR, lineterminator='\r\n')
+    writer.writerow(columns)
+    return f, writer
+
+
+class SyntheticGenerator:
+    """Génère un jeu complet dans un dossier, reproductible à graine égale"""
+
+    def __init__(self, output_dir, scale=1.0, seed=42, start='2025-01-01', end='2025-12-31',
+                 n_stores=22, anonymous_share=0.35, web_share=0.05, duplicate_share=0.02,
+                 depot_prefix_share=0.0, volumes=None):
+        self.output_dir = Path(output_dir)
+        self.scale = scale
+        self.seed = seed
+        self.start = date.fromisoformat(start)
+        self.end = date.fromisoformat(end)
+        self.stores = STORES[:n_stores]
+        self.anonymous_share = anonymous_share
+        self.web_share = web_share
+        self.duplicate_share = duplicate_share
+        self.depot_prefix_share = depot_prefix_share
+        self.volumes = dict(default_volumes(scale), **(volumes or {}))
+        self.rng = random.Random(seed)
+        self.stats = {}
+
+    # ------------------------------------------------------------------
+    # Magasins
+    # ------------------------------------------------------------------
+    def write_points_de_vente(self):
+        path = self.output_dir / sage.POINTS_DE_VENTE_FILE
+        f, writer = open_sage_writer(path, sage.POINTS_DE_VENTE_COLUMNS, sage.POINTS_DE_VENTE_ENCODING)
+        with f:
+            for code, intitule, ville, cp, zone in self.stores + [WEB_STORE]:
+                writer.writerow([zone, code, intitule, 'Zone commerciale', '', '', cp, ville])
+        # Poids de fréquentation : quelques gros magasins, beaucoup de moyens
+        self.store_cum = list(accumulate(self.rng.lognormvariate(0, 0.45) for _ in self.stores))
+        self.stats['magasins'] = len(self.stores) + 1
+
+    # ------------------------------------------------------------------
+    # Produits
+    # ------------------------------------------------------------------
+    def write_produits(self):
+        rng = self.rng
+        n = self.volumes['produits']
+        families = list(FAMILIES)
+        family_cum = list(accumulate(FAMILIES[f][0] for f in families))
+
+        self.product_family = array('B')
+        self.product_price = array('d')
+        popularity = array('d')
+
+        path = self.output_dir / sage.PRODUITS_FILE
+        f, writer = open_sage_writer(path, sage.PRODUIT_COLUMNS)
+        with f:
+            for i in range(n):
+                fam_idx = weighted_index(rng, family_cum)
+                famille = families[fam_idx]
+                _, median_price, _, sous_familles = FAMILIES[famille]
+                sous_famille = rng.choice(sous_familles)
+                ssf = f"{sous_famille} {rng.randint(1, 6)}"
+                sssf = f"{ssf}.{rng.randint(1, 3)}"
+                price = round(median_price * rng.lognormvariate(0, 0.6), 2)
+                designation = f"{sous_famille.title()} {rng.choice(['classique', 'déco', 'nature', 'essentiel', 'premium'])} {i % 997}"
+                writer.writerow([
+                    str(100_000 + i), designation, designation, f"REF{i:07d}",
+                    famille, sous_famille, ssf, sssf,
+                    'yes' if rng.random() < 0.3 else 'no',
+                ])
+                self.product_family.append(fam_idx)
+                self.product_price.append(price)
+                # Zipf : le rang est aléatoire pour ne pas corréler popularité et id
+                popularity.append(1.0 / (rng.randint(1, n) ** 0.9))
+
+        # Poids cumulés par mois (popularité × saisonnalité de la famille)
+        self.product_cum_by_month = []
+        for month in range(12):
+            season = [FAMILIES[fam][2][month] for fam in families]
+            self.product_cum_by_month.append(array('d', accumulate(
+                popularity[i] * season[self.product_family[i]] for i in range(n)
+            )))
+        self.stats['produits'] = n
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+    def client_identity(self, store):
+        rng = self.rng
+        sexe = rng.choice(['F', 'F', 'H'])
+        prenom = rng.choice(PRENOMS_F if sexe == 'F' else PRENOMS_H)
+        nom = rng.choice(NOMS)
+        code, _, ville, cp, _ = store
+        # Clients majoritairement dans le département du magasin
+        client_cp = cp[:2] + f"{rng.randint(0, 9)}{rng.choice(['00', '10', '20', '30', '40', '50', '60', '70', '80', '90'])}"
+        return {
+            'nom': nom, 'prenom': prenom, 'sexe': sexe,
+            'civilite': 'Mme' if sexe == 'F' else 'M.',
+            'cp': client_cp, 'ville': ville,
+            'adresse': f"{rng.randint(1, 150)} {rng.choice(RUES)}",
+            'email': f"{prenom.lower()}.{nom.lower()}{rng.randint(1, 99)}@{rng.choice(DOMAINES)}"
+                     if rng.random() < 0.6 else '',
+            'telephone': f"0{rng.choice('67')}{rng.randint(10_000_000, 99_999_999)}"
+                         if rng.random() < 0.7 else '',
+            'naissance': date(rng.randint(1940, 2004), rng.randint(1, 12), rng.randint(1, 28)),
+        }
+
+    def messy_copy(self, identity):
+        """Même personne saisie différemment sur une seconde carte"""
+        rng = self.rng
+        copy = dict(identity)
+        copy['nom'] = rng.choice([identity['nom'].lower(), f" {identity['nom']}", identity['nom'].title()])
+        copy['prenom'] = identity['prenom'].upper()
+        if identity['email'] and rng.random() < 0.5:
+            copy['email'] = identity['email'].upper()
+        if identity['telephone']:
+            t = identity['telephone']
+            copy['telephone'] = rng.choice([f"+33{t[1:]}", ' '.join(t[i:i + 2] for i in range(0, 10, 2)), t])
+        return copy
+
+    def write_clients(self):
+        rng = self.rng
+        n = self.volumes['clients']
+        self.client_store = array('B')
+        activity = array('d')
+
+        path = self.output_dir / f"Fichier_client_{self.end.strftime('%d-%m-%y')}.csv"
+        f, writer = open_sage_writer(path, sage.CLIENT_COLUMNS)
+        duplicates = 0
+        previous = None
+        with f:
+            for i in range(n):
+                store_idx = weighted_index(rng, self.store_cum)
+                store = self.stores[store_idx]
+                if previous and rng.random() < self.duplicate_share:
+                    identity = self.messy_copy(previous[1])
+                    store_idx = previous[0]
+                    duplicates += 1
+                else:
+                    identity = self.client_identity(store)
+                created = self.start - timedelta(days=rng.randint(0, 3650))
+                writer.writerow([
+                    carte_number(i), identity['nom'], identity['prenom'],
+                    created.strftime('%d/%m/%Y'), 'Active',
+                    (created + timedelta(days=730)).strftime('%d/%m/%Y'),
+                    identity['civilite'], identity['naissance'].strftime('%d/%m/%Y'),
+                    identity['sexe'], f"{identity['prenom']} {identity['nom']}",
+                    identity['telephone'], identity['email'], '',
+                    identity['adresse'], '', identity['cp'], identity['ville'],
+                ])
+                previous = (store_idx, identity)
+                self.client_store.append(store_idx)
+                # Pareto tronquée : une minorité de fidèles fait l'essentiel des passages
+                activity.append(min(rng.paretovariate(1.3), 40.0))
+
+        self.client_cum = array('d', accumulate(activity))
+        self.stats['clients'] = n
+        self.stats['clients_doublons'] = duplicates
+
+    # ------------------------------------------------------------------
+    # Lignes de vente
+    # ------------------------------------------------------------------
+    def day_weights(self):
+        days = []
+        current = self.start
+        while current <= self.end:
+            month_factor = sum(FAMILIES[f][0] * FAMILIES[f][2][current.month - 1] for f in FAMILIES)
+            days.append((current, WEEKDAY_WEIGHTS[current.weekday()] * month_factor))
+            current += timedelta(days=1)
+        total = sum(w for _, w in days)
+        return [(d, w / total) for d, w in days]
+
+    def write_lignevente(self):
+        rng = self.rng
+        mean_basket = 2.6
+        expected_tickets = self.volumes['lignes'] / mean_basket
+        hours = list(HOUR_WEIGHTS)
+        hour_cum = list(accumulate(HOUR_WEIGHTS.values()))
+        n_stores = len(self.stores)
+        web_code = WEB_STORE[0]
+
+        lines = tickets = 0
+        ticket_seq = [0] * (n_stores + 1)
+
+        path = self.output_dir / sage.LIGNEVENTE_FILE
+        f, writer = open_sage_writer(path, sage.LIGNEVENTE_COLUMNS)
+        with f:
+            for day, weight in self.day_weights():
+                product_cum = self.product_cum_by_month[day.month - 1]
+                day_str = day.isoformat()
+                # Le dimanche, seules les ventes web tournent
+                web_only = day.weekday() == 6
+                for _ in range(poisson(rng, expected_tickets * weight)):
+                    if rng.random() < self.anonymous_share:
+                        carte = sage.CARTE_ANONYME
+                        store_idx = weighted_index(rng, self.store_cum)
+                    else:
+                        client_idx = weighted_index(rng, self.client_cum)
+                        carte = carte_number(client_idx)
+                        store_idx = self.client_store[client_idx]
+                        if rng.random() < 0.15:
+                            store_idx = weighted_index(rng, self.store_cum)
+
+                    if web_only or rng.random() < self.web_share:
+                        store_idx = n_stores
+                        depot = web_code
+                    else:
+                        depot = self.stores[store_idx][0]
+                        if rng.random() < self.depot_prefix_share:
+                            depot = f"M{depot}"
+
+                    ticket_seq[store_idx] += 1
+                    facture = f"{depot.lstrip('M')}{ticket_seq[store_idx]:08d}"
+                    heure = hours[weighted_index(rng, hour_cum)]
+                    # Panier : 1 ligne + géométrique
+                    basket = 1
+                    while rng.random() < 1 - 1 / mean_basket:
+                        basket += 1
+                    is_return = rng.random() < 0.01
+
+                    for _ in range(basket):
+                        produit = weighted_index(rng, product_cum)
+                        quantite = 1 if rng.random() < 0.8 else rng.randint(2, 6)
+                        if is_return:
+                            quantite = -quantite
+                        prix = round(self.product_price[produit] * (0.7 if rng.random() < 0.1 else 1.0), 2)
+                        writer.writerow([
+                            carte, facture, depot, day_str, heure, str(100_000 + produit),
+                            sage.format_decimal(quantite), sage.format_decimal(prix),
+                            sage.format_decimal(quantite * prix * 1.2),
+                        ])
+                        lines += 1
+                    tickets += 1
+
+        self.stats['lignes'] = lines
+        self.stats['tickets'] = tickets
+
+    def generate(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.write_points_de_vente()
+        self.write_produits()
+        self.write_clients()
+        self.write_lignevente()
+        self.write_manifest()
+        return self.stats
+
+    def write_manifest(self):
+        manifest = {
+            'scale': self.scale,
+            'seed': self.seed,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'anonymous_share': self.anonymous_share,
+            'web_share': self.web_share,
+            'duplicate_share': self.duplicate_share,
+            'depot_prefix_share': self.depot_prefix_share,
+            'volumes': self.volumes,
+            'stats': self.stats,
+        }
+        with open(self.output_dir / 'synthetic.json', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,162 @@
+"""
+Table des tickets (en-têtes de facture)
+---------------------------------------
+Nombre de tickets, taille du panier et panier moyen se calculent partout
+avec `COUNT(DISTINCT facture)` sur les lignes de vente. La table `tickets`
+garde une ligne par ticket (facture, date) : heure, dépôt, carte, nombre de
+lignes, CA, quantité, web. Les indicateurs par ticket deviennent un simple
+parcours d'une table plusieurs fois plus petite.
+
+Pour retrouver les indicateurs ligne à ligne de l'API (dashboard_kpis :
+lignes à CA positif, tickets = factures distinctes), chaque ticket garde
+aussi le CA et le nombre de ses lignes positives (`ca_positif`,
+`lignes_positives`) : un ticket avec une ligne de remboursement compte son
+CA positif, un ticket fait seulement de remboursements n'est pas compté.
+Les comptes de tickets se font sur `facture` (COUNT(DISTINCT facture)),
+comme sur les lignes, et non sur la clé (facture, date).
+
+    python scripts/apply-migration.py tickets      # création + reconstruction complète
+
+Les imports tiennent la table à jour mois par mois (`refresh`, appelé par
+decor.aggregates) : les tickets des mois chargés sont recalculés depuis
+`transactions`.
+Sur une base sans table `tickets`, rien n'est fait.
+"""
+from decor import version
+from decor.db import transaction
+from decor.schema import add_months, month_range, parse_month, table_exists
+
+TABLE = 'tickets'
+
+CREATE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        facture TEXT NOT NULL,
+        date TIMESTAMP NOT NULL,
+        heure INTEGER,
+        depot TEXT,
+        carte TEXT,
+        nb_lignes INTEGER NOT NULL,
+        ca DOUBLE PRECISION NOT NULL,
+        quantite DOUBLE PRECISION NOT NULL,
+        is_web BOOLEAN NOT NULL DEFAULT FALSE,
+        lignes_positives INTEGER NOT NULL DEFAULT 0,
+        ca_positif DOUBLE PRECISION NOT NULL DEFAULT 0,
+        PRIMARY KEY (facture, date)
+    )
+"""
+
+# Colonnes ajoutées après la première version de la table
+ADDED_COLUMNS = {
+    'lignes_positives': 'INTEGER NOT NULL DEFAULT 0',
+    'ca_positif': 'DOUBLE PRECISION NOT NULL DEFAULT 0',
+}
+
+INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_date ON {TABLE} (date)",
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_depot_date ON {TABLE} (depot, date)",
+    f"CREATE INDEX IF NOT EXISTS idx_{TABLE}_carte ON {TABLE} (carte) WHERE carte <> '0'",
+]
+
+# Un ticket = (facture, date) comme dans api/cross-selling.js ; un ticket
+# n'a qu'un dépôt et qu'une carte, MIN() ne sert qu'à les remonter
+SELECT_SQL = """
+    SELECT
+        facture,
+        date,
+        MIN(heure) AS heure,
+        MIN(depot) AS depot,
+        MIN(carte) AS carte,
+        COUNT(*) AS nb_lignes,
+        COALESCE(SUM(ca), 0) AS ca,
+        COALESCE(SUM(quantite), 0) AS quantite,
+        COALESCE(BOOL_OR(is_web), FALSE) AS is_web,
+        COUNT(*) FILTER (WHERE ca > 0) AS lignes_positives,
+        COALESCE(SUM(ca) FILTER (WHERE ca > 0), 0) AS ca_positif
+    FROM transactions
+    WHERE facture IS NOT NULL {where}
+    GROUP BY facture, date
+"""
+
+COLUMNS = 'facture, date, heure, depot, carte, nb_lignes, ca, quantite, is_web, lignes_positives, ca_positif'
+
+
+def exists(cur):
+    return table_exists(cur, TABLE)
+
+
+def has_added_columns(cur):
+    cur.execute("""
+        SELECT COUNT(*) FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND column_name = ANY(%s)
+    """, (TABLE, list(ADDED_COLUMNS)))
+    return cur.fetchone()[0] == len(ADDED_COLUMNS)
+
+
+def create(cur):
+    cur.execute(CREATE_SQL)
+    for column, definition in ADDED_COLUMNS.items():
+        cur.execute(f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS {column} {definition}")
+    for sql in INDEXES:
+        cur.execute(sql)
+
+
+def rebuild(conn, log=print):
+    """Recalcul complet depuis transactions (une transaction)"""
+    with transaction(conn) as cur:
+        create(cur)
+        cur.execute(f"TRUNCATE {TABLE}")
+        cur.execute(f"INSERT INTO {TABLE} ({COLUMNS}) {SELECT_SQL.format(where='')}")
+        count = cur.rowcount
+        version.bump(cur)
+    with transaction(conn) as cur:
+        cur.execute(f"ANALYZE {TABLE}")
+    log(f"   🎫 {count:,} tickets")
+    return count
+
+
+def refresh_range(cur, start, end):
+    """Recalculer les tickets dont la date est dans [start, end)"""
+    cur.execute(f"DELETE FROM {TABLE} WHERE date >= %s AND date < %s", (start, end))
+    cur.execute(f"INSERT INTO {TABLE} ({COLUMNS}) "
+                f"{SELECT_SQL.format(where='AND date >= %s AND date < %s')}",
+                (start, end))
+    return cur.rowcount
+
+
+def refresh_months(cur, first, last=None):
+    """
+    Recalculer les tickets des mois `first` à `last` inclus ; renvoie le
+    nombre de tickets écrits, ou None si la table n'existe pas.
+    """
+    if not exists(cur):
+        return None
+    months = list(month_range(first, last or first))
+    return refresh_range(cur, months[0], add_months(parse_month(months[-1]), 1))
+
+
+def refresh(conn, first, last=None, log=print):
+    """
+    Mise à jour après le chargement des mois `first` à `last` (None si table
+    absente) ; table d'avant `lignes_positives` / `ca_positif` : reconstruite.
+    """
+    with transaction(conn) as cur:
+        outdated = exists(cur) and not has_added_columns(cur)
+    if outdated:
+        log("   ⚠️  tickets sans CA positif par ticket : reconstruction complète")
+        return rebuild(conn, log=log)
+    with transaction(conn) as cur:
+        count = refresh_months(cur, first, last)
+    if count is not None:
+        log(f"   🎫 {count:,} tickets recalculés")
+    return count
+
+
+def stats(cur, where='', params=None):
+    """(tickets, lignes, CA, panier moyen, lignes par ticket), tickets = factures distinctes"""
+    cur.execute(f"""
+        SELECT COUNT(DISTINCT facture), COALESCE(SUM(nb_lignes), 0), COALESCE(SUM(ca), 0),
+               SUM(ca) / NULLIF(COUNT(DISTINCT facture), 0),
+               SUM(nb_lignes) * 1.0 / NULLIF(COUNT(DISTINCT facture), 0)
+        FROM {TABLE} {where}
+    """, params)
+    return cur.fetchone()
@@ -0,0 +1,268 @@
+"""
+Règles de validation déclaratives
+---------------------------------
+validate-import.py, check-stats.py, quick-check.py, check-data.py... lancent
+chacun une série de COUNT(*) / COUNT(CASE ...) séparés. Ici les règles sont
+des données (`RULES`) et toutes celles d'une même table sont compilées en une
+seule requête d'agrégats : un parcours par table, jointures de contrôle
+référentiel comprises.
+
+Types de règles :
+
+    complet    colonne renseignée (ni NULL ni chaîne vide)
+    reference  valeur présente dans une autre table (`cible` = 'table.colonne',
+               `sauf` = valeurs tolérées, ex. la carte anonyme '0')
+    plage      valeur entre `min` et `max` (littéraux ou expressions SQL
+               `min_sql` / `max_sql`)
+    unique     combinaison de `colonnes` sans doublon
+
+`tolerance` est la part de lignes en défaut acceptée (0 par défaut) ; None
+en fait une règle d'information (taux mesuré, jamais en échec). `niveau`
+vaut 'erreur' (défaut) ou 'avertissement'.
+
+La même compilation tourne sur PostgreSQL, la réplique DuckDB ou le moteur
+en mémoire (decor.backends). Le rapport JSON va dans data/validation-reports/ :
+
+    python scripts/validate-data.py
+    python scripts/validate-data.py --backend duckdb --table clients --strict
+"""
+import json
+import time
+from datetime import datetime
+
+from decor.env import DATA_DIR
+
+REPORTS_DIR = DATA_DIR / 'validation-reports'
+
+RULE_TYPES = ('complet', 'reference', 'plage', 'unique')
+
+STATUS_ICONS = {'ok': '✅', 'info': 'ℹ️ ', 'avertissement': '⚠️ ', 'erreur': '❌', 'ignoree': '⏭️ '}
+
+# Règles par défaut : celles des anciens scripts de contrôle
+RULES = [
+    {'table': 'clients', 'regle': 'unique', 'colonnes': ['carte']},
+    {'table': 'clients', 'regle': 'complet', 'colonne': 'carte'},
+    {'table': 'clients', 'regle': 'complet', 'colonne': 'nom', 'tolerance': None},
+    {'table': 'clients', 'regle': 'complet', 'colonne': 'prenom', 'tolerance': None},
+    {'table': 'clients', 'regle': 'complet', 'colonne': 'email', 'tolerance': None},
+    {'table': 'clients', 'regle': 'complet', 'colonne': 'telephone', 'tolerance': None},
+    {'table': 'clients', 'regle': 'complet', 'colonne': 'cp', 'tolerance': 0.5, 'niveau': 'avertissement'},
+
+    {'table': 'produits', 'regle': 'unique', 'colonnes': ['id']},
+    {'table': 'produits', 'regle': 'complet', 'colonne': 'famille', 'tolerance': 0.05, 'niveau': 'avertissement'},
+    {'table': 'produits', 'regle': 'complet', 'colonne': 'nom', 'tolerance': None},
+
+    {'table': 'magasins', 'regle': 'unique', 'colonnes': ['code']},
+    {'table': 'magasins', 'regle': 'complet', 'colonne': 'nom'},
+
+    {'table': 'transactions', 'regle': 'complet', 'colonne': 'facture'},
+    {'table': 'transactions', 'regle': 'complet', 'colonne': 'date'},
+    {'table': 'transactions', 'regle': 'complet', 'colonne': 'depot'},
+    {'table': 'transactions', 'regle': 'complet', 'colonne': 'produit'},
+    {'table': 'transactions', 'regle': 'reference', 'colonne': 'produit', 'cible': 'produits.id'},
+    {'table': 'transactions', 'regle': 'reference', 'colonne': 'carte', 'cible': 'clients.carte',
+     'sauf': ['0'], 'tolerance': 0.05, 'niveau': 'avertissement'},
+    {'table': 'transactions', 'regle': 'reference', 'colonne': 'depot', 'cible': 'magasins.code',
+     'tolerance': 0.01, 'niveau': 'avertissement'},
+    {'table': 'transactions', 'regle': 'plage', 'colonne': 'date', 'min': '2015-01-01',
+     'max_sql': "CURRENT_DATE + INTERVAL '1 day'"},
+    {'table': 'transactions', 'regle': 'plage', 'colonne': 'quantite', 'min': -10000, 'max': 10000,
+     'tolerance': 0.0001, 'niveau': 'avertissement'},
+    {'table': 'transactions', 'regle': 'plage', 'colonne': 'ca', 'min': -100000, 'max': 100000,
+     'tolerance': 0.0001, 'niveau': 'avertissement'},
+    {'table': 'transactions', 'regle': 'unique', 'colonnes': ['facture', 'date', 'depot', 'produit', 'quantite', 'ca'],
+     'tolerance': 0.01, 'niveau': 'avertissement', 'nom': 'lignes en double'},
+]
+
+
+def literal(value):
+    """Littéral SQL d'une valeur de règle (règles du dépôt, pas de saisie utilisateur)"""
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def rule_id(rule):
+    if rule.get('nom'):
+        return f"{rule['table']}: {rule['nom']}"
+    target = ', '.join(rule.get('colonnes') or [rule.get('colonne', '')])
+    suffix = f" → {rule['cible']}" if rule['regle'] == 'reference' else ''
+    return f"{rule['table']}.{target} {rule['regle']}{suffix}"
+
+
+def rule_columns(rule):
+    """(table, colonne) lues par une règle, pour écarter celles d'un schéma incomplet"""
+    columns = [(rule['table'], c) for c in rule.get('colonnes') or [rule['colonne']]]
+    if rule['regle'] == 'reference':
+        columns.append(tuple(rule['cible'].split('.', 1)))
+    return columns
+
+
+def filled(expr):
+    return f"({expr} IS NOT NULL AND CAST({expr} AS VARCHAR) <> '')"
+
+
+def compile_table(table, rules):
+    """
+    Une requête pour toutes les règles d'une table :
+    (sql, [(règle, [alias des mesures])]). Les contrôles référentiels
+    ajoutent une jointure gauche par table cible.
+    """
+    select = ['COUNT(*) AS lignes']
+    joins = []
+    plan = []
+    for i, rule in enumerate(rules):
+        kind = rule['regle']
+        name = f"r{i}"
+        if kind == 'complet':
+            column = f"t.{rule['colonne']}"
+            select.append(f"SUM(CASE WHEN {filled(column)} THEN 0 ELSE 1 END) AS {name}")
+            plan.append((rule, [name]))
+        elif kind == 'reference':
+            column = f"t.{rule['colonne']}"
+            target_table, target_column = rule['cible'].split('.', 1)
+            alias = f"j{i}"
+            joins.append(f"LEFT JOIN (SELECT DISTINCT {target_column} AS cle FROM {target_table}) {alias} "
+                         f"ON {column} = {alias}.cle")
+            orphan = f"{alias}.cle IS NULL AND {column} IS NOT NULL"
+            if rule.get('sauf'):
+                orphan += f" AND {column} NOT IN ({', '.join(literal(v) for v in rule['sauf'])})"
+            select.append(f"SUM(CASE WHEN {orphan} THEN 1 ELSE 0 END) AS {name}")
+            select.append(f"COUNT(DISTINCT CASE WHEN {orphan} THEN {column} END) AS {name}_cles")
+            plan.append((rule, [name, f"{name}_cles"]))
+        elif kind == 'plage':
+            column = f"t.{rule['colonne']}"
+            bounds = []
+            low = rule.get('min_sql') or (literal(rule['min']) if 'min' in rule else None)
+            high = rule.get('max_sql') or (literal(rule['max']) if 'max' in rule else None)
+            if low:
+                bounds.append(f"{column} < {low}")
+            if high:
+                bounds.append(f"{column} > {high}")
+            select.append(f"SUM(CASE WHEN {' OR '.join(bounds) or 'FALSE'} THEN 1 ELSE 0 END) AS {name}")
+            select.append(f"MIN({column}) AS {name}_min")
+            select.append(f"MAX({column}) AS {name}_max")
+            plan.append((rule, [name, f"{name}_min", f"{name}_max"]))
+        elif kind == 'unique':
+            key = ', '.join(f"COALESCE(CAST(t.{c} AS VARCHAR), '∅')" for c in rule['colonnes'])
+            select.append(f"COUNT(*) - COUNT(DISTINCT CONCAT_WS('|', {key})) AS {name}")
+            plan.append((rule, [name]))
+        else:
+            raise ValueError(f"Règle inconnue: {kind} (choix: {', '.join(RULE_TYPES)})")
+    sql = f"SELECT {', '.join(select)} FROM {table} t {' '.join(joins)}"
+    return sql, plan
+
+
+def evaluate(rule, total, values):
+    """Résultat d'une règle à partir de ses mesures"""
+    violations = int(values[0] or 0)
+    rate = violations / total if total else 0.0
+    tolerance = rule.get('tolerance', 0)
+    if tolerance is None:
+        status = 'info'
+    elif rate <= tolerance:
+        status = 'ok'
+    else:
+        status = rule.get('niveau', 'erreur')
+    result = {
+        'id': rule_id(rule),
+        'table': rule['table'],
+        'regle': rule['regle'],
+        'violations': violations,
+        'lignes': total,
+        'taux': rate,
+        'tolerance': tolerance,
+        'statut': status,
+    }
+    if rule['regle'] == 'reference':
+        result['cles_orphelines'] = int(values[1] or 0)
+    elif rule['regle'] == 'plage':
+        result['min'], result['max'] = (str(v) if v is not None else None for v in values[1:3])
+    return result
+
+
+def table_columns(backend):
+    """{table: {colonnes}} du schéma courant (information_schema, PostgreSQL comme DuckDB)"""
+    schema = 'public' if backend.dialect == 'postgres' else 'main'
+    columns = {}
+    for table, column in backend.execute(
+            f"SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = '{schema}'"):
+        columns.setdefault(table, set()).add(column)
+    return columns
+
+
+def validate(backend, rules=None, tables=None, log=print):
+    """
+    Exécuter les règles (une requête par table) ; renvoie le rapport :
+    {backend, cible, tables: {table: {lignes, secondes}}, regles: [...]}.
+    Les règles sur une table ou une colonne absente sont marquées 'ignoree'.
+    """
+    rules = [r for r in (rules or RULES) if not tables or r['table'] in tables]
+    columns = table_columns(backend)
+
+    # Résultats rangés dans l'ordre des règles
+    by_table, results = {}, {}
+    for position, rule in enumerate(rules):
+        missing = [f"{t}.{c}" for t, c in rule_columns(rule) if c not in columns.get(t, ())]
+        if missing:
+            results[position] = {'id': rule_id(rule), 'table': rule['table'], 'regle': rule['regle'],
+                                 'statut': 'ignoree', 'detail': f"absent : {', '.join(missing)}"}
+        else:
+            by_table.setdefault(rule['table'], []).append((position, rule))
+
+    report_tables = {}
+    for table, numbered in by_table.items():
+        positions, table_rules = zip(*numbered)
+        sql, plan = compile_table(table, table_rules)
+        start = time.perf_counter()
+        row = backend.execute(sql)[0]
+        elapsed = time.perf_counter() - start
+        total = int(row[0])
+        report_tables[table] = {'lignes': total, 'secondes': round(elapsed, 3), 'regles': len(table_rules)}
+        log(f"   🔎 {table}: {len(table_rules)} règles, {total:,} lignes, {elapsed:.2f}s")
+        offset = 1
+        for position, (rule, names) in zip(positions, plan):
+            results[position] = evaluate(rule, total, row[offset:offset + len(names)])
+            offset += len(names)
+
+    return {
+        'backend': backend.name,
+        'cible': backend.target,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'tables': report_tables,
+        'regles': [results[position] for position in sorted(results)],
+    }
+
+
+def failures(report, levels=('erreur',)):
+    return [r for r in report['regles'] if r['statut'] in levels]
+
+
+def print_results(report):
+    """Tableau des règles : statut, défauts, taux (clés orphelines ou plage observée)"""
+    print(f"\n{'':3}{'Règle':<62} {'Défauts':>10} {'Taux':>8}")
+    for result in report['regles']:
+        icon = STATUS_ICONS[result['statut']]
+        if 'violations' not in result:
+            print(f"{icon} {result['id'][:62]:<62} {result['detail']}")
+            continue
+        detail = ''
+        if 'cles_orphelines' in result:
+            detail = f"  ({result['cles_orphelines']:,} clés)"
+        elif 'min' in result:
+            detail = f"  ({result['min']} → {result['max']})"
+        elif 'detail' in result:
+            detail = f"  ({result['detail']})"
+        print(f"{icon} {result['id'][:62]:<62} {result['violations']:>10,} {result['taux']:>8.2%}{detail}")
+
+
+def write_report(report, output=None, name='validation'):
+    """Rapport JSON (chemin donné ou data/validation-reports/<name>-<date>.json)"""
+    if output is None:
+        REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = REPORTS_DIR / f"{name}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return output
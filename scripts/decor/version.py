@@ -0,0 +1,49 @@
+"""
+Version des données
+-------------------
+Un compteur dans la table `data_version` (une ligne), incrémenté dans la
+transaction même de chaque écriture de données : chaque lot ou phase des
+imports, `schema.reload_month`, les migrations qui réécrivent des lignes,
+les agrégats (`aggregates.refresh_all`, `rebuild_all`) et les scripts de
+reconstruction d'un agrégat. Les caches qui dépendent des données
+(decor.exports) s'en servent comme clé : même version, mêmes données. Un
+import interrompu laisse la version de ses lots validés ; une lecture ne
+voit jamais des lignes nouvelles sous l'ancienne version.
+
+    with transaction(conn) as cur:
+        ...                      # écritures
+        bump(cur)                # dans la même transaction
+
+Tant qu'aucun chargement n'a posé de version, `current` renvoie None et rien
+n'est servi depuis un cache.
+"""
+TABLE = 'data_version'
+
+CREATE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+"""
+
+
+def bump(cur):
+    """Incrémenter la version (table créée au premier appel) ; renvoie la nouvelle version"""
+    cur.execute(CREATE_SQL)
+    cur.execute(f"""
+        INSERT INTO {TABLE} (id, version) VALUES (TRUE, 1)
+        ON CONFLICT (id) DO UPDATE SET version = {TABLE}.version + 1, updated_at = NOW()
+        RETURNING version
+    """)
+    return cur.fetchone()[0]
+
+
+def current(cur):
+    """Version courante ; None si aucune écriture ne l'a encore posée"""
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f'public.{TABLE}',))
+    if not cur.fetchone()[0]:
+        return None
+    cur.execute(f"SELECT version FROM {TABLE}")
+    row = cur.fetchone()
+    return row[0] if row else None
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Doublons clients (cartes d'une même personne)
+---------------------------------------------
+Normalise noms, emails et téléphones, rapproche les cartes par clés de
+blocage (email, téléphone, nom + prénom + code postal) et écrit la table
+`client_identity` (decor.identity). Les imports la tiennent ensuite à jour
+via decor.aggregates ; les cohortes et le RFM regroupent les cartes fusionnées.
+
+Usage:
+  python scripts/dedupe-clients.py                          # base : crée / recalcule client_identity
+  python scripts/dedupe-clients.py --dry-run                # base : statistiques sans écrire
+  python scripts/dedupe-clients.py --fichier /chemin/extraction --output doublons.csv
+"""
+import argparse
+import csv
+import sys
+import time
+
+from decor import identity, version
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+from decor.sage import find_client_file
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Doublons clients (cartes d'une même personne)")
+    parser.add_argument('--fichier', help="Dossier d'extraction : analyser le fichier client sans la base")
+    parser.add_argument('--dry-run', action='store_true', help="Ne pas écrire client_identity")
+    parser.add_argument('--max-bloc', type=int, default=identity.MAX_BLOCK,
+                        help=f"Taille maximale d'un bloc comparé (défaut: {identity.MAX_BLOCK})")
+    parser.add_argument('--output', help="Exporter carte, client_id, règle en CSV")
+    parser.add_argument('--exemples', type=int, default=10, help="Groupes affichés")
+    return parser.parse_args()
+
+
+def load_rows(args):
+    if args.fichier:
+        path = find_client_file(args.fichier)
+        if path is None:
+            print(f"❌ Fichier client introuvable dans {args.fichier}")
+            sys.exit(1)
+        print(f"📄 {path.name}")
+        return identity.read_client_file(path), None
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+    conn = connect(database_url)
+    with transaction(conn) as cur:
+        cur.execute(identity.LOAD_SQL)
+        rows = cur.fetchall()
+    return rows, conn
+
+
+def main():
+    args = parse_args()
+    rows, conn = load_rows(args)
+    try:
+        start = time.perf_counter()
+        mapping, stats = identity.resolve(rows, args.max_bloc)
+        elapsed = time.perf_counter() - start
+
+        clients = {}
+        for carte, (client_id, rule, _) in mapping.items():
+            clients.setdefault(client_id, []).append((carte, rule))
+        print(f"\n🪪 {len(rows):,} cartes, {len(mapping):,} fusionnées en {len(clients):,} clients "
+              f"({len(mapping) - len(clients):,} doublons) en {elapsed:.1f}s")
+        for rule, count in stats.items():
+            print(f"   • {rule:<10} {count:>8,} cartes")
+
+        by_carte = {str(row[0]).strip(): row for row in rows}
+        largest = sorted(clients.items(), key=lambda item: (-len(item[1]), item[0]))[:args.exemples]
+        if largest:
+            print("\n🔍 Exemples :")
+        for client_id, members in largest:
+            print(f"   {client_id} ({len(members)} cartes)")
+            for carte, rule in sorted(members):
+                _, nom, prenom, email, telephone, cp, _ = by_carte[carte]
+                print(f"      {carte:<12} {rule:<10} {(nom or '').strip()[:18]:<18} {(prenom or '').strip()[:14]:<14} "
+                      f"{(email or '').strip()[:28]:<28} {(telephone or '').strip():<16} {cp or ''}")
+
+        if conn is not None and not args.dry_run:
+            with transaction(conn) as cur:
+                identity.create(cur)
+                changed = identity.store(cur, mapping)
+                version.bump(cur)
+            print(f"\n✅ {identity.TABLE} : {len(mapping):,} cartes, {changed:,} changent de client")
+            if changed:
+                print("   Cohortes à recalculer : python scripts/refresh-aggregates.py --only cohortes --full")
+
+        if args.output:
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['carte', 'client_id', 'regle', 'cartes'])
+                for carte in sorted(mapping):
+                    writer.writerow([carte, *mapping[carte]])
+            print(f"✅ {len(mapping):,} cartes exportées dans {args.output}")
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+if __name__ == '__main__':
+    main()
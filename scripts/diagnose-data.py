@@ -2,20 +2,29 @@
 """
 Script de diagnostic pour comprendre exactement la structure des données
 et ce qu'attend le Dashboard
+
+Usage:
+  python scripts/diagnose-data.py
+  python scripts/diagnose-data.py --export lignes-2025.csv   # + export complet en flux
 """
+import sys
+
 import duckdb
 import json
 
+from decor.db import duckdb_record_batches
+from decor.env import DUCKDB_FILE
+
+EXPORT_CSV = sys.argv[sys.argv.index('--export') + 1] if '--export' in sys.argv[:-1] else None
+
 print("=" * 80)
 print("DIAGNOSTIC COMPLET DES DONNÉES")
 print("=" * 80)
 
-conn = duckdb.connect('/Users/marceau/Desktop/test data/decor-analytics/public/duckdb.db', read_only=True)
+conn = duckdb.connect(str(DUCKDB_FILE), read_only=True)
 
-# 1. Vérifier ce qui est dans les transactions
-print("\n📊 ÉCHANTILLON DES TRANSACTIONS (10 premières de 2025):")
-print("-" * 80)
-sample = conn.execute("""
+# Lignes 2025 jointes aux référentiels (échantillon et export complet)
+LIGNES_2025_SQL = """
     SELECT 
         t.facture,
         t.date,
@@ -36,8 +45,12 @@ sample = conn.execute("""
     LEFT JOIN magasins m ON t.depot = m.code
     LEFT JOIN clients c ON t.carte = c.carte
     WHERE t.date >= '2025-01-01' AND t.date <= '2025-12-31'
-    LIMIT 10
-""").fetchall()
+"""
+
+# 1. Vérifier ce qui est dans les transactions
+print("\n📊 ÉCHANTILLON DES TRANSACTIONS (10 premières de 2025):")
+print("-" * 80)
+sample = conn.execute(LIGNES_2025_SQL + " LIMIT 10").fetchall()
 
 columns = ['facture', 'date', 'carte', 'produit', 'quantite', 'ca', 'depot', 'is_web', 
            'famille', 'sous_famille', 'magasin_nom', 'magasin_zone', 'sexe', 'client_cp']
@@ -190,6 +203,26 @@ ATTENTION: Ne PAS utiliser is_web pour déterminer le magasin "WEB"
 car is_web est probablement toujours false dans vos données.
 """)
 
+# 8. Export complet des lignes 2025 (par lots Arrow : mémoire constante)
+if EXPORT_CSV:
+    import pyarrow.csv as pacsv
+
+    print("\n" + "=" * 80)
+    print(f"💾 EXPORT DES LIGNES 2025 → {EXPORT_CSV}")
+    print("=" * 80)
+
+    writer = None
+    nb_lignes = 0
+    for batch in duckdb_record_batches(conn, LIGNES_2025_SQL):
+        if writer is None:
+            writer = pacsv.CSVWriter(EXPORT_CSV, batch.schema)
+        writer.write_batch(batch)
+        nb_lignes += batch.num_rows
+        print(f"   📊 {nb_lignes:,} lignes écrites...")
+    if writer is not None:
+        writer.close()
+    print(f"✅ {nb_lignes:,} lignes exportées")
+
 conn.close()
 
 print("\n" + "=" * 80)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Exports CSV / Parquet / XLSX des analyses et tables précalculées
+----------------------------------------------------------------
+Chaque export est lu en flux et écrit au fil de l'eau (decor.exports) ; le
+fichier est gardé dans data/exports/ sous la clé (analyse, filtres, format,
+version des données) : réexporter la même vue sur les mêmes données est
+immédiat. Plusieurs exports tournent en parallèle avec --jobs.
+
+Usage:
+  python scripts/export-data.py --liste
+  python scripts/export-data.py clients --format xlsx --since 2025-11 --until 2025-12
+  python scripts/export-data.py transactions --format parquet --depot 32 --output lignes-32.parquet
+  python scripts/export-data.py familles produits clients magasins --format csv --format xlsx --jobs 4 --dossier exports/
+  python scripts/export-data.py abc --fenetre 12m --format xlsx --sans-cache
+  python scripts/export-data.py --tout --format parquet --jobs 4
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from decor import exports
+from decor.env import describe_database_url, get_database_url
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exports CSV / Parquet / XLSX des analyses")
+    parser.add_argument('analyses', nargs='*', metavar='analyse',
+                        help=f"Analyses à exporter ({', '.join(exports.EXPORTS)})")
+    parser.add_argument('--tout', action='store_true', help="Exporter toutes les analyses")
+    parser.add_argument('--liste', action='store_true', help="Lister les analyses et leurs filtres")
+    parser.add_argument('--format', action='append', choices=exports.FORMATS,
+                        help="Format (répétable, défaut: csv)")
+    parser.add_argument('--since', help="Premier mois (AAAA-MM)")
+    parser.add_argument('--until', help="Dernier mois inclus (AAAA-MM)")
+    parser.add_argument('--depot', help="Code dépôt")
+    parser.add_argument('--fenetre', choices=['mois', '3m', '12m'], help="Fenêtre ABC")
+    parser.add_argument('--output', help="Fichier de sortie (un seul export)")
+    parser.add_argument('--dossier', help="Copier les exports dans ce dossier (noms lisibles)")
+    parser.add_argument('--jobs', type=int, default=1, help="Exports simultanés (défaut: 1)")
+    parser.add_argument('--sans-cache', action='store_true', help="Réécrire même si le cache est à jour")
+    return parser.parse_args()
+
+
+def print_catalog():
+    print(f"\n📚 {len(exports.EXPORTS)} analyses :")
+    for name, spec in exports.EXPORTS.items():
+        print(f"   {name:<14} {spec['description']}")
+        print(f"   {'':<14} filtres : {', '.join(sorted(spec['filters']))} ; tables : {', '.join(spec['tables'])}")
+
+
+def main():
+    args = parse_args()
+    if args.liste:
+        print_catalog()
+        return
+    unknown = [name for name in args.analyses if name not in exports.EXPORTS]
+    if unknown:
+        print(f"❌ Analyse(s) inconnue(s) : {', '.join(unknown)} (--liste pour le catalogue)")
+        sys.exit(1)
+    analyses = list(exports.EXPORTS) if args.tout else list(dict.fromkeys(args.analyses))
+    if not analyses:
+        print("❌ Analyse attendue (--liste pour le catalogue)")
+        sys.exit(1)
+
+    formats = args.format or ['csv']
+    if args.output and len(analyses) * len(formats) > 1:
+        print("❌ --output n'accepte qu'un export (utiliser --dossier)")
+        sys.exit(1)
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    jobs = []
+    for analysis in analyses:
+        try:
+            filters = exports.build_filters(analysis, args.since, args.until, args.depot, args.fenetre)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        for fmt in dict.fromkeys(formats):
+            output = args.output
+            if args.dossier:
+                Path(args.dossier).mkdir(parents=True, exist_ok=True)
+                output = str(Path(args.dossier) / exports.output_name(analysis, fmt, filters))
+            jobs.append((database_url, analysis, fmt, filters, output, not args.sans_cache))
+
+    start = time.perf_counter()
+    print(f"\n📤 {len(jobs)} export(s), {min(args.jobs, len(jobs))} en parallèle")
+    results = exports.run_all(jobs, args.jobs)
+
+    errors = 0
+    print(f"\n   {'Analyse':<14} {'Format':<8} {'Lignes':>10} {'Taille':>10} {'Durée':>8}  Fichier")
+    for result in results:
+        if 'erreur' in result:
+            errors += 1
+            print(f"❌ {result['analyse']:<14} {result['format']:<8} {result['erreur']}")
+            continue
+        icon = '♻️ ' if result['cache'] else '✅'
+        print(f"{icon} {result['analyse']:<14} {result['format']:<8} {result['lignes']:>10,} "
+              f"{result['octets'] / 1024:>8,.0f} Ko {result['secondes']:>7.2f}s  {result['chemin']}")
+    print(f"\n{'❌' if errors else '✅'} {len(results) - errors}/{len(results)} export(s) "
+          f"en {time.perf_counter() - start:.1f}s (♻️  = servi par le cache)")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Prévisions par famille
+----------------------
+Ajuste en lot les séries famille (tous canaux, magasins, web, famille ×
+magasin) et écrit prévisions et intervalles dans `forecasts` ; ou affiche
+les prévisions déjà calculées.
+
+Usage:
+  python scripts/forecast-series.py --rebuild                            # séries mensuelles, 4 périmètres
+  python scripts/forecast-series.py --rebuild --granularite semaine --jobs 4
+  python scripts/forecast-series.py --scope web --famille "Toutes familles"
+"""
+import argparse
+import os
+import sys
+import time
+
+from decor import forecast, version
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prévisions par famille")
+    parser.add_argument('--rebuild', action='store_true', help="Réajuster et enregistrer les prévisions")
+    parser.add_argument('--granularite', action='append', choices=list(forecast.GRANULARITIES),
+                        help="Granularité (répétable, défaut: mois)")
+    parser.add_argument('--scope', action='append', choices=forecast.SCOPES,
+                        help="Périmètre (répétable, défaut: tous)")
+    parser.add_argument('--horizon', type=int, help="Périodes prévues (défaut: 6 mois / 13 semaines)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Processus pour l'ajustement (défaut: nombre de CPU)")
+    parser.add_argument('--famille', help="Afficher une seule famille")
+    return parser.parse_args()
+
+
+def print_forecasts(conn, granularity, scope, famille=None):
+    where, params = "granularite = %s AND scope = %s", [granularity, scope]
+    if famille:
+        where += " AND famille = %s"
+        params.append(famille)
+    with transaction(conn) as cur:
+        cur.execute(f"""
+            SELECT famille, depot, periode, modele, prevision, borne_basse, borne_haute
+            FROM {forecast.TABLE}
+            WHERE {where}
+            ORDER BY famille = %s DESC, famille, depot, periode
+        """, params + [forecast.TOTAL])
+        rows = cur.fetchall()
+    print(f"\n📈 {scope} / {granularity}")
+    print(f"   {'Famille':<30} {'Dépôt':>5} {'Période':<10} {'Modèle':<16} {'Prévision €':>14} {'Intervalle 95 %':>28}")
+    for famille, depot, periode, modele, prevision, basse, haute in rows:
+        print(f"   {famille[:30]:<30} {depot:>5} {periode:%Y-%m-%d} {modele:<16} "
+              f"{prevision:>14,.0f} {basse:>13,.0f} – {haute:<13,.0f}")
+
+
+def main():
+    args = parse_args()
+    granularities = args.granularite or forecast.DEFAULT_GRANULARITIES
+    scopes = args.scope or (forecast.SCOPES if args.rebuild else ['tous'])
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    conn = connect(database_url)
+    try:
+        if args.rebuild:
+            start = time.perf_counter()
+            total = forecast.rebuild(conn, granularities=granularities, scopes=scopes,
+                                     horizon=args.horizon, jobs=args.jobs)
+            with transaction(conn) as cur:
+                version.bump(cur)
+            print(f"✅ {total:,} prévisions enregistrées en {time.perf_counter() - start:.1f}s")
+        else:
+            with transaction(conn) as cur:
+                ready = forecast.exists(cur)
+            if not ready:
+                print("ℹ️  Table forecasts absente : lancer avec --rebuild")
+                sys.exit(1)
+        if not args.rebuild or args.famille:
+            for granularity in granularities:
+                for scope in scopes:
+                    print_forecasts(conn, granularity, scope, args.famille)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Génération d'un jeu de données synthétique au format Sage
+---------------------------------------------------------
+Crée lignevente.csv, Fichier_client_*.csv, produits.csv et
+"Points de vente.csv" (ISO-8859-1, séparateur `;`, décimales à virgule)
+pour tester imports, analyses et benchmarks sans données réelles.
+
+Usage:
+  python scripts/generate-synthetic-data.py                   # volume actuel (x1)
+  python scripts/generate-synthetic-data.py --scale 10
+  python scripts/generate-synthetic-data.py --scale 0.05 --output data/synthetic/mini
+  python scripts/generate-synthetic-data.py --lignes 2000000 --clients 300000
+"""
+import argparse
+import time
+
+from decor.env import DATA_DIR
+from decor.synthetic import SyntheticGenerator
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Jeu de données synthétique au format Sage")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplicateur du volume actuel (1, 10, 100...)")
+    parser.add_argument('--output', help="Dossier de sortie (défaut: data/synthetic/x<scale>)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start', default='2025-01-01', help="Première date facture")
+    parser.add_argument('--end', default='2025-12-31', help="Dernière date facture")
+    parser.add_argument('--stores', type=int, default=22, help="Nombre de magasins physiques")
+    parser.add_argument('--anonymous-share', type=float, default=0.35, help="Part des tickets sans carte (carte 0)")
+    parser.add_argument('--web-share', type=float, default=0.05, help="Part des tickets web (dépôt 54)")
+    parser.add_argument('--duplicate-share', type=float, default=0.02, help="Part de clients en double")
+    parser.add_argument('--depot-prefix-share', type=float, default=0.0,
+                        help="Part des lignes avec un dépôt préfixé 'M' (M32 au lieu de 32)")
+    parser.add_argument('--lignes', type=int, help="Forcer le nombre de lignes de vente")
+    parser.add_argument('--clients', type=int, help="Forcer le nombre de clients")
+    parser.add_argument('--produits', type=int, help="Forcer le nombre de produits")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output = args.output or DATA_DIR / 'synthetic' / f"x{args.scale:g}"
+    volumes = {k: v for k, v in (('lignes', args.lignes), ('clients', args.clients),
+                                 ('produits', args.produits)) if v}
+
+    generator = SyntheticGenerator(
+        output, scale=args.scale, seed=args.seed, start=args.start, end=args.end,
+        n_stores=args.stores, anonymous_share=args.anonymous_share, web_share=args.web_share,
+        duplicate_share=args.duplicate_share, depot_prefix_share=args.depot_prefix_share,
+        volumes=volumes,
+    )
+
+    print(f"🧪 Génération synthétique x{args.scale:g} → {output}")
+    print(f"   Cible: {generator.volumes['lignes']:,} lignes, {generator.volumes['clients']:,} clients, "
+          f"{generator.volumes['produits']:,} produits")
+
+    start = time.time()
+    stats = generator.generate()
+
+    print(f"\n✅ Terminé en {time.time() - start:.1f}s")
+    print(f"   • Magasins: {stats['magasins']:,}")
+    print(f"   • Produits: {stats['produits']:,}")
+    print(f"   • Clients:  {stats['clients']:,} (dont {stats['clients_doublons']:,} doublons)")
+    print(f"   • Tickets:  {stats['tickets']:,}")
+    print(f"   • Lignes:   {stats['lignes']:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Géocodage des codes postaux clients
+-----------------------------------
+Résout les codes postaux distincts de la table `clients` avec decor.geocode
+(cache SQLite, référentiel local, Nominatim en option pour les codes
+introuvables) et met à jour `cp_centroids` quand la table existe
+(zones de chalandise, decor.catchment).
+
+Usage:
+  python scripts/geocode-clients.py                     # hors ligne : cache + référentiel
+  python scripts/geocode-clients.py --remote            # + Nominatim pour les codes restants (1 req/s)
+  python scripts/geocode-clients.py --output centroides-clients.csv
+"""
+import argparse
+import csv
+import sys
+import time
+
+from decor import catchment
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+from decor.geocode import Geocoder, Nominatim, normalize_cp
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Géocodage des codes postaux clients")
+    parser.add_argument('--remote', action='store_true',
+                        help="Interroger Nominatim pour les codes absents du référentiel")
+    parser.add_argument('--refresh', action='store_true', help="Ignorer le cache (tout résoudre à nouveau)")
+    parser.add_argument('--output', help="Exporter cp, lat, lon, clients en CSV")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    conn = connect(database_url)
+    try:
+        with transaction(conn) as cur:
+            cur.execute("SELECT cp, COUNT(*) FROM clients WHERE cp IS NOT NULL AND cp <> '' GROUP BY cp")
+            clients = dict(cur.fetchall())
+        total = sum(clients.values())
+        print(f"👥 {total:,} clients, {len(clients):,} codes postaux distincts")
+
+        start = time.perf_counter()
+        with Geocoder(remote=Nominatim() if args.remote else None, refresh=args.refresh) as geocoder:
+            located = geocoder.postcodes(clients)
+            stats = geocoder.stats
+        elapsed = time.perf_counter() - start
+
+        found = sum(clients[cp] for cp in located)
+        print(f"📍 {len(located):,} codes résolus en {elapsed:.1f}s "
+              f"(cache {stats['cache']:,}, référentiel {stats['reference']:,}, distant {stats['remote']:,})")
+        print(f"   {found:,} clients situés ({found / total:.1%})" if total else "   aucun client")
+
+        missing = sorted((cp for cp in clients if cp not in located), key=lambda cp: -clients[cp])
+        if missing:
+            print(f"\n⚠️  {len(missing):,} codes introuvables, les plus fréquents :")
+            for cp in missing[:10]:
+                print(f"   {cp!r:<10} {clients[cp]:>8,} clients")
+
+        with transaction(conn) as cur:
+            if catchment.exists(cur):
+                from psycopg2.extras import execute_values
+
+                execute_values(cur, f"""
+                    INSERT INTO {catchment.CENTROIDS_TABLE} (cp, lat, lon, source) VALUES %s
+                    ON CONFLICT (cp) DO UPDATE SET lat = EXCLUDED.lat, lon = EXCLUDED.lon, source = EXCLUDED.source
+                """, [(cp, lat, lon, 'geocode') for cp, (lat, lon) in
+                      {normalize_cp(cp): point for cp, point in located.items()}.items()])
+                print(f"\n✅ {catchment.CENTROIDS_TABLE} mis à jour")
+
+        if args.output:
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['cp', 'lat', 'lon', 'clients'])
+                for cp in sorted(located):
+                    writer.writerow([cp, *located[cp], clients[cp]])
+            print(f"✅ {len(located):,} codes exportés dans {args.output}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
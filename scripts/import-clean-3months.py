@@ -12,6 +12,11 @@ Ce script :
 5. ✅ Importe les nouvelles données
 6. ✅ Vérifie l'intégrité 2 fois
 
+Les fichiers sont contrôlés avant tout (decor.preflight) : une extraction
+avec produits orphelins ou dates illisibles est rejetée sans toucher la BDD.
+Après l'import, les mêmes relations sont revérifiées sur la BDD
+(règles de référence de decor.validation).
+
 ⚠️  ATTENTION : Ce script supprimera TOUTES les données actuelles !
 """
 
@@ -23,6 +28,11 @@ import os
 from dotenv import load_dotenv
 import sys
 
+from decor import preflight, validation, version
+from decor.backends import PostgresBackend
+from decor.depots import canonical_depot
+from decor.dimensions import fill_keys, has_keys, unresolved
+
 # Charger variables d'environnement
 load_dotenv()
 
@@ -44,6 +54,25 @@ print("""
 ╚══════════════════════════════════════════════════════════════╝
 """)
 
+# ============================================================================
+# ÉTAPE 0 : CONTRÔLE DES FICHIERS (AVANT TOUTE LECTURE PANDAS)
+# ============================================================================
+
+print("\n" + "="*80)
+print("🔍 ÉTAPE 0 : Contrôle des fichiers")
+print("="*80 + "\n")
+
+preflight_report = preflight.validate_extract(DATA_DIR, period=(DATE_START, DATE_END))
+validation.print_results(preflight_report)
+preflight_errors = validation.failures(preflight_report)
+if preflight_errors:
+    print(f"\n❌ ERREUR : extraction rejetée ({len(preflight_errors)} règle(s) en erreur), BDD inchangée")
+    sys.exit(1)
+
+orphelins = {r['id']: r for r in preflight_report['regles'] if r['regle'] == 'reference' and r['statut'] != 'ignoree'}
+missing_clients = orphelins.get('lignevente.carte reference → clients.carte', {}).get('cles_orphelines', 0)
+missing_produits = orphelins.get('lignevente.produit reference → produits.id', {}).get('cles_orphelines', 0)
+
 # ============================================================================
 # ÉTAPE 1 : LECTURE ET FILTRAGE DES TRANSACTIONS
 # ============================================================================
@@ -397,6 +426,8 @@ print(f"  ✅ {cur.rowcount:,} produits supprimés")
 
 # Note : on ne touche pas aux magasins car ils ne sont pas dans les nouveaux fichiers
 
+# Version incrémentée avec chaque écriture validée : exports en cache périmés
+version.bump(cur)
 conn.commit()
 print(f"\n✅ BDD nettoyée")
 
@@ -466,6 +497,7 @@ insert_query = """
 """
 
 execute_batch(cur, insert_query, clients_data, page_size=1000)
+version.bump(cur)
 conn.commit()
 
 print(f"✅ {len(clients_data):,} clients importés")
@@ -527,6 +559,7 @@ insert_query = """
 """
 
 execute_batch(cur, insert_query, produits_data, page_size=1000)
+version.bump(cur)
 conn.commit()
 
 print(f"✅ {len(produits_data):,} produits importés")
@@ -566,7 +599,7 @@ for _, row in df_transactions.iterrows():
     transaction = {
         'facture': str(row['N° Facture client']),
         'carte': str(row['N° Carte fidélité']),
-        'depot': str(row['Dépôt']),
+        'depot': canonical_depot(row['Dépôt'] if pd.notna(row['Dépôt']) else None),  # 'M32' → '32', comme magasins.code
         'date': row['Date facture'].strftime('%Y-%m-%d'),
         'heure': int(row.get('Heure mouvement', 0)) if pd.notna(row.get('Heure mouvement')) else None,
         'produit': str(row['N° Produit']),
@@ -602,9 +635,28 @@ batch_size = 1000
 for i in range(0, len(transactions_data), batch_size):
     batch = transactions_data[i:i+batch_size]
     execute_batch(cur, insert_query, batch, page_size=batch_size)
+    version.bump(cur)
     conn.commit()
     print(f"  ✅ {min(i+batch_size, len(transactions_data)):,} / {len(transactions_data):,} transactions importées")
 
+# Relations sur la BDD chargée (règles de référence de decor.validation, un
+# seul parcours de transactions), avant la résolution des clés : les
+# dimensions ne contiennent que les membres importés aux étapes 6 et 7
+backend = PostgresBackend(DATABASE_URL)
+try:
+    reference_rules = [r for r in validation.RULES if r['table'] == 'transactions' and r['regle'] == 'reference']
+    db_report = validation.validate(backend, rules=reference_rules, log=lambda message: None)
+finally:
+    backend.close()
+db_orphelins = {r['id']: r.get('cles_orphelines', 0) for r in db_report['regles']}
+missing_clients_db = db_orphelins.get('transactions.carte reference → clients.carte', 0)
+missing_produits_db = db_orphelins.get('transactions.produit reference → produits.id', 0)
+
+# Clés entières des lignes chargées (base migrée avec apply-migration.py cles)
+if has_keys(cur):
+    fill_keys(cur)
+    version.bump(cur)
+    conn.commit()
 print(f"✅ {len(transactions_data):,} transactions importées")
 
 # ============================================================================
@@ -629,6 +681,13 @@ cur.execute("SELECT COUNT(*) FROM produits")
 produits_count_after = cur.fetchone()[0]
 print(f"  • Produits : {produits_count_after:,}")
 
+# Lignes sans membre de dimension (carte anonyme '0', produit orphelin) :
+# clé entière NULL, aucune ligne créée dans clients / produits
+sans_membre = unresolved(cur) if has_keys(cur) else {}
+for fk, count in sans_membre.items():
+    if count:
+        print(f"  • Lignes sans membre ({fk} NULL) : {count:,}")
+
 # Vérifications
 print(f"\n✅ Vérification 1/2 - Comptages :")
 assert trans_count_after == len(transactions_data), f"❌ Transactions : {trans_count_after} ≠ {len(transactions_data)}"
@@ -648,32 +707,28 @@ print("\n" + "="*80)
 print("🔍 ÉTAPE 10 : Vérification intégrité (2/2)")
 print("="*80)
 
-print(f"\n🔗 Vérification des relations :")
+# Relations contrôlées sur les fichiers à l'étape 0...
+print(f"\n🔗 Vérification des relations (contrôle des fichiers, étape 0) :")
 
-# Clients manquants
-cur.execute("""
-    SELECT COUNT(DISTINCT t.carte)
-    FROM transactions t
-    LEFT JOIN clients c ON t.carte = c.carte
-    WHERE c.carte IS NULL
-""")
-missing_clients = cur.fetchone()[0]
 print(f"  • Clients manquants : {missing_clients}")
 if missing_clients > 0:
     print(f"    ⚠️  {missing_clients} cartes dans transactions mais pas dans clients")
 
-# Produits manquants
-cur.execute("""
-    SELECT COUNT(DISTINCT t.produit)
-    FROM transactions t
-    LEFT JOIN produits p ON t.produit = p.id
-    WHERE p.id IS NULL
-""")
-missing_produits = cur.fetchone()[0]
 print(f"  • Produits manquants : {missing_produits}")
 if missing_produits > 0:
     print(f"    ⚠️  {missing_produits} produits dans transactions mais pas dans produits")
 
+# ... et sur la BDD une fois chargée (contrôle fait en fin d'étape 8, avant
+# la résolution des clés) : attrape ce que le mapping ou l'import a perdu
+print(f"\n🔗 Vérification des relations (BDD) :")
+validation.print_results(db_report)
+if (missing_clients_db, missing_produits_db) != (missing_clients, missing_produits):
+    print(f"  ⚠️  Écart fichiers / BDD : clients {missing_clients} → {missing_clients_db}, "
+          f"produits {missing_produits} → {missing_produits_db}")
+db_errors = validation.failures(db_report)
+if db_errors:
+    print(f"\n❌ ERREUR : {len(db_errors)} règle(s) de référence en erreur après import")
+
 # Statistiques finales
 print(f"\n📊 Statistiques finales :")
 
@@ -729,8 +784,8 @@ print(f"""
   • {clients_count_after:,} clients importés
   • {produits_count_after:,} produits importés
   • Période : {DATE_START} → {DATE_END}
-  • Clients manquants : {missing_clients}
-  • Produits manquants : {missing_produits}
+  • Clients manquants : {missing_clients_db} (fichiers : {missing_clients})
+  • Produits manquants : {missing_produits_db} (fichiers : {missing_produits})
 
 🚀 Votre application Magic Système est prête avec des données propres !
 """)
@@ -7,26 +7,30 @@ Adapté pour les nouveaux formats avec:
 - Heure mouvement et Montant TTC pour les transactions
 """
 import pandas as pd
-import psycopg2
 from psycopg2.extras import execute_values
 import os
+import sys
 from datetime import datetime
 
-# Configuration de la base de données - Lire depuis .env
-DATABASE_URL = None
-env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-with open(env_path, 'r') as f:
-    for line in f:
-        if line.startswith('DATABASE_URL='):
-            DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-            break
+from decor.db import connection, transaction, warm_up
+from decor.depots import canonical_depot, validate_codes
+from decor.dimensions import key_caches
+from decor.env import get_database_url
+from decor.schema import ensure_partitions
+from decor import preflight, validation, version
+from decor.aggregates import refresh_all
+from decor.sage import find_client_file
+
+# Configuration de la base de données (environnement ou .env)
+DATABASE_URL = get_database_url()
 
 if not DATABASE_URL:
     print("❌ DATABASE_URL non trouvé dans .env")
     exit(1)
 
-# Chemins des nouveaux fichiers
-DATA_DIR = '/Users/marceau/Desktop/test data/decor-analytics/data/nouveaux/fevrier2026'
+# Chemins des nouveaux fichiers (un autre dossier peut être passé en argument,
+# par ex. un jeu généré par scripts/generate-synthetic-data.py)
+DATA_DIR = sys.argv[1] if len(sys.argv) > 1 else '/Users/marceau/Desktop/test data/decor-analytics/data/nouveaux/fevrier2026'
 
 def log_progress(phase, current, total):
     """Affiche la progression"""
@@ -53,13 +57,13 @@ def clean_float(value):
 # ============================================================================
 # IMPORT CLIENTS avec Nom, Prénom, Email, Téléphone
 # ============================================================================
-def import_clients():
+def import_clients(conn):
     print("\n" + "="*80)
     print("👥 IMPORT CLIENTS (Nouveau format avec contacts)")
     print("="*80)
     
     df = pd.read_csv(
-        f'{DATA_DIR}/Fichier_client_02-02-26 12.csv',
+        find_client_file(DATA_DIR) or f'{DATA_DIR}/Fichier_client_02-02-26 12.csv',
         sep=';',
         encoding='ISO-8859-1',
         low_memory=False,
@@ -82,16 +86,13 @@ def import_clients():
     # 9: Nom adresse
     # 10-13: Adresses, CP, Ville
     
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-    
     # Client anonyme "0"
-    cur.execute("""
-        INSERT INTO clients (carte, nom, ville) 
-        VALUES ('0', 'Anonyme', 'Inconnu') 
-        ON CONFLICT (carte) DO NOTHING
-    """)
-    conn.commit()
+    with transaction(conn) as cur:
+        cur.execute("""
+            INSERT INTO clients (carte, nom, ville) 
+            VALUES ('0', 'Anonyme', 'Inconnu') 
+            ON CONFLICT (carte) DO NOTHING
+        """)
     
     BATCH_SIZE = 5000
     total_imported = 0
@@ -150,38 +151,36 @@ def import_clients():
             ))
         
         if values:
-            execute_values(
-                cur,
-                """
-                INSERT INTO clients (
-                    carte, nom, prenom, email, telephone,
-                    date_creation, statut, date_validite, civilite, date_naissance, sexe,
-                    nom_adresse, adresse, adresse_2, adresse_4, cp, ville
+            with transaction(conn) as cur:
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO clients (
+                        carte, nom, prenom, email, telephone,
+                        date_creation, statut, date_validite, civilite, date_naissance, sexe,
+                        nom_adresse, adresse, adresse_2, adresse_4, cp, ville
+                    )
+                    VALUES %s
+                    ON CONFLICT (carte) DO UPDATE SET
+                        nom = EXCLUDED.nom,
+                        prenom = EXCLUDED.prenom,
+                        email = EXCLUDED.email,
+                        telephone = EXCLUDED.telephone,
+                        date_creation = EXCLUDED.date_creation,
+                        statut = EXCLUDED.statut,
+                        civilite = EXCLUDED.civilite,
+                        sexe = EXCLUDED.sexe,
+                        cp = EXCLUDED.cp,
+                        ville = EXCLUDED.ville
+                    """,
+                    values
                 )
-                VALUES %s
-                ON CONFLICT (carte) DO UPDATE SET
-                    nom = EXCLUDED.nom,
-                    prenom = EXCLUDED.prenom,
-                    email = EXCLUDED.email,
-                    telephone = EXCLUDED.telephone,
-                    date_creation = EXCLUDED.date_creation,
-                    statut = EXCLUDED.statut,
-                    civilite = EXCLUDED.civilite,
-                    sexe = EXCLUDED.sexe,
-                    cp = EXCLUDED.cp,
-                    ville = EXCLUDED.ville
-                """,
-                values
-            )
-            conn.commit()
+                version.bump(cur)  # exports en cache périmés dès ce lot validé
             total_imported += len(values)
         
         if (i // BATCH_SIZE) % 10 == 0:
             log_progress('CLIENTS', min(i + BATCH_SIZE, len(df)), len(df))
     
-    cur.close()
-    conn.close()
-    
     print(f"✅ {total_imported:,} clients importés/mis à jour")
     
     # Stats sur les nouvelles colonnes
@@ -196,7 +195,7 @@ def import_clients():
 # ============================================================================
 # IMPORT PRODUITS avec Nom, Référence interne, Produit web
 # ============================================================================
-def import_produits():
+def import_produits(conn):
     print("\n" + "="*80)
     print("📦 IMPORT PRODUITS (Nouveau format avec noms)")
     print("="*80)
@@ -222,17 +221,6 @@ def import_produits():
     # 7: Libellé SSS/Famille
     # 8: Produit web ⭐ (yes/no)
     
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-    
-    # Produit "0"
-    cur.execute("""
-        INSERT INTO produits (id, nom, famille) 
-        VALUES ('0', 'Inconnu', 'Inconnu') 
-        ON CONFLICT (id) DO NOTHING
-    """)
-    conn.commit()
-    
     values = []
     for _, row in df.iterrows():
         prod_id = clean_string(row.iloc[0])
@@ -261,27 +249,31 @@ def import_produits():
             sous_sous_sous_famille
         ))
     
-    execute_values(
-        cur,
-        """
-        INSERT INTO produits (
-            id, nom, reference_interne, produit_web,
-            famille, sous_famille, sous_sous_famille, sous_sous_sous_famille
+    # Produit "0" et catalogue dans une seule transaction
+    with transaction(conn) as cur:
+        cur.execute("""
+            INSERT INTO produits (id, nom, famille) 
+            VALUES ('0', 'Inconnu', 'Inconnu') 
+            ON CONFLICT (id) DO NOTHING
+        """)
+        execute_values(
+            cur,
+            """
+            INSERT INTO produits (
+                id, nom, reference_interne, produit_web,
+                famille, sous_famille, sous_sous_famille, sous_sous_sous_famille
+            )
+            VALUES %s
+            ON CONFLICT (id) DO UPDATE SET
+                nom = EXCLUDED.nom,
+                reference_interne = EXCLUDED.reference_interne,
+                produit_web = EXCLUDED.produit_web,
+                famille = EXCLUDED.famille,
+                sous_famille = EXCLUDED.sous_famille
+            """,
+            values
         )
-        VALUES %s
-        ON CONFLICT (id) DO UPDATE SET
-            nom = EXCLUDED.nom,
-            reference_interne = EXCLUDED.reference_interne,
-            produit_web = EXCLUDED.produit_web,
-            famille = EXCLUDED.famille,
-            sous_famille = EXCLUDED.sous_famille
-        """,
-        values
-    )
-    conn.commit()
-    
-    cur.close()
-    conn.close()
+        version.bump(cur)
     
     print(f"✅ {len(values):,} produits importés/mis à jour")
     
@@ -297,13 +289,15 @@ def import_produits():
 # ============================================================================
 # IMPORT MAGASINS (inchangé)
 # ============================================================================
-def import_magasins():
+def import_magasins(conn):
     print("\n" + "="*80)
     print("🏪 IMPORT MAGASINS (format inchangé)")
     print("="*80)
     
-    # On utilise les anciens fichiers pour les magasins
+    # On utilise les anciens fichiers pour les magasins, sauf s'ils sont fournis avec l'extraction
     old_data_dir = '/Users/marceau/Desktop/test data/data/nouveaux'
+    if os.path.exists(f'{DATA_DIR}/Points de vente.csv'):
+        old_data_dir = DATA_DIR
     
     try:
         df = pd.read_csv(
@@ -317,17 +311,6 @@ def import_magasins():
     
     print(f"   📊 Lignes lues: {len(df):,}")
     
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-    
-    # Magasin "0"
-    cur.execute("""
-        INSERT INTO magasins (code, nom) 
-        VALUES ('0', 'Inconnu') 
-        ON CONFLICT (code) DO NOTHING
-    """)
-    conn.commit()
-    
     cols = list(df.columns)
     values = []
     
@@ -335,6 +318,7 @@ def import_magasins():
         code = clean_string(row[cols[1]] if len(cols) > 1 else None)
         if not code:
             continue
+        code = canonical_depot(code)
         
         values.append((
             code,
@@ -344,44 +328,94 @@ def import_magasins():
             clean_string(row[cols[6]] if len(cols) > 6 else None)
         ))
     
-    execute_values(
-        cur,
-        """
-        INSERT INTO magasins (code, nom, zone, ville, cp)
-        VALUES %s
-        ON CONFLICT (code) DO NOTHING
-        """,
-        values
-    )
-    conn.commit()
-    
-    cur.close()
-    conn.close()
+    # Magasin "0" et points de vente dans une seule transaction
+    with transaction(conn) as cur:
+        cur.execute("""
+            INSERT INTO magasins (code, nom) 
+            VALUES ('0', 'Inconnu') 
+            ON CONFLICT (code) DO NOTHING
+        """)
+        execute_values(
+            cur,
+            """
+            INSERT INTO magasins (code, nom, zone, ville, cp)
+            VALUES %s
+            ON CONFLICT (code) DO NOTHING
+            """,
+            values
+        )
+        version.bump(cur)
     
     print(f"✅ {len(values):,} magasins importés")
 
 # ============================================================================
 # IMPORT TRANSACTIONS avec Heure et Montant TTC
 # ============================================================================
-def import_transactions():
+def insert_transactions(conn, rows, caches=None):
+    """
+    Insérer un lot de lignes de vente (une transaction par lot, qui
+    incrémente la version des données). Avec `caches` (decor.dimensions), les clés entières carte_id,
+    produit_id et depot_id sont écrites avec la ligne.
+    """
+    with transaction(conn) as cur:
+        columns = ("facture, carte, depot, date, heure, produit, "
+                   "quantite, prix, montant_ttc, ca, is_web, ville, cp")
+        if caches:
+            cartes = caches['carte'].resolve(cur, {r[1] for r in rows})
+            produits = caches['produit'].resolve(cur, {r[5] for r in rows})
+            depots = caches['depot'].resolve(cur, {r[2] for r in rows})
+            rows = [r + (cartes[r[1]], produits[r[5]], depots[r[2]]) for r in rows]
+            columns += ", carte_id, produit_id, depot_id"
+        execute_values(
+            cur,
+            f"""
+            INSERT INTO transactions ({columns})
+            VALUES %s
+            ON CONFLICT DO NOTHING
+            """,
+            rows
+        )
+        version.bump(cur)
+
+def import_transactions(conn):
     print("\n" + "="*80)
     print("🎫 IMPORT TRANSACTIONS (Nouveau format avec heure et TTC)")
     print("="*80)
-    
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
-    
+
     # Désactiver temporairement les contraintes FK
     print("   🔒 Désactivation contraintes FK...")
-    cur.execute("ALTER TABLE transactions DISABLE TRIGGER ALL")
-    conn.commit()
-    
+    with transaction(conn) as cur:
+        cur.execute("ALTER TABLE transactions DISABLE TRIGGER ALL")
+
+    try:
+        total_imported, months = load_transactions(conn)
+    finally:
+        # Réactiver les contraintes (même si l'import échoue en cours de route)
+        print("   🔓 Réactivation contraintes FK...")
+        with transaction(conn) as cur:
+            cur.execute("ALTER TABLE transactions ENABLE TRIGGER ALL")
+
+    print(f"✅ {total_imported:,} transactions importées")
+
+    # Tables précalculées (tickets, cohortes...) des mois chargés
+    if months:
+        print(f"   🔄 Agrégats {months[0]} → {months[-1]}...")
+        refresh_all(conn, months[0], months[-1])
+
+def load_transactions(conn):
     print("   📖 Lecture du fichier par chunks...")
     
     CHUNK_SIZE = 10000
     BATCH_SIZE = 2000
     total_imported = 0
     buffer = []
+    months_ready = set()  # mois dont la partition existe (transactions partitionnée)
+    depots_vus = set()    # codes dépôt canoniques, validés contre la liste officielle
+    with transaction(conn) as cur:
+        caches = key_caches(cur)  # None tant que `apply-migration.py cles` n'a pas été lancé
+    if caches:
+        print(f"   🔢 Clés entières: {len(caches['carte'].ids):,} cartes, "
+              f"{len(caches['produit'].ids):,} produits, {len(caches['depot'].ids):,} dépôts en cache")
     
     # Colonnes du nouveau fichier lignevente.csv:
     # 0: N° Carte fidélité
@@ -409,7 +443,7 @@ def import_transactions():
                 continue
             
             carte = clean_string(row.iloc[0]) or '0'
-            depot = clean_string(row.iloc[2]) or '0'
+            depot = canonical_depot(clean_string(row.iloc[2]))
             date_str = clean_string(row.iloc[3])
             produit = clean_string(row.iloc[5]) or '0'
             
@@ -438,57 +472,37 @@ def import_transactions():
             # Pour l'instant on garde la logique actuelle
             is_web = False
             
+            # Partition du mois (et du mois suivant) créée avant la première ligne
+            if date_val[:7] not in months_ready:
+                with transaction(conn) as cur:
+                    for month in ensure_partitions(cur, date_val):
+                        print(f"   📅 Partition {month:%Y-%m} créée")
+                months_ready.add(date_val[:7])
+            
+            depots_vus.add(depot)
             buffer.append((
                 facture, carte, depot, date_val, heure, produit,
                 quantite, prix, montant_ttc, ca, is_web, None, None
             ))
             
             if len(buffer) >= BATCH_SIZE:
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO transactions (
-                        facture, carte, depot, date, heure, produit,
-                        quantite, prix, montant_ttc, ca, is_web, ville, cp
-                    )
-                    VALUES %s
-                    ON CONFLICT DO NOTHING
-                    """,
-                    buffer
-                )
-                conn.commit()
+                insert_transactions(conn, buffer, caches)
                 total_imported += len(buffer)
                 buffer = []
-        
+
         if chunk_num % 10 == 0:
             print(f"   📊 Traité: {total_imported:,} lignes...")
-    
+
     # Dernier batch
     if buffer:
-        execute_values(
-            cur,
-            """
-            INSERT INTO transactions (
-                facture, carte, depot, date, heure, produit,
-                quantite, prix, montant_ttc, ca, is_web, ville, cp
-            )
-            VALUES %s
-            ON CONFLICT DO NOTHING
-            """,
-            buffer
-        )
-        conn.commit()
+        insert_transactions(conn, buffer, caches)
         total_imported += len(buffer)
-    
-    # Réactiver les contraintes
-    print("   🔓 Réactivation contraintes FK...")
-    cur.execute("ALTER TABLE transactions ENABLE TRIGGER ALL")
-    conn.commit()
-    
-    cur.close()
-    conn.close()
-    
-    print(f"✅ {total_imported:,} transactions importées")
+
+    inconnus = validate_codes(depots_vus)
+    if inconnus:
+        print(f"   ⚠️  Dépôts absents de la liste officielle des caisses: {', '.join(inconnus)}")
+
+    return total_imported, sorted(months_ready)
 
 # ============================================================================
 # MAIN
@@ -503,25 +517,54 @@ def main():
     print("   • Produits: Nom, Référence interne, Produit web")
     print("   • Transactions: Heure mouvement, Montant TTC")
     
+    # Extraction contrôlée avant de toucher la base (decor.preflight)
+    print("\n🔍 Contrôle de l'extraction...")
+    report = preflight.validate_extract(DATA_DIR)
+    errors = validation.failures(report)
+    if errors:
+        validation.print_results(report)
+        print(f"\n❌ Extraction rejetée : {len(errors)} règle(s) en erreur, aucune donnée chargée")
+        print("   Détail : python scripts/validate-extract.py " + DATA_DIR)
+        sys.exit(1)
+    warnings = validation.failures(report, ('avertissement',))
+    for result in warnings:
+        print(f"   ⚠️  {result['id']} : {result['violations']:,} ligne(s)")
+    print(f"   ✅ Extraction conforme ({len(warnings)} avertissement(s))")
+
+    # Connexion ouverte pendant la confirmation (réveil Neon + TLS en parallèle)
+    warm_up(DATABASE_URL)
     input("\n⏸️  Appuyez sur Entrée pour continuer (ou Ctrl+C pour annuler)...")
-    
+
     try:
         # Pas de nettoyage complet, on fait des UPSERT pour mettre à jour
         print("\n📝 Mode: UPSERT (mise à jour des données existantes)")
-        
-        import_magasins()  # D'abord les magasins (dépendance)
-        import_clients()   # Ensuite les clients
-        import_produits()  # Puis les produits
-        import_transactions()  # Enfin les transactions
-        
-        # Stats finales
+
+        # Une seule connexion pour tout l'import
+        with connection(DATABASE_URL) as conn:
+            import_magasins(conn)  # D'abord les magasins (dépendance)
+            import_clients(conn)   # Ensuite les clients
+            import_produits(conn)  # Puis les produits
+            import_transactions(conn)  # Enfin les transactions
+            print_final_stats(conn)
+
         print("\n" + "="*80)
-        print("📊 STATISTIQUES FINALES")
+        print("✅ IMPORT TERMINÉ AVEC SUCCÈS !")
         print("="*80)
-        
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
-        
+
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Import annulé par l'utilisateur")
+    except Exception as e:
+        print(f"\n\n❌ ERREUR: {e}")
+        import traceback
+        traceback.print_exc()
+
+def print_final_stats(conn):
+    # Stats finales
+    print("\n" + "="*80)
+    print("📊 STATISTIQUES FINALES")
+    print("="*80)
+
+    with transaction(conn) as cur:
         cur.execute('SELECT COUNT(*) FROM clients')
         clients_count = cur.fetchone()[0]
         cur.execute('SELECT COUNT(*) FROM clients WHERE email IS NOT NULL')
@@ -545,20 +588,6 @@ def main():
         trans_heure = cur.fetchone()[0]
         print(f"\n🎫 Transactions: {trans_count:,}")
         print(f"   └─ avec heure: {trans_heure:,} ({trans_heure/trans_count*100:.1f}%)")
-        
-        cur.close()
-        conn.close()
-        
-        print("\n" + "="*80)
-        print("✅ IMPORT TERMINÉ AVEC SUCCÈS !")
-        print("="*80)
-        
-    except KeyboardInterrupt:
-        print("\n\n⚠️  Import annulé par l'utilisateur")
-    except Exception as e:
-        print(f"\n\n❌ ERREUR: {e}")
-        import traceback
-        traceback.print_exc()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Conseiller d'index pour la table transactions
+---------------------------------------------
+Rejoue le catalogue de requêtes de l'API (et les requêtes relevées par
+decor.instrument) sur un PostgreSQL LOCAL, évalue chaque index candidat
+(composite, couvrant, BRIN) et écrit les index retenus dans une migration
+SQL pour apply-migration.py.
+
+Usage:
+  python scripts/index-advisor.py --database-url postgresql://localhost/decor
+  python scripts/index-advisor.py --module stores --module rfm -n 5
+  python scripts/index-advisor.py --workload data/query-reports/analyse-magasins-anomalies-*.json
+  python scripts/index-advisor.py --list
+  python scripts/apply-migration.py sql scripts/migrations/<date>-index-advisor.sql
+"""
+import argparse
+import sys
+
+from decor.backends import PostgresBackend
+from decor.bench import RESULTS_DIR
+from decor.index_advisor import (
+    CANDIDATES, candidate_sql, is_local, load_workload, run_advisor, save_report,
+    select_indexes, write_migration,
+)
+from decor.queries import list_modules, select_queries
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Conseiller d'index composites / couvrants / BRIN")
+    parser.add_argument('--database-url', help="URL PostgreSQL (défaut: DATABASE_URL)")
+    parser.add_argument('--module', action='append', choices=list_modules(),
+                        help="Limiter le catalogue à un module de l'API (répétable)")
+    parser.add_argument('--query', action='append', help="Limiter à une requête (répétable)")
+    parser.add_argument('--workload', nargs='+', default=[],
+                        help="Rapports JSON de decor.instrument à rejouer en plus")
+    parser.add_argument('--candidate', action='append', help="Limiter à un index candidat (répétable)")
+    parser.add_argument('-n', '--iterations', type=int, default=3, help="Itérations chaudes par requête")
+    parser.add_argument('--min-gain', type=float, default=0.10,
+                        help="Gain minimal sur la charge pour retenir un index (0.10 = -10%%)")
+    parser.add_argument('--output', help="Fichier de migration (défaut: scripts/migrations/<date>-index-advisor.sql)")
+    parser.add_argument('--output-dir', default=str(RESULTS_DIR), help="Dossier du rapport JSON")
+    parser.add_argument('--allow-remote', action='store_true',
+                        help="Autoriser une base non locale (les index y sont créés puis supprimés)")
+    parser.add_argument('--list', action='store_true', help="Lister les index candidats")
+    return parser.parse_args()
+
+
+def fmt_size(size):
+    return f"{size / 1024 / 1024:7.1f} Mo"
+
+
+def print_result(result):
+    if 'error' in result:
+        print(f"   ❌ {result['name']:<28} {result['error'].splitlines()[0][:70]}")
+        return
+    marker = '🟢' if result['used_by'] and result['gain'] > 0 else '  '
+    print(f"   {marker} {result['name']:<28} {fmt_size(result['size_bytes'])}  "
+          f"création {result['build_seconds']:5.1f}s  gain {result['gain'] * 100:+6.1f} %  "
+          f"{result['saved_ms_per_mb']:8.1f} ms/Mo  ({len(result['used_by'])} requête(s))")
+
+
+def main():
+    args = parse_args()
+    candidates = [c for c in CANDIDATES if not args.candidate or c['name'] in args.candidate]
+
+    if args.list:
+        for candidate in candidates:
+            print(f"{candidate['name']:<28} {candidate_sql(candidate).format(name='…')}")
+            print(f"{'':<28} ↳ {candidate['why']}")
+        return
+
+    queries = select_queries(args.module, args.query) + load_workload(args.workload)
+    if not queries or not candidates:
+        print("❌ Aucune requête ou aucun candidat ne correspond aux filtres")
+        sys.exit(1)
+
+    try:
+        backend = PostgresBackend(args.database_url).connect()
+    except Exception as e:
+        print(f"❌ Connexion impossible: {e}")
+        sys.exit(1)
+
+    if not is_local(backend.target) and not args.allow_remote:
+        print(f"❌ {backend.target} n'est pas une base locale : utiliser --allow-remote en connaissance de cause")
+        backend.close()
+        sys.exit(1)
+
+    print(f"\n🔍 CONSEILLER D'INDEX - {len(queries)} requêtes, {len(candidates)} candidats ({backend.target})")
+    print('=' * 100)
+    try:
+        report = run_advisor(backend, queries, candidates, iterations=args.iterations, on_result=print_result)
+    finally:
+        backend.close()
+
+    print('\n' + '=' * 100)
+    print(f"⏱️  Charge de référence: {report['baseline_total']:.2f}s (somme des p50 chauds)")
+    print(f"💾 Rapport: {save_report(report, args.output_dir)}")
+
+    chosen = select_indexes(report, args.min_gain)
+    if not chosen:
+        print(f"\nℹ️  Aucun index ne fait gagner {args.min_gain * 100:.0f} % sur la charge")
+        return
+
+    path = write_migration(chosen, report, args.output)
+    print(f"\n✅ {len(chosen)} index retenus → {path}")
+    for result in chosen:
+        print(f"   • {result['name']} ({fmt_size(result['size_bytes']).strip()}, gain {result['gain'] * 100:.0f} %)")
+    print(f"\nAppliquer : python scripts/apply-migration.py sql {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Rapprochement d'une extraction Sage avec la base
+------------------------------------------------
+Totaux (lignes, tickets, CA, quantité) par jour et par dépôt : lignevente.csv
+lu une fois, `transactions` lue en une requête groupée (decor.reconcile).
+Seules les cellules en écart sont affichées, par mois puis par jour ;
+rapport Markdown + JSON dans data/reconciliation-reports/.
+
+Usage:
+  python scripts/reconcile-extract.py /chemin/extraction
+  python scripts/reconcile-extract.py /chemin/extraction --since 2025-11 --until 2025-11
+  python scripts/reconcile-extract.py /chemin/extraction --depot 32 --strict   # code 1 si écart
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from decor import reconcile
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+from decor.sage import LIGNEVENTE_FILE
+from decor.schema import add_months, parse_month
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rapprochement d'une extraction Sage avec la base")
+    parser.add_argument('data_dir', help="Dossier de l'extraction (contient lignevente.csv)")
+    parser.add_argument('--since', help="Premier mois rapproché (YYYY-MM)")
+    parser.add_argument('--until', help="Dernier mois rapproché (YYYY-MM)")
+    parser.add_argument('--depot', action='append', help="Limiter les écarts affichés à ce dépôt (répétable)")
+    parser.add_argument('--top', type=int, default=20, help="Écarts journaliers affichés")
+    parser.add_argument('--strict', action='store_true', help="Code de sortie 1 s'il reste un écart")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    path = Path(args.data_dir) / LIGNEVENTE_FILE
+    if not path.exists():
+        print(f"❌ Fichier introuvable : {path}")
+        sys.exit(1)
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    since = str(parse_month(args.since)) if args.since else None
+    until = str(add_months(parse_month(args.until), 1)) if args.until else None
+
+    start = time.perf_counter()
+    source = reconcile.csv_totals(path, since, until)
+    print(f"📄 {path.name} : {len(source):,} cellules (jour × dépôt) en {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    conn = connect(database_url)
+    try:
+        with transaction(conn) as cur:
+            database = reconcile.db_totals(cur, since, until)
+    finally:
+        conn.close()
+    print(f"🗄️  transactions : {len(database):,} cellules en {time.perf_counter() - start:.1f}s")
+
+    if args.depot:
+        source = {key: cell for key, cell in source.items() if key[1] in args.depot}
+        database = {key: cell for key, cell in database.items() if key[1] in args.depot}
+
+    gaps = reconcile.diff(source, database)
+    month_gaps = reconcile.diff(reconcile.by_month(source), reconcile.by_month(database), label='mois')
+    summary = {side: dict(zip(reconcile.METRICS, reconcile.totals(cells)))
+               for side, cells in (('fichier', source), ('base', database))}
+
+    print(f"\n   {'Indicateur':<10} {'Fichier':>16} {'Base':>16} {'Écart':>14}")
+    for metric in reconcile.METRICS:
+        left, right = summary['fichier'][metric], summary['base'][metric]
+        icon = '❌' if any(gap['indicateur'] == metric for gap in month_gaps) else '✅'
+        print(f"{icon} {metric:<10} {left:>16,.2f} {right:>16,.2f} {right - left:>+14,.2f}")
+
+    if month_gaps:
+        print(f"\n🔍 {len(month_gaps):,} écarts (mois × dépôt) :")
+        print(f"   {'Mois':<8} {'Dépôt':<6} {'Indicateur':<10} {'Fichier':>14} {'Base':>14} {'Écart':>12}")
+        for gap in month_gaps:
+            print(f"   {gap['mois']:<8} {gap['depot']:<6} {gap['indicateur']:<10} "
+                  f"{gap['fichier']:>14,.2f} {gap['base']:>14,.2f} {gap['ecart']:>+12,.2f}")
+    if gaps:
+        # CA d'abord, puis par écart absolu décroissant
+        print(f"\n🔍 {len(gaps):,} écarts (jour × dépôt), les {min(args.top, len(gaps))} premiers :")
+        print(f"   {'Jour':<11} {'Dépôt':<6} {'Indicateur':<10} {'Fichier':>14} {'Base':>14} {'Écart':>12}")
+        for gap in sorted(gaps, key=lambda g: (g['indicateur'] != 'ca', -abs(g['ecart'])))[:args.top]:
+            print(f"   {gap['jour']:<11} {gap['depot']:<6} {gap['indicateur']:<10} "
+                  f"{gap['fichier']:>14,.2f} {gap['base']:>14,.2f} {gap['ecart']:>+12,.2f}")
+    else:
+        print("\n✅ Aucun écart entre le fichier et la base")
+
+    meta = {
+        'fichier': str(path),
+        'base': describe_database_url(database_url),
+        'debut': since,
+        'fin': until,
+        'depots': args.depot,
+        'cellules_fichier': len(source),
+        'cellules_base': len(database),
+    }
+    report = reconcile.write_report(gaps, month_gaps, summary, meta)
+    print(f"\n📝 Rapport : {report}")
+    if gaps and args.strict:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Mise à jour des tables précalculées (tickets, cohortes...)
+----------------------------------------------------------
+Les imports appellent déjà decor.aggregates.refresh_all pour les mois
+chargés ; ce script sert à créer les tables, à tout reconstruire ou à
+rattraper une période.
+
+Usage:
+  python scripts/refresh-aggregates.py --full                 # création + recalcul complet
+  python scripts/refresh-aggregates.py                        # mois courant
+  python scripts/refresh-aggregates.py --since 2025-11        # de novembre 2025 au mois courant
+  python scripts/refresh-aggregates.py --only cohortes --full
+"""
+import argparse
+import sys
+import time
+from datetime import date
+
+from decor.aggregates import AGGREGATES, rebuild_all, refresh_all
+from decor.db import connect
+from decor.env import describe_database_url, get_database_url
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mise à jour des tables précalculées")
+    parser.add_argument('--full', action='store_true', help="Créer les tables et tout recalculer")
+    parser.add_argument('--since', help="Premier mois à recalculer (AAAA-MM, défaut: mois courant)")
+    parser.add_argument('--until', help="Dernier mois à recalculer (AAAA-MM, défaut: mois courant)")
+    parser.add_argument('--only', action='append', choices=list(AGGREGATES),
+                        help="Limiter à un agrégat (répétable)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+
+    print(f"🔗 {describe_database_url(database_url)}")
+    conn = connect(database_url)
+    start = time.perf_counter()
+    try:
+        if args.full:
+            print("\n🏗️  RECALCUL COMPLET")
+            rebuild_all(conn, args.only)
+        else:
+            first = args.since or date.today()
+            last = args.until or date.today()
+            print(f"\n🔄 MISE À JOUR {str(first)[:7]} → {str(last)[:7]}")
+            results = refresh_all(conn, first, last, args.only)
+            missing = [name for name, result in results.items() if result is None]
+            if missing:
+                print(f"ℹ️  Tables absentes ({', '.join(missing)}) : lancer avec --full")
+    finally:
+        conn.close()
+    print(f"\n✅ Terminé en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
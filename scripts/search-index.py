@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Recherche clients, produits et tickets sur les index de decor.search
+--------------------------------------------------------------------
+Interroge les index créés par `apply-migration.py recherche` comme le ferait
+la recherche à la frappe, ou rejoue une frappe simulée (préfixes successifs
+de valeurs réelles) et mesure p50 / p95 par type.
+
+Usage:
+  python scripts/search-index.py "dupont ma"
+  python scripts/search-index.py 100004 --type ticket --limit 20
+  python scripts/search-index.py --bench --echantillon 100
+"""
+import argparse
+import sys
+import time
+
+from decor import search
+from decor.bench import percentile
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recherche clients, produits et tickets")
+    parser.add_argument('query', nargs='?', help="Texte recherché")
+    parser.add_argument('--type', action='append', choices=list(search.KINDS),
+                        help="Limiter à un type (répétable)")
+    parser.add_argument('--limit', type=int, default=10, help="Résultats par type")
+    parser.add_argument('--bench', action='store_true', help="Frappe simulée sur des valeurs tirées au hasard")
+    parser.add_argument('--echantillon', type=int, default=50, help="Avec --bench : valeurs tirées par type")
+    return parser.parse_args()
+
+
+def run_query(cur, args, kinds, trigram):
+    for kind in args.type or list(search.KINDS):
+        if kind not in kinds:
+            print(f"\n⚠️  {kind} : table {search.KINDS[kind]['table']} absente")
+            continue
+        start = time.perf_counter()
+        rows = search.search(cur, kind, args.query, args.limit, kinds, trigram)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n🔎 {kind} : {len(rows)} résultat(s) en {elapsed:.1f} ms")
+        for row in rows:
+            print("   " + " | ".join('' if value is None else str(value).strip() for value in row))
+
+
+def run_bench(cur, args, kinds, trigram):
+    terms = search.sample_terms(cur, {kind: kinds[kind] for kind in args.type or kinds if kind in kinds},
+                                args.echantillon)
+    print(f"\n   {'Type':<8} {'Requêtes':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    worst = 0
+    for kind, values in terms.items():
+        timings = []
+        for value in values:
+            for prefix in search.typing_prefixes(value):
+                start = time.perf_counter()
+                search.search(cur, kind, prefix, args.limit, kinds, trigram)
+                timings.append((time.perf_counter() - start) * 1000)
+        if not timings:
+            continue
+        p95 = percentile(timings, 95)
+        worst = max(worst, p95)
+        icon = '✅' if p95 <= search.TARGET_MS else '⚠️ '
+        print(f"{icon} {kind:<8} {len(timings):>9,} {percentile(timings, 50):>8.1f} {p95:>8.1f} {max(timings):>8.1f}")
+    return worst
+
+
+def main():
+    args = parse_args()
+    if not args.query and not args.bench:
+        print("❌ Texte recherché ou --bench attendu")
+        sys.exit(1)
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+    conn = connect(database_url)
+    try:
+        with transaction(conn) as cur:
+            if not search.has_function(cur):
+                print("❌ Index de recherche absents : python scripts/apply-migration.py recherche")
+                sys.exit(1)
+            kinds = search.available(cur)
+            trigram = search.has_trigram(cur)
+            print(f"   Mode : {'préfixes + sous-chaînes (pg_trgm)' if trigram else 'préfixes'}")
+            if args.query:
+                run_query(cur, args, kinds, trigram)
+            if args.bench:
+                worst = run_bench(cur, args, kinds, trigram)
+                print(f"\n{'✅' if worst <= search.TARGET_MS else '⚠️ '} p95 le plus lent : {worst:.1f} ms "
+                      f"(objectif {search.TARGET_MS} ms)")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
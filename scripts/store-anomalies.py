@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Anomalies journalières de tous les magasins
+-------------------------------------------
+Une requête agrégée pour tous les dépôts (decor.anomalies), détection
+vectorisée (résidus saisonniers, scores robustes), rapport Markdown + JSON
+dans data/anomaly-reports/.
+
+Usage:
+  python scripts/store-anomalies.py                        # tout l'historique
+  python scripts/store-anomalies.py --since 2025-01 --seuil 3
+  python scripts/store-anomalies.py --depot 32 --depot 12  # rapport limité à deux magasins
+"""
+import argparse
+import sys
+import time
+
+from decor import anomalies
+from decor.db import connect, transaction
+from decor.env import describe_database_url, get_database_url
+from decor.schema import add_months, parse_month
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Anomalies journalières de tous les magasins")
+    parser.add_argument('--since', help="Premier mois analysé (YYYY-MM, défaut: tout l'historique)")
+    parser.add_argument('--until', help="Dernier mois analysé (YYYY-MM)")
+    parser.add_argument('--depot', action='append', help="Limiter le rapport à ce dépôt (répétable)")
+    parser.add_argument('--seuil', type=float, default=anomalies.THRESHOLD,
+                        help=f"Score robuste minimal (défaut: {anomalies.THRESHOLD})")
+    parser.add_argument('--semaines', type=int, default=anomalies.WEEKS,
+                        help=f"Semaines de référence par jour de la semaine (défaut: {anomalies.WEEKS})")
+    parser.add_argument('--top', type=int, default=15, help="Anomalies affichées")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    database_url = get_database_url()
+    if not database_url:
+        print("❌ DATABASE_URL non trouvé dans .env")
+        sys.exit(1)
+    print(f"🔗 {describe_database_url(database_url)}")
+
+    # La référence saisonnière demande `semaines` semaines avant la période
+    since = parse_month(args.since) if args.since else None
+    history = add_months(since, -((args.semaines * 7) // 28 + 1)) if since else None
+    until = add_months(parse_month(args.until), 1) if args.until else None
+
+    conn = connect(database_url)
+    try:
+        start = time.perf_counter()
+        with transaction(conn) as cur:
+            depots, days, series, source = anomalies.load_daily(cur, history, until)
+        if not len(depots):
+            print("ℹ️  Aucune vente sur la période")
+            sys.exit(1)
+        unknown = anomalies.unknown_depots(depots)
+        depots, series = anomalies.select_depots(depots, series)
+        print(f"📊 {len(depots)} dépôts × {len(days)} jours lus depuis {source} "
+              f"en {time.perf_counter() - start:.1f}s")
+
+        found = anomalies.detect(depots, days, series, threshold=args.seuil, weeks=args.semaines)
+        summary = anomalies.summarize(depots, series)
+        if since:
+            found = [a for a in found if a['jour'] >= str(since)]
+        if args.depot:
+            found = [a for a in found if a['depot'] in args.depot]
+            summary = [row for row in summary if row[0] in args.depot]
+
+        meta = {
+            'debut': str(since or days[0]),
+            'fin': str(days[-1]),
+            'source': source,
+            'seuil': args.seuil,
+            'semaines': args.semaines,
+        }
+        path = anomalies.write_report(found, summary, unknown, meta)
+
+        if unknown:
+            print(f"⚠️  Dépôts hors liste officielle : {', '.join(unknown)}")
+        print(f"\n🚨 {len(found):,} anomalies (seuil {args.seuil})")
+        print(f"   {'Jour':<11} {'Dépôt':<6} {'Indicateur':<10} {'Type':<8} {'Valeur':>12} {'Attendu':>12} {'Score':>7}")
+        for a in found[:args.top]:
+            score = f"{a['score']:+.1f}" if a['score'] is not None else '-'
+            print(f"   {a['jour']:<11} {a['depot']:<6} {a['indicateur']:<10} {a['type']:<8} "
+                  f"{a['valeur']:>12,.2f} {a['attendu']:>12,.2f} {score:>7}")
+        print(f"\n📝 Rapport : {path}")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+"""
+Tests des fonctions pures du paquet decor (sans base de données)
+-----------------------------------------------------------------
+Les scripts importent `decor` depuis scripts/ : même chemin ici.
+
+    python -m pytest scripts/tests -q
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
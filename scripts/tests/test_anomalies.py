@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from decor.anomalies import detect, summarize  # noqa: E402
+
+DAYS = 84
+
+
+def make_series(seed=0):
+    rng = np.random.default_rng(seed)
+    depots = np.array(['32', '33', '34', '35'], dtype=object)
+    days = np.arange(np.datetime64('2025-01-06'), np.datetime64('2025-01-06') + DAYS)
+    weekly = np.tile([1.0, 1.0, 1.1, 1.1, 1.3, 1.6, 0.8], DAYS // 7)
+    tickets = np.round(40 * weekly * rng.normal(1, 0.05, (len(depots), DAYS)))
+    ca = tickets * 60 * rng.normal(1, 0.05, (len(depots), DAYS))
+    return depots, days, tickets, ca
+
+
+def as_series(tickets, ca):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        panier = np.where(tickets > 0, ca / tickets, np.nan)
+    return {'ca': ca, 'tickets': tickets, 'lignes': tickets * 3, 'panier': panier}
+
+
+def test_detect_flags_spike_and_absence():
+    depots, days, tickets, ca = make_series()
+    ca[1, 70] *= 4
+    tickets[2, 75] = 0
+    ca[2, 75] = 0
+    anomalies = detect(depots, days, as_series(tickets, ca))
+
+    absence = anomalies[0]
+    assert (absence['depot'], absence['jour'], absence['type'], absence['score']) == ('34', str(days[75]), 'absence', None)
+    spikes = [a for a in anomalies if a['indicateur'] == 'ca' and a['type'] == 'hausse']
+    assert ('33', str(days[70])) in {(a['depot'], a['jour']) for a in spikes}
+    assert all(a['ecart'] > 1 for a in spikes if (a['depot'], a['jour']) == ('33', str(days[70])))
+
+
+def test_detect_ignores_common_closure():
+    depots, days, tickets, ca = make_series()
+    # Jour férié : tous les dépôts fermés, ni absence ni baisse
+    tickets[:, 77] = 0
+    ca[:, 77] = 0
+    anomalies = detect(depots, days, as_series(tickets, ca))
+    assert not [a for a in anomalies if a['jour'] == str(days[77])]
+
+
+def test_detect_without_depots():
+    assert detect(np.array([], dtype=object), np.array([], dtype='datetime64[D]'), {}) == []
+
+
+def test_summarize_sorted_by_revenue():
+    depots = np.array(['32', 'WEB'], dtype=object)
+    series = {'tickets': np.array([[2.0, 0.0], [1.0, 3.0]]), 'ca': np.array([[100.0, 0.0], [50.0, 250.0]])}
+    assert summarize(depots, series) == [('WEB', 2, 300.0, 4, 75.0), ('32', 1, 100.0, 2, 50.0)]
@@ -0,0 +1,55 @@
+import pytest
+
+from decor.audiences import compose, names_in, segment, tokenize
+
+pyroaring = pytest.importorskip('pyroaring')
+
+SETS = {
+    'tous': pyroaring.BitMap(range(1, 11)),
+    'rfm:À Risque': pyroaring.BitMap([1, 2, 3, 4]),
+    'contact:email': pyroaring.BitMap([2, 3, 5, 7]),
+    'magasin:32': pyroaring.BitMap([3, 4, 5, 6]),
+}
+
+
+def test_tokenize_quoted_names():
+    assert tokenize('"rfm:À Risque" & ~magasin:32') == [
+        ('nom', 'rfm:À Risque'), ('op', '&'), ('op', '~'), ('nom', 'magasin:32')]
+    assert names_in('("rfm:À Risque" | magasin:32) & contact:email') == {
+        'rfm:À Risque', 'magasin:32', 'contact:email'}
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('"rfm:À Risque" & contact:email', [2, 3]),
+    ('"rfm:À Risque" | magasin:32 & contact:email', [1, 2, 3, 4, 5]),
+    ('("rfm:À Risque" | magasin:32) & contact:email', [2, 3, 5]),
+    ('~contact:email & magasin:32', [4, 6]),
+    ('~(contact:email | magasin:32)', [1, 8, 9, 10]),
+    ('~~magasin:32', [3, 4, 5, 6]),
+])
+def test_compose_precedence(expression, expected):
+    assert list(compose(expression, SETS)) == expected
+
+
+@pytest.mark.parametrize('expression, message', [
+    ('magasin:99', 'inconnu'),
+    ('magasin:32 &', 'incomplète'),
+    ('(magasin:32 | contact:email', 'incomplète'),
+    ('magasin:32 contact:email', 'en trop'),
+    ('& magasin:32', 'inattendu'),
+    ('"magasin:32', 'illisible'),
+])
+def test_compose_errors(expression, message):
+    with pytest.raises(ValueError, match=message):
+        compose(expression, SETS)
+
+
+def test_negation_needs_universe():
+    sets = {name: bitmap for name, bitmap in SETS.items() if name != 'tous'}
+    with pytest.raises(ValueError, match='tous'):
+        compose('~magasin:32', sets)
+
+
+def test_segment_matches_rfm_rules():
+    assert [segment(*scores) for scores in ((5, 5, 5), (4, 4, 4), (2, 4, 1), (3, 4, 1), (5, 1, 1), (1, 3, 3), (3, 3, 3))] == [
+        'Ultra Champions', 'Champions', 'À Risque', 'Loyaux', 'Nouveaux', 'Perdus', 'Occasionnels']
@@ -0,0 +1,33 @@
+from decor.backends import translate_sql
+from decor.queries import QUERIES
+
+
+def test_postgres_sql_unchanged():
+    sql = "SELECT TO_CHAR(MIN(date), 'YYYY-MM') FROM transactions"
+    assert translate_sql(sql, 'postgres') == sql
+
+
+def test_simple_column():
+    assert (translate_sql("TO_CHAR(date, 'YYYY-MM')", 'duckdb')
+            == "strftime(CAST(date AS DATE), '%Y-%m')")
+
+
+def test_nested_call():
+    assert (translate_sql("TO_CHAR(MIN(date), 'YYYY-MM') as cohort_month", 'duckdb')
+            == "strftime(CAST(MIN(date) AS DATE), '%Y-%m') as cohort_month")
+
+
+def test_nested_to_char_and_commas():
+    sql = "TO_CHAR(COALESCE(MIN(a), TO_CHAR(b, 'DD')::date), 'YYYY-MM')"
+    assert (translate_sql(sql, 'duckdb')
+            == "strftime(CAST(COALESCE(MIN(a), TO_CHAR(b, 'DD')::date) AS DATE), '%Y-%m')")
+
+
+def test_other_formats_untouched():
+    sql = "TO_CHAR(date, 'YYYY-MM-DD'), TO_CHAR(date, 'YYYY-MM')"
+    assert translate_sql(sql, 'duckdb') == "TO_CHAR(date, 'YYYY-MM-DD'), strftime(CAST(date AS DATE), '%Y-%m')"
+
+
+def test_catalogue_fully_translated():
+    for query in QUERIES:
+        assert "TO_CHAR" not in translate_sql(query['sql'], 'duckdb'), query['name']
@@ -0,0 +1,67 @@
+import random
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+np = pytest.importorskip('numpy')
+sparse = pytest.importorskip('scipy.sparse')
+
+from decor.basket import Incidence, fpgrowth, itemset_rules, pair_rules  # noqa: E402
+
+
+def incidence(baskets, items, ticket_ca=None):
+    rows = [row for row, basket in enumerate(baskets) for _ in basket]
+    cols = [items.index(item) for basket in baskets for item in basket]
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                               shape=(len(baskets), len(items)))
+    ca = np.asarray(ticket_ca if ticket_ca is not None else [1.0] * len(baskets))
+    return Incidence(matrix, items, ca)
+
+
+def test_pair_rules_support_confidence_lift():
+    baskets = [['A', 'B'], ['A', 'B'], ['A', 'C'], ['B'], ['A', 'B', 'C'], ['C']]
+    ca = [10.0, 20.0, 5.0, 7.0, 40.0, 3.0]
+    rules = {(r['antecedent'][0], r['consequent']): r
+             for r in pair_rules(incidence(baskets, ['A', 'B', 'C'], ca), min_tickets=2)}
+    # A : 4 tickets, B : 4, C : 3 ; A+B : 3, A+C : 2, B+C : 1 (sous le seuil)
+    assert set(rules) == {('A', 'B'), ('B', 'A'), ('A', 'C'), ('C', 'A')}
+    ab, ca_rule = rules[('A', 'B')], rules[('C', 'A')]
+    assert ab['tickets'] == 3
+    assert ab['support'] == pytest.approx(3 / 6)
+    assert ab['confidence'] == pytest.approx(3 / 4)
+    assert ab['lift'] == pytest.approx(3 * 6 / (4 * 4))
+    assert ab['ca'] == pytest.approx(10 + 20 + 40)
+    assert ca_rule['confidence'] == pytest.approx(2 / 3)
+    assert ca_rule['lift'] == pytest.approx(2 * 6 / (4 * 3))
+    assert ca_rule['ca'] == pytest.approx(5 + 40)
+
+
+def brute_force(baskets, min_count, max_len):
+    counts = Counter()
+    for basket in baskets:
+        for size in range(1, max_len + 1):
+            counts.update(frozenset(c) for c in combinations(sorted(set(basket)), size))
+    return {itemset: count for itemset, count in counts.items() if count >= min_count}
+
+
+@pytest.mark.parametrize('seed, min_count, max_len', [(0, 3, 4), (1, 5, 3), (2, 2, 2)])
+def test_fpgrowth_matches_brute_force(seed, min_count, max_len):
+    rng = random.Random(seed)
+    baskets = [rng.sample(range(8), rng.randint(1, 5)) for _ in range(120)]
+    assert fpgrowth(baskets, min_count, max_len) == brute_force(baskets, min_count, max_len)
+
+
+def test_itemset_rules_from_three_item_sets():
+    baskets = [['A', 'B', 'C']] * 30 + [['A', 'B']] * 10 + [['C']] * 20 + [['A', 'D']] * 10
+    rules = itemset_rules(incidence(baskets, ['A', 'B', 'C', 'D']), min_support=0.01, min_confidence=0.5)
+    # A : 50 tickets, B : 40, C : 50 ; {A, B} : 40, {A, C} = {B, C} = {A, B, C} : 30
+    assert [(r['antecedent'], r['consequent']) for r in rules] == [
+        (['A', 'C'], 'B'), (['B', 'C'], 'A'), (['A', 'B'], 'C')]
+    by_consequent = {r['consequent']: r for r in rules}
+    assert by_consequent['B']['confidence'] == pytest.approx(1.0)
+    assert by_consequent['B']['lift'] == pytest.approx(70 / 40)
+    assert by_consequent['A']['lift'] == pytest.approx(70 / 50)
+    assert by_consequent['C']['confidence'] == pytest.approx(30 / 40)
+    assert by_consequent['C']['lift'] == pytest.approx(30 / 40 * 70 / 50)
+    assert all(r['support'] == pytest.approx(30 / 70) for r in rules)
@@ -0,0 +1,76 @@
+import pytest
+
+from decor.dimensions import text_keys
+from decor.queries import QUERIES
+
+# Requêtes du catalogue sur les seules tables de base (ni agrégats ni tickets)
+BASE_QUERIES = [q for q in QUERIES
+                if not any(table in q['sql'] for table in ('cohort_matrix', 'hierarchy_', 'FROM tickets'))]
+
+
+def test_text_keys_joins():
+    assert text_keys("JOIN produits p ON t.produit_id = p.cle") == "JOIN produits p ON t.produit = p.id"
+    assert text_keys("JOIN clients c ON t.carte_id = c.cle") == "JOIN clients c ON t.carte = c.carte"
+    assert text_keys("JOIN magasins m ON t.depot_id = m.cle") == "JOIN magasins m ON t.depot = m.code"
+
+
+def test_text_keys_fact_columns():
+    assert text_keys("COUNT(DISTINCT t.carte_id), COUNT(DISTINCT carte_id)") == "COUNT(DISTINCT t.carte), COUNT(DISTINCT carte)"
+    assert text_keys("ON t.carte_id = a.carte_id") == "ON t.carte = a.carte"
+    # Autres colonnes *_id intactes
+    assert text_keys("JOIN hierarchy_nodes n ON n.id = r.node_id") == "JOIN hierarchy_nodes n ON n.id = r.node_id"
+
+
+def test_catalogue_text_form_has_no_keys():
+    for query in QUERIES:
+        sql = text_keys(query['sql'])
+        assert '.cle' not in sql and '_id = ' not in sql.replace('node_id = ', ''), query['name']
+
+
+@pytest.fixture
+def backend():
+    duckdb = pytest.importorskip('duckdb')
+    from decor.backends import DuckDBBackend
+
+    backend = DuckDBBackend()
+    backend.conn = duckdb.connect(':memory:')
+    for sql in [
+        "CREATE TABLE clients (cle INTEGER, carte VARCHAR, nom VARCHAR, prenom VARCHAR, sexe VARCHAR, ville VARCHAR, cp VARCHAR)",
+        "INSERT INTO clients VALUES (1, 'C1', 'A', 'a', 'F', 'ROMANS', '26100'), (2, 'C2', 'B', 'b', 'H', 'VALENCE', '26000'), "
+        "(3, '0', NULL, NULL, NULL, NULL, NULL)",
+        "CREATE TABLE produits (cle INTEGER, id VARCHAR, famille VARCHAR, sous_famille VARCHAR)",
+        "INSERT INTO produits VALUES (1, 'P1', 'PEINTURE', 'MURS'), (2, 'P2', 'SOLS', NULL)",
+        "CREATE TABLE magasins (cle SMALLINT, code VARCHAR, nom VARCHAR, zone VARCHAR)",
+        "INSERT INTO magasins VALUES (1, '32', 'Romans', 'SUD'), (2, 'WEB', 'Web', NULL)",
+        "CREATE TABLE transactions (facture VARCHAR, date DATE, carte VARCHAR, depot VARCHAR, produit VARCHAR, "
+        "ca DOUBLE, quantite DOUBLE, carte_id INTEGER, produit_id INTEGER, depot_id SMALLINT)",
+        "INSERT INTO transactions VALUES "
+        "('F12345', DATE '2025-01-03', 'C1', '32', 'P1', 10, 1, 1, 1, 1), "
+        "('F12345', DATE '2025-01-03', 'C1', '32', 'P2', 20, 2, 1, 2, 1), "
+        "('F2', DATE '2025-02-10', 'C2', '32', 'P1', 5, 1, 2, 1, 1), "
+        "('F3', DATE '2025-02-11', 'C2', 'WEB', 'P2', 8, 1, 2, 2, 2), "
+        "('F4', DATE '2025-03-01', '0', '32', 'P1', 4, 1, 3, 1, 1), "
+        # Produit orphelin : pas de membre dans produits, produit_id NULL
+        "('F5', DATE '2025-03-02', 'C1', '32', 'P9', 6, 1, 1, NULL, 1), "
+        # Carte absente de clients : carte_id NULL, comptée comme client quand même
+        "('F6', DATE '2025-03-03', 'C9', '32', 'P1', 7, 1, NULL, 1, 1)",
+    ]:
+        backend.conn.execute(sql)
+    yield backend
+    backend.close()
+
+
+def test_orphan_card_counted_on_keys(backend):
+    query = next(q for q in QUERIES if q['name'] == 'dashboard_kpis')
+    backend.keys = True
+    assert backend.execute(query['sql'])[0][0] == 4  # C1, C2, '0', C9
+
+
+def test_catalogue_same_rows_on_keys_and_text(backend):
+    assert backend.has_keys()
+    for query in BASE_QUERIES:
+        backend.keys = True
+        keyed = backend.execute(query['sql'])
+        backend.keys = False
+        text = backend.execute(query['sql'])
+        assert sorted(map(repr, keyed)) == sorted(map(repr, text)), query['name']
@@ -0,0 +1,21 @@
+import pytest
+
+from decor import exports
+
+
+def test_build_filters_normalizes_months_and_depot():
+    assert exports.build_filters('clients', since='2025-11', until='2025-12') == {
+        'since': '2025-11-01', 'until': '2026-01-01'}
+    with pytest.raises(ValueError, match='fenetre'):
+        exports.build_filters('familles', fenetre='12m')
+
+
+def test_cache_path_keyed_on_view_and_data_version():
+    filters = exports.build_filters('familles', since='2025-11')
+    path = exports.cache_path('familles', 'csv', filters, 7)
+    assert path.parent == exports.CACHE_DIR / 'familles'
+    assert path == exports.cache_path('familles', 'csv', dict(filters), 7)
+    # Nouvelle version : même vue (même préfixe, l'ancien fichier est purgé), autre fichier
+    bumped = exports.cache_path('familles', 'csv', filters, 8)
+    assert bumped != path and bumped.name.rsplit('-', 1)[0] == path.name.rsplit('-', 1)[0]
+    assert exports.cache_path('familles', 'xlsx', filters, 7).name.rsplit('-', 1)[0] != path.name.rsplit('-', 1)[0]
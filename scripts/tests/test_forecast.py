@@ -0,0 +1,64 @@
+from datetime import date
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from decor.forecast import fit_block, fit_holt_winters, fit_seasonal_naive, history_end  # noqa: E402
+
+PATTERN = np.array([5, 4, 6, 8, 9, 12, 15, 11, 7, 6, 9, 20], dtype=float)
+
+
+def test_seasonal_naive_repeats_last_season():
+    Y = np.vstack([np.tile(PATTERN, 3), np.tile(PATTERN * 2, 3)])
+    forecast, sigma, spread = fit_seasonal_naive(Y, 12, 18)
+    assert forecast[0].tolist() == np.tile(PATTERN, 2)[:18].tolist()
+    assert forecast[1].tolist() == (np.tile(PATTERN, 2)[:18] * 2).tolist()
+    assert sigma.tolist() == [0.0, 0.0]
+    assert not spread.any()
+
+
+def test_seasonal_naive_short_series_uses_last_value():
+    forecast, _, _ = fit_seasonal_naive(np.array([[0.0, 0.0, 3.0, 4.0, 6.0]]), 12, 3)
+    assert forecast.tolist() == [[6.0, 6.0, 6.0]]
+
+
+def test_holt_winters_constant_series():
+    Y = np.full((2, 36), 7.0)
+    Y[1] = 250.0
+    forecast, sigma, spread = fit_holt_winters(Y, 12, 6)
+    assert forecast == pytest.approx(np.vstack([np.full(6, 7.0), np.full(6, 250.0)]))
+    assert sigma.tolist() == [0.0, 0.0]
+    assert not spread.any()
+
+
+def test_fit_block_periodic_series_within_interval():
+    models, forecast, lower, upper, sigma = fit_block((np.tile(PATTERN, 4)[None, :], 12, 6))
+    assert models[0] in ('holt_winters', 'saisonnier_naif')
+    assert forecast[0] == pytest.approx(PATTERN[:6])
+    assert (lower <= forecast).all() and (forecast <= upper).all()
+
+
+class LastDate:
+    """Curseur minimal : SELECT MAX(date) renvoie `day`"""
+
+    def __init__(self, day):
+        self.day = day
+
+    def execute(self, sql, params=None):
+        assert 'MAX(date)' in sql
+
+    def fetchone(self):
+        return (self.day,)
+
+
+@pytest.mark.parametrize('last, granularity, expected', [
+    (date(2025, 11, 3), 'mois', date(2025, 11, 1)),       # novembre entamé : exclu
+    (date(2025, 11, 30), 'mois', date(2025, 12, 1)),      # novembre complet
+    (date(2025, 12, 31), 'mois', date(2026, 1, 1)),
+    (date(2025, 11, 5), 'semaine', date(2025, 11, 3)),    # mercredi : semaine exclue
+    (date(2025, 11, 9), 'semaine', date(2025, 11, 10)),   # dimanche : semaine complète
+    (None, 'mois', None),
+])
+def test_history_end_excludes_started_period(last, granularity, expected):
+    assert history_end(LastDate(last), granularity) == expected
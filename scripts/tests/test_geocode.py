@@ -0,0 +1,71 @@
+import pytest
+
+from decor.geocode import ADDRESS, POSTCODE, Geocoder, normalize_address, normalize_cp, split_address
+
+STORE = '12 Avenue Victor Hugo 26100 ROMANS-SUR-ISERE'
+STORE_POINT = (45.0431, 5.0512)
+
+
+def test_normalize_address_expands_abbreviations_and_accents():
+    assert normalize_address("415 av. Paul-Henri Mouton") == '415 AVENUE PAUL HENRI MOUTON'
+    assert normalize_address("Rte de l'Étang, bd St-Jean") == 'ROUTE DE L ETANG BOULEVARD SAINT JEAN'
+    assert normalize_address(None) == ''
+
+
+def test_normalize_cp():
+    assert normalize_cp(' 1440') == '01440'
+    assert normalize_cp('26100.0') == '26100'
+    assert normalize_cp('261') is None
+
+
+def test_split_address_keeps_last_postcode():
+    assert split_address('905 Rue des Vareys 01440 VIRIAT') == ('905', '905 RUE DES VAREYS 01440 VIRIAT', '01440')
+
+
+@pytest.fixture
+def paths(tmp_path):
+    postcodes = tmp_path / 'codes-postaux.csv'
+    postcodes.write_text('cp;latitude;longitude\n26100;44.76;4.76\n26200;44.77;4.74\n', encoding='utf-8')
+    return {'cache_file': tmp_path / 'cache.sqlite', 'postcodes_file': postcodes, 'ban_dir': tmp_path / 'ban'}
+
+
+def test_centroid_is_only_a_fallback_when_remote(paths):
+    calls = []
+
+    def remote(address):
+        calls.append(address)
+        return STORE_POINT
+
+    with Geocoder(remote=remote, **paths) as geocoder:
+        assert geocoder.address(STORE) == (*STORE_POINT, ADDRESS)
+    assert calls == [normalize_address(STORE)]
+
+
+def test_centroid_fallback_not_cached(paths):
+    with Geocoder(**paths) as geocoder:
+        assert geocoder.address(STORE) == (44.76, 4.76, POSTCODE)
+        assert geocoder.cached([f'adr:{normalize_address(STORE)}']) == {}
+
+    # Un passage ultérieur avec fournisseur distant obtient le point exact
+    with Geocoder(remote={normalize_address(STORE): STORE_POINT}.get, **paths) as geocoder:
+        assert geocoder.address(STORE) == (*STORE_POINT, ADDRESS)
+        assert geocoder.stats['remote'] == 1
+
+
+def test_remote_miss_keeps_centroid_and_is_not_asked_again(paths):
+    calls = []
+
+    def remote(address):
+        calls.append(address)
+        return None
+
+    with Geocoder(remote=remote, **paths) as geocoder:
+        assert geocoder.address(STORE) == (44.76, 4.76, POSTCODE)
+    with Geocoder(remote=remote, **paths) as geocoder:
+        assert geocoder.address(STORE) == (44.76, 4.76, POSTCODE)
+    assert len(calls) == 1
+
+
+def test_postcode_centroid_is_final(paths):
+    with Geocoder(remote=lambda address: pytest.fail(address), **paths) as geocoder:
+        assert geocoder.postcodes(['26200']) == {'26200': (44.77, 4.74)}
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from decor.identity import normalize_emails, normalize_names, normalize_phones, resolve  # noqa: E402
+
+
+def test_normalize_phones():
+    values = ['+33 6 12 34 56 78', '06.12.34.56.78', '612345678', '0033612345678',
+              '12345', '00 44 20 7946 0958', None, '06 12 34 56 7X']
+    assert normalize_phones(values).tolist() == ['0612345678'] * 4 + [''] * 4
+
+
+def test_normalize_names_and_emails():
+    assert normalize_names(['  dupont-Élodie ', "O'Neil", None]).tolist() == ['DUPONTELODIE', 'ONEIL', '']
+    assert normalize_emails([' Jean.Dupont@Mail.FR', 'jean@', 'a b@mail.fr', '@mail.fr']).tolist() == \
+        ['jean.dupont@mail.fr', '', '', '']
+
+
+def test_resolve_links_cards_of_same_person():
+    rows = [
+        ('1001', 'Dupont', 'Jean', 'jean.dupont@mail.fr', '', '26100', ''),
+        ('998', 'DUPONT', 'jean', 'JEAN.DUPONT@mail.fr', '06 12 34 56 78', '26100', ''),
+        ('1500', 'Dupont', '', '', '+33612345678', '', ''),
+        # Même email, autre nom : pas la même personne
+        ('2000', 'Martin', 'Jean', 'jean.dupont@mail.fr', '', '26100', ''),
+        # Même nom et code postal, naissance différente
+        ('3000', 'Durand', 'Marie', '', '', '07000', '1980-01-01'),
+        ('3001', 'Durand', 'Marie', '', '', '07000', '1985-05-05'),
+    ]
+    mapping, stats = resolve(rows)
+    assert mapping == {
+        '1001': ('998', 'email', 3),
+        '998': ('998', 'email', 3),
+        '1500': ('998', 'telephone', 3),
+    }
+    assert stats == {'email': 2, 'telephone': 1, 'nom_cp': 0}
+
+
+def test_resolve_skips_oversized_blocks():
+    rows = [(str(i), 'Dupont', 'Jean', 'contact@magasin.fr', '', '', '') for i in range(1, 5)]
+    assert resolve(rows, max_block=3) == ({}, {'email': 0, 'telephone': 0, 'nom_cp': 0})
+    assert len(resolve(rows, max_block=4)[0]) == 4
@@ -0,0 +1,68 @@
+import json
+import re
+
+from decor.index_advisor import CANDIDATES, candidate_sql, plan_index_names
+from decor.queries import QUERIES
+
+PARTITIONED_PLAN = [{
+    'Plan': {
+        'Node Type': 'Aggregate',
+        'Plans': [{
+            'Node Type': 'Append',
+            'Plans': [
+                {'Node Type': 'Index Only Scan',
+                 'Index Name': 'transactions_2025_10_depot_date_ca_facture_carte_idx',
+                 'Relation Name': 'transactions_2025_10'},
+                {'Node Type': 'Bitmap Heap Scan', 'Relation Name': 'transactions_2025_11',
+                 'Plans': [{'Node Type': 'Bitmap Index Scan',
+                            'Index Name': 'transactions_2025_11_depot_date_ca_facture_carte_idx'}]},
+                {'Node Type': 'Seq Scan', 'Relation Name': 'transactions_default'},
+            ],
+        }],
+    },
+}]
+
+
+def test_child_indexes_found_in_nested_nodes():
+    assert plan_index_names(PARTITIONED_PLAN) == {
+        'transactions_2025_10_depot_date_ca_facture_carte_idx',
+        'transactions_2025_11_depot_date_ca_facture_carte_idx',
+    }
+
+
+def test_json_text_plan():
+    assert plan_index_names(json.dumps(PARTITIONED_PLAN)) == plan_index_names(PARTITIONED_PLAN)
+
+
+def test_parent_name_alone_does_not_match():
+    assert 'idx_tx_depot_date_cover' not in plan_index_names(PARTITIONED_PLAN)
+
+
+def test_sequential_plan():
+    assert plan_index_names([{'Plan': {'Node Type': 'Seq Scan', 'Relation Name': 'transactions'}}]) == set()
+
+
+def _columns(sql):
+    lists = re.findall(r"\(([^()]*)\)", sql.split(' WITH ')[0].split(' WHERE ')[0])
+    return [c.strip() for part in lists for c in part.split(',')]
+
+
+def test_candidates_cover_catalogue_columns():
+    catalogue = ' '.join(q['sql'] for q in QUERIES)
+    for candidate in CANDIDATES:
+        for column in _columns(candidate_sql(candidate)):
+            assert re.search(rf"\b{column}\b", catalogue), (candidate['name'], column)
+    # Chaque clé entière de jointure est servie par au moins un candidat
+    keyed = {c for candidate in CANDIDATES for c in _columns(candidate_sql(candidate))}
+    assert {'carte_id', 'produit_id', 'depot_id'} <= keyed
+
+
+def test_candidates_text_form():
+    for candidate in CANDIDATES:
+        sql = candidate_sql(candidate, keys=False)
+        columns = _columns(sql)
+        assert not any(c.endswith('_id') for c in columns), sql
+        assert len(columns) == len(set(columns)), sql
+    produit = next(c for c in CANDIDATES if c['name'] == 'idx_tx_produit_id_date_cover')
+    assert candidate_sql(produit, keys=False) == \
+        "CREATE INDEX {name} ON transactions (produit, date) INCLUDE (ca, quantite, depot)"
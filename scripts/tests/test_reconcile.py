@@ -0,0 +1,44 @@
+from decor import reconcile
+from decor.sage import ENCODING, LIGNEVENTE_COLUMNS, SEPARATOR
+
+LINES = [
+    ['1001', 'F1', 'M32', '03/11/2025', '10', 'P1', '2', '4,50', '9,00'],
+    ['1001', 'F1', '32', '03/11/2025', '10', 'P2', '1', '10', '10,00'],
+    ['', 'F2', '32', '03/11/2025', '11', 'P1', '1', '4,50', '4,50'],
+    ['1002', 'F3', '33', '2025-11-04', '09', 'P3', '-1', '20', '-20,00'],
+    ['1003', '', '33', '04/11/2025', '09', 'P3', '1', '20', '20,00'],
+    ['1003', 'F4', '33', 'illisible', '09', 'P3', '1', '20', '20,00'],
+    ['1004', 'F5', '33', '01/12/2025', '09', 'P3', '1', '20', '20,00'],
+]
+
+
+def test_csv_totals_same_rules_as_import(tmp_path):
+    path = tmp_path / 'lignevente.csv'
+    with open(path, 'w', encoding=ENCODING, newline='') as f:
+        for row in [LIGNEVENTE_COLUMNS] + LINES:
+            f.write(SEPARATOR.join(row) + '\n')
+    assert reconcile.csv_totals(path, since='2025-11-01', until='2025-12-01') == {
+        ('2025-11-03', '32'): [3, 2, 23.5, 4.0],
+        ('2025-11-04', '33'): [1, 1, -20.0, -1.0],
+    }
+
+
+def test_diff_reports_only_cells_beyond_tolerance():
+    source = {('2025-11-03', '32'): [3, 2, 23.5, 4.0], ('2025-11-04', '33'): [1, 1, -20.0, -1.0]}
+    database = {('2025-11-03', '32'): [3, 2, 23.505, 4.0], ('2025-11-05', '33'): [2, 1, 40.0, 2.0]}
+    gaps = reconcile.diff(source, database)
+    assert [(g['jour'], g['depot'], g['indicateur'], g['ecart']) for g in gaps] == [
+        ('2025-11-04', '33', 'lignes', -1), ('2025-11-04', '33', 'tickets', -1),
+        ('2025-11-04', '33', 'ca', 20.0), ('2025-11-04', '33', 'quantite', 1.0),
+        ('2025-11-05', '33', 'lignes', 2), ('2025-11-05', '33', 'tickets', 1),
+        ('2025-11-05', '33', 'ca', 40.0), ('2025-11-05', '33', 'quantite', 2.0),
+    ]
+
+
+def test_by_month_and_totals():
+    cells = {('2025-11-03', '32'): [3, 2, 23.5, 4.0], ('2025-11-20', '32'): [1, 1, 6.5, 1.0],
+             ('2025-12-01', '32'): [1, 1, 1.0, 1.0]}
+    months = reconcile.by_month(cells)
+    assert months == {('2025-11', '32'): [4, 3, 30.0, 5.0], ('2025-12', '32'): [1, 1, 1.0, 1.0]}
+    assert reconcile.diff(months, months, label='mois') == []
+    assert reconcile.totals(cells) == [5, 4, 31.0, 6.0]
@@ -0,0 +1,58 @@
+import pytest
+
+from decor import tickets
+from decor.queries import QUERIES
+
+QUERY = {q['name']: q['sql'] for q in QUERIES}
+
+
+@pytest.fixture
+def backend():
+    duckdb = pytest.importorskip('duckdb')
+    from decor.backends import DuckDBBackend
+
+    backend = DuckDBBackend()
+    backend.conn = duckdb.connect(':memory:')
+    backend.keys = False
+    for sql in [
+        "CREATE TABLE magasins (cle SMALLINT, code VARCHAR, nom VARCHAR, zone VARCHAR)",
+        "INSERT INTO magasins VALUES (1, '32', 'Romans', 'SUD'), (2, 'WEB', 'Web', NULL), (3, '41', 'Interne', NULL)",
+        "CREATE TABLE transactions (facture VARCHAR, date TIMESTAMP, heure INTEGER, carte VARCHAR, depot VARCHAR, "
+        "produit VARCHAR, ca DOUBLE, quantite DOUBLE, is_web BOOLEAN)",
+        "INSERT INTO transactions VALUES "
+        # Ticket avec une ligne de remboursement
+        "('F1', TIMESTAMP '2025-01-03', 10, 'C1', '32', 'P1', 30, 1, FALSE), "
+        "('F1', TIMESTAMP '2025-01-03', 10, 'C1', '32', 'P2', 20, 2, FALSE), "
+        "('F1', TIMESTAMP '2025-01-03', 10, 'C1', '32', 'P3', -15, -1, FALSE), "
+        # Ticket fait seulement d'un remboursement
+        "('F2', TIMESTAMP '2025-01-04', 11, 'C2', '32', 'P1', -30, -1, FALSE), "
+        # Même facture sur deux dates : un seul ticket côté lignes
+        "('F3', TIMESTAMP '2025-01-05', 12, 'C2', 'WEB', 'P2', 8, 1, TRUE), "
+        "('F3', TIMESTAMP '2025-01-06', 9, 'C2', 'WEB', 'P1', 12, 1, TRUE), "
+        # Dépôt interne exclu des KPI
+        "('F4', TIMESTAMP '2025-01-07', 15, 'C1', '41', 'P1', 50, 1, FALSE)",
+        tickets.CREATE_SQL,
+        f"INSERT INTO tickets ({tickets.COLUMNS}) {tickets.SELECT_SQL.format(where='')}",
+    ]:
+        backend.conn.execute(sql)
+    yield backend
+    backend.close()
+
+
+def test_tickets_kpis_match_line_kpis(backend):
+    _, total_tickets, total_ca, panier = backend.execute(QUERY['dashboard_kpis'])[0]
+    assert (total_tickets, total_ca) == (2, 70)  # F1 (50 de lignes positives) et F3
+    assert backend.execute(QUERY['tickets_kpis'])[0][:3] == pytest.approx((total_tickets, total_ca, panier))
+
+
+def test_tickets_top_magasins_match_lines(backend):
+    lines = backend.execute(QUERY['dashboard_top_magasins'])
+    assert [tuple(row[:3]) + tuple(pytest.approx(v) for v in row[3:]) for row in lines] \
+        == backend.execute(QUERY['tickets_top_magasins'])
+
+
+def test_stats_counts_distinct_factures(backend):
+    cur = backend.conn.cursor()
+    nb, lignes, ca, panier, taille = tickets.stats(cur)
+    assert (nb, lignes, ca) == (4, 7, 75)
+    assert panier == pytest.approx(75 / 4) and taille == pytest.approx(7 / 4)
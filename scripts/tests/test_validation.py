@@ -0,0 +1,89 @@
+import pytest
+
+from decor import preflight, validation
+
+duckdb = pytest.importorskip('duckdb')
+
+
+@pytest.fixture
+def backend():
+    from decor.backends import DuckDBBackend
+
+    backend = DuckDBBackend()
+    backend.conn = duckdb.connect(':memory:')
+    backend.conn.execute("CREATE TABLE clients (carte VARCHAR, nom VARCHAR)")
+    backend.conn.execute("INSERT INTO clients VALUES ('1', 'A'), ('2', ''), ('2', NULL)")
+    backend.conn.execute("CREATE TABLE transactions (carte VARCHAR, quantite DOUBLE)")
+    backend.conn.execute("INSERT INTO transactions VALUES ('1', 1), ('0', 2), ('9', 3), ('9', -50000), (NULL, 5)")
+    yield backend
+    backend.close()
+
+
+def test_compile_table_one_query_with_join_per_reference():
+    rules = [
+        {'table': 'transactions', 'regle': 'complet', 'colonne': 'carte'},
+        {'table': 'transactions', 'regle': 'reference', 'colonne': 'carte', 'cible': 'clients.carte', 'sauf': ['0']},
+    ]
+    sql, plan = validation.compile_table('transactions', rules)
+    assert sql.startswith('SELECT COUNT(*) AS lignes')
+    assert sql.count('LEFT JOIN') == 1
+    assert "NOT IN ('0')" in sql
+    assert [names for _, names in plan] == [['r0'], ['r1', 'r1_cles']]
+
+
+def test_compile_table_unknown_rule():
+    with pytest.raises(ValueError):
+        validation.compile_table('transactions', [{'table': 'transactions', 'regle': 'magique'}])
+
+
+def test_validate_counts_orphans_and_statuses(backend):
+    rules = [
+        {'table': 'transactions', 'regle': 'reference', 'colonne': 'carte', 'cible': 'clients.carte', 'sauf': ['0']},
+        {'table': 'transactions', 'regle': 'plage', 'colonne': 'quantite', 'min': -10000, 'max': 10000,
+         'tolerance': 0.25, 'niveau': 'avertissement'},
+        {'table': 'clients', 'regle': 'unique', 'colonnes': ['carte']},
+        {'table': 'clients', 'regle': 'complet', 'colonne': 'nom', 'tolerance': None},
+        {'table': 'clients', 'regle': 'complet', 'colonne': 'email'},
+    ]
+    report = validation.validate(backend, rules=rules, log=lambda message: None)
+    reference, plage, unique, nom, email = report['regles']
+
+    assert (reference['violations'], reference['cles_orphelines'], reference['statut']) == (2, 1, 'erreur')
+    assert (plage['violations'], plage['min'], plage['statut']) == (1, '-50000.0', 'ok')
+    assert (unique['violations'], unique['statut']) == (1, 'erreur')
+    assert (nom['violations'], nom['statut']) == (2, 'info')
+    assert email['statut'] == 'ignoree'
+    assert [r['id'] for r in validation.failures(report)] == [reference['id'], unique['id']]
+
+
+def test_preflight_check_reference_and_unique():
+    spec = preflight.FILES['lignevente']
+    reference = preflight.Check({'table': 'lignevente', 'regle': 'reference', 'colonne': 'produit',
+                                 'cible': 'produits.id', 'sauf': ['0']}, spec, keys={'P1'})
+    duplicates = preflight.Check({'table': 'lignevente', 'regle': 'unique'}, spec)
+    rows = [
+        ['1', 'F1', '32', '01/11/2025', '10:00', 'P1', '1', '9,90', '9,90'],
+        ['1', 'F1', '32', '01/11/2025', '10:00', 'P2', '1', '9,90', '9,90'],
+        ['1', 'F1', '32', '01/11/2025', '10:00', 'P2', '1', '9,90', '9,90'],
+        ['1', 'F2', '32', '01/11/2025', '10:00', '0', '1', '9,90', '9,90'],
+        ['1', 'F3', '32'],
+    ]
+    for row in rows:
+        reference(row)
+        duplicates(row)
+    assert reference.values() == [2, 1]
+    assert duplicates.values() == [1]
+
+
+def test_preflight_check_format_and_plage():
+    spec = preflight.FILES['lignevente']
+    date_format = preflight.Check({'table': 'lignevente', 'regle': 'format', 'colonne': 'date', 'type': 'date'}, spec)
+    quantite = preflight.Check({'table': 'lignevente', 'regle': 'plage', 'colonne': 'quantite',
+                                'min': -10000, 'max': 10000}, spec)
+    for day, quantity in (('01/11/2025', '2'), ('1 nov. 2025', '1,5'), ('', '20000'), ('02/11/2025', 'abc')):
+        row = ['1', 'F1', '32', day, '10:00', 'P1', quantity, '1', '1']
+        date_format(row)
+        quantite(row)
+    assert date_format.values() == [1]
+    violations, low, high = quantite.values()
+    assert (violations, float(low), float(high)) == (1, 1.5, 20000.0)
@@ -20,6 +20,13 @@ import psycopg2
 from datetime import datetime
 from dotenv import load_dotenv
 
+from decor import version
+from decor.db import connect, transaction
+from decor.depots import canonical_csv
+from decor.dimensions import fill_keys, has_keys
+from decor.schema import add_months, ensure_partitions, parse_month
+from decor.aggregates import refresh_all
+
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -43,7 +50,7 @@ def log(message):
 def connect_db():
     """Se connecter à la base de données"""
     try:
-        conn = psycopg2.connect(DATABASE_URL)
+        conn = connect(DATABASE_URL)
         log("✅ Connexion à Neon PostgreSQL établie")
         return conn
     except Exception as e:
@@ -92,8 +99,10 @@ def insert_clients(conn):
                 "COPY clients (carte, ville, cp) FROM STDIN WITH CSV HEADER",
                 f
             )
-        conn.commit()
         inserted = cursor.rowcount
+        if inserted:
+            version.bump(cursor)  # même transaction que les lignes
+        conn.commit()
         log(f"✅ {inserted} clients insérés")
         return inserted
     except psycopg2.errors.UniqueViolation:
@@ -122,8 +131,10 @@ def insert_produits(conn):
                 "COPY produits (id, famille, sous_famille, sous_sous_famille, sous_sous_sous_famille) FROM STDIN WITH CSV HEADER",
                 f
             )
-        conn.commit()
         inserted = cursor.rowcount
+        if inserted:
+            version.bump(cursor)
+        conn.commit()
         log(f"✅ {inserted} produits insérés")
         return inserted
     except psycopg2.errors.UniqueViolation:
@@ -137,20 +148,35 @@ def insert_produits(conn):
     finally:
         cursor.close()
 
+def prepare_partitions(conn):
+    """Partitions du mois précédent au mois suivant (base partitionnée uniquement)"""
+    current = parse_month(datetime.now())
+    with transaction(conn) as cursor:
+        created = ensure_partitions(cursor, add_months(current, -1), current, ahead=1)
+    for month in created:
+        log(f"📅 Partition {month:%Y-%m} créée")
+
 def insert_transactions(conn):
     """Insérer les nouvelles transactions"""
+    prepare_partitions(conn)
     cursor = conn.cursor()
     nb_lines = count_lines(TRANSACTIONS_FILE)
     log(f"📥 Insertion de {nb_lines} nouvelles transactions...")
     
     try:
         with open(TRANSACTIONS_FILE, 'r') as f:
+            # Codes dépôt canonisés avant COPY ('M32' → '32')
             cursor.copy_expert(
                 "COPY transactions (facture, date, carte, depot, produit, ca, quantite) FROM STDIN WITH CSV HEADER",
-                f
+                canonical_csv(f, 3)
             )
-        conn.commit()
         inserted = cursor.rowcount
+        # Clés entières des nouvelles lignes (base migrée avec apply-migration.py cles)
+        if has_keys(cursor):
+            fill_keys(cursor)
+        if inserted:
+            version.bump(cursor)
+        conn.commit()
         log(f"✅ {inserted} transactions insérées")
         return inserted
     except Exception as e:
@@ -201,6 +227,11 @@ def main():
         
         log("\n--- Phase 3: Transactions ---")
         transactions_added = insert_transactions(conn)
+
+        log("\n--- Phase 4: Agrégats (tickets, cohortes...) ---")
+        if transactions_added:
+            current = parse_month(datetime.now())
+            refresh_all(conn, add_months(current, -1), current, log=log)
         
         # 5. Stats après
         nb_trans_apres, nb_clients_apres, nb_produits_apres = get_stats(conn)
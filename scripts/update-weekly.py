@@ -17,12 +17,19 @@ Usage:
   python scripts/update-weekly.py
 """
 
+import csv
 import os
 import sys
-import psycopg2
 from datetime import datetime
 from dotenv import load_dotenv
 
+from decor import version
+from decor.aggregates import refresh_all
+from decor.db import connect, transaction
+from decor.depots import canonical_csv
+from decor.dimensions import ensure_keys, fill_keys
+from decor.schema import create_partitioned, parse_month
+
 # Charger les variables d'environnement
 load_dotenv()
 
@@ -47,7 +54,7 @@ def log(message):
 def connect_db():
     """Se connecter à la base de données"""
     try:
-        conn = psycopg2.connect(DATABASE_URL)
+        conn = connect(DATABASE_URL)
         log("✅ Connexion à Neon PostgreSQL établie")
         return conn
     except Exception as e:
@@ -85,6 +92,21 @@ def count_lines(filepath):
     with open(filepath, 'r') as f:
         return sum(1 for _ in f) - 1
 
+def transaction_months():
+    """Premier et dernier mois de transactions.csv (colonne date), None si illisibles"""
+    first = last = None
+    with open(TRANSACTIONS_FILE, 'r', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            try:
+                month = parse_month(row[1])
+            except (IndexError, ValueError):
+                continue
+            first = month if first is None or month < first else first
+            last = month if last is None or month > last else last
+    return first, last
+
 def confirm_action():
     """Demander confirmation avant destruction"""
     log("\n" + "⚠️ " * 30)
@@ -118,6 +140,7 @@ def drop_tables(conn):
         cursor.execute("DROP TABLE IF EXISTS clients CASCADE")
         cursor.execute("DROP TABLE IF EXISTS produits CASCADE")
         cursor.execute("DROP TABLE IF EXISTS depots CASCADE")
+        version.bump(cursor)  # chaque phase validée porte sa version
         
         conn.commit()
         log("✅ Tables supprimées")
@@ -128,8 +151,8 @@ def drop_tables(conn):
     finally:
         cursor.close()
 
-def create_tables(conn):
-    """Créer toutes les tables"""
+def create_tables(conn, months):
+    """Créer toutes les tables (`months` : premier et dernier mois des transactions)"""
     log("\n🏗️  Création des tables...")
     cursor = conn.cursor()
     
@@ -165,19 +188,11 @@ def create_tables(conn):
         """)
         log("  ✅ Table depots créée")
         
-        # Table transactions
-        cursor.execute("""
-            CREATE TABLE transactions (
-                facture VARCHAR(50),
-                date DATE,
-                carte VARCHAR(50),
-                depot VARCHAR(50),
-                produit VARCHAR(50),
-                ca NUMERIC(10, 2),
-                quantite INTEGER
-            )
-        """)
-        log("  ✅ Table transactions créée")
+        # Table transactions : toutes les colonnes lues par l'API et les agrégats,
+        # partitionnée par mois (decor.schema) comme après `apply-migration.py partition`
+        first, last = months
+        months_created = create_partitioned(cursor, first or parse_month(datetime.now()), last)
+        log(f"  ✅ Table transactions créée ({len(months_created)} partitions mensuelles + défaut)")
         
         conn.commit()
         log("✅ Toutes les tables créées")
@@ -199,8 +214,9 @@ def load_clients(conn):
                 "COPY clients (carte, ville, cp) FROM STDIN WITH CSV HEADER",
                 f
             )
-        conn.commit()
         inserted = cursor.rowcount
+        version.bump(cursor)
+        conn.commit()
         log(f"✅ {inserted:,} clients chargés")
         return inserted
     except Exception as e:
@@ -221,8 +237,9 @@ def load_produits(conn):
                 "COPY produits (id, famille, sous_famille, sous_sous_famille, sous_sous_sous_famille) FROM STDIN WITH CSV HEADER",
                 f
             )
-        conn.commit()
         inserted = cursor.rowcount
+        version.bump(cursor)
+        conn.commit()
         log(f"✅ {inserted:,} produits chargés")
         return inserted
     except Exception as e:
@@ -245,10 +262,11 @@ def load_depots(conn):
         with open(DEPOTS_FILE, 'r') as f:
             cursor.copy_expert(
                 "COPY depots (code, nom) FROM STDIN WITH CSV HEADER",
-                f
+                canonical_csv(f, 0)
             )
-        conn.commit()
         inserted = cursor.rowcount
+        version.bump(cursor)
+        conn.commit()
         log(f"✅ {inserted:,} dépôts chargés")
         return inserted
     except Exception as e:
@@ -268,12 +286,14 @@ def load_transactions(conn):
     
     try:
         with open(TRANSACTIONS_FILE, 'r') as f:
+            # Codes dépôt canonisés avant COPY ('M32' → '32')
             cursor.copy_expert(
                 "COPY transactions (facture, date, carte, depot, produit, ca, quantite) FROM STDIN WITH CSV HEADER",
-                f
+                canonical_csv(f, 3)
             )
-        conn.commit()
         inserted = cursor.rowcount
+        version.bump(cursor)
+        conn.commit()
         log(f"✅ {inserted:,} transactions chargées")
         return inserted
     except Exception as e:
@@ -345,11 +365,12 @@ def main():
     try:
         start_time = datetime.now()
         
-        # 4. Supprimer les tables
+        # 4. Supprimer les tables (mois du fichier lus avant : partitions à créer)
+        months = transaction_months()
         drop_tables(conn)
         
         # 5. Créer les tables
-        create_tables(conn)
+        create_tables(conn, months)
         
         # 6. Charger les données
         clients_count = load_clients(conn)
@@ -359,11 +380,20 @@ def main():
         
         # 7. Créer les index
         create_indexes(conn)
+
+        # 8. Clés entières recréées et renseignées, puis agrégats des mois chargés
+        with transaction(conn) as cursor:
+            ensure_keys(cursor)
+            fill_keys(cursor)
+        first, last = months
+        if transactions_count and first:
+            log(f"\n🔄 Agrégats {first:%Y-%m} → {last:%Y-%m}...")
+            refresh_all(conn, first, last, log=log)
         
-        # 8. Optimiser
+        # 9. Optimiser
         vacuum_analyze(conn)
         
-        # 9. Résumé
+        # 10. Résumé
         duration = (datetime.now() - start_time).total_seconds()
         log("\n" + "=" * 60)
         log("✅ RECRÉATION COMPLÈTE TERMINÉE")
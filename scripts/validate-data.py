@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Validation des données (règles déclaratives)
+--------------------------------------------
+Exécute les règles de decor.validation (complétude, intégrité référentielle,
+plages, doublons) : une requête d'agrégats par table, sur PostgreSQL, la
+réplique DuckDB ou le moteur en mémoire. Rapport JSON dans
+data/validation-reports/ (ou --output).
+
+Usage:
+  python scripts/validate-data.py                          # PostgreSQL (DATABASE_URL)
+  python scripts/validate-data.py --backend duckdb         # réplique public/duckdb.db
+  python scripts/validate-data.py --table transactions --strict   # code de sortie 1 si erreur
+"""
+import argparse
+import sys
+
+from decor import validation
+from decor.backends import BACKENDS, open_backend
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Validation des données (règles déclaratives)")
+    parser.add_argument('--backend', choices=list(BACKENDS), default='postgres')
+    parser.add_argument('--table', action='append', help="Limiter à une table (répétable)")
+    parser.add_argument('--output', help="Chemin du rapport JSON")
+    parser.add_argument('--strict', action='store_true', help="Code de sortie 1 si une règle est en erreur")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    try:
+        backend = open_backend(args.backend)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"🔗 {backend.name} : {backend.target}")
+
+    try:
+        report = validation.validate(backend, tables=args.table)
+    finally:
+        backend.close()
+
+    validation.print_results(report)
+
+    path = validation.write_report(report, args.output)
+    errors = validation.failures(report)
+    warnings = validation.failures(report, ('avertissement',))
+    print(f"\n📝 Rapport : {path}")
+    print(f"{'❌' if errors else '✅'} {len(errors)} erreur(s), {len(warnings)} avertissement(s)")
+    if errors and args.strict:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Contrôle d'une extraction Sage avant import
+-------------------------------------------
+Lit lignevente.csv, le fichier client, produits.csv et "Points de vente.csv"
+une fois chacun, sans base de données (decor.preflight) : en-têtes, dates,
+montants illisibles, produits et cartes orphelins, doublons. Rapport JSON
+dans data/validation-reports/ (ou --output).
+
+Usage:
+  python scripts/validate-extract.py /chemin/extraction
+  python scripts/validate-extract.py data/synthetic/mini --since 2025-11-01 --until 2026-02-01
+  python scripts/validate-extract.py /chemin/extraction --strict     # code de sortie 1 si erreur
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from decor import preflight, validation
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Contrôle d'une extraction Sage avant import")
+    parser.add_argument('data_dir', help="Dossier de l'extraction")
+    parser.add_argument('--since', help="Première date facture contrôlée (AAAA-MM-JJ)")
+    parser.add_argument('--until', help="Date facture de fin, exclue (AAAA-MM-JJ)")
+    parser.add_argument('--output', help="Chemin du rapport JSON")
+    parser.add_argument('--strict', action='store_true', help="Code de sortie 1 si une règle est en erreur")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if not Path(args.data_dir).is_dir():
+        print(f"❌ Dossier introuvable : {args.data_dir}")
+        sys.exit(1)
+    period = None
+    if args.since or args.until:
+        period = (args.since or '0000-00-00', args.until or '9999-99-99')
+    print(f"📁 {args.data_dir}")
+
+    start = time.perf_counter()
+    report = preflight.validate_extract(args.data_dir, period=period)
+    validation.print_results(report)
+
+    path = validation.write_report(report, args.output, name='extraction')
+    errors = validation.failures(report)
+    warnings = validation.failures(report, ('avertissement',))
+    print(f"\n📝 Rapport : {path}")
+    print(f"{'❌' if errors else '✅'} {len(errors)} erreur(s), {len(warnings)} avertissement(s) "
+          f"en {time.perf_counter() - start:.1f}s")
+    if errors and args.strict:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
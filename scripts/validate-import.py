@@ -2,62 +2,44 @@
 """
 Validation rapide de l'intégrité des données importées
 """
-import psycopg2
-import os
-from dotenv import load_dotenv
+from decor import validation
+from decor.backends import PostgresBackend
+from decor.db import connect
 
-load_dotenv()
-
-conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+conn = connect()
 cur = conn.cursor()
 
 print("\n" + "="*80)
 print("🔍 VALIDATION FINALE DES DONNÉES IMPORTÉES")
 print("="*80)
 
-# Comptages
-print("\n📊 COMPTAGES :")
-cur.execute("SELECT COUNT(*) FROM transactions")
-trans_count = cur.fetchone()[0]
-print(f"  ✅ Transactions : {trans_count:,}")
-
-cur.execute("SELECT COUNT(*) FROM clients")
-clients_count = cur.fetchone()[0]
-print(f"  ✅ Clients : {clients_count:,}")
+# Comptages, complétude, période : règles de decor.validation, une requête par table
+backend = PostgresBackend()
+try:
+    report = validation.validate(backend, log=lambda message: None)
+finally:
+    backend.close()
+results = {r['id']: r for r in report['regles']}
 
-cur.execute("SELECT COUNT(*) FROM produits")
-produits_count = cur.fetchone()[0]
-print(f"  ✅ Produits : {produits_count:,}")
+print("\n📊 COMPTAGES :")
+for table in ('transactions', 'clients', 'produits'):
+    print(f"  ✅ {table.capitalize()} : {report['tables'][table]['lignes']:,}")
 
 # Complétude clients
 print("\n📊 COMPLÉTUDE CLIENTS :")
-cur.execute("""
-    SELECT
-        COUNT(CASE WHEN nom IS NOT NULL AND nom != '' THEN 1 END)::int as avec_nom,
-        COUNT(CASE WHEN prenom IS NOT NULL AND prenom != '' THEN 1 END)::int as avec_prenom,
-        COUNT(CASE WHEN email IS NOT NULL AND email != '' THEN 1 END)::int as avec_email,
-        COUNT(CASE WHEN telephone IS NOT NULL AND telephone != '' THEN 1 END)::int as avec_tel
-    FROM clients
-""")
-
-avec_nom, avec_prenom, avec_email, avec_tel = cur.fetchone()
-print(f"  • Nom : {avec_nom:,} ({avec_nom/clients_count*100:.1f}%)")
-print(f"  • Prénom : {avec_prenom:,} ({avec_prenom/clients_count*100:.1f}%)")
-print(f"  • Email : {avec_email:,} ({avec_email/clients_count*100:.1f}%)")
-print(f"  • Téléphone : {avec_tel:,} ({avec_tel/clients_count*100:.1f}%)")
+clients_count = report['tables']['clients']['lignes']
+for colonne, libelle in (('nom', 'Nom'), ('prenom', 'Prénom'), ('email', 'Email'), ('telephone', 'Téléphone')):
+    result = results[f"clients.{colonne} complet"]
+    if result['statut'] == 'ignoree':
+        continue
+    renseignes = result['lignes'] - result['violations']
+    print(f"  • {libelle} : {renseignes:,} ({renseignes/clients_count*100 if clients_count else 0:.1f}%)")
 
 # Période des transactions
 print("\n📊 PÉRIODE TRANSACTIONS :")
-cur.execute("""
-    SELECT 
-        MIN(date) as date_min,
-        MAX(date) as date_max
-    FROM transactions
-""")
-
-date_min, date_max = cur.fetchone()
-print(f"  • Date min : {date_min}")
-print(f"  • Date max : {date_max}")
+periode = results['transactions.date plage']
+print(f"  • Date min : {periode['min']}")
+print(f"  • Date max : {periode['max']}")
 
 # Répartition mensuelle
 print("\n📊 RÉPARTITION MENSUELLE :")
@@ -79,25 +61,11 @@ for mois, nb_trans, ca, nb_clients in cur.fetchall():
 
 print(f"\n  💰 CA TOTAL : {total_ca:,.2f}€")
 
-# Vérifier relations (clients/produits manquants)
+# Vérifier relations (clients/produits manquants, carte anonyme '0' exclue)
 print("\n📊 INTÉGRITÉ RÉFÉRENTIELLE :")
-
-cur.execute("""
-    SELECT COUNT(DISTINCT t.carte)
-    FROM transactions t
-    LEFT JOIN clients c ON t.carte = c.carte
-    WHERE c.carte IS NULL
-""")
-missing_clients = cur.fetchone()[0]
+missing_clients = results['transactions.carte reference → clients.carte']['cles_orphelines']
 print(f"  • Clients manquants : {missing_clients}")
-
-cur.execute("""
-    SELECT COUNT(DISTINCT t.produit)
-    FROM transactions t
-    LEFT JOIN produits p ON t.produit = p.id
-    WHERE p.id IS NULL
-""")
-missing_produits = cur.fetchone()[0]
+missing_produits = results['transactions.produit reference → produits.id']['cles_orphelines']
 print(f"  • Produits manquants : {missing_produits}")
 
 # Top 10 clients par CA
@@ -144,7 +112,14 @@ for i, (id_prod, nom, famille, nb_ventes, qte, ca_total) in enumerate(cur.fetcha
 cur.close()
 conn.close()
 
+errors = validation.failures(report)
 print("\n" + "="*80)
-print("✅ VALIDATION TERMINÉE - DONNÉES INTÈGRES !")
-print("="*80)
-print("\n🚀 Votre application Magic Système est prête !\n")
+if errors:
+    print(f"❌ VALIDATION TERMINÉE - {len(errors)} RÈGLE(S) EN ERREUR :")
+    for result in errors:
+        print(f"  • {result['id']} : {result['violations']:,} ligne(s)")
+    print("="*80 + "\n")
+else:
+    print("✅ VALIDATION TERMINÉE - DONNÉES INTÈGRES !")
+    print("="*80)
+    print("\n🚀 Votre application Magic Système est prête !\n")
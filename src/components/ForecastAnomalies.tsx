@@ -118,7 +118,20 @@ export default function ForecastAnomalies() {
     return forecasts
   }
   
-  const forecasts = forecastMonths(monthlyData, 3)
+  // Prévisions précalculées (total toutes familles) quand l'API les fournit
+  const precomputed = (data.previsions?.[channel] || [])
+    .filter((row: any) => row.famille === 'Toutes familles')
+    .slice(0, 3)
+    .map((row: any) => ({
+      month: row.mois,
+      ca: null,
+      forecast: row.prevision,
+      forecastLow: row.basse,
+      forecastHigh: row.haute,
+      isForecast: true,
+    }))
+
+  const forecasts = precomputed.length > 0 ? precomputed : forecastMonths(monthlyData, 3)
   const allData = [...dataWithMA, ...forecasts]
   
   // Détection d'anomalies (écart > 20% par rapport à la moyenne mobile)
@@ -262,6 +275,24 @@ export default function ForecastAnomalies() {
                 dot={{ fill: '#06b6d4', r: 5 }}
                 name="Prévision"
               />
+              <Line 
+                type="monotone" 
+                dataKey="forecastHigh" 
+                stroke="#06b6d4" 
+                strokeWidth={1}
+                strokeDasharray="2 4"
+                dot={false}
+                name="Intervalle haut (95%)"
+              />
+              <Line 
+                type="monotone" 
+                dataKey="forecastLow" 
+                stroke="#06b6d4" 
+                strokeWidth={1}
+                strokeDasharray="2 4"
+                dot={false}
+                name="Intervalle bas (95%)"
+              />
             </LineChart>
           </ResponsiveContainer>
         </Suspense>
@@ -1,4 +1,6 @@
 import { PrismaClient } from '@prisma/client'
+import { jointures } from './api/_cles.js'
+import { magasinJoin } from './api/_depots.js'
 
 const prisma = new PrismaClient({
   log: ['query', 'error', 'warn']
@@ -13,11 +15,13 @@ const serializeJSON = (obj) => {
 async function testAll() {
   try {
     console.log('🔍 TEST SECTION ALL - Début')
+    const joinMagasins = await magasinJoin(prisma)
+    const cles = await jointures(prisma)
     
     console.log('\n1. KPIs...')
     const kpis = await prisma.$queryRawUnsafe(`
       SELECT 
-        COUNT(DISTINCT carte)::int as "totalClients",
+        COUNT(DISTINCT ${cles.carte})::int as "totalClients",
         COUNT(*)::int as "totalTransactions",
         SUM(ca)::float as "totalCA",
         (SUM(ca) / COUNT(DISTINCT facture))::float as "panierMoyen"
@@ -49,7 +53,7 @@ async function testAll() {
         SUM(t.ca)::float as ca,
         SUM(t.quantite)::float as volume
       FROM transactions t
-      JOIN produits p ON t.produit = p.id
+      JOIN produits p ON ${cles.produits}
       GROUP BY p.id, p.famille, p.sous_famille
       ORDER BY ca DESC
       LIMIT 10
@@ -67,7 +71,7 @@ async function testAll() {
         COUNT(DISTINCT t.facture)::int as "nbTickets",
         (SUM(t.ca) / COUNT(DISTINCT t.facture))::float as "panierMoyen"
       FROM transactions t
-      JOIN magasins m ON (t.depot = m.code OR t.depot = CONCAT('M', m.code) OR REPLACE(t.depot, 'M', '') = m.code)
+      ${joinMagasins}
       GROUP BY m.code, m.nom, m.zone
       ORDER BY ca DESC
       LIMIT 5
@@ -82,7 +86,7 @@ async function testAll() {
         SUM(t.ca)::float as ca,
         COUNT(DISTINCT t.facture)::int as "nbCommandes"
       FROM transactions t
-      JOIN clients c ON t.carte = c.carte
+      JOIN clients c ON ${cles.clients}
       GROUP BY c.carte, c.ville
       ORDER BY ca DESC
       LIMIT 10
@@ -1,84 +1,23 @@
-import os
-import psycopg2
-from urllib.parse import urlparse
-from dotenv import load_dotenv
+import sys
+from pathlib import Path
 
-load_dotenv()
+sys.path.insert(0, str(Path(__file__).parent / 'scripts'))
+from decor.db import connect
+from decor.depots import AVOIRS, CAISSES_OFFICIELLES, MAGASINS_REELS, SERVICES, canonical_depot
 
-DATABASE_URL = os.getenv('DATABASE_URL')
-result = urlparse(DATABASE_URL)
-
-conn = psycopg2.connect(
-    database=result.path[1:],
-    user=result.username,
-    password=result.password,
-    host=result.hostname,
-    port=result.port
-)
+# Connexion partagée (DATABASE_URL de l'environnement ou du .env)
+conn = connect()
 
 cur = conn.cursor()
 
-# Liste fournie par l'utilisateur
-caisses_officielles = {
-    '12': 'Caisse ALES',
-    '13': 'Caisse BEZIERS',
-    '14': 'Caisse ARLES',
-    '15': 'Caisse VAISE',
-    '16': 'Caisse ST JEAN DE VEDAS',
-    '17': 'Caisse St Peray',
-    '19': 'Caisse Romans',
-    '20': 'Caisse Montfavet',
-    '22': 'Caisse ST BONNET DE MURE',
-    '23': 'Caisse VIRIAT',
-    '24': 'Caisse SILLINGY',
-    '25': 'Caisse CARCASSONNE',
-    '26': 'Caisse ST EGREVE',
-    '27': 'Caisse VILLEFRANCHE',
-    '28': 'Caisse ST MARTIN D\'HERES',
-    '29': 'Caisse FENOUILLET',
-    '31': 'Caisse Montelimar',
-    '32': 'Caisse LEMPDES',
-    '33': 'Caisse ESTANCARBON',
-    '34': 'Caisse AUBENAS',
-    '35': 'Caisse NIMES',
-    '36': 'Caisse VOGLANS',
-    '37': 'Caisse SORGUES',
-    '38': 'Caisse ONET LE CHATEAU',
-    '39': 'Caisse NARBONNE',
-    '48': 'D2D',
-    '49': 'SCEM',
-    '50': 'CAP',
-    '52': 'Avoir M19',
-    '53': 'Ventes etats',
-    '54': 'Ventes Web',
-    '55': 'Client activités annexes',
-    '58': 'Avoir M17',
-    '60': 'MAZET MESSAGERIE MONTELIMAR',
-    '62': 'TAILORMADE LOGISTICS FRANCE',
-    '63': 'GLS',
-    '100': 'FMI DIRRA',
-    '101': 'EFIWARE',
-    '102': 'Client Acompte M19',
-    '109': 'Avoir M12',
-    '110': 'Avoir M13',
-    '111': 'Avoir M14',
-    '112': 'Avoir M15',
-    '113': 'Avoir M16',
-    '114': 'Avoir M20',
-    '115': 'Avoir M22',
-    '116': 'Avoir M23',
-    '117': 'Avoir M24',
-    '118': 'Avoir M25',
-    '119': 'Avoir M26',
-}
-
-magasins_reels = ['12', '13', '14', '15', '16', '17', '19', '20', '22', '23', 
-                  '24', '25', '26', '27', '28', '29', '31', '32', '33', '34', 
-                  '35', '36', '37', '38', '39']
-
-avoirs = ['52', '58', '109', '110', '111', '112', '113', '114', '115', '116', '117', '118', '119']
-
-services = ['48', '49', '50', '53', '54', '55', '60', '62', '63', '100', '101', '102']
+# Liste officielle des caisses (scripts/decor/depots.py, utilisée aussi à l'import)
+caisses_officielles = CAISSES_OFFICIELLES
+
+magasins_reels = MAGASINS_REELS
+
+avoirs = AVOIRS
+
+services = SERVICES
 
 print("\n" + "="*90)
 print("ANALYSE CORRESPONDANCE CAISSES - PÉRIODE NOV 2025 - JAN 2026".center(90))
@@ -96,7 +35,7 @@ cur.execute("""
         COUNT(CASE WHEN t.ca < 0 THEN 1 END) as nb_negatifs
     FROM transactions t
     GROUP BY t.depot
-    ORDER BY t.depot::int
+    ORDER BY LENGTH(t.depot), t.depot
 """)
 
 depots_utilises = cur.fetchall()
@@ -111,10 +50,13 @@ depots_non_listes = []
 depots_magasins_reels = []
 depots_avoirs_utilises = []
 depots_services_utilises = []
+depots_non_canoniques = []
 
 for depot_info in depots_utilises:
     depot, tickets, lignes, ca, ca_min, ca_max, negatifs = depot_info
     depots_dans_base.add(depot)
+    if canonical_depot(depot) != depot:
+        depots_non_canoniques.append(depot)
     
     description = caisses_officielles.get(depot, "❌ NON LISTÉ")
     if depot not in caisses_officielles:
@@ -135,6 +77,10 @@ for depot_info in depots_utilises:
     ca_str = f"{ca:,.0f}" if ca else "0"
     print(f"{emoji} {depot:<6} {description[:33]:<35} {tickets:>8} {lignes:>8} {ca_str:>13} {negatifs:>9}")
 
+if depots_non_canoniques:
+    print(f"\n🔤 Codes non canoniques ({', '.join(depots_non_canoniques)}) :")
+    print("   python scripts/apply-migration.py depots")
+
 # 2. Caisses officielles NON utilisées
 print("\n\n⚠️  2. CAISSES OFFICIELLES NON UTILISÉES (dans liste mais pas dans data)")
 print("-"*90)